@@ -0,0 +1,33 @@
+import env
+from pytissueoptics import *
+import time
+
+TITLE = "OpenCL propagation modes"
+
+DESCRIPTION = """ Compares the propagation speed of the megakernel and wavefront OpenCL schedulers on the heterogeneous
+spherical shells scene, where photons alternate between clear, scattering and absorbing layers. """
+
+
+def exampleCode():
+    N = 100000
+
+    outerShell = Sphere(2.5, order=2, material=ScatteringMaterial(mu_a=0.04, mu_s=0.09, g=0.89, n=1.37), label="outer")
+    innerShell = Sphere(2.3, order=2, material=ScatteringMaterial(mu_a=0.2, mu_s=90, g=0.89, n=1.37), label="inner")
+    core = Sphere(1.0, order=2, material=ScatteringMaterial(mu_a=0.5, mu_s=1e-6, g=1, n=1.37), label="core")
+    grid = Cuboid(6, 6, 6, material=ScatteringMaterial(mu_a=0.2, mu_s=70, g=0.89, n=1.37))
+    tissue = ScatteringScene([core, innerShell, outerShell, grid])
+
+    for mode in [PropagationMode.MEGAKERNEL, PropagationMode.WAVEFRONT, PropagationMode.SORTED_WAVEFRONT]:
+        logger = EnergyLogger(tissue, defaultBinSize=0.1)
+        source = PencilPointSource(position=Vector(0, 0.01, -3), direction=Vector(0, 0, 1), N=N, seed=0,
+                                   propagationMode=mode)
+        t0 = time.time()
+        source.propagate(tissue, logger=logger, showProgress=False)
+        elapsedTime = time.time() - t0
+        absorbance = Stats(logger).getAbsorbance("inner", useTotalEnergy=True)
+        print(f"{mode.name}: {elapsedTime:.2f} s ({N / elapsedTime / 1000:.1f} photons/ms). "
+              f"Absorbance of inner shell: {absorbance:.2f}%")
+
+
+if __name__ == "__main__":
+    exampleCode()
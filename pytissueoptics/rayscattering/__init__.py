@@ -1,6 +1,8 @@
 from .photon import Photon
 from .materials import ScatteringMaterial
 from .energyLogging import EnergyLogger
+from .loggingPolicy import LoggingPolicy, LogEvent
+from .tallies import TimeResolvedTally, TrackLengthTally, Detector, CylindricalTally, RadialAngularTally
 from .source import PencilPointSource, IsotropicPointSource, DirectionalSource, DivergentSource
 from .scatteringScene import ScatteringScene
 from .statistics import Stats
@@ -8,9 +10,12 @@ from .display.viewer import Viewer, PointCloudStyle, Visibility, ViewGroup, Dire
 from .display.views import View2DProjection, View2DProjectionX, View2DProjectionY, View2DProjectionZ, \
     View2DSurface, View2DSurfaceX, View2DSurfaceY, View2DSurfaceZ, View2DSlice, View2DSliceX, View2DSliceY, View2DSliceZ
 from .opencl import hardwareAccelerationIsAvailable, CONFIG
+from .opencl.CLPhotons import PropagationMode
 
 __all__ = ["Photon", "ScatteringMaterial", "PencilPointSource", "IsotropicPointSource", "DirectionalSource",
            "DivergentSource", "EnergyLogger", "ScatteringScene", "Viewer", "PointCloudStyle", "Visibility", "ViewGroup",
            "Direction", "View2DProjection", "View2DProjectionX", "View2DProjectionY", "View2DProjectionZ",
            "View2DSurface", "View2DSurfaceX", "View2DSurfaceY", "View2DSurfaceZ", "View2DSlice", "View2DSliceX",
-           "View2DSliceY", "View2DSliceZ", "samples", "Stats", "hardwareAccelerationIsAvailable", "CONFIG"]
+           "View2DSliceY", "View2DSliceZ", "samples", "Stats", "hardwareAccelerationIsAvailable", "CONFIG",
+           "PropagationMode", "LoggingPolicy", "LogEvent", "TimeResolvedTally",
+           "TrackLengthTally", "Detector", "CylindricalTally", "RadialAngularTally"]
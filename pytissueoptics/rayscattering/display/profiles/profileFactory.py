@@ -7,7 +7,7 @@ from pytissueoptics.rayscattering.energyLogging import EnergyLogger
 from pytissueoptics.rayscattering.energyLogging import PointCloudFactory
 from pytissueoptics.rayscattering.scatteringScene import ScatteringScene
 from pytissueoptics.rayscattering.display.profiles import Profile1D
-from pytissueoptics.rayscattering.display.utils import Direction
+from pytissueoptics.rayscattering.display.utils import Direction, binning
 
 
 class ProfileFactory:
@@ -32,9 +32,16 @@ class ProfileFactory:
         limits = (min(limits), max(limits))
         bins = int((limits[1] - limits[0]) / binSize)
 
+        voxelDataPoints = None
+        if not self._logger.has3D and surfaceLabel is None:
+            voxelDataPoints = self._logger.getVoxelDataPoints(solidLabel)
+
         if self._logger.has3D:
             histogram = self._extractHistogramFrom3D(horizontalDirection, solidLabel, surfaceLabel,
                                                      surfaceEnergyLeaving, limits, bins)
+        elif voxelDataPoints is not None:
+            histogram = binning.histogram(voxelDataPoints[:, [horizontalDirection.axis + 1]], [limits], [bins],
+                                          weights=voxelDataPoints[:, 0])
         else:
             histogram = self._extractHistogramFromViews(horizontalDirection, solidLabel, surfaceLabel,
                                                         surfaceEnergyLeaving, limits, bins)
@@ -57,24 +64,40 @@ class ProfileFactory:
 
     def _extractHistogramFrom3D(self, horizontalDirection: Direction, solidLabel: str, surfaceLabel: str,
                                 surfaceEnergyLeaving: bool, limits: Tuple[float, float], bins: int):
-        pointCloud = self._pointCloudFactory.getPointCloud(solidLabel, surfaceLabel)
-
-        if surfaceLabel:
-            if surfaceEnergyLeaving:
-                dataPoints = pointCloud.leavingSurfacePoints
+        if self._logger.dataPointProcessor is not None:
+            return self._extractHistogramFrom3DOnDevice(horizontalDirection, solidLabel, surfaceLabel,
+                                                        surfaceEnergyLeaving, limits, bins)
+        histogram = np.zeros(bins, dtype=np.float32)
+        for pointCloud in self._pointCloudFactory.getPointCloudChunks(solidLabel, surfaceLabel):
+            if surfaceLabel:
+                if surfaceEnergyLeaving:
+                    dataPoints = pointCloud.leavingSurfacePoints
+                else:
+                    dataPoints = pointCloud.enteringSurfacePointsPositive
             else:
-                dataPoints = pointCloud.enteringSurfacePointsPositive
-        else:
-            dataPoints = pointCloud.solidPoints
-        if dataPoints is None:
-            return np.zeros(bins)
+                dataPoints = pointCloud.solidPoints
+            if dataPoints is None:
+                continue
 
-        x, w = dataPoints[:, horizontalDirection.axis + 1], dataPoints[:, 0]
-        histogram, _ = np.histogram(x, bins=bins, range=limits, weights=w)
+            binning.histogram(dataPoints[:, [horizontalDirection.axis + 1]], [limits], [bins], weights=dataPoints[:, 0],
+                              out=histogram)
         return histogram
 
+    def _extractHistogramFrom3DOnDevice(self, horizontalDirection: Direction, solidLabel: str, surfaceLabel: str,
+                                        surfaceEnergyLeaving: bool, limits: Tuple[float, float], bins: int):
+        """ The surface datapoints are filtered by their sign on the device. """
+        spec = binning.HistogramSpec(columns=(horizontalDirection.axis + 1,), limits=(limits,), bins=(bins,))
+        if surfaceLabel:
+            spec = spec._replace(sign=1 if surfaceEnergyLeaving else -1)
+        pointClouds = self._pointCloudFactory.getPointCloudChunks(solidLabel, surfaceLabel)
+        chunks = (pointCloud.surfacePoints if surfaceLabel else pointCloud.solidPoints for pointCloud in pointClouds)
+        return self._logger.dataPointProcessor.histogram(chunks, spec)
+
     def _extractHistogramFromViews(self, horizontalDirection: Direction, solidLabel: str, surfaceLabel: str,
                                    surfaceEnergyLeaving: bool, limits: Tuple[float, float], bins: int):
+        """ The profile is cropped and re-binned from a view that covers its limits, preferably a view with aligned
+        bins so the profile is exact (see `binning.getRebinningMatrix`). """
+        approximateSource = None
         for view in self._logger.views:
             if view.axis == horizontalDirection.axis:
                 continue
@@ -92,17 +115,23 @@ class ProfileFactory:
             else:
                 viewLimits = view.limitsV
                 viewBins = view.binsV
-            if sorted(viewLimits) != sorted(limits):
-                # todo: allow contained limits
-                continue
-            if viewBins != bins:
+            matrix = binning.getRebinningMatrix(sorted(viewLimits), viewBins, limits, bins)
+            if matrix is None:
                 continue
+            if binning.isExactRebinning(matrix):
+                return self._extractHistogramFromView(view, horizontalDirection, matrix)
+            if approximateSource is None:
+                approximateSource = view, matrix
 
-            return self._extractHistogramFromView(view, horizontalDirection)
+        if approximateSource is not None:
+            view, matrix = approximateSource
+            utils.warn(f"WARNING: The bins of the profile are not aligned with the bins of the existing views. The "
+                       f"profile is approximated by re-binning the view {view.name}.")
+            return self._extractHistogramFromView(view, horizontalDirection, matrix)
 
-        raise RuntimeError("Cannot create 1D profile. The 3D data was discarded and no matching 2D view was found.")
+        raise RuntimeError("Cannot create 1D profile. The 3D data was discarded and no 2D view covers its limits.")
 
-    def _extractHistogramFromView(self, view, horizontalDirection: Direction):
+    def _extractHistogramFromView(self, view, horizontalDirection: Direction, matrix: np.ndarray):
         if view.axisU == horizontalDirection.axis:
             axisToSum = 1
         else:
@@ -112,7 +141,7 @@ class ProfileFactory:
         data = np.sum(data, axis=axisToSum)
         if axisToSum == 0:
             data = np.flip(data, axis=0)
-        return data
+        return binning.rebinHistogram(data, [matrix]).astype(np.float32)
 
     def _correctCapitalization(self, solidLabel, surfaceLabel):
         if solidLabel is None:
@@ -1,2 +1,6 @@
 from .direction import Direction, DEFAULT_X_VIEW_DIRECTIONS, DEFAULT_Y_VIEW_DIRECTIONS, DEFAULT_Z_VIEW_DIRECTIONS
 from .volumeSlicer import VolumeSlicer
+from .binning import getBinIndices, accumulateBins, histogram, histogramDataPoints, HistogramSpec, \
+    getRebinningMatrix, getBinOverlaps, isExactRebinning, rebinHistogram
+from .histogramData import HistogramData
+from .pointCloudDecimator import PointCloudDecimator
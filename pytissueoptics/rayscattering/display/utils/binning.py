@@ -0,0 +1,168 @@
+from typing import NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+BINNING_CHUNK_ROWS = 2 ** 20
+DENSE_BINCOUNT_RATIO = 8
+REBINNING_TOLERANCE = 1e-6
+
+
+class HistogramSpec(NamedTuple):
+    """
+    A weighted histogram of datapoints (value, x, y, z): the datapoint `columns` binned along each axis with their
+    `limits` and number of `bins`, and the datapoints it weighs. With a `sign` of 1 (-1), only the positive (negative)
+    datapoints are binned, weighted by their absolute value. With a `sliceColumn`, only the datapoints strictly inside
+    the `sliceLimits` along this column are binned.
+    """
+    columns: Tuple[int, ...]
+    limits: Tuple[Tuple[float, float], ...]
+    bins: Tuple[int, ...]
+    sign: int = 0
+    sliceColumn: int = None
+    sliceLimits: Tuple[float, float] = None
+
+    def getWeights(self, dataPoints: np.ndarray) -> np.ndarray:
+        weights = dataPoints[:, 0]
+        if self.sign != 0:
+            weights = np.where(weights * self.sign > 0, np.abs(weights), 0)
+        if self.sliceColumn is not None:
+            positions = dataPoints[:, self.sliceColumn]
+            isInSlice = (positions > self.sliceLimits[0]) & (positions < self.sliceLimits[1])
+            weights = np.where(isInSlice, weights, 0)
+        return weights
+
+
+def getBinIndices(coordinates: np.ndarray, limits: Sequence[Tuple[float, float]],
+                  bins: Sequence[int]) -> np.ndarray:
+    """
+    Returns the flat (row-major) index of the bin of each row of `coordinates` (n, d) in the uniform grid with the
+    given `limits` and number of `bins` along each of the d axes, or -1 when the row is outside the grid. Like the
+    NumPy histogram functions, bins are right-open except the last bin of each axis.
+
+    The bin of each coordinate is computed with float32 arithmetic, so coordinates that are within float32 precision
+    of an edge can fall in either of the two bins.
+    """
+    binIndices = np.zeros(len(coordinates), dtype=np.intp)
+    isInside = np.ones(len(coordinates), dtype=bool)
+    for axis, ((minLimit, maxLimit), axisBins) in enumerate(zip(limits, bins)):
+        x = coordinates[:, axis].astype(np.float32)
+        scale = np.float32(axisBins / (maxLimit - minLimit))
+        x -= np.float32(minLimit)
+        isInside &= (x >= 0) & (x <= np.float32(maxLimit - minLimit))
+        x *= scale
+        np.clip(x, 0, axisBins - 1, out=x)
+        binIndices *= axisBins
+        binIndices += x.astype(np.intp)
+    binIndices[~isInside] = -1
+    return binIndices
+
+
+def accumulateBins(histogram: np.ndarray, binIndices: np.ndarray, weights: np.ndarray = None):
+    """
+    Adds the weight of each datapoint (or 1 without weights) to the bin of the given flat `binIndices` of the
+    preallocated `histogram`. Datapoints with a bin index of -1 are ignored.
+
+    Dense histograms are summed with a single `np.bincount` over all the bins. When the histogram has many more bins
+    than datapoints (e.g. a fine 3D grid), only the bins that were hit are summed, so the temporary memory scales with
+    the number of datapoints instead of the size of the histogram.
+    """
+    isInside = binIndices >= 0
+    binIndices = binIndices[isInside]
+    if weights is not None:
+        weights = weights[isInside]
+    if len(binIndices) == 0:
+        return
+    if not histogram.flags.c_contiguous:
+        raise ValueError("The histogram must be a C-contiguous array to be accumulated in place.")
+    flatHistogram = histogram.reshape(-1)
+    if flatHistogram.size <= DENSE_BINCOUNT_RATIO * len(binIndices):
+        flatHistogram += np.bincount(binIndices, weights=weights, minlength=flatHistogram.size)
+    else:
+        usedBins, inverse = np.unique(binIndices, return_inverse=True)
+        flatHistogram[usedBins] += np.bincount(inverse.reshape(-1), weights=weights)
+
+
+def histogram(coordinates: np.ndarray, limits: Sequence[Tuple[float, float]], bins: Sequence[int],
+              weights: np.ndarray = None, out: np.ndarray = None) -> np.ndarray:
+    """
+    Weighted histogram of the rows of `coordinates` (n, d) on a uniform grid, equivalent to `np.histogramdd` with a
+    `range`. The histogram is accumulated in `out` when given, so it can be computed from a stream of chunks (e.g.
+    out-of-core data), otherwise it is a new float32 array. The rows are binned in chunks to bound the temporary
+    memory.
+    """
+    if out is None:
+        out = np.zeros(tuple(bins), dtype=np.float32)
+    for start in range(0, len(coordinates), BINNING_CHUNK_ROWS):
+        end = start + BINNING_CHUNK_ROWS
+        binIndices = getBinIndices(coordinates[start:end], limits, bins)
+        accumulateBins(out, binIndices, None if weights is None else weights[start:end])
+    return out
+
+
+def histogramDataPoints(dataPoints: np.ndarray, spec: HistogramSpec, out: np.ndarray = None) -> np.ndarray:
+    """ Histogram of the datapoints (value, x, y, z) described by the spec (see `histogram`). """
+    return histogram(dataPoints[:, list(spec.columns)], spec.limits, spec.bins, weights=spec.getWeights(dataPoints),
+                     out=out)
+
+
+def getRebinningMatrix(sourceLimits: Tuple[float, float], sourceBins: int, targetLimits: Tuple[float, float],
+                       targetBins: int) -> Optional[np.ndarray]:
+    """
+    Returns the (sourceBins, targetBins) matrix of the fraction of each source bin that overlaps each target bin of
+    an axis, or None when the target limits are not within the source limits. Re-binning a histogram with this
+    matrix (see `rebinHistogram`) assumes that the values are uniform within each source bin, which is exact when
+    every target bin is a union of source bins, i.e. when the source is cropped and coarsened by an integer factor
+    (see `isExactRebinning`).
+
+    The limits are (min, max) and the edges are compared relatively to the width of the source bins: fractions within
+    `REBINNING_TOLERANCE` of 0 or 1 are rounded, so edges aligned up to floating point errors are exact.
+    """
+    sourceWidth = (sourceLimits[1] - sourceLimits[0]) / sourceBins
+    tolerance = REBINNING_TOLERANCE * sourceWidth
+    if targetLimits[0] < sourceLimits[0] - tolerance or targetLimits[1] > sourceLimits[1] + tolerance:
+        return None
+    sourceStarts = np.linspace(sourceLimits[0], sourceLimits[1], sourceBins + 1)[:-1]
+    binIndices, fractions = getBinOverlaps(sourceStarts, sourceWidth, targetLimits, targetBins)
+    matrix = np.zeros((sourceBins, targetBins))
+    np.add.at(matrix, (np.arange(sourceBins)[:, None], binIndices), fractions)
+    return matrix
+
+
+def getBinOverlaps(starts: np.ndarray, width: float, limits: Tuple[float, float],
+                   bins: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Returns the indices (n, k) of the uniform bins of an axis that each interval [start, start + width] overlaps, and
+    the fraction of the interval that overlaps each of these bins. The k columns cover the largest number of bins
+    that an interval of this width can overlap: the unused columns and the bins outside the limits have a fraction
+    of 0. The memory thus scales with the number of bins the intervals overlap instead of the total number of bins.
+
+    Fractions within `REBINNING_TOLERANCE` of 0 or 1 are rounded (see `getRebinningMatrix`).
+    """
+    binWidth = (limits[1] - limits[0]) / bins
+    k = int(np.ceil(width / binWidth - REBINNING_TOLERANCE)) + 1
+    starts = np.asarray(starts, dtype=np.float64)
+    firstIndices = np.floor((starts - limits[0]) / binWidth).astype(np.intp)
+    binIndices = firstIndices[:, None] + np.arange(k)[None, :]
+    binStarts = limits[0] + binIndices * binWidth
+    overlaps = np.minimum(starts[:, None] + width, binStarts + binWidth) - np.maximum(starts[:, None], binStarts)
+    fractions = np.clip(overlaps / width, 0, 1)
+    fractions[fractions < REBINNING_TOLERANCE] = 0
+    fractions[fractions > 1 - REBINNING_TOLERANCE] = 1
+    isInside = (binIndices >= 0) & (binIndices < bins)
+    fractions[~isInside] = 0
+    np.clip(binIndices, 0, bins - 1, out=binIndices)
+    return binIndices, fractions
+
+
+def isExactRebinning(matrix: np.ndarray) -> bool:
+    """ Whether every source bin of the rebinning matrix is either completely in a target bin or not used. """
+    return bool(np.all((matrix == 0) | (matrix == 1)))
+
+
+def rebinHistogram(histogram: np.ndarray, matrices: Sequence[np.ndarray]) -> np.ndarray:
+    """ Re-bins each axis of the histogram with its rebinning matrix (see `getRebinningMatrix`). The sums are done in
+    float64. """
+    histogram = histogram.astype(np.float64)
+    for axis, matrix in enumerate(matrices):
+        histogram = np.moveaxis(np.tensordot(histogram, matrix, axes=([axis], [0])), -1, axis)
+    return histogram
@@ -0,0 +1,87 @@
+from typing import Tuple
+
+import numpy as np
+
+from pytissueoptics.rayscattering.display.utils.binning import accumulateBins
+
+MAX_SPARSE_DENSITY = 0.25
+
+
+class HistogramData:
+    """
+    Float32 histogram of a fixed shape that is only allocated when needed. It starts as a sparse list of the bins that
+    were hit (flat bin indices and their values) and switches to a dense array when more than `MAX_SPARSE_DENSITY` of
+    the bins were hit, where the sparse list would use about as much memory as the dense array.
+
+    Datapoints are added with the flat bin indices of `binning.getBinIndices`.
+    """
+    def __init__(self, shape: Tuple[int, ...]):
+        self._shape = tuple(shape)
+        self._array = None
+        self._bins = np.zeros(0, dtype=np.intp)
+        self._values = np.zeros(0, dtype=np.float32)
+
+    @classmethod
+    def fromArray(cls, array: np.ndarray) -> 'HistogramData':
+        data = cls(array.shape)
+        binIndices = np.flatnonzero(array)
+        data.accumulate(binIndices, array.reshape(-1)[binIndices])
+        return data
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        return self._shape
+
+    @property
+    def size(self) -> int:
+        return int(np.prod(self._shape))
+
+    @property
+    def isSparse(self) -> bool:
+        return self._array is None
+
+    @property
+    def nBytes(self) -> int:
+        if self._array is not None:
+            return self._array.nbytes
+        return self._bins.nbytes + self._values.nbytes
+
+    def accumulate(self, binIndices: np.ndarray, weights: np.ndarray = None):
+        """ Adds the weight of each datapoint to its bin. Datapoints with a bin index of -1 are ignored. """
+        if self._array is not None:
+            accumulateBins(self._array, binIndices, weights)
+            return
+
+        isInside = binIndices >= 0
+        binIndices = np.concatenate([self._bins, binIndices[isInside]])
+        weights = np.ones(np.count_nonzero(isInside)) if weights is None else weights[isInside]
+        self._bins, inverse = np.unique(binIndices, return_inverse=True)
+        self._values = np.bincount(inverse.reshape(-1), weights=np.concatenate([self._values, weights]))
+        self._values = self._values.astype(np.float32)
+
+        if len(self._bins) > MAX_SPARSE_DENSITY * self.size:
+            self._array = self.toArray()
+            self._bins, self._values = self._bins[:0], self._values[:0]
+
+    def getBins(self) -> Tuple[np.ndarray, np.ndarray]:
+        """ Returns the flat indices and the values of the bins that can be non-zero. """
+        if self._array is None:
+            return self._bins, self._values
+        binIndices = np.flatnonzero(self._array)
+        return binIndices, self._array.reshape(-1)[binIndices]
+
+    def toArray(self) -> np.ndarray:
+        """ Returns the dense array of the histogram. It is a new array when the histogram is sparse. """
+        if self._array is not None:
+            return self._array
+        array = np.zeros(self._shape, dtype=np.float32)
+        array.reshape(-1)[self._bins] = self._values
+        return array
+
+    def sum(self) -> float:
+        if self._array is not None:
+            return float(np.sum(self._array))
+        return float(np.sum(self._values))
+
+    def clear(self):
+        self.__init__(self._shape)
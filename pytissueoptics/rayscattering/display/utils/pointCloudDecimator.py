@@ -0,0 +1,155 @@
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from pytissueoptics.scene.utils.morton import mortonEncode, getMortonCells
+
+MAX_DECIMATION_LEVEL = 10
+STREAMING_CELLS_PER_POINT = 16
+
+
+class PointCloudDecimator:
+    """
+    Reduces a stream of datapoints (value, x, y, z) to at most `maxPoints` points for display. While the datapoints
+    fit in the budget, they are kept as they are. Beyond it, the datapoints are merged in the cells of an octree
+    over the limits: each cell is represented by a single point at the centroid of its datapoints (weighted by their
+    energy) with the sum of their values, so the energy is conserved.
+
+    The octree is cut at the finest level that fits in the budget. When `adaptive` is True, the cells holding the
+    most energy are then refined further with the remaining budget, so the point cloud keeps its details where the
+    energy concentrates.
+
+    Only the occupied cells of a streaming level are kept while streaming. It starts at `maxLevel` (2**`maxLevel`
+    cells per axis) and is coarsened by one level whenever the occupied cells exceed `STREAMING_CELLS_PER_POINT` times
+    `maxPoints`, so the memory and the cost of each added chunk are bounded by the point budget instead of the number
+    of datapoints or of occupied cells. Datapoints outside the limits are merged with the closest cells.
+    """
+    def __init__(self, maxPoints: Optional[int], limits: List[Tuple[float, float]], adaptive: bool = True,
+                 maxLevel: int = MAX_DECIMATION_LEVEL):
+        """
+        :param maxPoints: The maximum number of points returned. If None, every datapoint is returned.
+        :param limits: The (min, max) limits along each axis of the octree used to merge the datapoints.
+        :param adaptive: Refine the cells that hold the most energy with the budget left at the finest uniform level.
+        :param maxLevel: The depth of the finest cells. The datapoints merged in these cells are never separated.
+        """
+        self._maxPoints = maxPoints
+        self._limits = limits
+        self._adaptive = adaptive
+        self._level = maxLevel
+
+        self._buffer: List[np.ndarray] = []
+        self._nBuffered = 0
+        self._keys: Optional[np.ndarray] = None
+        self._cellStats: Optional[np.ndarray] = None
+
+    @property
+    def isDecimating(self) -> bool:
+        return self._keys is not None
+
+    def add(self, dataPoints: Optional[np.ndarray]):
+        if dataPoints is None or len(dataPoints) == 0:
+            return
+        if not self.isDecimating:
+            self._buffer.append(dataPoints)
+            self._nBuffered += len(dataPoints)
+            if self._maxPoints is None or self._nBuffered <= self._maxPoints:
+                return
+            dataPoints = np.concatenate(self._buffer, axis=0)
+            self._buffer, self._nBuffered = [], 0
+            self._keys = np.zeros(0, dtype=np.uint64)
+            self._cellStats = np.zeros((0, 9))
+        self._mergeInCells(dataPoints)
+
+    @property
+    def level(self) -> int:
+        """ The depth of the cells kept while streaming. """
+        return self._level
+
+    def _mergeInCells(self, dataPoints: np.ndarray):
+        """ Adds the datapoints to the statistics of their cell at the streaming level: count, value, |value|,
+        |value| * (x, y, z) and (x, y, z). """
+        positions = dataPoints[:, 1:].astype(np.float64)
+        values = dataPoints[:, 0].astype(np.float64)
+        weights = np.abs(values)
+        stats = np.column_stack([np.ones(len(values)), values, weights, weights[:, None] * positions, positions])
+        keys = mortonEncode(getMortonCells(positions, self._limits, self._level))
+
+        keys = np.concatenate([self._keys, keys])
+        stats = np.concatenate([self._cellStats, stats], axis=0)
+        self._keys, inverse = np.unique(keys, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        self._cellStats = np.column_stack([np.bincount(inverse, weights=column, minlength=len(self._keys))
+                                           for column in stats.T])
+        while len(self._keys) > STREAMING_CELLS_PER_POINT * self._maxPoints:
+            self._coarsen()
+
+    def _coarsen(self):
+        """ Merges the cells of the streaming level in their parent cell. Since the cells are sorted by Morton code,
+        the children of a parent cell are contiguous. """
+        self._level -= 1
+        parentKeys = self._keys >> np.uint64(3)
+        parentStarts = np.concatenate([[0], np.flatnonzero(np.diff(parentKeys)) + 1])
+        self._keys = parentKeys[parentStarts]
+        self._cellStats = np.add.reduceat(self._cellStats, parentStarts, axis=0)
+
+    def getDataPoints(self) -> Optional[np.ndarray]:
+        """ Returns the decimated datapoints, or None if no datapoints were added. """
+        if not self.isDecimating:
+            if not self._buffer:
+                return None
+            return self._buffer[0] if len(self._buffer) == 1 else np.concatenate(self._buffer, axis=0)
+
+        clusterStarts = self._getClusterStarts()
+        stats = np.add.reduceat(self._cellStats, clusterStarts, axis=0)
+        counts, values, weights = stats[:, 0], stats[:, 1], stats[:, 2]
+        hasWeight = weights > 0
+        centroids = stats[:, 6:9] / counts[:, None]
+        centroids[hasWeight] = stats[hasWeight, 3:6] / weights[hasWeight, None]
+
+        dataPoints = np.empty((len(clusterStarts), 4), dtype=np.float32)
+        dataPoints[:, 0] = values
+        dataPoints[:, 1:] = centroids
+        return dataPoints
+
+    def _getClusterStarts(self) -> np.ndarray:
+        """ Returns the index of the first streaming cell of each cluster. Since the streaming cells are sorted by
+        Morton code, each octree cell is a contiguous range of streaming cells. """
+        level = max(l for l in range(self._level + 1) if len(self._getCellStarts(l)) <= self._maxPoints)
+        if not self._adaptive:
+            return self._getCellStarts(level)
+
+        cellStarts = [self._getCellStarts(l) for l in range(level, self._level + 1)]
+        cumulativeWeights = np.concatenate([[0], np.cumsum(self._cellStats[:, 2])])
+        cellWeights = [cumulativeWeights[np.append(starts[1:], len(self._keys))] - cumulativeWeights[starts]
+                       for starts in cellStarts]
+        parents = [None] + [np.searchsorted(cellStarts[i - 1], cellStarts[i], side="right") - 1
+                            for i in range(1, len(cellStarts))]
+
+        def getLeaves(threshold: float) -> List[np.ndarray]:
+            """ Returns, for each level, which cells are kept as clusters when every cell heavier than the threshold
+            is refined. """
+            leaves, isReached = [], None
+            for i in range(len(cellStarts)):
+                isReached = np.ones(len(cellStarts[i]), dtype=bool) if i == 0 else isRefined[parents[i]]
+                isRefined = isReached & (cellWeights[i] > threshold)
+                leaves.append(isReached & ~isRefined if i < len(cellStarts) - 1 else isReached)
+            return leaves
+
+        # Refining the heaviest cell first until the budget is spent is the same as refining every cell heavier than
+        # some threshold, since a cell is never lighter than its children. The lowest threshold within the budget is
+        # found by bisection over the weights of the cells.
+        thresholds = np.unique(np.concatenate(cellWeights))
+        low, high = 0, len(thresholds) - 1
+        while low < high:
+            middle = (low + high) // 2
+            if sum(np.count_nonzero(leaves) for leaves in getLeaves(thresholds[middle])) <= self._maxPoints:
+                high = middle
+            else:
+                low = middle + 1
+        leaves = getLeaves(thresholds[low])
+        return np.sort(np.concatenate([starts[isLeaf] for starts, isLeaf in zip(cellStarts, leaves)]))
+
+    def _getCellStarts(self, level: int) -> np.ndarray:
+        """ Returns the index of the first streaming cell of each occupied cell of the level. """
+        cellKeys = self._keys >> np.uint64(3 * (self._level - level))
+        return np.concatenate([[0], np.flatnonzero(np.diff(cellKeys)) + 1])
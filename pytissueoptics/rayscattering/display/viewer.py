@@ -1,16 +1,15 @@
 from enum import Flag
-from typing import List, Tuple, Union
+from typing import Iterator, List, Optional, Tuple, Union
 
 import numpy as np
 
 from pytissueoptics.rayscattering import utils
 from pytissueoptics.rayscattering.energyLogging import EnergyLogger
-from pytissueoptics.rayscattering.energyLogging.pointCloud import PointCloud
 from pytissueoptics.rayscattering.energyLogging import PointCloudFactory
 from pytissueoptics.rayscattering.source import Source
 from pytissueoptics.rayscattering.scatteringScene import ScatteringScene
 from pytissueoptics.rayscattering.statistics import Stats
-from pytissueoptics.rayscattering.display.utils import Direction
+from pytissueoptics.rayscattering.display.utils import Direction, PointCloudDecimator, binning
 from pytissueoptics.rayscattering.display.views import ViewGroup, View2D
 from pytissueoptics.rayscattering.display.profiles import ProfileFactory
 from pytissueoptics.scene import MAYAVI_AVAILABLE, MayaviViewer, ViewPointStyle
@@ -51,13 +50,21 @@ class PointCloudStyle:
         surfaceScaleWithValue (bool): Same as `scaleWithValue` but for the surface points.
         surfaceColormap (str): Same as `colormap` but for the surface points.
         surfaceReverseColormap (bool): Same as `reverseColormap` but for the surface points.
+
+    Level of detail attributes:
+        maxPoints (Optional[int]): Maximum number of points drawn for the solids and for the surfaces. Beyond it, nearby
+            points are merged into a single point that carries their energy (see `PointCloudDecimator`). None draws
+            every point.
+        adaptiveDecimation (bool): Keep more details where the energy concentrates instead of merging the points with
+            the same resolution everywhere.
     """
 
     def __init__(self, solidLabel: str = None, surfaceLabel: str = None, showSolidPoints: bool = True,
                  showSurfacePointsLeaving: bool = True, showSurfacePointsEntering: bool = False,
                  showPointsAsSpheres: bool = False, pointSize: float = 0.15, scaleWithValue: bool = True,
                  colormap: str = "rainbow", reverseColormap: bool = False, surfacePointSize: float = 0.01,
-                 surfaceScaleWithValue: bool = False, surfaceColormap: str = None, surfaceReverseColormap: bool = None):
+                 surfaceScaleWithValue: bool = False, surfaceColormap: str = None, surfaceReverseColormap: bool = None,
+                 maxPoints: Optional[int] = 200000, adaptiveDecimation: bool = True):
         self.solidLabel = solidLabel
         self.surfaceLabel = surfaceLabel
         self.showSolidPoints = showSolidPoints
@@ -75,6 +82,9 @@ class PointCloudStyle:
         self.surfaceColormap = colormap if surfaceColormap is None else surfaceColormap
         self.surfaceReverseColormap = reverseColormap if surfaceReverseColormap is None else surfaceReverseColormap
 
+        self.maxPoints = maxPoints
+        self.adaptiveDecimation = adaptiveDecimation
+
 
 class Viewer:
     def __init__(self, scene: ScatteringScene, source: Source, logger: EnergyLogger):
@@ -126,8 +136,13 @@ class Viewer:
             utils.warn("ERROR: Package 'mayavi' is not available. Please install it to use 3D visualizations.")
             return
 
-        if not self._logger.has3D:
-            utils.warn("ERROR: Cannot show 3D volume slicer without 3D data.")
+        if not self._logger.has3D and not self._logger.hasVoxels:
+            utils.warn("ERROR: Cannot show 3D volume slicer without 3D data or voxels.")
+            return
+
+        sceneVoxelGrid = self._logger.getVoxelGrid()
+        if not self._logger.has3D and sceneVoxelGrid is not None and binSize is None and limits is None:
+            self._showVolume(sceneVoxelGrid.getData(), logScale, interpolate)
             return
 
         if binSize is None:
@@ -136,21 +151,37 @@ class Viewer:
         limits = limits or self._sceneLimits
         bins = [int((d[1] - d[0]) / binSize) for d in limits]
 
-        # np.histogramdd only works in float64 and requires around 3 times the final memory.
-        requiredMemoryInGB = 3 * 8 * bins[0] * bins[1] * bins[2] / 1024**3
+        # The volume is accumulated in a single float32 array, one chunk of solid points at a time.
+        requiredMemoryInGB = 4 * bins[0] * bins[1] * bins[2] / 1024**3
         if requiredMemoryInGB > 4:
             utils.warn(f"WARNING: The volume slicer will require a lot of memory ({round(requiredMemoryInGB, 2)} GB). "
                        f"Consider using a larger binSize or tighter limits.")
 
-        points = self._pointCloudFactory.getPointCloudOfSolids().solidPoints
         try:
-            hist, _ = np.histogramdd(points[:, 1:], bins=bins, weights=points[:, 0], range=limits)
+            if self._logger.dataPointProcessor is not None:
+                spec = binning.HistogramSpec(columns=(1, 2, 3), limits=tuple(map(tuple, limits)), bins=tuple(bins))
+                hist = self._logger.dataPointProcessor.histogram(self._getSolidPointChunks(), spec)
+            else:
+                hist = np.zeros(bins, dtype=np.float32)
+                for points in self._getSolidPointChunks():
+                    binning.histogram(points[:, 1:], limits, bins, weights=points[:, 0], out=hist)
         except MemoryError:
             utils.warn("ERROR: Not enough memory to create the volume slicer. "
                        "Consider using a larger binSize or tighter limits.")
             return
-        hist = hist.astype(np.float32)
+        self._showVolume(hist, logScale, interpolate)
+
+    def _getSolidPointChunks(self) -> Iterator[np.ndarray]:
+        """ Yields the energy absorbed in the scene as datapoint chunks, from the 3D data or else from the voxels. """
+        if not self._logger.has3D:
+            yield self._logger.getVoxelDataPoints()
+            return
+        for solidLabel in self._logger.getStoredSolidLabels():
+            for pointCloud in self._pointCloudFactory.getPointCloudChunks(solidLabel):
+                yield pointCloud.solidPoints
 
+    @staticmethod
+    def _showVolume(hist: np.ndarray, logScale: bool, interpolate: bool):
         if logScale:
             hist = utils.logNorm(hist)
 
@@ -178,32 +209,33 @@ class Viewer:
         stats.report(solidLabel=solidLabel, saveToFile=saveToFile, verbose=verbose)
 
     def _addPointCloud(self, style: PointCloudStyle):
-        pointCloud = self._pointCloudFactory.getPointCloud(solidLabel=style.solidLabel, surfaceLabel=style.surfaceLabel)
+        """ The point cloud is read as a stream of chunks and decimated to the point budget of the style, so the
+        whole point cloud is never held in memory nor sent to Mayavi. """
+        solidPoints = PointCloudDecimator(style.maxPoints, self._sceneLimits, style.adaptiveDecimation)
+        surfacePoints = PointCloudDecimator(style.maxPoints, self._sceneLimits, style.adaptiveDecimation)
+        for pointCloud in self._pointCloudFactory.getPointCloudChunks(style.solidLabel, style.surfaceLabel):
+            if style.showSolidPoints:
+                solidPoints.add(pointCloud.solidPoints)
+            if pointCloud.surfacePoints is None:
+                continue
+            if style.showSurfacePointsLeaving:
+                surfacePoints.add(pointCloud.leavingSurfacePoints)
+            if style.showSurfacePointsEntering:
+                surfacePoints.add(pointCloud.enteringSurfacePointsPositive)
 
-        self._drawPointCloudOfSolids(pointCloud, style)
-        self._drawPointCloudOfSurfaces(pointCloud, style)
+        self._drawPointCloudOfSolids(solidPoints.getDataPoints(), style)
+        self._drawPointCloudOfSurfaces(surfacePoints.getDataPoints(), style)
 
-    def _drawPointCloudOfSolids(self, pointCloud: PointCloud, style: PointCloudStyle):
-        if pointCloud.solidPoints is None:
-            return
-        if not style.showSolidPoints:
+    def _drawPointCloudOfSolids(self, solidPoints: Optional[np.ndarray], style: PointCloudStyle):
+        if solidPoints is None:
             return
 
-        self._viewer3D.addDataPoints(pointCloud.solidPoints, scale=style.pointSize,
+        self._viewer3D.addDataPoints(solidPoints, scale=style.pointSize,
                                      scaleWithValue=style.scaleWithValue, colormap=style.colormap,
                                      reverseColormap=style.reverseColormap, asSpheres=style.showPointsAsSpheres)
 
-    def _drawPointCloudOfSurfaces(self, pointCloud: PointCloud, style: PointCloudStyle):
-        if pointCloud.surfacePoints is None:
-            return
-
-        surfacePoints = np.empty((0, 4))
-
-        if style.showSurfacePointsLeaving:
-            surfacePoints = np.vstack((surfacePoints, pointCloud.leavingSurfacePoints))
-        if style.showSurfacePointsEntering:
-            surfacePoints = np.vstack((surfacePoints, pointCloud.enteringSurfacePointsPositive))
-        if len(surfacePoints) == 0:
+    def _drawPointCloudOfSurfaces(self, surfacePoints: Optional[np.ndarray], style: PointCloudStyle):
+        if surfacePoints is None:
             return
 
         self._viewer3D.addDataPoints(surfacePoints, scale=style.surfacePointSize,
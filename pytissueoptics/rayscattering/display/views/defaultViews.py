@@ -4,6 +4,7 @@ import numpy as np
 
 from pytissueoptics.rayscattering.display.views.view2D import View2D, ViewGroup
 from pytissueoptics.rayscattering.display.utils.direction import *
+from pytissueoptics.rayscattering.display.utils.binning import HistogramSpec
 
 
 class View2DProjection(View2D):
@@ -13,8 +14,8 @@ class View2DProjection(View2D):
         super().__init__(projectionDirection, horizontalDirection,
                          solidLabel=solidLabel, limits=limits, binSize=binSize)
 
-    def _filter(self, dataPoints: np.ndarray) -> np.ndarray:
-        return dataPoints
+    def _getWeights(self, dataPoints: np.ndarray) -> np.ndarray:
+        return dataPoints[:, 0]
 
 
 class View2DProjectionX(View2DProjection):
@@ -42,13 +43,15 @@ class View2DSurface(View2D):
         super().__init__(projectionDirection, horizontalDirection, solidLabel=solidLabel, surfaceLabel=surfaceLabel,
                          surfaceEnergyLeaving=surfaceEnergyLeaving, limits=limits, binSize=binSize)
 
-    def _filter(self, dataPoints: np.ndarray) -> np.ndarray:
+    def _getWeights(self, dataPoints: np.ndarray) -> np.ndarray:
+        weights = dataPoints[:, 0]
         if self._surfaceEnergyLeaving:
-            dataPoints = dataPoints[dataPoints[:, 0] > 0]
-        else:
-            dataPoints = dataPoints[dataPoints[:, 0] < 0]
-            dataPoints[:, 0] *= -1
-        return dataPoints
+            return np.where(weights > 0, weights, 0)
+        return np.where(weights < 0, -weights, 0)
+
+    @property
+    def histogramSpec(self) -> HistogramSpec:
+        return super().histogramSpec._replace(sign=1 if self._surfaceEnergyLeaving else -1)
 
     @property
     def group(self) -> ViewGroup:
@@ -92,11 +95,16 @@ class View2DSlice(View2D):
             self._thickness = binSize3D[self.axis]
         super().setContext(limits3D, binSize3D)
 
-    def _filter(self, dataPoints: np.ndarray) -> np.ndarray:
+    def _getWeights(self, dataPoints: np.ndarray) -> np.ndarray:
         dataPositions = dataPoints[:, 1 + self.axis]
         insideSlice = np.logical_and(dataPositions > self._position - self._thickness / 2,
                                      dataPositions < self._position + self._thickness / 2)
-        return dataPoints[insideSlice]
+        return np.where(insideSlice, dataPoints[:, 0], 0)
+
+    @property
+    def histogramSpec(self) -> HistogramSpec:
+        sliceLimits = (self._position - self._thickness / 2, self._position + self._thickness / 2)
+        return super().histogramSpec._replace(sliceColumn=1 + self.axis, sliceLimits=sliceLimits)
 
 
 class View2DSliceX(View2DSlice):
@@ -8,6 +8,9 @@ from matplotlib import pyplot as plt
 
 from pytissueoptics.rayscattering import utils
 from pytissueoptics.rayscattering.display.utils.direction import *
+from pytissueoptics.rayscattering.display.utils.binning import getBinIndices, HistogramSpec, getRebinningMatrix, \
+    isExactRebinning, rebinHistogram
+from pytissueoptics.rayscattering.display.utils.histogramData import HistogramData
 
 
 class ViewGroup(Flag):
@@ -67,10 +70,16 @@ class View2D:
         self._binSize = (binSize, binSize) if isinstance(binSize, (int, float)) else binSize
         self._binsU, self._binsV = None, None
 
-        self._dataUV = None
+        self._dataUV: Optional[HistogramData] = None
         self._hasData = False
         self.displayPosition = position
 
+    def __setstate__(self, state: dict):
+        # Views pickled before the lazy storage of their data have a dense array.
+        if isinstance(state.get("_dataUV"), np.ndarray):
+            state["_dataUV"] = HistogramData.fromArray(state["_dataUV"])
+        self.__dict__.update(state)
+
     def setContext(self, limits3D: List[Tuple[float, float]], binSize3D: Tuple[float, float, float]):
         """
         Used internally by ViewFactory when initializing the views. The limits and the bin sizes are given for
@@ -93,44 +102,88 @@ class View2D:
         if self._horizontalDirection.isNegative:
             self._limitsU = self._limitsU[::-1]
 
-        try:
-            self._dataUV = np.zeros((self._binsU, self._binsV), dtype=np.float32)
-        except MemoryError:
-            raise MemoryError(f"Cannot allocate memory for 2D view. "
-                              f"Consider increasing `defaultBinSize` of EnergyLogger.")
+        self._dataUV = HistogramData((self._binsU, self._binsV))
 
-    def extractData(self, dataPoints: np.ndarray):
+    def extractData(self, dataPoints: np.ndarray, binIndices: np.ndarray = None):
         """
         Used internally by Logger2D to store 3D datapoints into this 2D view.
-        Data points are (n, 4) arrays with (value, x, y, z).
+        Data points are (n, 4) arrays with (value, x, y, z). The data of the view is only allocated when written to,
+        and stays sparse while few of its bins are hit (see HistogramData).
+
+        The bin indices of the datapoints can be given when already computed by another view with the same
+        `binningKey` (see `getBinIndices`).
         """
         if self._binsU is None or self._binsV is None:
             raise RuntimeError("View2D must be initialized with setContext before extracting data.")
-
-        dataPoints = self._filter(dataPoints)
         if dataPoints.size == 0:
             return
 
-        u, v, w = dataPoints[:, 1 + self.axisU], dataPoints[:, 1 + self.axisV], dataPoints[:, 0]
-        sumUVProjection = np.histogram2d(u, v, weights=w, bins=(self._binsU, self._binsV),
-                                          range=(sorted(self._limitsU), sorted(self._limitsV)))[0]
-        self._dataUV += np.flip(sumUVProjection, axis=1)
+        if binIndices is None:
+            binIndices = self.getBinIndices(dataPoints)
+        self._dataUV.accumulate(binIndices, self._getWeights(dataPoints))
         self._hasData = True
 
-    def _filter(self, dataPoints: np.ndarray) -> np.ndarray:
+    def extractHistogram(self, histogram: np.ndarray):
+        """
+        Used internally by EnergyLogger to add to this view a (binsU, binsV) histogram of datapoints binned with the
+        `histogramSpec` of this view, like the histograms computed on a device (see CLDataPointProcessor).
+        """
+        if self._binsU is None or self._binsV is None:
+            raise RuntimeError("View2D must be initialized with setContext before extracting data.")
+        histogram = np.ascontiguousarray(histogram[:, ::-1]).reshape(-1)
+        binIndices = np.flatnonzero(histogram)
+        if len(binIndices) == 0:
+            return
+        self._dataUV.accumulate(binIndices, histogram[binIndices])
+        self._hasData = True
+
+    @property
+    def histogramSpec(self) -> HistogramSpec:
+        """ The binning and the weights of the datapoints in this view, without the flip of the V axis. """
+        return HistogramSpec(columns=(1 + self.axisU, 1 + self.axisV),
+                             limits=(tuple(sorted(self._limitsU)), tuple(sorted(self._limitsV))),
+                             bins=(self._binsU, self._binsV))
+
+    @property
+    def binningKey(self) -> tuple:
+        """ Views with the same binning key have the same bin indices for any datapoint. """
+        return self.axisU, self.axisV, tuple(sorted(self._limitsU)), tuple(sorted(self._limitsV)), \
+            self._binsU, self._binsV
+
+    def getBinIndices(self, dataPoints: np.ndarray) -> np.ndarray:
+        """
+        Returns the flat index of the bin of each datapoint in the UV data of this view, or -1 when the datapoint is
+        outside the view limits (see `binning.getBinIndices`). The V axis of the UV data is flipped.
+        """
+        binIndices = getBinIndices(dataPoints[:, [1 + self.axisU, 1 + self.axisV]],
+                                   (sorted(self._limitsU), sorted(self._limitsV)), (self._binsU, self._binsV))
+        isInside = binIndices >= 0
+        binIndices[isInside] += self._binsV - 1 - 2 * (binIndices[isInside] % self._binsV)
+        return binIndices
+
+    def _getWeights(self, dataPoints: np.ndarray) -> np.ndarray:
         """
-        Filters the data points to only keep the ones that are relevant to this view.
-        Must be implemented by subclasses.
+        Returns the weight of each datapoint in this view, which is zero for the datapoints that are not relevant to
+        this view. Must be implemented by subclasses.
         """
         raise NotImplementedError()
 
+    def clearData(self):
+        if self._dataUV is not None:
+            self._dataUV.clear()
+        self._hasData = False
+
     def flip(self):
         """ Flips the view as if it was seen from behind. """
         self._projectionDirection = Direction((self._projectionDirection.value + 3) % 6)
         self._horizontalDirection = Direction((self._horizontalDirection.value + 3) % 6)
 
     def getImageData(self, logScale: bool = True, autoFlip=True) -> np.ndarray:
-        image = self._dataUV
+        try:
+            image = self._dataUV.toArray()
+        except MemoryError:
+            raise MemoryError(f"Cannot allocate memory for 2D view. "
+                              f"Consider increasing `defaultBinSize` of EnergyLogger.")
         if logScale and self._hasData:
             image = utils.logNorm(image)
         if not autoFlip:
@@ -197,16 +250,38 @@ class View2D:
         plt.show()
 
     def initDataFrom(self, source: 'View2D'):
-        """ Extract data from one view to another when there is only a difference in orientation. """
-        assert self.isContainedBy(source), "Cannot extract data from views that are not equivalent."
-
-        dataUV = source._dataUV.copy()
-        if source.axisU == self.axisU:
-            self._dataUV = dataUV
+        """
+        Derives the data of this view from the data of a view that contains it (see `isContainedBy`). The data is
+        transposed to the orientation of this view, then cropped to its limits and re-binned to its bins. When the
+        view is exactly contained by the source (see `isExactlyContainedBy`), the bins of this view are sums of
+        bins of the source. Otherwise, the data of each bin of the source is spread over the bins it overlaps in
+        proportion to the overlap, as if it was uniform within the bin.
+        """
+        assert self.isContainedBy(source), "Cannot extract data from a view that does not contain this view."
+        matrixU, matrixV = self._getRebinningMatrices(source)
+        isTransposed = source.axisU != self.axisU
+
+        if self._isIdentity(matrixU) and self._isIdentity(matrixV):
+            # Only a difference in orientation, which keeps the data sparse.
+            binIndices, values = source._dataUV.getBins()
+            if isTransposed:
+                # Transpose and flip both axes.
+                u, v = np.divmod(binIndices, source._binsV)
+                binIndices = (source._binsV - 1 - v) * source._binsU + (source._binsU - 1 - u)
+            self._dataUV = HistogramData((self._binsU, self._binsV))
+            self._dataUV.accumulate(binIndices, values)
         else:
-            self._dataUV = np.flip(dataUV.T, axis=(0, 1))
+            data = source._dataUV.toArray()[:, ::-1]
+            if isTransposed:
+                data = data.T
+            data = rebinHistogram(data, (matrixU, matrixV))[:, ::-1]
+            self._dataUV = HistogramData.fromArray(np.ascontiguousarray(data, dtype=np.float32))
         self._hasData = source._hasData
 
+    @staticmethod
+    def _isIdentity(matrix: np.ndarray) -> bool:
+        return matrix.shape[0] == matrix.shape[1] and np.array_equal(matrix, np.eye(len(matrix)))
+
     def isEqualTo(self, other: 'View2D') -> bool:
         if not self.isContainedBy(other):
             return False
@@ -223,6 +298,9 @@ class View2D:
         return True
 
     def isContainedBy(self, other: 'View2D') -> bool:
+        """ Whether the data of this view can be derived from the data of the other view (see `initDataFrom`): both
+        views have the same projection axis and datapoints, and the limits of this view are within the limits of the
+        other view. """
         if self._projectionDirection.axis != other._projectionDirection.axis:
             return False
         if not utils.labelsEqual(self._solidLabel, other._solidLabel):
@@ -235,26 +313,32 @@ class View2D:
             return False
         if self._thickness != other._thickness:
             return False
+        return self._getRebinningMatrices(other) is not None
 
-        # TODO: change/remove the following once the algorithm can extract a view contained inside a bigger view.
-        isTransposed = self.axisU != other.axisU
-        if isTransposed:
-            bins = self._binsV, self._binsU
-            limits = sorted(self._limitsV), sorted(self._limitsU)
-        else:
-            bins = self._binsU, self._binsV
-            limits = sorted(self._limitsU), sorted(self._limitsV)
-        otherBins = other._binsU, other._binsV
-        otherLimits = sorted(other._limitsU), sorted(other._limitsV)
-
-        if bins != otherBins:
-            return False
-        if limits != otherLimits:
+    def isExactlyContainedBy(self, other: 'View2D') -> bool:
+        """ Whether this view is contained by the other view with bins that are unions of bins of the other view, so
+        its data can be derived without approximation: the other view is cropped and coarsened by integer factors. """
+        if not self.isContainedBy(other):
             return False
-        return True
+        return all(isExactRebinning(matrix) for matrix in self._getRebinningMatrices(other))
+
+    def _getRebinningMatrices(self, source: 'View2D') -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """ Returns the rebinning matrices from the bins of the source to the U and V bins of this view (see
+        `binning.getRebinningMatrix`), or None when the limits of this view are not within the source limits. """
+        sourceLimits = [sorted(source._limitsU), sorted(source._limitsV)]
+        sourceBins = [source._binsU, source._binsV]
+        if source.axisU != self.axisU:
+            sourceLimits, sourceBins = sourceLimits[::-1], sourceBins[::-1]
+        limits = [sorted(self._limitsU), sorted(self._limitsV)]
+        bins = [self._binsU, self._binsV]
+
+        matrices = tuple(getRebinningMatrix(*args) for args in zip(sourceLimits, sourceBins, limits, bins))
+        if any(matrix is None for matrix in matrices):
+            return None
+        return matrices
 
     def getSum(self) -> float:
-        return float(np.sum(self._dataUV))
+        return self._dataUV.sum()
 
     @property
     def projectionDirection(self) -> Direction:
@@ -1,3 +1,5 @@
 from .pointCloud import PointCloud
 from .pointCloudFactory import PointCloudFactory
+from .voxelGrid import VoxelGrid
+from .octreeTally import OctreeTally
 from .energyLogger import EnergyLogger
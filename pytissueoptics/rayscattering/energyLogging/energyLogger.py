@@ -1,6 +1,9 @@
+import hashlib
 import os
 import pickle
-from typing import Union, List
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Union, List, Optional, Dict, Iterable
 
 import numpy as np
 
@@ -8,14 +11,26 @@ from pytissueoptics.rayscattering import utils
 from pytissueoptics.rayscattering.scatteringScene import ScatteringScene
 from pytissueoptics.rayscattering.display.views.view2D import ViewGroup, View2D
 from pytissueoptics.rayscattering.display.views.viewFactory import ViewFactory
-from pytissueoptics.scene.logger.logger import Logger, InteractionKey
+from pytissueoptics.rayscattering.energyLogging.voxelGrid import VoxelGrid
+from pytissueoptics.rayscattering.energyLogging.octreeTally import OctreeTally
+from pytissueoptics.rayscattering.energyLogging.prioritySampling import getPriorities, prioritySample
+from pytissueoptics.rayscattering.opencl import hardwareAccelerationIsAvailable
+from pytissueoptics.rayscattering.opencl.CLDataPointProcessor import CLDataPointProcessor
+from pytissueoptics.scene.logger.logger import Logger, InteractionKey, DataType, CHUNK_ROWS
+from pytissueoptics.scene.logger.listArrayContainer import ListArrayContainer
+from pytissueoptics.scene.logger.loggerStore import LoggerStore, isStorePath
 from pytissueoptics.scene.geometry import Vector
 
 
 class EnergyLogger(Logger):
+    VIEWS_STORE_NAME = "views"
+
     def __init__(self, scene: ScatteringScene, filepath: str = None, keep3D: bool = True,
                  views: Union[ViewGroup, List[View2D]] = ViewGroup.ALL, defaultBinSize: Union[float, tuple] = 0.01,
-                 infiniteLimits=((-5, 5), (-5, 5), (-5, 5))):
+                 infiniteLimits=((-5, 5), (-5, 5), (-5, 5)), maxMemoryMB: float = None,
+                 voxelSize: Union[float, tuple] = None, voxelsPerSolid: bool = True,
+                 octreeTally: OctreeTally = None, maxPointsPerKey: int = None, seed: int = None,
+                 useHardwareAcceleration: bool = False):
         """
         Log the energy deposited by scattering photons as well as the energy that crossed surfaces. Every interaction
         is linked to a specific solid and surface of the scene when applicable. This `EnergyLogger` has to be given to
@@ -36,6 +51,35 @@ class EnergyLogger(Logger):
         :param defaultBinSize: The default bin size to use when binning the 3D data to 2D views. In the same physical
                 units as the scene. Custom bin sizes can be specified in each View2D.
         :param infiniteLimits: The default limits to use for the 2D views when the scene is infinite (has no solids).
+        :param maxMemoryMB: (Optional) Memory budget of the 3D data when `keep3D` is True. When the 3D data held in
+                memory exceeds this budget, it is written in the background to the logger store (see `save`) or to a
+                temporary store, and then read from these files. Statistics, profiles and 2D views read the 3D data
+                as a stream of chunks, so they keep working under this budget.
+        :param voxelSize: (Optional) Also bin the energy absorbed in the solids to 3D voxel grids of this voxel size.
+                With `keep3D` set to False, this keeps the 3D distribution of the absorbed energy at a memory cost
+                bounded by the size of the grids instead of the number of interactions. The voxel grids are then used
+                for the statistics of absorbance, for the profiles and 2D views of the solids (including views
+                added after the propagation, like arbitrary slices) and for the 3D volume slicer.
+        :param voxelsPerSolid: (Default to True) If True, each solid has its own voxel grid which covers its bounding
+                box. If False, a single voxel grid covers the whole scene (or the `infiniteLimits` when the scene has
+                no solids), including the energy absorbed in the world, but the energy of each solid can no longer be
+                distinguished.
+        :param octreeTally: (Optional) Also tally the energy absorbed in the solids (or in a single solid, see
+                `OctreeTally.solidLabel`) to this adaptive octree. Its resolution only gets fine where the energy
+                concentrates, so it can resolve a small high-fluence region inside a large volume for the memory of a
+                coarse voxel grid. It is saved with the logger and is available with `octreeTally`.
+        :param maxPointsPerKey: (Optional) When `keep3D` is True, only keep a random sample of about this number of
+                3D datapoints for each interaction key (at most twice as many between two samplings). The datapoints
+                are sampled with priority sampling (see `prioritySampling`): each kept datapoint carries the energy of
+                the discarded ones so the energy of any region, profile bin or view bin estimated from the sample is
+                unbiased, and the most energetic datapoints are kept as they are. The memory of the 3D data then stays
+                constant however long the propagation is. The statistics still use the exact energy totals.
+        :param seed: (Optional) Seed of the random priorities of `maxPointsPerKey`. Defaults to the seed of the first
+                source propagated with this logger, so a seeded propagation always keeps the same sample.
+        :param useHardwareAcceleration: (Default to False) Bin the 3D data to the 2D views, the profiles and the 3D
+                volume slicer, and sum the energy of loggers saved without energy totals, with OpenCL kernels (see
+                `CLDataPointProcessor`). The 3D data is streamed to the device in chunks, so large or stored 3D data
+                can quickly be binned again at a new resolution. Falls back to the CPU if OpenCL is not available.
         """
         self._scene = scene
         self._keep3D = keep3D
@@ -48,6 +92,24 @@ class EnergyLogger(Logger):
         self._views = self._viewFactory.build(views)
         self._outdatedViews = set()
         self._nDataPointsRemoved = 0
+        self._maxMemoryMB = maxMemoryMB
+        self._spillExecutor: Optional[ThreadPoolExecutor] = None
+        self._compiledLengths: Dict[View2D, Dict[InteractionKey, int]] = {}
+        self._voxelSize = voxelSize
+        self._voxelsPerSolid = voxelsPerSolid
+        self._voxelGrids: Dict[Optional[str], VoxelGrid] = {}
+        self._octreeTally = octreeTally
+        self._energyTotals: Optional[Dict[InteractionKey, np.ndarray]] = {}
+        self._maxPointsPerKey = maxPointsPerKey
+        self._samplingPriorities: Dict[InteractionKey, np.ndarray] = {}
+        self._samplingCounts: Dict[InteractionKey, int] = {}
+        self._seed = seed
+        self._dataPointProcessor: Optional[CLDataPointProcessor] = None
+        if useHardwareAcceleration:
+            if hardwareAccelerationIsAvailable():
+                self._dataPointProcessor = CLDataPointProcessor()
+            else:
+                utils.warn("WARNING: Hardware acceleration not available. Falling back to CPU post-processing.")
 
         super().__init__(fromFilepath=filepath)
 
@@ -66,18 +128,37 @@ class EnergyLogger(Logger):
             self._views.append(view)
             return True
 
-        for i, existingView in enumerate(self._views):
-            if view.isContainedBy(existingView):
-                view.initDataFrom(existingView)
-                if existingView in self._outdatedViews:
-                    self._outdatedViews.add(view)
-                self._views.append(view)
-                return True
+        sourceView = self._findSourceView(view)
+        if sourceView is not None:
+            view.initDataFrom(sourceView)
+            if sourceView in self._outdatedViews:
+                self._outdatedViews.add(view)
+            self._views.append(view)
+            return True
+
+        voxelDataPoints = self.getVoxelDataPoints(view.solidLabel) if view.surfaceLabel is None else None
+        if voxelDataPoints is not None:
+            view.extractData(voxelDataPoints)
+            self._views.append(view)
+            return True
 
         utils.warn(f"ERROR: Cannot create view {view.name}. The 3D data was discarded and the required data was not "
                    f"found in existing views.")
         return False
 
+    def _findSourceView(self, view: View2D) -> Optional[View2D]:
+        """ Returns an existing view that contains the view (see `View2D.isContainedBy`), preferably one from which
+        the view is derived exactly. Warns when the view can only be approximated by re-binning. """
+        containingViews = [existingView for existingView in self._views if view.isContainedBy(existingView)]
+        for existingView in containingViews:
+            if view.isExactlyContainedBy(existingView):
+                return existingView
+        if not containingViews:
+            return None
+        utils.warn(f"WARNING: The bins of view {view.name} are not aligned with the bins of the existing views. Its "
+                   f"data is approximated by re-binning the view {containingViews[0].name}.")
+        return containingViews[0]
+
     def updateView(self, view: View2D):
         if view in self._outdatedViews:
             self._compileViews([view])
@@ -104,15 +185,30 @@ class EnergyLogger(Logger):
             print(f"\t{i}: {view.description}")
 
     def save(self, filepath: str = None):
+        """ Saves the logger to a single pickle file, or to a LoggerStore directory when the path is a directory or
+        ends with '.logdir'. In a LoggerStore, the views are saved apart from the 3D data so they can be loaded
+        without reading the 3D data, and the 3D data is appended to the existing files when saving again. """
         if filepath is None and self._filepath is None:
             filepath = self.DEFAULT_LOGGER_PATH
             utils.warn(f"No filepath specified. Saving to {filepath}.")
         elif filepath is None:
             filepath = self._filepath
 
+        if isStorePath(filepath):
+            store = LoggerStore(filepath)
+            store.writeObject(self.VIEWS_STORE_NAME, (self._views, self._defaultViews, self._outdatedViews,
+                                                      self._compiledLengths, self._voxelGrids,
+                                                      self._octreeTally, self._energyTotals,
+                                                      self._samplingPriorities, self._samplingCounts))
+            self._saveToStore(store, header={"nDataPointsRemoved": self._nDataPointsRemoved,
+                                             "sceneHash": self._sceneHash, "has3D": self.has3D})
+            return
+
         with open(filepath, "wb") as file:
             pickle.dump((self._data, self.info, self._labels, self._views, self._defaultViews, self._outdatedViews,
-                         self._nDataPointsRemoved, self._sceneHash, self.has3D), file)
+                         self._nDataPointsRemoved, self._sceneHash, self.has3D, self._compiledLengths,
+                         self._voxelGrids, self._octreeTally, self._energyTotals, self._samplingPriorities,
+                         self._samplingCounts), file)
 
     def load(self, filepath: str):
         self._filepath = filepath
@@ -122,9 +218,33 @@ class EnergyLogger(Logger):
                        "at this location if the logger is saved later on.".format(filepath))
             return
 
-        with open(filepath, "rb") as file:
-            self._data, self.info, self._labels, self._views, oldDefaultViews, self._outdatedViews, \
-                self._nDataPointsRemoved, oldSceneHash, oldHas3D = pickle.load(file)
+        if isStorePath(filepath):
+            store = LoggerStore(filepath)
+            header = self._loadFromStore(store)
+            self._views, oldDefaultViews, self._outdatedViews, *optionalObjects = \
+                store.readObject(self.VIEWS_STORE_NAME)
+            self._nDataPointsRemoved, oldSceneHash, oldHas3D = \
+                header["nDataPointsRemoved"], header["sceneHash"], header["has3D"]
+        else:
+            with open(filepath, "rb") as file:
+                self._data, self.info, self._labels, self._views, oldDefaultViews, self._outdatedViews, \
+                    self._nDataPointsRemoved, oldSceneHash, oldHas3D, *optionalObjects = pickle.load(file)
+            self._mergedData.clear()
+            self._spatialIndexes.clear()
+        # Loggers saved by older versions do not have the following objects.
+        compiledLengths, voxelGrids, octreeTally, energyTotals, samplingPriorities, samplingCounts = \
+            (optionalObjects + [None] * 6)[:6]
+        self._loadCompiledLengths(compiledLengths)
+        self._loadEnergyTotals(energyTotals, oldHas3D)
+        self._voxelGrids = voxelGrids or {}
+        self._samplingPriorities = samplingPriorities or {}
+        self._samplingCounts = samplingCounts or {key: len(priorities) for key, priorities in
+                                                  self._samplingPriorities.items()}
+        if octreeTally is not None:
+            if self._octreeTally is not None:
+                utils.warn("WARNING: Cannot provide a new octree tally to a loaded logger. "
+                           "Using the octree tally from the file.")
+            self._octreeTally = octreeTally
 
         if oldSceneHash != self._sceneHash:
             utils.warn("WARNING: The scene used to create the logger at '{}' is different from the current "
@@ -139,6 +259,39 @@ class EnergyLogger(Logger):
             utils.warn("WARNING: Cannot provide new default views to a loaded logger. "
                        "Using only the views from the file.".format(filepath))
 
+    def _loadCompiledLengths(self, compiledLengths: Optional[Dict[View2D, Dict[InteractionKey, int]]]):
+        if compiledLengths is not None:
+            self._compiledLengths = compiledLengths
+            return
+        # Loggers saved before the compiled lengths were tracked: up-to-date views contain all the datapoints and
+        # outdated views are compiled again from the start.
+        self._compiledLengths = {}
+        for view in self._views:
+            if view in self._outdatedViews:
+                view.clearData()
+            else:
+                self._compiledLengths[view] = self._getDataPointLengths()
+
+    def _loadEnergyTotals(self, energyTotals: Optional[Dict[InteractionKey, np.ndarray]], has3D: bool):
+        if energyTotals is not None:
+            self._energyTotals = energyTotals
+            return
+        # Loggers saved before the energy totals were tracked: the totals are summed once from the 3D data, or are
+        # unknown if the 3D data was discarded.
+        self._energyTotals = None
+        if not has3D:
+            return
+        self._energyTotals = {}
+        for key in self._data:
+            if self._dataPointProcessor is not None:
+                self._energyTotals[key] = self._dataPointProcessor.getSums(self.getDataPointChunks(key))
+                continue
+            for dataPoints in self.getDataPointChunks(key):
+                self._addEnergyTotals(dataPoints, key)
+
+    def _getDataPointLengths(self) -> Dict[InteractionKey, int]:
+        return {key: len(data.dataPoints) for key, data in self._data.items() if data.dataPoints is not None}
+
     @property
     def views(self) -> List[View2D]:
         return self._views
@@ -178,44 +331,238 @@ class EnergyLogger(Logger):
         data to 2D views if 3D data is being discarded.
         """
         super().logDataPointArray(array, key)
-        self._outdatedViews = set(self._views)
+        if self._energyTotals is not None:
+            self._addEnergyTotals(array, key)
+        if self._voxelSize is not None and key.surfaceLabel is None:
+            self._extractVoxelData(array, key.solidLabel)
+        if self._octreeTally is not None and key.surfaceLabel is None and \
+                self._octreeTally.acceptsSolid(key.solidLabel):
+            self._octreeTally.extractData(array)
 
         if not self._keep3D:
             self._compileViews(self._views)
             self._delete3DData()
+            return
+
+        if self._maxPointsPerKey is not None and len(self._data[key].dataPoints) > 2 * self._maxPointsPerKey:
+            self._sampleDataPoints(key)
+
+        self._outdatedViews = set(self._views)
+        if self._maxMemoryMB is not None and self._nBytesInMemory > self._maxMemoryMB * 2 ** 20:
+            if self._spillExecutor is None:
+                self._spillExecutor = ThreadPoolExecutor(max_workers=1)
+                weakref.finalize(self, self._spillExecutor.shutdown, True)
+            self._spillData(self._spillExecutor)
+
+    def close(self):
+        """ Waits for the data being spilled to disk (see `maxMemoryMB`) and stops the spilling thread. The logger
+        can still be used afterwards. The thread is also stopped when the logger is garbage collected. """
+        if self._spillExecutor is None:
+            return
+        self._spillExecutor.shutdown(wait=True)
+        self._spillExecutor = None
+
+    def _sampleDataPoints(self, key: InteractionKey):
+        """ Replaces the datapoints of the key with their priority sample of `maxPointsPerKey` datapoints. The
+        priorities of the datapoints logged since the last sampling are drawn now. """
+        container = self._data[key].dataPoints
+        priorities = self._samplingPriorities.get(key, np.zeros(0))
+        newValues = np.concatenate([dataPoints[:, 0] for dataPoints in container.getChunks(start=len(priorities))])
+        nDrawn = self._samplingCounts.get(key, 0)
+        priorities = np.concatenate([priorities, getPriorities(newValues, self._getSamplingRandomSource(key, nDrawn))])
+        self._samplingCounts[key] = nDrawn + len(newValues)
+
+        dataPoints, self._samplingPriorities[key] = prioritySample(container.getData(), priorities,
+                                                                   self._maxPointsPerKey)
+        self._nDataPointsRemoved += len(container) - len(dataPoints)
+        self._data[key].dataPoints = ListArrayContainer.fromArray(dataPoints)
+        self._mergedData.clear()
+        self._storedLengths.pop((key, DataType.DATA_POINT), None)
+        self._spatialIndexes.pop(key, None)
+
+        # The views that contain the previous datapoints of this key are compiled again from the start.
+        for view in list(self._compiledLengths):
+            if self._viewContainsKey(view, key) and self._compiledLengths[view].get(key, 0) > 0:
+                view.clearData()
+                del self._compiledLengths[view]
+
+    def _getSamplingRandomSource(self, key: InteractionKey, nDrawn: int):
+        """ Returns the generator of the priorities of the datapoints of the key, from the `nDrawn`-th datapoint
+        logged to this key. The generator is seeded from the seed of the logger (or of the source), the key and
+        `nDrawn`, so the same datapoints logged in the same order always get the same priorities. """
+        seed = self._seed if self._seed is not None else self.info.get("seed")
+        if seed is None:
+            return np.random
+        keyHash = hashlib.sha256(repr((key.solidLabel, key.surfaceLabel)).encode("utf-8")).hexdigest()[:16]
+        return np.random.default_rng([int(seed), int(keyHash, 16), nDrawn])
+
+    def _addEnergyTotals(self, dataPoints: np.ndarray, key: InteractionKey):
+        values = dataPoints[:, 0]
+        negativeEnergy = np.sum(values, dtype=np.float64, where=values < 0)
+        positiveEnergy = np.sum(values, dtype=np.float64) - negativeEnergy
+        if key not in self._energyTotals:
+            self._energyTotals[key] = np.zeros(2, dtype=np.float64)
+        self._energyTotals[key] += (positiveEnergy, -negativeEnergy)
+
+    @property
+    def hasEnergyTotals(self) -> bool:
+        """ False when the logger was loaded from a file saved without the energy totals after its 3D data was
+        discarded. """
+        return self._energyTotals is not None
+
+    def getEnergyTotal(self, key: InteractionKey, leaving: bool = True) -> float:
+        """
+        Returns the total energy logged under this interaction key, including the datapoints that were discarded or
+        written to disk. The totals are kept up to date as datapoints are logged, so this does not read the 3D data.
+
+        For a solid key (without surface label), this is the energy absorbed in the solid. For a surface key, this is
+        the energy leaving the solid through this surface (positive datapoints) or, if `leaving` is False, the energy
+        entering the solid through this surface (negative datapoints, returned as a positive energy).
+        """
+        if self._energyTotals is None:
+            raise RuntimeError("The energy totals of this logger are not available.")
+        totals = self._energyTotals.get(key)
+        if totals is None:
+            return 0.0
+        if key.surfaceLabel is None:
+            return float(totals[0] - totals[1])
+        return float(totals[0] if leaving else totals[1])
+
+    def _extractVoxelData(self, dataPoints: np.ndarray, solidLabel: str):
+        if not self._voxelsPerSolid:
+            solidLabel = None
+        elif not utils.labelContained(solidLabel, self._scene.getSolidLabels()):
+            return
+        if solidLabel not in self._voxelGrids:
+            self._voxelGrids[solidLabel] = self._createVoxelGrid(solidLabel)
+        self._voxelGrids[solidLabel].extractData(dataPoints)
+
+    def _createVoxelGrid(self, solidLabel: Optional[str]) -> VoxelGrid:
+        if solidLabel is not None:
+            return VoxelGrid(self.getSolidLimits(solidLabel), self._voxelSize, clip=True)
+        sceneBoundingBox = self._scene.getBoundingBox()
+        limits = self._infiniteLimits if sceneBoundingBox is None else sceneBoundingBox.xyzLimits
+        return VoxelGrid(limits, self._voxelSize)
+
+    @property
+    def dataPointProcessor(self) -> Optional[CLDataPointProcessor]:
+        """ The OpenCL post-processing of the 3D data, or None without `useHardwareAcceleration`. """
+        return self._dataPointProcessor
+
+    @property
+    def hasVoxels(self) -> bool:
+        return len(self._voxelGrids) > 0
+
+    @property
+    def voxelGrids(self) -> Dict[Optional[str], VoxelGrid]:
+        """ The voxel grids of each solid label, or of the whole scene under the label None when `voxelsPerSolid`
+        is False. """
+        return self._voxelGrids
+
+    def getVoxelGrid(self, solidLabel: str = None) -> Optional[VoxelGrid]:
+        """ Returns the voxel grid of the solid, or the voxel grid of the whole scene when no solid label is given.
+        Returns None when the logger has no such voxel grid. """
+        for label, voxelGrid in self._voxelGrids.items():
+            if utils.labelsEqual(label, solidLabel):
+                return voxelGrid
+        return None
+
+    @property
+    def octreeTally(self) -> Optional[OctreeTally]:
+        return self._octreeTally
+
+    def getVoxelDataPoints(self, solidLabel: str = None) -> Optional[np.ndarray]:
+        """
+        Returns the energy absorbed in the voxels of the solid (or of the scene when no solid label is given) as
+        datapoints (value, x, y, z) at the center of the voxels. Without a voxel grid of the whole scene, the scene
+        datapoints are those of all the solids. Returns None when this data is not available.
+        """
+        voxelGrid = self.getVoxelGrid(solidLabel)
+        if voxelGrid is not None:
+            return voxelGrid.getDataPoints()
+        if solidLabel is not None or not self._voxelsPerSolid or not self.hasVoxels:
+            return None
+        return np.concatenate([voxelGrid.getDataPoints() for voxelGrid in self._voxelGrids.values()], axis=0)
 
     def logDataPoint(self, value: float, position: Vector, key: InteractionKey):
         self.logDataPointArray(np.array([[value, *position.array]]), key)
 
     def _compileViews(self, views: List[View2D]):
+        """ Extracts to each view the datapoints logged since it was last compiled. """
         for key, data in self._data.items():
             datapointsContainer = data.dataPoints
             if datapointsContainer is None or len(datapointsContainer) == 0:
                 continue
+            viewsByStart: Dict[int, List[View2D]] = {}
+            for view in views:
+                start = self._compiledLengths.get(view, {}).get(key, 0)
+                if start < len(datapointsContainer) and self._viewContainsKey(view, key):
+                    viewsByStart.setdefault(start, []).append(view)
+            for start, startViews in viewsByStart.items():
+                self._extractData(datapointsContainer.getChunks(start, maxRows=CHUNK_ROWS), startViews)
             for view in views:
-                if view.solidLabel and not utils.labelsEqual(view.solidLabel, key.solidLabel):
-                    continue
-                if view.surfaceLabel and not utils.labelsEqual(view.surfaceLabel, key.surfaceLabel):
-                    continue
-                if view.surfaceLabel is None and key.surfaceLabel is not None:
-                    continue
-                view.extractData(datapointsContainer.getData())
+                self._compiledLengths.setdefault(view, {})[key] = len(datapointsContainer)
         for view in views:
             self._outdatedViews.discard(view)
 
+    def _extractData(self, chunks: Iterable[np.ndarray], views: List[View2D]):
+        """ Bins the datapoint chunks to the views. The bin indices are computed once for all the views with the same
+        binning geometry, and each group of views is binned in its own thread. With hardware acceleration, every view
+        is binned on the device instead, in a single pass over the chunks. """
+        if not views:
+            return
+        if self._dataPointProcessor is not None:
+            histograms = self._dataPointProcessor.histograms(chunks, [view.histogramSpec for view in views])
+            for view, histogram in zip(views, histograms):
+                view.extractHistogram(histogram)
+            return
+        viewGroups: Dict[tuple, List[View2D]] = {}
+        for view in views:
+            viewGroups.setdefault(view.binningKey, []).append(view)
+        viewGroups = list(viewGroups.values())
+
+        if len(viewGroups) == 1:
+            for dataPoints in chunks:
+                self._extractDataToGroup(dataPoints, viewGroups[0])
+            return
+        with ThreadPoolExecutor(max_workers=min(len(viewGroups), os.cpu_count() or 1)) as executor:
+            for dataPoints in chunks:
+                futures = [executor.submit(self._extractDataToGroup, dataPoints, group) for group in viewGroups]
+                for future in futures:
+                    future.result()
+
+    @staticmethod
+    def _extractDataToGroup(dataPoints: np.ndarray, views: List[View2D]):
+        binIndices = views[0].getBinIndices(dataPoints)
+        for view in views:
+            view.extractData(dataPoints, binIndices)
+
+    @staticmethod
+    def _viewContainsKey(view: View2D, key: InteractionKey) -> bool:
+        if view.solidLabel and not utils.labelsEqual(view.solidLabel, key.solidLabel):
+            return False
+        if view.surfaceLabel and not utils.labelsEqual(view.surfaceLabel, key.surfaceLabel):
+            return False
+        if view.surfaceLabel is None and key.surfaceLabel is not None:
+            return False
+        return True
+
     def _delete3DData(self):
         self._nDataPointsRemoved += super().nDataPoints
-        self._data.clear()
+        self._clearData()
+        self._compiledLengths.clear()
 
     @property
     def nDataPoints(self) -> int:
         """
-        Overwrites the `Logger` method to return the total number of data points logged, including the ones discarded.
+        Overwrites the `Logger` method to return the total number of data points logged, including the ones discarded
+        or left out of the samples.
         """
-        if self._keep3D:
-            return super().nDataPoints
-        else:
+        if not self._keep3D:
             return self._nDataPointsRemoved
+        if self._maxPointsPerKey is not None:
+            return super().nDataPoints + self._nDataPointsRemoved
+        return super().nDataPoints
 
     @property
     def isEmpty(self) -> bool:
@@ -0,0 +1,222 @@
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from pytissueoptics.rayscattering import utils
+from pytissueoptics.rayscattering.display.utils import Direction, HistogramSpec, binning
+from pytissueoptics.rayscattering.display.views.view2D import View2D
+from pytissueoptics.scene.logger.logger import CHUNK_ROWS
+
+OCTANT_OFFSETS = np.array([[(octant >> axis) & 1 for axis in range(3)] for octant in range(8)], dtype=np.float64)
+
+
+class OctreeTally:
+    """
+    Adaptive 3D tally of the energy deposited in a volume. The volume starts as a single cell, and each cell is split
+    in 8 octants when the datapoints it received pass the `splitCount` (or the `splitWeight`), down to the
+    `minCellSize`. The resolution is thus only fine where the energy concentrates and the memory scales with the
+    number of cells instead of the size of the volume.
+
+    The energy received by a cell before it was split stays in this cell and is considered uniformly distributed
+    over its volume. Datapoints that cause a split are tallied in the new cells.
+
+    The tally can be given to an EnergyLogger, or filled with `extractData`. It is displayed by extracting it to any
+    View2D (projections and slices) with `extractView`, or to a Profile1D with `getProfile`.
+    """
+    def __init__(self, limits: List[Tuple[float, float]], minCellSize: float, splitCount: int = 64,
+                 splitWeight: float = None, solidLabel: str = None):
+        """
+        :param limits: The (min, max) limits of the volume along each axis.
+        :param minCellSize: Cells are not split when their octants would be smaller than this size (along their
+                largest axis).
+        :param splitCount: A cell is split when it received more than this number of datapoints.
+        :param splitWeight: (Optional) A cell is also split when it received more than this energy.
+        :param solidLabel: (Optional) When given to an EnergyLogger, only tally the energy absorbed in this solid.
+                Otherwise, the energy absorbed in all the solids (and in the world) is tallied.
+        """
+        self._limits = [(float(min(l)), float(max(l))) for l in limits]
+        self._rootOrigin = np.array([l[0] for l in self._limits])
+        self._rootSize = np.array([l[1] - l[0] for l in self._limits])
+        self._maxDepth = max(0, int(np.floor(np.log2(max(self._rootSize) / minCellSize))))
+        self._minCellSize = minCellSize
+        self._splitCount = splitCount
+        self._splitWeight = splitWeight
+        self._solidLabel = solidLabel
+
+        self._nCells = 0
+        self._firstChild = np.zeros(0, dtype=np.int64)
+        self._depth = np.zeros(0, dtype=np.int8)
+        self._origin = np.zeros((0, 3), dtype=np.float64)
+        self._value = np.zeros(0, dtype=np.float64)
+        self._count = np.zeros(0, dtype=np.int64)
+        self._addCells(self._rootOrigin[None, :], np.zeros(1, dtype=np.int8))
+
+    @property
+    def limits(self) -> List[Tuple[float, float]]:
+        return self._limits
+
+    @property
+    def solidLabel(self) -> Optional[str]:
+        return self._solidLabel
+
+    @property
+    def nCells(self) -> int:
+        return self._nCells
+
+    @property
+    def nLeaves(self) -> int:
+        return int(np.count_nonzero(self._firstChild[:self._nCells] < 0))
+
+    @property
+    def maxDepth(self) -> int:
+        return self._maxDepth
+
+    @property
+    def nBytes(self) -> int:
+        return sum(array[:self._nCells].nbytes for array in (self._firstChild, self._depth, self._origin,
+                                                             self._value, self._count))
+
+    def getSum(self) -> float:
+        return float(np.sum(self._value[:self._nCells]))
+
+    def acceptsSolid(self, solidLabel: str) -> bool:
+        return self._solidLabel is None or utils.labelsEqual(self._solidLabel, solidLabel)
+
+    def extractData(self, dataPoints: np.ndarray):
+        """ Tallies the value of each datapoint (value, x, y, z). Datapoints outside the limits are ignored. """
+        positions, weights = dataPoints[:, 1:], dataPoints[:, 0]
+        isInside = np.all((positions >= self._rootOrigin) & (positions <= self._rootOrigin + self._rootSize), axis=1)
+        positions, weights = positions[isInside], weights[isInside]
+        if len(weights) == 0:
+            return
+
+        cells = np.zeros(len(weights), dtype=np.int64)
+        while True:
+            cells = self._descend(positions, cells)
+            leaves, inverse = np.unique(cells, return_inverse=True)
+            inverse = inverse.reshape(-1)
+            counts = self._count[leaves] + np.bincount(inverse)
+            shouldSplit = counts > self._splitCount
+            if self._splitWeight is not None:
+                shouldSplit |= self._value[leaves] + np.bincount(inverse, weights=weights) > self._splitWeight
+            shouldSplit &= self._depth[leaves] < self._maxDepth
+            if not np.any(shouldSplit):
+                break
+            self._split(leaves[shouldSplit])
+
+        self._value[leaves] += np.bincount(inverse, weights=weights)
+        self._count[leaves] += np.bincount(inverse)
+
+    def _descend(self, positions: np.ndarray, cells: np.ndarray) -> np.ndarray:
+        """ Moves each position from its cell down to the leaf that contains it. """
+        isActive = self._firstChild[cells] >= 0
+        while np.any(isActive):
+            indices = np.flatnonzero(isActive)
+            parents = cells[indices]
+            centers = self._origin[parents] + self._getCellSizes(parents) / 2
+            octants = (positions[indices] >= centers) @ np.array([1, 2, 4])
+            cells[indices] = self._firstChild[parents] + octants
+            isActive[indices] = self._firstChild[cells[indices]] >= 0
+        return cells
+
+    def _split(self, leaves: np.ndarray):
+        childSizes = self._getCellSizes(leaves) / 2
+        origins = self._origin[leaves][:, None, :] + childSizes[:, None, :] * OCTANT_OFFSETS[None, :, :]
+        self._firstChild[leaves] = self._nCells + 8 * np.arange(len(leaves))
+        self._addCells(origins.reshape((-1, 3)), np.repeat(self._depth[leaves] + 1, 8).astype(np.int8))
+
+    def _addCells(self, origins: np.ndarray, depths: np.ndarray):
+        n = len(depths)
+        if self._nCells + n > len(self._depth):
+            capacity = max(2 * len(self._depth), self._nCells + n, 64)
+            self._firstChild = self._resize(self._firstChild, capacity, -1)
+            self._depth = self._resize(self._depth, capacity, 0)
+            self._origin = self._resize(self._origin, capacity, 0)
+            self._value = self._resize(self._value, capacity, 0)
+            self._count = self._resize(self._count, capacity, 0)
+        cells = slice(self._nCells, self._nCells + n)
+        self._origin[cells] = origins
+        self._depth[cells] = depths
+        self._nCells += n
+
+    def _resize(self, array: np.ndarray, capacity: int, fillValue) -> np.ndarray:
+        resized = np.full((capacity, *array.shape[1:]), fillValue, dtype=array.dtype)
+        resized[:self._nCells] = array[:self._nCells]
+        return resized
+
+    def _getCellSizes(self, cells: np.ndarray) -> np.ndarray:
+        return self._rootSize[None, :] / (2.0 ** self._depth[cells])[:, None]
+
+    def getCells(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """ Returns the origin, the size and the energy of the cells that received energy. Cells that were split
+        are included with the energy they received before being split. """
+        cells = np.flatnonzero(self._value[:self._nCells])
+        return self._origin[cells], self._getCellSizes(cells), self._value[cells]
+
+    def getHistogram(self, spec: HistogramSpec) -> np.ndarray:
+        """
+        Returns the histogram of the tallied energy with the binning of the spec (see `binning.HistogramSpec`). The
+        energy of each cell is considered uniform over its volume: it is deposited directly in the bins that the cell
+        overlaps, in proportion to the overlap along each binned axis (see `binning.getBinOverlaps`), and to the
+        fraction of the cell inside the slice of the spec. The memory thus scales with the number of bins instead
+        of with the resolution of the bins relatively to the size of the cells.
+        """
+        axes = [column - 1 for column in spec.columns]
+        histogram = np.zeros(int(np.prod(spec.bins)), dtype=np.float64)
+        if spec.sign < 0:
+            return histogram.reshape(spec.bins)
+        cells = np.flatnonzero(self._value[:self._nCells])
+        for depth in np.unique(self._depth[cells]):
+            depthCells = cells[self._depth[cells] == depth]
+            cellSize = self._rootSize / 2.0 ** depth
+            maxBinsPerCell = int(np.prod([np.ceil(cellSize[axis] / ((limits[1] - limits[0]) / bins)) + 1
+                                          for axis, limits, bins in zip(axes, spec.limits, spec.bins)]))
+            nCellsPerChunk = max(1, CHUNK_ROWS // maxBinsPerCell)
+            for start in range(0, len(depthCells), nCellsPerChunk):
+                chunkCells = depthCells[start:start + nCellsPerChunk]
+                origins, nCells = self._origin[chunkCells], len(chunkCells)
+                binIndices = np.zeros((nCells, 1), dtype=np.intp)
+                weights = self._value[chunkCells][:, None]
+                if spec.sliceColumn is not None:
+                    weights = weights * self._getSliceFractions(origins, cellSize, spec)[:, None]
+                for axis, limits, bins in zip(axes, spec.limits, spec.bins):
+                    axisIndices, axisFractions = binning.getBinOverlaps(origins[:, axis], cellSize[axis], limits, bins)
+                    binIndices = (binIndices[:, :, None] * bins + axisIndices[:, None, :]).reshape((nCells, -1))
+                    weights = (weights[:, :, None] * axisFractions[:, None, :]).reshape((nCells, -1))
+                isUsed = weights != 0
+                binning.accumulateBins(histogram, binIndices[isUsed], weights[isUsed])
+        return histogram.reshape(spec.bins)
+
+    @staticmethod
+    def _getSliceFractions(origins: np.ndarray, cellSize: np.ndarray, spec: HistogramSpec) -> np.ndarray:
+        """ Returns the fraction of the depth of each cell that is inside the slice of the spec. """
+        axis = spec.sliceColumn - 1
+        overlaps = np.minimum(origins[:, axis] + cellSize[axis], spec.sliceLimits[1]) - \
+            np.maximum(origins[:, axis], spec.sliceLimits[0])
+        return np.clip(overlaps / cellSize[axis], 0, 1)
+
+    def extractView(self, view: View2D, binSize: float = None):
+        """
+        Extracts the tallied energy to the 2D view. The view is initialized with the limits of the tally and the
+        given bin size (default to the minimum cell size) if it does not have its own limits and bin size. The energy
+        of each cell is spread over the view bins it overlaps (see `getHistogram`).
+        """
+        if view.binsU is None:
+            binSize = binSize or self._minCellSize
+            view.setContext(self._limits, (binSize, binSize, binSize))
+        view.extractHistogram(self.getHistogram(view.histogramSpec))
+
+    def getProfile(self, horizontalDirection: Direction, limits: Tuple[float, float] = None,
+                   binSize: float = None) -> 'Profile1D':
+        """ Returns the profile of the tallied energy along the direction. Default to the limits of the tally and to
+        the minimum cell size. """
+        from pytissueoptics.rayscattering.display.profiles import Profile1D
+        axis = horizontalDirection.axis
+        limits = tuple(sorted(limits or self._limits[axis]))
+        binSize = binSize or self._minCellSize
+        bins = max(1, int(round((limits[1] - limits[0]) / binSize)))
+
+        spec = HistogramSpec(columns=(axis + 1,), limits=(limits,), bins=(bins,))
+        histogram = self.getHistogram(spec).astype(np.float32)
+        name = 'Energy profile along ' + 'xyz'[axis] + ' of the octree tally'
+        return Profile1D(histogram, horizontalDirection, limits, name)
@@ -1,3 +1,5 @@
+from typing import Iterator
+
 import numpy as np
 
 from pytissueoptics.scene.logger import Logger, InteractionKey
@@ -37,3 +39,21 @@ class PointCloudFactory:
         if len(points) == 0:
             return PointCloud(None, None)
         return PointCloud(None, np.concatenate(points, axis=0))
+
+    def getPointCloudChunks(self, solidLabel: str = None, surfaceLabel: str = None) -> Iterator[PointCloud]:
+        """ Yields the points of `getPointCloud` as a stream of smaller point clouds, so the logged points never have
+        to be loaded in memory all at once. """
+        if not solidLabel and not surfaceLabel:
+            for _solidLabel in self._logger.getStoredSolidLabels():
+                yield from self.getPointCloudChunks(_solidLabel)
+            yield from self.getPointCloudOfSurfacesChunks()
+            return
+        for points in self._logger.getDataPointChunks(InteractionKey(solidLabel, surfaceLabel)):
+            yield PointCloud(None, points) if surfaceLabel else PointCloud(points, None)
+
+    def getPointCloudOfSurfacesChunks(self, solidLabel: str = None) -> Iterator[PointCloud]:
+        """ Yields the points of `getPointCloudOfSurfaces` as a stream of smaller point clouds. """
+        solidLabels = [solidLabel] if solidLabel else self._logger.getStoredSolidLabels()
+        for _solidLabel in solidLabels:
+            for surfaceLabel in self._logger.getStoredSurfaceLabels(_solidLabel):
+                yield from self.getPointCloudChunks(_solidLabel, surfaceLabel)
@@ -0,0 +1,37 @@
+"""
+Priority sampling of weighted datapoints (Duffield, Lund & Thorup, "Priority sampling for estimation of arbitrary
+subset sums", J. ACM 54, 2007).
+
+Each datapoint of value v is given the priority |v| / u, with u uniform in (0, 1]. A sample of size k keeps the k
+datapoints of highest priority and replaces the value of each kept datapoint with sign(v) * max(|v|, tau), where tau
+is the highest priority that was discarded. The sum of the sampled values over any subset of the datapoints (a
+region, a bin, a solid) is then an unbiased estimate of the sum of their original values, and heavy datapoints are
+kept as they are.
+
+Sampling the sample again with the same priorities (and more datapoints) gives the same result as sampling all the
+datapoints at once, since tau can only increase. The sample can thus be reduced as datapoints are streamed.
+"""
+
+from typing import Tuple
+
+import numpy as np
+
+
+def getPriorities(values: np.ndarray, randomSource=np.random) -> np.ndarray:
+    return np.abs(values.astype(np.float64)) / (1 - randomSource.random(len(values)))
+
+
+def prioritySample(dataPoints: np.ndarray, priorities: np.ndarray, size: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Returns the `size` datapoints (value, x, y, z) of highest priority with their rescaled values, and their
+    priorities. The datapoints are returned as they are if there are no more than `size`.
+    """
+    if len(dataPoints) <= size:
+        return dataPoints, priorities
+    order = np.argpartition(-priorities, size)
+    kept, threshold = order[:size], priorities[order[size]]
+
+    sample = dataPoints[kept]
+    values = sample[:, 0]
+    sample[:, 0] = np.sign(values) * np.maximum(np.abs(values), threshold)
+    return sample, priorities[kept]
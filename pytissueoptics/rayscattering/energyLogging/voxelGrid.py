@@ -0,0 +1,77 @@
+from typing import List, Tuple, Union
+
+import numpy as np
+
+from pytissueoptics.rayscattering.display.utils.binning import getBinIndices
+from pytissueoptics.rayscattering.display.utils.histogramData import HistogramData
+
+
+class VoxelGrid:
+    """
+    3D grid of the energy deposited in a volume, binned at a fixed voxel size. The grid only takes the memory of its
+    voxels (or less while few voxels were hit, see HistogramData), no matter how many datapoints it received.
+
+    Used by the EnergyLogger to keep the 3D distribution of the absorbed energy when `keep3D` is False.
+    """
+    def __init__(self, limits: List[Tuple[float, float]], voxelSize: Union[float, Tuple[float, float, float]],
+                 clip: bool = False):
+        """
+        :param limits: The (min, max) limits of the grid along each axis.
+        :param voxelSize: The size of the voxels along each axis. The limits are divided in a whole number of voxels,
+                so the size of the voxels is rounded to fit the limits.
+        :param clip: If True, the datapoints outside the limits are added to the nearest voxel instead of being
+                ignored. Used when the limits are known to contain every datapoint (e.g. the bounding box of a solid),
+                so no energy is lost to rounding errors at the limits.
+        """
+        if isinstance(voxelSize, (int, float)):
+            voxelSize = (voxelSize, voxelSize, voxelSize)
+        self._limits = [(float(min(l)), float(max(l))) for l in limits]
+        self._bins = tuple(max(1, round((l[1] - l[0]) / size)) for l, size in zip(self._limits, voxelSize))
+        self._clip = clip
+        self._data = HistogramData(self._bins)
+
+    @property
+    def limits(self) -> List[Tuple[float, float]]:
+        return self._limits
+
+    @property
+    def bins(self) -> Tuple[int, int, int]:
+        return self._bins
+
+    @property
+    def voxelSize(self) -> Tuple[float, float, float]:
+        return tuple((l[1] - l[0]) / bins for l, bins in zip(self._limits, self._bins))
+
+    @property
+    def nBytes(self) -> int:
+        return self._data.nBytes
+
+    def extractData(self, dataPoints: np.ndarray):
+        """ Adds the value of each datapoint (value, x, y, z) to its voxel. """
+        if len(dataPoints) == 0:
+            return
+        positions = dataPoints[:, 1:]
+        if self._clip:
+            positions = np.clip(positions, [l[0] for l in self._limits], [l[1] for l in self._limits])
+        self._data.accumulate(getBinIndices(positions, self._limits, self._bins), dataPoints[:, 0])
+
+    def getData(self) -> np.ndarray:
+        """ Returns the dense (binsX, binsY, binsZ) array of the energy in each voxel. """
+        return self._data.toArray().copy()
+
+    def getDataPoints(self) -> np.ndarray:
+        """ Returns the datapoints (value, x, y, z) of the voxels that received energy, positioned at the center of
+        the voxels. """
+        binIndices, values = self._data.getBins()
+        isNonZero = values != 0
+        binIndices, values = binIndices[isNonZero], values[isNonZero]
+
+        dataPoints = np.empty((len(values), 4), dtype=np.float32)
+        dataPoints[:, 0] = values
+        voxelIndices = np.unravel_index(binIndices, self._bins)
+        for axis, (indices, size) in enumerate(zip(voxelIndices, self.voxelSize)):
+            dataPoints[:, axis + 1] = self._limits[axis][0] + (indices + 0.5) * size
+        return dataPoints
+
+    def getSum(self) -> float:
+        return self._data.sum()
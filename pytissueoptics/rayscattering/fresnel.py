@@ -18,8 +18,10 @@ class FresnelIntersect:
     _indexIn: float
     _indexOut: float
     _thetaIn: float
+    _randomSource = random
 
-    def compute(self, rayDirection: Vector, intersection: Intersection) -> FresnelIntersection:
+    def compute(self, rayDirection: Vector, intersection: Intersection, randomSource=random) -> FresnelIntersection:
+        self._randomSource = randomSource
         rayDirection = rayDirection
         normal = intersection.normal.copy()
 
@@ -56,7 +58,7 @@ class FresnelIntersect:
 
     def _getIsReflected(self) -> bool:
         R = self._getReflectionCoefficient()
-        if random.random() < R:
+        if self._randomSource.random() < R:
             return True
         return False
 
@@ -0,0 +1,114 @@
+import hashlib
+from enum import Flag
+from typing import List, Optional
+
+import numpy as np
+
+from pytissueoptics.scene.geometry import BoundingBox, Vector
+
+
+class LogEvent(Flag):
+    """
+    A LogEvent is a bit Flag representing the photon events to log. They can be combined with the `|` operator.
+        ABSORPTION: Weight deposited in a solid (or in the world material) at each interaction.
+        CROSSING: Weight crossing a surface, logged for the solids on both sides of the surface.
+    """
+    NONE = 0
+    ABSORPTION = 1
+    CROSSING = 2
+    ALL = ABSORPTION | CROSSING
+
+
+class LoggingPolicy:
+    def __init__(self, events: LogEvent = LogEvent.ALL, solids: List[str] = None, excludedSolids: List[str] = None,
+                 surfaces: List[str] = None, excludedSurfaces: List[str] = None,
+                 regions: List[BoundingBox] = None):
+        """
+        Selects the interactions recorded during a propagation. Events that are not selected are never written to the
+        logger, which reduces the memory and transfer time of the hardware accelerated propagation. The policy is given
+        to `Source.propagate` and is compiled into the OpenCL kernel.
+
+        An interaction is logged only if it satisfies every given criterion:
+        :param events: The LogEvent types to log. Default to LogEvent.ALL.
+        :param solids: (Optional) Labels of the solids to log. The world material is labeled "world".
+        :param excludedSolids: (Optional) Labels of the solids to ignore.
+        :param surfaces: (Optional) Labels of the surfaces where crossings are logged.
+        :param excludedSurfaces: (Optional) Labels of the surfaces where crossings are ignored.
+        :param regions: (Optional) Regions of interest. Only the interactions located inside one of these bounding
+                boxes are logged.
+        """
+        self._events = events
+        self._solids = None if solids is None else set(solids)
+        self._excludedSolids = set(excludedSolids or [])
+        self._surfaces = None if surfaces is None else set(surfaces)
+        self._excludedSurfaces = set(excludedSurfaces or [])
+        self._regions = regions or []
+
+    @property
+    def events(self) -> LogEvent:
+        return self._events
+
+    @property
+    def regions(self) -> List[BoundingBox]:
+        return self._regions
+
+    @property
+    def logsNothing(self) -> bool:
+        return self._events == LogEvent.NONE
+
+    def logsSolid(self, solidLabel: str) -> bool:
+        if self._solids is not None and solidLabel not in self._solids:
+            return False
+        return solidLabel not in self._excludedSolids
+
+    def logsSurface(self, surfaceLabel: str) -> bool:
+        if self._surfaces is not None and surfaceLabel not in self._surfaces:
+            return False
+        return surfaceLabel not in self._excludedSurfaces
+
+    def logsPosition(self, position: Vector) -> bool:
+        if not self._regions:
+            return True
+        return any(self._regionContains(region, position) for region in self._regions)
+
+    def logsAbsorption(self, solidLabel: str, position: Vector) -> bool:
+        return LogEvent.ABSORPTION in self._events and self.logsSolid(solidLabel) and self.logsPosition(position)
+
+    def getAbsorptionMask(self, solidLabel: str, positions: np.ndarray) -> np.ndarray:
+        """ Vectorized `logsAbsorption` over an array of (x, y, z) positions. """
+        if LogEvent.ABSORPTION not in self._events or not self.logsSolid(solidLabel):
+            return np.zeros(len(positions), dtype=bool)
+        if not self._regions:
+            return np.ones(len(positions), dtype=bool)
+        mask = np.zeros(len(positions), dtype=bool)
+        for region in self._regions:
+            limits = np.asarray(region.xyzLimits)
+            mask |= np.all((limits[:, 0] <= positions) & (positions <= limits[:, 1]), axis=1)
+        return mask
+
+    def logsCrossing(self, solidLabel: str, surfaceLabel: str, position: Vector) -> bool:
+        return LogEvent.CROSSING in self._events and self.logsSolid(solidLabel) and \
+            self.logsSurface(surfaceLabel) and self.logsPosition(position)
+
+    @staticmethod
+    def _regionContains(region: BoundingBox, position: Vector) -> bool:
+        """ Same test as the OpenCL kernel (boundaries included). """
+        limits = np.asarray(region.xyzLimits)
+        return bool(np.all((limits[:, 0] <= position.array) & (position.array <= limits[:, 1])))
+
+    @property
+    def _hashComponents(self) -> tuple:
+        return (self._events.value, sorted(self._solids) if self._solids is not None else None,
+                sorted(self._excludedSolids), sorted(self._surfaces) if self._surfaces is not None else None,
+                sorted(self._excludedSurfaces), [region.xyzLimits for region in self._regions])
+
+    def __hash__(self):
+        # Labels are hashed with sha256 since the string hash of python changes between sessions.
+        return int(hashlib.sha256(repr(self._hashComponents).encode('utf-8')).hexdigest(), 16)
+
+    def __eq__(self, other: 'LoggingPolicy') -> bool:
+        return isinstance(other, LoggingPolicy) and self._hashComponents == other._hashComponents
+
+
+LOG_ALL = LoggingPolicy()
+LOG_NOTHING = LoggingPolicy(events=LogEvent.NONE)
@@ -22,22 +22,22 @@ class ScatteringMaterial(RefractiveMaterial):
     def getAlbedo(self):
         return self._albedo
 
-    def getScatteringDistance(self):
+    def getScatteringDistance(self, randomSource=np.random):
         if self.mu_t == 0:
             return math.inf
 
         rnd = 0
         while rnd == 0:
-            rnd = np.random.random()
+            rnd = randomSource.random()
         return -np.log(rnd) / self.mu_t
 
-    def getScatteringAngles(self):
-        phi = np.random.random() * 2 * np.pi
+    def getScatteringAngles(self, randomSource=np.random):
+        phi = randomSource.random() * 2 * np.pi
         g = self.g
         if g == 0:
-            cost = 2 * np.random.random() - 1
+            cost = 2 * randomSource.random() - 1
         else:
-            temp = (1 - g * g) / (1 - g + 2 * g * np.random.random())
+            temp = (1 - g * g) / (1 - g + 2 * g * randomSource.random())
             cost = (1 + g * g - temp * temp) / (2 * g)
         return np.arccos(cost), phi
 
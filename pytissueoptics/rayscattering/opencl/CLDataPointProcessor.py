@@ -0,0 +1,86 @@
+import os
+from typing import Iterable, List
+
+import numpy as np
+
+from pytissueoptics.rayscattering.display.utils.binning import HistogramSpec
+from pytissueoptics.rayscattering.opencl.CLProgram import CLProgram
+from pytissueoptics.rayscattering.opencl.buffers import BufferOf
+
+DATAPOINTS_SOURCE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src', 'dataPoints.c')
+DEVICE_CHUNK_ROWS = 2 ** 21
+N_PARTIAL_SUMS = 4096
+
+
+class CLDataPointProcessor:
+    """
+    Post-processing of logged datapoints (value, x, y, z) with the OpenCL kernels of src/dataPoints.c: weighted
+    histograms (2D views, profiles and 3D grids, see `HistogramSpec`) and sums of the positive and negative values.
+
+    The datapoints are given as an iterable of chunks (e.g. `ListArrayContainer.getChunks` or slices of a stored
+    memmap), so the datapoints are streamed through a single device buffer. Each chunk is copied to the device once
+    and binned to every histogram, which stay on the device until all the chunks are processed.
+    """
+    def __init__(self, chunkRows: int = DEVICE_CHUNK_ROWS):
+        self._program = CLProgram(DATAPOINTS_SOURCE_PATH)
+        self._chunkRows = chunkRows
+        self._dataPoints = BufferOf(np.zeros(chunkRows * 4, dtype=np.float32))
+
+    def histogram(self, chunks: Iterable[np.ndarray], spec: HistogramSpec) -> np.ndarray:
+        """ Returns the float32 histogram of the datapoints described by the spec (see `binning.histogramDataPoints`).
+        """
+        return self.histograms(chunks, [spec])[0]
+
+    def histograms(self, chunks: Iterable[np.ndarray], specs: List[HistogramSpec]) -> List[np.ndarray]:
+        """ Returns the float32 histogram of the datapoints for each spec, in a single pass over the chunks. """
+        histograms = [BufferOf(np.zeros(int(np.prod(spec.bins)), dtype=np.float32)) for spec in specs]
+        arguments = [self._getHistogramArguments(spec) for spec in specs]
+        for nDataPoints in self._uploadChunks(chunks):
+            for histogram, specArguments in zip(histograms, arguments):
+                self._program.launchKernel("histogramDataPoints", N=nDataPoints,
+                                           arguments=[self._dataPoints, *specArguments, histogram],
+                                           rebuildBuffers=False)
+        return [self._getData(histogram).reshape(spec.bins) for histogram, spec in zip(histograms, specs)]
+
+    def getSums(self, chunks: Iterable[np.ndarray]) -> np.ndarray:
+        """ Returns the sum of the positive values and the sum of the absolute negative values of the datapoints. """
+        partialSums = BufferOf(np.zeros(2 * N_PARTIAL_SUMS, dtype=np.float32))
+        sums = np.zeros(2)
+        for nDataPoints in self._uploadChunks(chunks):
+            nWorkItems = min(nDataPoints, N_PARTIAL_SUMS)
+            self._program.launchKernel("sumDataPoints", N=nWorkItems,
+                                       arguments=[np.uint32(nDataPoints), self._dataPoints, partialSums],
+                                       rebuildBuffers=False)
+            partialSumPairs = self._program.getData(partialSums).reshape(-1, 2)[:nWorkItems]
+            sums += np.sum(partialSumPairs, axis=0, dtype=np.float64)
+        return sums
+
+    def _getData(self, buffer: BufferOf) -> np.ndarray:
+        """ Returns the data of the buffer, which is only on the device if a kernel was launched with it. """
+        if buffer.deviceBuffer is None:
+            return buffer.hostBuffer
+        return self._program.getData(buffer)
+
+    def _uploadChunks(self, chunks: Iterable[np.ndarray]) -> Iterable[int]:
+        """ Copies the chunks to the device buffer, split to its capacity, and yields the number of datapoints. """
+        for chunk in chunks:
+            if chunk is None:
+                continue
+            for start in range(0, len(chunk), self._chunkRows):
+                dataPoints = chunk[start:start + self._chunkRows]
+                self._dataPoints.hostBuffer[:dataPoints.size] = dataPoints.reshape(-1)
+                if self._dataPoints.deviceBuffer is not None:
+                    self._program.setData(self._dataPoints)
+                yield len(dataPoints)
+
+    def _getHistogramArguments(self, spec: HistogramSpec) -> list:
+        """ Kernel arguments of the spec, with the bin arithmetic of `binning.getBinIndices`. """
+        minima = np.array([l[0] for l in spec.limits], dtype=np.float32)
+        ranges = np.array([np.float32(l[1] - l[0]) for l in spec.limits], dtype=np.float32)
+        scales = np.array([np.float32(b / (l[1] - l[0])) for l, b in zip(spec.limits, spec.bins)], dtype=np.float32)
+        sliceColumn, sliceLimits = -1, (0, 0)
+        if spec.sliceColumn is not None:
+            sliceColumn, sliceLimits = spec.sliceColumn, spec.sliceLimits
+        return [np.uint32(len(spec.columns)), BufferOf(np.array(spec.columns, dtype=np.int32)), BufferOf(minima),
+                BufferOf(ranges), BufferOf(scales), BufferOf(np.array(spec.bins, dtype=np.uint32)),
+                np.int32(spec.sign), np.int32(sliceColumn), np.float32(sliceLimits[0]), np.float32(sliceLimits[1])]
@@ -0,0 +1,79 @@
+from typing import Dict, List
+
+import numpy as np
+
+from pytissueoptics.rayscattering import utils
+from pytissueoptics.rayscattering.materials import ScatteringMaterial
+from pytissueoptics.rayscattering.opencl.CLProgram import CLProgram
+from pytissueoptics.rayscattering.opencl.buffers import BufferOf
+from pytissueoptics.rayscattering.tallies import Tally, Detector
+
+RECORDS_PER_PHOTON = 2
+
+
+class CLDetectors:
+    """
+    Device buffers of the exit-state detectors (see src/detectors.c): the distance travelled by each kernel photon in
+    each material, and a region of records per detector. The records of a batch are reserved with an atomic counter
+    per detector, so only the detected photons are copied back to the detectors after each batch. Each region holds
+    `RECORDS_PER_PHOTON` records per kernel photon.
+
+    Without detectors, the buffers are placeholders of a single item.
+    """
+    def __init__(self, tallies: List[Tally], materials: List[ScatteringMaterial], nPhotons: int):
+        self._detectors = [tally for tally in tallies if isinstance(tally, Detector)]
+        self._materials = materials
+        self._capacity = RECORDS_PER_PHOTON * int(nPhotons)
+        self._recordSize = 7 + len(materials)
+        if not self._detectors:
+            self.pathLengths = BufferOf(np.zeros(1, dtype=np.float32))
+            self.records = BufferOf(np.zeros(1, dtype=np.float32))
+            self.counts = BufferOf(np.zeros(1, dtype=np.uint32))
+            return
+        self.pathLengths = BufferOf(np.zeros((nPhotons, len(materials)), dtype=np.float32))
+        self.records = BufferOf(np.zeros(len(self._detectors) * self._capacity * self._recordSize, dtype=np.float32))
+        self.counts = BufferOf(np.zeros(len(self._detectors), dtype=np.uint32))
+
+    @property
+    def arguments(self) -> list:
+        """ The kernel arguments that follow the tallies. """
+        return [self.pathLengths, self.records, self.counts]
+
+    def getCompileDefinitions(self) -> Dict[str, str]:
+        if not self._detectors:
+            return {}
+        return {"DETECTOR_CAPACITY": str(self._capacity)}
+
+    def addRecords(self, program: CLProgram):
+        """ Copies the records of the batch to the detectors and clears the counters for the next batch. Only the
+        written records are transferred. """
+        if not self._detectors:
+            return
+        counts = program.getData(self.counts).copy()
+        for i, detector in enumerate(self._detectors):
+            start = i * self._capacity * self._recordSize
+            nRecords = min(int(counts[i]), self._capacity)
+            records = program.getDataRange(self.records, start, start + nRecords * self._recordSize)
+            records = records.reshape(nRecords, self._recordSize).astype(np.float64)
+            detector.addRecords(records[:, 0:3], records[:, 3:6], records[:, 6], records[:, 7:], self._materials)
+
+        nDropped = int(np.sum(np.maximum(counts.astype(np.int64) - self._capacity, 0)))
+        if nDropped > 0:
+            utils.warn(f"WARNING: {nDropped} detector records were dropped because the photons of a batch crossed "
+                       f"a detector more than {RECORDS_PER_PHOTON} times per photon on average.")
+        self.counts.hostBuffer[:] = 0
+        program.setData(self.counts)
+
+    def readPathLengths(self, program: CLProgram):
+        """ Copies the distances of the kernel photons back to the host, which rebuilds the buffer for the next batch.
+        """
+        if self._detectors:
+            program.getData(self.pathLengths, returnData=False)
+
+    def replacePhotons(self, replacedPhotons: np.ndarray, removedPhotons: np.ndarray):
+        """ Follows the replacement of the fully propagated kernel photons (see CLPhotons): the distances of the new
+        photons are cleared and the rows of the removed photons are deleted. """
+        if not self._detectors:
+            return
+        self.pathLengths.hostBuffer[replacedPhotons] = 0
+        self.pathLengths.hostBuffer = np.delete(self.pathLengths.hostBuffer, removedPhotons, axis=0)
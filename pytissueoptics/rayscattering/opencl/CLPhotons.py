@@ -1,55 +1,102 @@
 import os
 import time
+from enum import Enum
+from typing import List
 
 import numpy as np
 
 from pytissueoptics.rayscattering.opencl import WEIGHT_THRESHOLD
 from pytissueoptics.rayscattering.opencl.utils import CLKeyLog, CLParameters, BatchTiming
 from pytissueoptics.rayscattering.opencl.CLScene import CLScene
+from pytissueoptics.rayscattering.opencl.CLDetectors import CLDetectors
 from pytissueoptics.rayscattering.opencl.CLProgram import CLProgram
+from pytissueoptics.rayscattering.opencl.CLWavefront import CLWavefront, WAVEFRONT_SOURCE_PATH
 from pytissueoptics.rayscattering.opencl.buffers.seedCL import SeedCL
-from pytissueoptics.rayscattering.opencl.buffers.dataPointCL import DataPointCL
+from pytissueoptics.rayscattering.opencl.buffers.logCL import LogCL
 from pytissueoptics.rayscattering.opencl.buffers.photonCL import PhotonCL
+from pytissueoptics.rayscattering.opencl.buffers import BufferOf
+from pytissueoptics.rayscattering.loggingPolicy import LoggingPolicy, LOG_NOTHING
 from pytissueoptics.rayscattering.scatteringScene import ScatteringScene
+from pytissueoptics.rayscattering.tallies import Tally
 from pytissueoptics.scene.logger.logger import Logger
 from pytissueoptics.scene.geometry import Environment
 
 PROPAGATION_SOURCE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src', 'propagation.c')
 
 
+class PropagationMode(Enum):
+    """
+    MEGAKERNEL: Each work unit propagates its photons from start to end in a single kernel.
+    WAVEFRONT: Each step is split into separate kernels over compact photon queues (see CLWavefront).
+    SORTED_WAVEFRONT: Same as WAVEFRONT, but the queues are also sorted by material and solid before each kernel.
+    """
+    MEGAKERNEL = 0
+    WAVEFRONT = 1
+    SORTED_WAVEFRONT = 2
+
+
 class CLPhotons:
-    def __init__(self, positions: np.ndarray, directions: np.ndarray):
+    def __init__(self, positions: np.ndarray, directions: np.ndarray, seed: int = None, firstPhotonID: int = 0,
+                 propagationMode: PropagationMode = PropagationMode.MEGAKERNEL, quantizeLogPositions: bool = False):
+        """
+        With `quantizeLogPositions`, the device log stores 16-bit fixed-point positions relative to the scene bounding
+        box instead of floats, which reduces the log transfer size. Positions outside the scene bounding box are
+        clamped to it.
+        """
         assert positions.shape == directions.shape, "Positions and directions must have the same shape."
         self._positions = positions
         self._directions = directions
         self._N = np.uint32(len(positions))
+        self._seed = seed
+        self._firstPhotonID = firstPhotonID
+        self._propagationMode = propagationMode
+        self._quantizeLogPositions = quantizeLogPositions
         self._weightThreshold = np.float32(WEIGHT_THRESHOLD)
         self._initialMaterial = None
         self._initialSolid = None
 
         self._scene = None
         self._sceneLogger = None
+        self._loggingPolicy = None
+        self._tallies = []
 
-    def setContext(self, scene: ScatteringScene, environment: Environment, logger: Logger = None):
+    def setContext(self, scene: ScatteringScene, environment: Environment, logger: Logger = None,
+                   loggingPolicy: LoggingPolicy = None, tallies: List[Tally] = None):
         self._scene = scene
         self._sceneLogger = logger
+        self._loggingPolicy = loggingPolicy if logger is not None else LOG_NOTHING
+        self._tallies = tallies or []
         self._initialMaterial = environment.material
         self._initialSolid = environment.solid
 
     def propagate(self, IPP: float, verbose: bool = False):
         assert self._scene is not None, "Context must be set before propagation."
-        program = CLProgram(sourcePath=PROPAGATION_SOURCE_PATH)
+        useWavefront = self._propagationMode != PropagationMode.MEGAKERNEL
+        program = CLProgram(sourcePath=WAVEFRONT_SOURCE_PATH if useWavefront else PROPAGATION_SOURCE_PATH)
         params = CLParameters(self._N, AVG_IT_PER_PHOTON=IPP)
 
-        scene = CLScene(self._scene, params.workItemAmount)
+        # Wavefront kernels run one work item per active photon, so each photon needs its own intersection scratch.
+        scene = CLScene(self._scene, params.maxPhotonsPerBatch if useWavefront else params.workItemAmount,
+                        quantizeLogPositions=self._quantizeLogPositions, loggingPolicy=self._loggingPolicy,
+                        tallies=self._tallies)
+        detectors = CLDetectors(self._tallies, self._scene.getMaterials(), params.maxPhotonsPerBatch)
+        program.specialize({**scene.getCompileDefinitions(), **detectors.getCompileDefinitions()})
 
         kernelPhotons = PhotonCL(self._positions[0:params.maxPhotonsPerBatch], self._directions[0:params.maxPhotonsPerBatch],
-                                 materialID=scene.getMaterialID(self._initialMaterial), solidID=scene.getSolidID(self._initialSolid))
+                                 materialID=scene.getMaterialID(self._initialMaterial), solidID=scene.getSolidID(self._initialSolid),
+                                 firstPhotonID=self._firstPhotonID)
         photonPool = PhotonCL(self._positions[params.maxPhotonsPerBatch:], self._directions[params.maxPhotonsPerBatch:],
-                              materialID=scene.getMaterialID(self._initialMaterial), solidID=scene.getSolidID(self._initialSolid))
+                              materialID=scene.getMaterialID(self._initialMaterial), solidID=scene.getSolidID(self._initialSolid),
+                              firstPhotonID=self._firstPhotonID + params.maxPhotonsPerBatch)
         photonPool.make(program.device)
-        seeds = SeedCL(params.maxPhotonsPerBatch)
-        logger = DataPointCL(size=params.maxLoggableInteractions)
+        seeds = SeedCL(params.maxPhotonsPerBatch, seed=self._seed)
+        logger = LogCL(size=params.maxLoggableInteractions, quantizedPositions=scene.quantizesLogPositions)
+        tallySizes = [tally.data.size for tally in self._tallies]
+        tallies = BufferOf(np.zeros(max(1, sum(tallySizes)), dtype=np.float32))
+        if useWavefront:
+            wavefront = CLWavefront(program, scene, seeds, logger, self._weightThreshold,
+                                    sortQueues=self._propagationMode == PropagationMode.SORTED_WAVEFRONT,
+                                    tallies=tallies, detectors=detectors)
 
         photonCount = 0
         batchCount = 0
@@ -59,22 +106,34 @@ class CLPhotons:
 
         while photonCount < self._N:
             t1 = time.time_ns()
-            program.launchKernel(kernelName="propagate", N=np.int32(params.workItemAmount),
-                                 arguments=[np.int32(params.photonsPerWorkItem),
-                                            np.int32(params.maxLoggableInteractionsPerWorkItem),
-                                            self._weightThreshold, np.int32(params.workItemAmount), kernelPhotons,
-                                            scene.materials, scene.nSolids, scene.solids, scene.surfaces, scene.triangles,
-                                            scene.vertices, scene.solidCandidates, seeds, logger])
+            if useWavefront:
+                wavefront.propagate(kernelPhotons)
+            else:
+                program.launchKernel(kernelName="propagate", N=np.int32(params.workItemAmount),
+                                     arguments=[np.int32(params.photonsPerWorkItem),
+                                                np.int32(params.maxLoggableInteractionsPerWorkItem),
+                                                self._weightThreshold, np.int32(params.workItemAmount), kernelPhotons,
+                                                scene.materials, scene.nSolids, scene.solids, scene.surfaces,
+                                                scene.triangles, scene.vertices, scene.solidCandidates, seeds,
+                                                *logger.columns, tallies, *detectors.arguments])
             t2 = time.time_ns()
-            log = program.getData(logger)
+            if self._sceneLogger is not None:
+                for column in logger.columns:
+                    program.getData(column, returnData=False)
             t3 = time.time_ns()
-            self._translateToSceneLogger(log, scene)
+            self._translateToSceneLogger(logger, scene)
             t4 = time.time_ns()
 
-            logger.reset()
+            self._addToTallies(program, tallies, tallySizes)
+            detectors.addRecords(program)
+
+            if self._sceneLogger is not None:
+                logger.reset()
             program.getData(kernelPhotons, returnData=False)
+            detectors.readPathLengths(program)
             batchPhotonCount, photonCount = self._replaceFullyPropagatedPhotons(kernelPhotons, photonPool,
-                                                                                photonCount, params.maxPhotonsPerBatch)
+                                                                                photonCount, params.maxPhotonsPerBatch,
+                                                                                detectors)
             if verbose:
                 timing.recordBatch(batchPhotonCount, propagationTime=(t2 - t1), dataTransferTime=(t3 - t2),
                                    dataConversionTime=(t4 - t3), totalTime=(time.time_ns() - t1))
@@ -83,7 +142,7 @@ class CLPhotons:
             batchCount += 1
 
     def _replaceFullyPropagatedPhotons(self, kernelPhotons: PhotonCL, photonPool: PhotonCL, photonCount: int,
-                                       currentKernelLength: int) -> (int, int):
+                                       currentKernelLength: int, detectors: CLDetectors = None) -> (int, int):
         photonsToReplace = np.where(kernelPhotons.hostBuffer["weight"] == 0)[0]
         batchPhotonCount = len(photonsToReplace)
 
@@ -100,11 +159,23 @@ class CLPhotons:
             photonsToRemove = photonsToReplace
 
         kernelPhotons.hostBuffer = np.delete(kernelPhotons.hostBuffer, photonsToRemove)
+        if detectors is not None:
+            detectors.replacePhotons(photonsToReplace, photonsToRemove)
 
         photonCount += batchPhotonCount
         return batchPhotonCount, photonCount
 
-    def _translateToSceneLogger(self, log, sceneCL):
+    def _addToTallies(self, program: CLProgram, tallies: BufferOf, tallySizes: List[int]):
+        """ Adds the scores of the batch to the tallies and clears the device buffer for the next batch. """
+        if not self._tallies:
+            return
+        data = program.getData(tallies)[:sum(tallySizes)].astype(np.float64)
+        for tally, tallyData in zip(self._tallies, np.split(data, np.cumsum(tallySizes)[:-1])):
+            tally.add(tallyData)
+        tallies.hostBuffer[:] = 0
+        program.setData(tallies)
+
+    def _translateToSceneLogger(self, log: LogCL, sceneCL: CLScene):
         if not self._sceneLogger:
             return
 
@@ -1,6 +1,7 @@
 import os
 import time
-from typing import List
+from collections import OrderedDict
+from typing import Dict, List
 
 import numpy as np
 
@@ -15,7 +16,14 @@ from pytissueoptics.rayscattering.opencl import CONFIG
 from pytissueoptics.rayscattering.opencl.buffers import CLObject
 
 
+MAX_CACHED_PROGRAMS = 16
+
+
 class CLProgram:
+    # Compiled binaries shared by all instances (and contexts), keyed by device, source code and compile definitions.
+    # The definitions are the scene signature of specialized programs (see specialize).
+    _binaryCache = OrderedDict()
+
     def __init__(self, sourcePath: str):
         self._sourcePath = sourcePath
         self._context = CONFIG.clContext
@@ -23,13 +31,21 @@ class CLProgram:
 
         self._mainQueue = cl.CommandQueue(self._context)
         self._program = None
+        self._programKey = None
+        self._definitions = {}
+        self._kernels = {}
         self._include = ''
         self._mocks = []
 
-    def launchKernel(self, kernelName: str, N: int, arguments: list, verbose: bool = False):
+    def launchKernel(self, kernelName: str, N: int, arguments: list, verbose: bool = False,
+                     rebuildBuffers: bool = True):
+        """
+        Builds the given CLObjects and launches the kernel over N work items. Use `rebuildBuffers=False` to reuse the
+        device buffers of previous launches when chaining kernels that work on device-resident data.
+        """
         t0 = time.time()
         CLObjects = [arg for arg in arguments if isinstance(arg, CLObject)]
-        self._build(CLObjects)
+        self._build(CLObjects, rebuildBuffers)
         if verbose:
             for _object in CLObjects:
                 print(f" ... {_object.name} ({_object.nBytes / 1024**2:.3f} MB)")
@@ -39,7 +55,9 @@ class CLProgram:
         if verbose:
             print(f" ... {t1 - t0:.3f} s. [Build]")
 
-        kernel = getattr(self._program, kernelName)
+        if kernelName not in self._kernels:
+            self._kernels[kernelName] = getattr(self._program, kernelName)
+        kernel = self._kernels[kernelName]
         try:
             kernel(self._mainQueue, (N,), None, *buffers)
         except cl.MemoryError:
@@ -51,9 +69,10 @@ class CLProgram:
         if verbose:
             print(f" ... {t2 - t1:.3f} s. [Kernel execution]")
 
-    def _build(self, objects: List[CLObject]):
+    def _build(self, objects: List[CLObject], rebuildBuffers: bool = True):
         for _object in objects:
-            _object.build(self._device, self._context)
+            if rebuildBuffers or _object.deviceBuffer is None:
+                _object.build(self._device, self._context)
 
         typeDeclarations = ''.join([_object.declaration for _object in objects])
         sourceCode = self._include + typeDeclarations + self._makeSource(self._sourcePath)
@@ -61,7 +80,27 @@ class CLProgram:
         for code, mock in self._mocks:
             sourceCode = sourceCode.replace(code, mock)
 
-        self._program = cl.Program(self._context, sourceCode).build()
+        programKey = (sourceCode, tuple(sorted(self._definitions.items())))
+        if programKey == self._programKey:
+            return
+        self._program = self._getProgram(programKey)
+        self._programKey = programKey
+        self._kernels = {}
+
+    def _getProgram(self, programKey) -> 'cl.Program':
+        sourceCode, definitions = programKey
+        options = [f"-D{name}={value}" for name, value in definitions]
+        cacheKey = (self._device.int_ptr, sourceCode, definitions)
+        if cacheKey in CLProgram._binaryCache:
+            CLProgram._binaryCache.move_to_end(cacheKey)
+            binary = CLProgram._binaryCache[cacheKey]
+            return cl.Program(self._context, [self._device], [binary]).build(options=options)
+
+        program = cl.Program(self._context, sourceCode).build(options=options)
+        CLProgram._binaryCache[cacheKey] = program.get_info(cl.program_info.BINARIES)[0]
+        if len(CLProgram._binaryCache) > MAX_CACHED_PROGRAMS:
+            CLProgram._binaryCache.popitem(last=False)
+        return program
 
     def getData(self, _object: CLObject, dtype: np.dtype = np.float32, returnData: bool = True):
         cl.enqueue_copy(self._mainQueue, dest=_object.hostBuffer, src=_object.deviceBuffer)
@@ -72,9 +111,30 @@ class CLProgram:
         else:
             return _object.hostBuffer
 
+    def getDataRange(self, _object: CLObject, start: int, stop: int) -> np.ndarray:
+        """ Copies the items [start, stop) of the device buffer of a flat CLObject to its host buffer, so only this
+        range is transferred, and returns them. """
+        data = _object.hostBuffer[start:stop]
+        if len(data) > 0:
+            cl.enqueue_copy(self._mainQueue, dest=data, src=_object.deviceBuffer,
+                            src_offset=start * _object.hostBuffer.itemsize)
+        return data
+
+    def setData(self, _object: CLObject):
+        """ Copies the host buffer of an already built CLObject to its device buffer. """
+        cl.enqueue_copy(self._mainQueue, dest=_object.deviceBuffer, src=_object.hostBuffer)
+
     def include(self, code: str):
         self._include += code
 
+    def specialize(self, definitions: Dict[str, str]):
+        """
+        Compiles the program with the given preprocessor definitions (-D NAME=VALUE), like the scene constants
+        of CLScene.getCompileDefinitions(). Programs are cached by source and definitions, so a specialized
+        variant is only compiled once per scene signature.
+        """
+        self._definitions = dict(definitions)
+
     @staticmethod
     def _makeSource(sourcePath) -> str:
         includeDir = os.path.dirname(sourcePath)
@@ -83,8 +143,7 @@ class CLProgram:
             line = f.readline()
             while line.startswith("#include"):
                 libFileName = line.split('"')[1]
-                with open(os.path.join(includeDir, libFileName), 'r') as libFile:
-                    sourceCode += libFile.read()
+                sourceCode += CLProgram._makeSource(os.path.join(includeDir, libFileName))
                 line = f.readline()
             sourceCode += line
             sourceCode += f.read()
@@ -1,8 +1,11 @@
-from typing import List
+from typing import Dict, List, Optional, Tuple, Union
 
 import numpy as np
 
+from pytissueoptics.rayscattering.loggingPolicy import LoggingPolicy, LogEvent, LOG_ALL
 from pytissueoptics.rayscattering.scatteringScene import ScatteringScene
+from pytissueoptics.rayscattering.tallies import Tally, TimeResolvedTally, TrackLengthTally, Detector, \
+    RadialTally, CylindricalTally, RadialAngularTally
 from pytissueoptics.rayscattering.opencl.buffers import SolidCLInfo, \
     SurfaceCLInfo, TriangleCLInfo
 from pytissueoptics.rayscattering.opencl.buffers.solidCandidateCL import SolidCandidateCL
@@ -17,10 +20,16 @@ NO_SOLID_ID = -1
 NO_SURFACE_ID = -1
 FIRST_SOLID_ID = 1
 NO_SOLID_LABEL = "world"
+MAX_UNROLLED_SOLIDS = 8
+
+SOLID_LOG_KEY_OFFSET = 2
+CROSSING_LOG_KEY = 0x8000
+QUANTIZATION_LEVELS = 2 ** 16 - 1
 
 
 class CLScene:
-    def __init__(self, scene: ScatteringScene, nWorkUnits: int):
+    def __init__(self, scene: ScatteringScene, nWorkUnits: int, quantizeLogPositions: bool = False,
+                 loggingPolicy: LoggingPolicy = None, tallies: List[Tally] = None):
         self._sceneMaterials = scene.getMaterials()
         self._solidLabels = [solid.getLabel() for solid in scene.getSolids()]
         self._surfaceLabels = {}
@@ -40,6 +49,274 @@ class CLScene:
         self.triangles = TriangleCL(self._trianglesInfo)
         self.vertices = VertexCL(self._vertices)
 
+        assert self.nSolidIDs + SOLID_LOG_KEY_OFFSET < CROSSING_LOG_KEY and len(self._surfacesInfo) < CROSSING_LOG_KEY, \
+            f"The scene is too large for the 16-bit log keys of the OpenCL engine ({CROSSING_LOG_KEY} solids or " \
+            f"surfaces)."
+        self._logOrigin, self._logResolution = None, None
+        if quantizeLogPositions and scene.getBoundingBox() is not None:
+            self._setLogQuantization(scene.getBoundingBox())
+        self._loggingPolicy = loggingPolicy or LOG_ALL
+        self._tallies = tallies or []
+
+    @property
+    def quantizesLogPositions(self) -> bool:
+        return self._logOrigin is not None
+
+    def getLogPositions(self, positions: np.ndarray) -> np.ndarray:
+        """ Converts the position column of the device log to an (N, 3) float array. """
+        positions = positions.reshape((-1, 3))
+        if not self.quantizesLogPositions:
+            return positions
+        return (positions * self._logResolution + self._logOrigin).astype(np.float32)
+
+    @property
+    def nSolidIDs(self) -> int:
+        """ The number of solid IDs. Unlike `nSolids`, it counts the layers of the stacked solids, which have their own
+        solid ID for their surfaces and the interactions inside them. """
+        return len(self._solidLabels)
+
+    @property
+    def logsNothing(self) -> bool:
+        return self._loggingPolicy.logsNothing
+
+    def getLoggedSolidMask(self) -> np.ndarray:
+        """ Returns the logging policy flag of each solid, indexed by solidID + 1 (the world is at index 0). """
+        solidMask = np.zeros(self.nSolidIDs + FIRST_SOLID_ID + 1, dtype=bool)
+        for solidID in [NO_SOLID_ID, *range(FIRST_SOLID_ID, self.nSolidIDs + FIRST_SOLID_ID)]:
+            solidMask[solidID + 1] = self._loggingPolicy.logsSolid(self.getSolidLabel(solidID))
+        return solidMask
+
+    def _getLoggedSurfaceMask(self) -> np.ndarray:
+        """ A crossing is written once per surface, so it is kept if any solid of the surface is logged. The host
+        discards the side that is not logged when decoding the log (see CLKeyLog). """
+        solidMask = self.getLoggedSolidMask()
+        surfaceMask = []
+        for surfaceID, surface in enumerate(self._surfacesInfo):
+            surfaceLabel = self.getSurfaceLabel(surface.insideSolidID, surfaceID)
+            hasLoggedSolid = solidMask[surface.insideSolidID + 1] or solidMask[surface.outsideSolidID + 1]
+            surfaceMask.append(self._loggingPolicy.logsSurface(surfaceLabel) and hasLoggedSolid)
+        return np.array(surfaceMask, dtype=bool)
+
+    def getSurfaceSolidIDs(self) -> Tuple[np.ndarray, np.ndarray]:
+        """ Returns the inside and outside solid IDs of each surface ID. """
+        insideSolidIDs = np.array([surface.insideSolidID for surface in self._surfacesInfo], dtype=np.int32)
+        outsideSolidIDs = np.array([surface.outsideSolidID for surface in self._surfacesInfo], dtype=np.int32)
+        return insideSolidIDs, outsideSolidIDs
+
+    def _setLogQuantization(self, bbox):
+        """ Quantized log positions are 16-bit fixed-point coordinates over the scene bounding box. Positions outside
+        the bounding box, like interactions in a scattering world material, are clamped to it. """
+        self._logOrigin = np.array([bbox.xMin, bbox.yMin, bbox.zMin], dtype=np.float32)
+        extent = np.array([bbox.xWidth, bbox.yWidth, bbox.zWidth], dtype=np.float32)
+        self._logResolution = extent / QUANTIZATION_LEVELS
+
+    def getCompileDefinitions(self) -> Dict[str, str]:
+        """
+        Returns the compile-time constants that specialize the propagation kernels for this scene (see
+        src/sceneSpecialization.c). Scenes with the same definitions share the same compiled program.
+        """
+        definitions = {"SCENE_N_SOLIDS": str(int(self.nSolids)),
+                       "SCENE_HAS_SMOOTHING": str(int(any(surface.toSmooth for surface in self._surfacesInfo)))}
+        if self.nSolids <= MAX_UNROLLED_SOLIDS:
+            definitions["SCENE_UNROLL_SOLIDS"] = "1"
+        if len(self._sceneMaterials) == 1:
+            definitions["SCENE_SINGLE_MATERIAL"] = "1"
+
+        anisotropies = {float(np.float32(material.g)) for material in self._sceneMaterials}
+        if len(anisotropies) == 1:
+            definitions["SCENE_G"] = f"{anisotropies.pop()!r}f"
+        elif 0 not in anisotropies:
+            definitions["SCENE_ANISOTROPIC"] = "1"
+
+        if self.quantizesLogPositions:
+            scale = np.divide(1, self._logResolution, out=np.zeros(3, dtype=np.float32),
+                              where=self._logResolution > 0)
+            definitions["LOG_QUANTIZED_POSITIONS"] = "1"
+            definitions["LOG_ORIGIN"] = self._toFloat3Literal(self._logOrigin)
+            definitions["LOG_SCALE"] = self._toFloat3Literal(scale)
+        definitions.update(self._getLoggingPolicyDefinitions())
+        definitions.update(self._getTallyDefinitions())
+        return definitions
+
+    def _getLoggingPolicyDefinitions(self) -> Dict[str, str]:
+        """ Compiles the logging policy into the kernel (see src/logger.c). """
+        definitions = {}
+        if LogEvent.ABSORPTION not in self._loggingPolicy.events:
+            definitions["LOG_NO_ABSORPTION"] = "1"
+        if LogEvent.CROSSING not in self._loggingPolicy.events:
+            definitions["LOG_NO_CROSSING"] = "1"
+
+        solidMask = self.getLoggedSolidMask()
+        if solidMask.sum() < self.nSolidIDs + 1:
+            definitions["LOG_SOLID_MASK"] = self._toArrayLiteral(solidMask.astype(int))
+        surfaceMask = self._getLoggedSurfaceMask()
+        if len(surfaceMask) > 0 and not surfaceMask.all():
+            definitions["LOG_SURFACE_MASK"] = self._toArrayLiteral(surfaceMask.astype(int))
+
+        regions = self._loggingPolicy.regions
+        if regions:
+            limits = np.array([region.xyzLimits for region in regions], dtype=np.float32)
+            definitions["LOG_N_REGIONS"] = str(len(regions))
+            definitions["LOG_REGION_MINS"] = self._toArrayLiteral(limits[:, :, 0].flatten(), isFloat=True)
+            definitions["LOG_REGION_MAXS"] = self._toArrayLiteral(limits[:, :, 1].flatten(), isFloat=True)
+        return definitions
+
+    def _getTallyDefinitions(self) -> Dict[str, str]:
+        """ Compiles the tallies into the kernel (see src/tallies.c). The data of the tallies is concatenated in a
+        single buffer, in the order of the tallies. """
+        sizes = [tally.data.size for tally in self._tallies]
+        offsets = dict(zip(self._tallies, np.cumsum(sizes, dtype=int) - sizes))
+        timeResolvedTallies = [tally for tally in self._tallies if isinstance(tally, TimeResolvedTally)]
+        trackLengthTallies = [tally for tally in self._tallies if isinstance(tally, TrackLengthTally) and
+                              self._findSolidID(tally.solidLabel) is not None]
+        definitions = {}
+        if timeResolvedTallies:
+            definitions.update(self._getTimeResolvedTallyDefinitions(timeResolvedTallies,
+                                                                     [offsets[tally] for tally in timeResolvedTallies]))
+        if trackLengthTallies:
+            definitions.update(self._getTrackLengthTallyDefinitions(trackLengthTallies,
+                                                                    [offsets[tally] for tally in trackLengthTallies]))
+        cylindricalTallies = [tally for tally in self._tallies if isinstance(tally, CylindricalTally)]
+        if cylindricalTallies:
+            definitions.update(self._getCylindricalTallyDefinitions(cylindricalTallies,
+                                                                    [offsets[tally] for tally in cylindricalTallies]))
+        radialAngularTallies = [tally for tally in self._tallies if isinstance(tally, RadialAngularTally)]
+        if radialAngularTallies and len(self._surfacesInfo) > 0:
+            radialAngularOffsets = [offsets[tally] for tally in radialAngularTallies]
+            definitions.update(self._getRadialAngularTallyDefinitions(radialAngularTallies, radialAngularOffsets))
+        detectors = [tally for tally in self._tallies if isinstance(tally, Detector)]
+        if detectors and len(self._surfacesInfo) > 0:
+            definitions.update(self._getDetectorDefinitions(detectors))
+        return definitions
+
+    def _getCylindricalTallyDefinitions(self, tallies: List[CylindricalTally], offsets: List[int]) -> Dict[str, str]:
+        depthLimits = np.array([tally.depthLimits for tally in tallies], dtype=np.float32)
+        depthBins = np.array([tally.depthBins for tally in tallies])
+        definitions = {"CYLINDER_N": str(len(tallies)),
+                       "CYLINDER_OFFSETS": self._toArrayLiteral(offsets),
+                       "CYLINDER_DEPTH_MINS": self._toArrayLiteral(depthLimits[:, 0], isFloat=True),
+                       "CYLINDER_DEPTH_SCALES": self._toArrayLiteral(
+                           (depthBins / (depthLimits[:, 1] - depthLimits[:, 0])).astype(np.float32), isFloat=True),
+                       "CYLINDER_DEPTH_BINS": self._toArrayLiteral(depthBins),
+                       "CYLINDER_SOLID_MASK_LENGTH": str(self.nSolidIDs + FIRST_SOLID_ID + 1),
+                       "CYLINDER_SOLID_MASK": self._toArrayLiteral(self._getAbsorptionSolidMask(tallies).flatten())}
+        definitions.update(self._getRadialDefinitions("CYLINDER", tallies))
+        return definitions
+
+    def _getRadialAngularTallyDefinitions(self, tallies: List[RadialAngularTally],
+                                          offsets: List[int]) -> Dict[str, str]:
+        angularBins = np.array([tally.angularBins for tally in tallies])
+        surfaceSigns = [self._getTallySurfaceSigns(tally) for tally in tallies]
+        definitions = {"ANGULAR_N": str(len(tallies)),
+                       "ANGULAR_OFFSETS": self._toArrayLiteral(offsets),
+                       "ANGULAR_ANGLE_SCALES": self._toArrayLiteral((angularBins / (np.pi / 2)).astype(np.float32),
+                                                                    isFloat=True),
+                       "ANGULAR_ANGLE_BINS": self._toArrayLiteral(angularBins),
+                       "ANGULAR_N_SURFACES": str(len(self._surfacesInfo)),
+                       "ANGULAR_SURFACE_SIGNS": self._toArrayLiteral(np.array(surfaceSigns).flatten())}
+        definitions.update(self._getRadialDefinitions("ANGULAR", tallies))
+        return definitions
+
+    def _getRadialDefinitions(self, prefix: str, tallies: List[RadialTally]) -> Dict[str, str]:
+        """ Returns the axes and the radial bins of the tallies, with the given prefix. """
+        centers = np.array([tally.center.array for tally in tallies], dtype=np.float32)
+        axes = np.array([tally.axis.array for tally in tallies], dtype=np.float32)
+        radialBins = np.array([tally.radialBins for tally in tallies])
+        radialScales = radialBins / np.array([tally.maxRadius for tally in tallies])
+        return {f"{prefix}_CENTERS": self._toArrayLiteral(centers.flatten(), isFloat=True),
+                f"{prefix}_AXES": self._toArrayLiteral(axes.flatten(), isFloat=True),
+                f"{prefix}_RADIAL_SCALES": self._toArrayLiteral(radialScales.astype(np.float32), isFloat=True),
+                f"{prefix}_RADIAL_BINS": self._toArrayLiteral(radialBins)}
+
+    def _getAbsorptionSolidMask(self, tallies: List[Union[TimeResolvedTally, CylindricalTally]]) -> np.ndarray:
+        """ Returns the flags of the solids whose absorption is scored by each tally, indexed by solidID + 1. """
+        solidMask = np.zeros((len(tallies), self.nSolidIDs + FIRST_SOLID_ID + 1), dtype=int)
+        for i, tally in enumerate(tallies):
+            for solidID in [NO_SOLID_ID, *range(FIRST_SOLID_ID, self.nSolidIDs + FIRST_SOLID_ID)]:
+                solidMask[i, solidID + 1] = tally.detectsAbsorption(self.getSolidLabel(solidID))
+        return solidMask
+
+    def _getDetectorDefinitions(self, detectors: List[Detector]) -> Dict[str, str]:
+        """ Compiles the detectors into the kernel (see src/detectors.c), in the order of the tallies. The capacity of
+        their records is defined by CLDetectors. """
+        axes = np.array([[0, 0, 0] if detector.axis is None else detector.axis.array for detector in detectors],
+                        dtype=np.float32)
+        minCosines = np.array([detector.minCosine for detector in detectors], dtype=np.float32)
+        centers = np.array([[0, 0, 0] if detector.center is None else detector.center.array
+                            for detector in detectors], dtype=np.float32)
+        radii = np.array([np.finfo(np.float32).max if detector.radius is None else detector.radius
+                          for detector in detectors], dtype=np.float32)
+        surfaceSigns = [self._getTallySurfaceSigns(detector) for detector in detectors]
+        return {"DETECTOR_N": str(len(detectors)),
+                "DETECTOR_N_MATERIALS": str(len(self._sceneMaterials)),
+                "DETECTOR_N_SURFACES": str(len(self._surfacesInfo)),
+                "DETECTOR_SURFACE_SIGNS": self._toArrayLiteral(np.array(surfaceSigns).flatten()),
+                "DETECTOR_AXES": self._toArrayLiteral(axes.flatten(), isFloat=True),
+                "DETECTOR_MIN_COSINES": self._toArrayLiteral(minCosines, isFloat=True),
+                "DETECTOR_CENTERS": self._toArrayLiteral(centers.flatten(), isFloat=True),
+                "DETECTOR_RADII": self._toArrayLiteral(radii, isFloat=True)}
+
+    def _getTrackLengthTallyDefinitions(self, tallies: List[TrackLengthTally], offsets: List[int]) -> Dict[str, str]:
+        limits = np.array([tally.limits for tally in tallies], dtype=np.float32)
+        return {"TRACK_N": str(len(tallies)),
+                "TRACK_OFFSETS": self._toArrayLiteral(offsets),
+                "TRACK_SOLID_IDS": self._toArrayLiteral([self._findSolidID(tally.solidLabel) for tally in tallies]),
+                "TRACK_MINS": self._toArrayLiteral(limits[:, :, 0].flatten(), isFloat=True),
+                "TRACK_MAXS": self._toArrayLiteral(limits[:, :, 1].flatten(), isFloat=True),
+                "TRACK_BINS": self._toArrayLiteral(np.array([tally.bins for tally in tallies]).flatten())}
+
+    def _getTimeResolvedTallyDefinitions(self, tallies: List[TimeResolvedTally],
+                                         offsets: List[int]) -> Dict[str, str]:
+        bins = np.array([tally.bins for tally in tallies])
+        opticalPathLimits = np.array([tally.opticalPathLimits for tally in tallies], dtype=np.float32)
+        scales = bins / (opticalPathLimits[:, 1] - opticalPathLimits[:, 0])
+        solidMask = self._getAbsorptionSolidMask(tallies)
+        noRegion = np.finfo(np.float32).max * np.array([[-1, 1]] * 3)
+        regionLimits = np.array([noRegion if tally.region is None else tally.region.xyzLimits
+                                 for tally in tallies], dtype=np.float32)
+
+        definitions = {"TALLY_N": str(len(tallies)),
+                       "TALLY_OFFSETS": self._toArrayLiteral(offsets),
+                       "TALLY_BINS": self._toArrayLiteral(bins),
+                       "TALLY_MINS": self._toArrayLiteral(opticalPathLimits[:, 0], isFloat=True),
+                       "TALLY_SCALES": self._toArrayLiteral(scales.astype(np.float32), isFloat=True),
+                       "TALLY_SOLID_MASK_LENGTH": str(solidMask.shape[1]),
+                       "TALLY_SOLID_MASK": self._toArrayLiteral(solidMask.flatten()),
+                       "TALLY_REGION_MINS": self._toArrayLiteral(regionLimits[:, :, 0].flatten(), isFloat=True),
+                       "TALLY_REGION_MAXS": self._toArrayLiteral(regionLimits[:, :, 1].flatten(), isFloat=True)}
+        if len(self._surfacesInfo) > 0:
+            surfaceSigns = [self._getTallySurfaceSigns(tally) for tally in tallies]
+            definitions["TALLY_N_SURFACES"] = str(len(self._surfacesInfo))
+            definitions["TALLY_SURFACE_SIGNS"] = self._toArrayLiteral(np.array(surfaceSigns).flatten())
+        return definitions
+
+    def _getTallySurfaceSigns(self, tally: Union[TimeResolvedTally, RadialAngularTally, Detector]) -> List[int]:
+        """ Returns, for each surface ID, the sign of the crossings scored by the tally: 1 (-1) for the photons
+        leaving (entering) the inside solid of the surface, or 0 when the surface is not scored. """
+        signs = []
+        insideSolidIDs, outsideSolidIDs = self.getSurfaceSolidIDs()
+        for surfaceID, (insideSolidID, outsideSolidID) in enumerate(zip(insideSolidIDs, outsideSolidIDs)):
+            surfaceLabel = self.getSurfaceLabel(insideSolidID, surfaceID)
+            sign = 0
+            for solidID, leavingSign in [(insideSolidID, 1), (outsideSolidID, -1)]:
+                if solidID == NO_SOLID_ID:
+                    continue
+                for isLeavingSolid in [True, False]:
+                    if tally.detectsCrossing(self.getSolidLabel(solidID), surfaceLabel, isLeavingSolid):
+                        sign = leavingSign if isLeavingSolid else -leavingSign
+            signs.append(sign)
+        return signs
+
+    @staticmethod
+    def _toArrayLiteral(values: np.ndarray, isFloat: bool = False) -> str:
+        if isFloat:
+            return "{" + ",".join(f"{float(value)!r}f" for value in values) + "}"
+        return "{" + ",".join(str(int(value)) for value in values) + "}"
+
+    @staticmethod
+    def _toFloat3Literal(vector: np.ndarray) -> str:
+        return "(float3)(" + ",".join(f"{float(np.float32(value))!r}f" for value in vector) + ")"
+
     def getMaterialID(self, material):
         return self._sceneMaterials.index(material)
 
@@ -48,6 +325,14 @@ class CLScene:
             return NO_SOLID_ID
         return self._solidLabels.index(solid.getLabel()) + FIRST_SOLID_ID
 
+    def _findSolidID(self, solidLabel: str) -> Optional[int]:
+        """ Returns the solid ID of a solid label (NO_SOLID_ID for the world), or None if it is not in the scene. """
+        if solidLabel == NO_SOLID_LABEL:
+            return NO_SOLID_ID
+        if solidLabel not in self._solidLabels:
+            return None
+        return self._solidLabels.index(solidLabel) + FIRST_SOLID_ID
+
     def getSolidLabel(self, solidID):
         if solidID == NO_SOLID_ID:
             return NO_SOLID_LABEL
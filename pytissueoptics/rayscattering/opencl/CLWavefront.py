@@ -0,0 +1,124 @@
+import os
+
+import numpy as np
+
+from pytissueoptics.rayscattering.opencl.CLProgram import CLProgram
+from pytissueoptics.rayscattering.opencl.CLScene import CLScene
+from pytissueoptics.rayscattering.opencl.CLDetectors import CLDetectors
+from pytissueoptics.rayscattering.opencl.buffers import BufferOf, LogCL, PhotonCL, PhotonStateCL, SeedCL
+
+WAVEFRONT_SOURCE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src', 'wavefront.c')
+
+ACTIVE_QUEUE_COUNTER = 0
+BOUNDARY_QUEUE_COUNTER = 1
+SCATTER_QUEUE_COUNTER = 2
+LOG_COUNTER = 3
+MAX_LOGS_PER_STEP = 1
+WORK_GROUP_SIZE = 64
+
+
+class CLWavefront:
+    """
+    Wavefront scheduler of the photon propagation (see src/wavefront.c). Every photon step is split into a step kernel
+    (distance and intersection), a boundary kernel (Fresnel) and a scatter kernel (scattering and absorption). Each
+    kernel is launched over a compact queue of photon IDs, which limits the divergence between work items when
+    photons follow different code paths. When `sortQueues` is set, the queues are also sorted by material and solid
+    IDs before each launch so that neighboring work items process the same kind of work.
+    """
+    def __init__(self, program: CLProgram, scene: CLScene, seeds: SeedCL, logger: LogCL,
+                 weightThreshold: np.float32, sortQueues: bool = False, tallies: BufferOf = None,
+                 detectors: CLDetectors = None):
+        self._program = program
+        self._scene = scene
+        self._seeds = seeds
+        self._logger = logger
+        self._tallies = tallies if tallies is not None else BufferOf(np.zeros(1, dtype=np.float32))
+        self._detectors = detectors if detectors is not None else CLDetectors([], [], 0)
+        self._weightThreshold = weightThreshold
+        self._sortQueues = sortQueues
+
+        self._size = None
+        self._states = None
+        self._queues = None
+        self._counters = None
+
+    def propagate(self, photons: PhotonCL):
+        """
+        Propagates the given photons on the device until they are all dead or until the logger cannot hold another
+        step of the remaining photons. Photon and logger data are left on the device. When the logging policy logs
+        nothing, the log capacity does not limit the steps.
+        """
+        photons.make(self._program.device)
+        nPhotons, maxLogs = len(photons.hostBuffer), self._logger.length
+        maxLogsPerStep = 0 if self._scene.logsNothing else MAX_LOGS_PER_STEP
+        self._allocate(nPhotons)
+        self._launch("wavefrontInit", nPhotons, photons, rebuildBuffers=True)
+
+        activeQueue = np.where(photons.hostBuffer["weight"] != 0)[0].astype(np.uint32)
+        logCount = 0
+        while len(activeQueue) > 0:
+            stepSize = len(activeQueue)
+            if maxLogsPerStep > 0:
+                stepSize = min(stepSize, (maxLogs - logCount) // maxLogsPerStep)
+            if stepSize == 0:
+                break
+            self._setCounters(logCount)
+            self._queues["active"].hostBuffer[:stepSize] = activeQueue[:stepSize]
+            self._program.setData(self._queues["active"])
+            self._launch("wavefrontStep", stepSize, photons)
+
+            counters = self._program.getData(self._counters)
+            nBoundary, nScatter = counters[BOUNDARY_QUEUE_COUNTER], counters[SCATTER_QUEUE_COUNTER]
+            if self._sortQueues:
+                self._sortQueue("boundary", nBoundary)
+                self._sortQueue("scatter", nScatter)
+            self._launch("wavefrontBoundary", nBoundary, photons)
+            self._launch("wavefrontScatter", nScatter, photons)
+
+            counters = self._program.getData(self._counters)
+            nActive, logCount = counters[ACTIVE_QUEUE_COUNTER], counters[LOG_COUNTER]
+            nextActiveQueue = self._getQueue("active", nActive)
+            activeQueue = np.concatenate([nextActiveQueue, activeQueue[stepSize:]])
+
+    def _allocate(self, size: int):
+        if size == self._size:
+            return
+        self._size = size
+        self._states = PhotonStateCL(size)
+        self._queues = {name: BufferOf(np.zeros(size, dtype=np.uint32)) for name in
+                        ["active", "activeKeys", "boundary", "boundaryKeys", "scatter", "scatterKeys"]}
+        self._counters = BufferOf(np.zeros(4, dtype=np.uint32))
+
+    def _launch(self, kernelName: str, N: int, photons: PhotonCL, rebuildBuffers: bool = False):
+        if N == 0:
+            return
+        q = self._queues
+        paddedN = -(-int(N) // WORK_GROUP_SIZE) * WORK_GROUP_SIZE
+        self._program.launchKernel(kernelName, N=np.int32(paddedN), rebuildBuffers=rebuildBuffers,
+                                   arguments=[np.uint32(N), photons, self._states, self._scene.materials, self._scene.nSolids,
+                                              self._scene.solids, self._scene.surfaces, self._scene.triangles,
+                                              self._scene.vertices, self._scene.solidCandidates,
+                                              self._weightThreshold, self._seeds, *self._logger.columns,
+                                              q["active"], q["activeKeys"], q["boundary"], q["boundaryKeys"],
+                                              q["scatter"], q["scatterKeys"], self._counters, self._tallies,
+                                              *self._detectors.arguments])
+
+    def _setCounters(self, logCount: int):
+        self._counters.hostBuffer[:] = 0
+        self._counters.hostBuffer[LOG_COUNTER] = logCount
+        self._program.setData(self._counters)
+
+    def _getQueue(self, name: str, length: int) -> np.ndarray:
+        if length == 0:
+            return np.empty(0, dtype=np.uint32)
+        queue = self._program.getData(self._queues[name])[:length]
+        if self._sortQueues:
+            keys = self._program.getData(self._queues[name + "Keys"])[:length]
+            queue = queue[np.argsort(keys, kind="stable")]
+        return queue.copy()
+
+    def _sortQueue(self, name: str, length: int):
+        if length < 2:
+            return
+        self._queues[name].hostBuffer[:length] = self._getQueue(name, length)
+        self._program.setData(self._queues[name])
@@ -1,8 +1,9 @@
 from .CLObject import CLObject, EmptyBuffer, RandomBuffer, BufferOf
 
-from .dataPointCL import DataPointCL
+from .logCL import LogCL
 from .materialCL import MaterialCL
 from .photonCL import PhotonCL
+from .photonStateCL import PhotonStateCL
 from .seedCL import SeedCL
 
 from .solidCandidateCL import SolidCandidateCL
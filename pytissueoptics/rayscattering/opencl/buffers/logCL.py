@@ -0,0 +1,63 @@
+from typing import List
+
+from pytissueoptics.rayscattering.opencl.buffers.CLObject import *
+
+
+class LogColumnCL(CLObject):
+    def __init__(self, size: int, dtype: np.dtype, width: int = 1):
+        self._size = size
+        self._columnDtype = dtype
+        self._width = width
+        super().__init__()
+
+    def _getInitialHostBuffer(self) -> np.ndarray:
+        return np.zeros(self._size * self._width, dtype=self._columnDtype)
+
+
+class LogCL:
+    """
+    Device log stored as a structure of arrays (see src/logger.c): a float weight column, a position column with 3
+    coordinates per entry and a 16-bit key column. A surface crossing only takes one entry for both solids.
+
+    With the default float positions, an entry takes 18 bytes instead of the 24 bytes of the former (weight, x, y, z,
+    solidID, surfaceID) entries. This is 25% less per absorption and about 60% less per crossing, which used to be
+    logged twice. Only the quantized positions (16-bit fixed point relative to the scene bounding box, see
+    `CLScene`) halve the size of every entry, with 12 bytes. They are opt-in (`quantizeLogPositions` of `Source`)
+    since they round the logged positions to 1/65535 of the scene size.
+    """
+    def __init__(self, size: int, quantizedPositions: bool = False):
+        self._quantizedPositions = quantizedPositions
+        self.weights = LogColumnCL(size, np.float32)
+        self.positions = LogColumnCL(size, self._getPositionType(quantizedPositions), width=3)
+        self.keys = LogColumnCL(size, np.uint16)
+
+    @property
+    def columns(self) -> List[CLObject]:
+        """ Kernel arguments of the log, in order. """
+        return [self.weights, self.positions, self.keys]
+
+    @property
+    def quantizedPositions(self) -> bool:
+        return self._quantizedPositions
+
+    @property
+    def length(self) -> int:
+        return len(self.keys.hostBuffer)
+
+    @property
+    def nBytes(self) -> int:
+        return sum(column.hostBuffer.nbytes for column in self.columns)
+
+    def reset(self):
+        for column in self.columns:
+            column.reset()
+
+    @staticmethod
+    def getItemSize(quantizedPositions: bool = False) -> int:
+        """ Returns the number of bytes of a single log entry. """
+        positionSize = 3 * np.dtype(LogCL._getPositionType(quantizedPositions)).itemsize
+        return np.dtype(np.float32).itemsize + positionSize + np.dtype(np.uint16).itemsize
+
+    @staticmethod
+    def _getPositionType(quantizedPositions: bool) -> type:
+        return np.uint16 if quantizedPositions else np.float32
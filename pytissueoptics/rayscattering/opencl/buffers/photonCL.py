@@ -11,16 +11,20 @@ class PhotonCL(CLObject):
              ("er", cl.cltypes.float3),
              ("weight", cl.cltypes.float),
              ("materialID", cl.cltypes.uint),
-             ("solidID", cl.cltypes.int)])
+             ("solidID", cl.cltypes.int),
+             ("photonID", cl.cltypes.uint),
+             ("randomCounter", cl.cltypes.uint),
+             ("opticalPathLength", cl.cltypes.float)])
 
     def __init__(self, positions: np.ndarray, directions: np.ndarray,
-                 materialID: int, solidID: int, weight=1.0):
+                 materialID: int, solidID: int, weight=1.0, firstPhotonID: int = 0):
         self._positions = positions
         self._directions = directions
         self._N = positions.shape[0]
         self._materialID = materialID
         self._solidID = solidID
         self._weight = weight
+        self._firstPhotonID = firstPhotonID
 
         super().__init__()
 
@@ -33,4 +37,5 @@ class PhotonCL(CLObject):
         buffer["weight"] = self._weight
         buffer["materialID"] = self._materialID
         buffer["solidID"] = self._solidID
+        buffer["photonID"] = np.arange(self._firstPhotonID, self._firstPhotonID + self._N)
         return buffer
@@ -0,0 +1,17 @@
+from pytissueoptics.rayscattering.opencl.buffers.CLObject import *
+
+
+class PhotonStateCL(CLObject):
+    """ Per-photon state kept on the device between the stages of the wavefront propagation. """
+    STRUCT_NAME = "PhotonState"
+    STRUCT_DTYPE = np.dtype(
+            [("normal", cl.cltypes.float3),
+             ("distance", cl.cltypes.float),
+             ("surfaceID", cl.cltypes.uint)])
+
+    def __init__(self, size: int):
+        self._size = size
+        super().__init__(buildOnce=True)
+
+    def _getInitialHostBuffer(self) -> np.ndarray:
+        return np.zeros(self._size, dtype=self._dtype)
@@ -1,10 +1,18 @@
 from pytissueoptics.rayscattering.opencl.buffers.CLObject import *
+from pytissueoptics.rayscattering.randomStream import makeSeed, getKey
+
+SEED_STATE_SIZE = 4
 
 
 class SeedCL(CLObject):
-    def __init__(self, size: int):
+    """ Philox state of each work unit: [streamID, counter, key0, key1]. See src/random.c. """
+    def __init__(self, size: int, seed: int = None):
         self._size = size
+        self._seed = makeSeed(seed)
         super().__init__(buildOnce=True)
 
     def _getInitialHostBuffer(self) -> np.ndarray:
-        return np.random.randint(low=0, high=2 ** 32 - 1, size=self._size, dtype=cl.cltypes.uint)
+        buffer = np.zeros((self._size, SEED_STATE_SIZE), dtype=cl.cltypes.uint)
+        buffer[:, 0] = np.arange(self._size)
+        buffer[:, 2:4] = getKey(self._seed)
+        return buffer.ravel()
@@ -0,0 +1,18 @@
+#ifndef ATOMICS
+#define ATOMICS
+
+/*
+Atomic float addition (a compare-and-swap loop on the bits of the float), used by the kernels that sum weights from
+many work items in the same bin. The order of the additions, and so the last bits of the sum, can change from one
+run to the other.
+*/
+
+void atomicAddFloat(volatile __global float *address, float value) {
+    union { uint bits; float value; } current, next;
+    do {
+        current.value = *address;
+        next.value = current.value + value;
+    } while (atomic_cmpxchg((volatile __global uint *)address, current.bits, next.bits) != current.bits);
+}
+
+#endif
@@ -0,0 +1,67 @@
+#include "atomics.c"
+
+/*
+Post-processing of logged datapoints (see CLDataPointProcessor.py). The datapoints are rows of 4 floats
+(value, x, y, z).
+
+Histograms use the float32 arithmetic of binning.getBinIndices, so a datapoint falls in the same bin as on the host.
+Their bins are summed with atomic float additions (see atomics.c).
+*/
+
+/*
+Adds the weight of each datapoint to its bin of a row-major histogram. The bins are defined along the datapoint
+columns by their minimum, range and scale (bins / range). With a sign of 1 (-1), only the positive (negative)
+datapoints are binned, weighted by their absolute value. With a slice column, only the datapoints strictly inside
+the slice limits along this column are binned.
+*/
+__kernel void histogramDataPoints(__global float *dataPoints, uint nAxes, __global int *columns,
+                                  __global float *minima, __global float *ranges, __global float *scales,
+                                  __global uint *bins, int sign, int sliceColumn, float sliceMin, float sliceMax,
+                                  __global float *histogram) {
+    __global float *dataPoint = dataPoints + 4 * get_global_id(0);
+    float weight = dataPoint[0];
+    if (sign != 0) {
+        if (weight * sign <= 0) {
+            return;
+        }
+        weight = fabs(weight);
+    }
+    if (weight == 0) {
+        return;
+    }
+    if (sliceColumn >= 0 && !(dataPoint[sliceColumn] > sliceMin && dataPoint[sliceColumn] < sliceMax)) {
+        return;
+    }
+
+    uint binIndex = 0;
+    for (uint axis = 0; axis < nAxes; axis++) {
+        float x = dataPoint[columns[axis]] - minima[axis];
+        if (!(x >= 0 && x <= ranges[axis])) {
+            return;
+        }
+        x = clamp(x * scales[axis], 0.0f, (float)(bins[axis] - 1));
+        binIndex = binIndex * bins[axis] + (uint)x;
+    }
+    atomicAddFloat(histogram + binIndex, weight);
+}
+
+/*
+Each work item sums the positive values and the absolute negative values of a strided subset of the datapoints to
+its 2 partial sums. The partial sums are compensated (Kahan) since each work item sums many values in float32.
+*/
+__kernel void sumDataPoints(uint nDataPoints, __global float *dataPoints, __global float *partialSums) {
+    uint workItemID = get_global_id(0);
+    uint nWorkItems = get_global_size(0);
+    float sums[2] = {0, 0};
+    float errors[2] = {0, 0};
+    for (uint i = workItemID; i < nDataPoints; i += nWorkItems) {
+        float value = dataPoints[4 * i];
+        int k = value < 0;
+        float term = fabs(value) - errors[k];
+        float sum = sums[k] + term;
+        errors[k] = (sum - sums[k]) - term;
+        sums[k] = sum;
+    }
+    partialSums[2 * workItemID] = sums[0];
+    partialSums[2 * workItemID + 1] = sums[1];
+}
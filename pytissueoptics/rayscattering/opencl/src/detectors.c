@@ -0,0 +1,66 @@
+/*
+Exit-state detectors (see Detector.py). The distance travelled by each photon in each material is accumulated in the
+pathLengths buffer, indexed by photon * DETECTOR_N_MATERIALS + materialID. When a photon is refracted through the
+surface of a detector, inside its aperture and acceptance cone, a record of DETECTOR_RECORD_SIZE floats is written to
+the region of the detector in the records buffer:
+    position (3 floats), direction after refraction (3 floats), weight, distance travelled in each material.
+The records are reserved with an atomic counter per detector, so only the detected photons take space and are
+transferred (see CLDetectors.py). Records beyond the capacity of a region are counted but not written.
+
+The detectors are compiled with the following definitions (see CLScene and CLDetectors). Without DETECTOR_N, nothing is
+recorded:
+    DETECTOR_N: number of detectors.
+    DETECTOR_N_MATERIALS: number of materials of the scene.
+    DETECTOR_CAPACITY: number of records of each region of the records buffer.
+    DETECTOR_N_SURFACES, DETECTOR_SURFACE_SIGNS: crossings detected, indexed by detector * DETECTOR_N_SURFACES +
+        surfaceID. Same signs as TALLY_SURFACE_SIGNS (see tallies.c).
+    DETECTOR_AXES, DETECTOR_MIN_COSINES: axis (3 floats) and cosine of the half-angle of the acceptance cone of each
+        detector. A zero axis uses the normal of the surface, oriented along the photon.
+    DETECTOR_CENTERS, DETECTOR_RADII: center (3 floats) and radius of the aperture of each detector.
+*/
+
+#ifdef DETECTOR_N
+    #define DETECTOR_RECORD_SIZE (7 + DETECTOR_N_MATERIALS)
+    __constant char detectorSurfaceSigns[] = DETECTOR_SURFACE_SIGNS;
+    __constant float detectorAxes[] = DETECTOR_AXES;
+    __constant float detectorMinCosines[] = DETECTOR_MIN_COSINES;
+    __constant float detectorCenters[] = DETECTOR_CENTERS;
+    __constant float detectorRadii[] = DETECTOR_RADII;
+#endif
+
+void addPathLength(__global float *pathLengths, uint photonID, uint materialID, float length){
+#ifdef DETECTOR_N
+    pathLengths[photonID * DETECTOR_N_MATERIALS + materialID] += length;
+#endif
+}
+
+bool acceptsCrossing(uint detectorID, float3 position, float3 direction, float3 normal){
+#ifdef DETECTOR_N
+    float3 axis = vload3(detectorID, detectorAxes);
+    float cosine = all(axis == 0) ? fabs(dot(direction, normal)) : dot(direction, axis);
+    if (cosine < detectorMinCosines[detectorID]) return false;
+    return distance(position, vload3(detectorID, detectorCenters)) <= detectorRadii[detectorID];
+#else
+    return false;
+#endif
+}
+
+void recordCrossing(__global float *records, __global uint *recordCounts, __global float *pathLengths,
+                    uint surfaceID, float3 position, float3 direction, float3 normal, float weight, uint photonID){
+#ifdef DETECTOR_N
+    int sign = dot(direction, normal) > 0 ? 1 : -1;
+    for (uint i = 0; i < DETECTOR_N; i++){
+        if (detectorSurfaceSigns[i * DETECTOR_N_SURFACES + surfaceID] != sign) continue;
+        if (!acceptsCrossing(i, position, direction, normal)) continue;
+        uint recordID = atomic_inc(&recordCounts[i]);
+        if (recordID >= DETECTOR_CAPACITY) continue;
+        __global float *record = records + (i * DETECTOR_CAPACITY + recordID) * DETECTOR_RECORD_SIZE;
+        vstore3(position, 0, record);
+        vstore3(direction, 0, record + 3);
+        record[6] = weight;
+        for (uint j = 0; j < DETECTOR_N_MATERIALS; j++){
+            record[7 + j] = pathLengths[photonID * DETECTOR_N_MATERIALS + j];
+        }
+    }
+#endif
+}
@@ -1,3 +1,4 @@
+#include "sceneSpecialization.c"
 
 struct FresnelIntersection {
     float3 incidencePlane;
@@ -78,13 +79,13 @@ FresnelIntersection computeFresnelIntersection(float3 rayDirection, Intersection
     bool goingInside = dot(rayDirection, normal) < 0;
     if (goingInside) {
         normal *= -1;
-        nIn = materials[surfaces[intersection->surfaceID].outsideMaterialID].n;
-        nOut = materials[surfaces[intersection->surfaceID].insideMaterialID].n;
+        nIn = materials[MATERIAL_ID(surfaces[intersection->surfaceID].outsideMaterialID)].n;
+        nOut = materials[MATERIAL_ID(surfaces[intersection->surfaceID].insideMaterialID)].n;
         fresnelIntersection.nextMaterialID = surfaces[intersection->surfaceID].insideMaterialID;
         fresnelIntersection.nextSolidID = surfaces[intersection->surfaceID].insideSolidID;
     } else {
-        nIn = materials[surfaces[intersection->surfaceID].insideMaterialID].n;
-        nOut = materials[surfaces[intersection->surfaceID].outsideMaterialID].n;
+        nIn = materials[MATERIAL_ID(surfaces[intersection->surfaceID].insideMaterialID)].n;
+        nOut = materials[MATERIAL_ID(surfaces[intersection->surfaceID].outsideMaterialID)].n;
         fresnelIntersection.nextMaterialID = surfaces[intersection->surfaceID].outsideMaterialID;
         fresnelIntersection.nextSolidID = surfaces[intersection->surfaceID].outsideSolidID;
     }
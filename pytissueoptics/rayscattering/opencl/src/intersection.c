@@ -1,3 +1,4 @@
+#include "sceneSpecialization.c"
 __constant float EPS = 0.00001f;
 __constant float EPS_CORRECTION = 0.0005f;
 __constant float EPS_PARALLEL = 0.00001f;
@@ -115,8 +116,9 @@ GemsBoxIntersection _getBBoxIntersection(Ray ray, float3 minCornerVector, float3
 
 void _findBBoxIntersectingSolids(Ray ray, Scene *scene, uint gid){
 
-    for (uint i = 0; i < scene->nSolids; i++) {
-        uint boxGID = gid * scene->nSolids + i;
+    UNROLL_SOLIDS
+    for (uint i = 0; i < N_SOLIDS(scene); i++) {
+        uint boxGID = gid * N_SOLIDS(scene) + i;
         scene->solidCandidates[boxGID].solidID = i + 1;
 
         GemsBoxIntersection gemsIntersection = _getBBoxIntersection(ray, scene->solids[i].bbox_min, scene->solids[i].bbox_max);
@@ -134,10 +136,12 @@ void _sortSolidCandidates(Scene *scene, uint gid) {
     /*
     Simple bubble sort algorithm (kernel-friendly) to sort the solid candidates by distance.
     */
-    for (uint i = 0; i < scene->nSolids; i++) {
-        uint boxGID = gid * scene->nSolids + i;
-        for (uint j = i + 1; j < scene->nSolids; j++) {
-            uint boxGID2 = gid * scene->nSolids + j;
+    UNROLL_SOLIDS
+    for (uint i = 0; i < N_SOLIDS(scene); i++) {
+        uint boxGID = gid * N_SOLIDS(scene) + i;
+        UNROLL_SOLIDS
+        for (uint j = i + 1; j < N_SOLIDS(scene); j++) {
+            uint boxGID2 = gid * N_SOLIDS(scene) + j;
             if (scene->solidCandidates[boxGID].distance > scene->solidCandidates[boxGID2].distance) {
                 SolidCandidate tmp = scene->solidCandidates[boxGID];
                 scene->solidCandidates[boxGID] = scene->solidCandidates[boxGID2];
@@ -295,7 +299,7 @@ void _composeIntersection(Intersection *intersection, Ray *ray, Scene *scene) {
         return;
     }
 
-    if (scene->surfaces[intersection->surfaceID].toSmooth) {
+    if (SCENE_HAS_SMOOTHING && scene->surfaces[intersection->surfaceID].toSmooth) {
         setSmoothNormal(intersection, scene->triangles, scene->vertices, ray);
     }
     intersection->distanceLeft = ray->length - intersection->distance;
@@ -313,12 +317,13 @@ Intersection findIntersection(Ray ray, Scene *scene, uint gid) {
     closestIntersection.exists = false;
     closestIntersection.isTooClose = false;
     closestIntersection.distance = INFINITY;
-    if (scene->nSolids == 0) {
+    if (N_SOLIDS(scene) == 0) {
         return closestIntersection;
     }
 
-    for (uint i = 0; i < scene->nSolids; i++) {
-        uint boxGID = gid * scene->nSolids + i;
+    UNROLL_SOLIDS
+    for (uint i = 0; i < N_SOLIDS(scene); i++) {
+        uint boxGID = gid * N_SOLIDS(scene) + i;
         if (scene->solidCandidates[boxGID].distance == -1) {
             // Default buffer value -1 means that there is no intersection with this solid
             continue;
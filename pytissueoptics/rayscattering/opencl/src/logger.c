@@ -0,0 +1,114 @@
+/*
+Compact structure-of-arrays log (see LogCL.py). Each entry is spread over 3 columns: a weight, a position and a
+16-bit key that encodes the interaction:
+    NO_LOG_KEY: unused entry.
+    solidID + SOLID_LOG_KEY_OFFSET: weight deposited in a solid (or in the world for NO_SOLID_ID).
+    CROSSING_LOG_KEY | surfaceID: weight crossing a surface, positive when leaving the inside solid of the surface.
+        A single entry is written per crossing. The host recovers both solid IDs from the surface.
+Positions are 3 floats, or 3 unsigned shorts when LOG_QUANTIZED_POSITIONS is defined. Quantized positions are
+fixed-point coordinates relative to the scene bounding box (LOG_ORIGIN and LOG_SCALE, see CLScene).
+
+The logging policy (see LoggingPolicy.py) is compiled with the following definitions. Without them, every event is
+logged:
+    LOG_NO_ABSORPTION, LOG_NO_CROSSING: event types that are never logged.
+    LOG_SOLID_MASK: array of flags indexed by solidID + 1 (the world is at index 0).
+    LOG_SURFACE_MASK: array of flags indexed by surfaceID.
+    LOG_N_REGIONS, LOG_REGION_MINS, LOG_REGION_MAXS: bounding boxes (3 floats per corner) of the regions of interest.
+Entries are only reserved for logged events, so rejected events take no space in the log.
+*/
+
+#define NO_LOG_KEY 0
+#define SOLID_LOG_KEY_OFFSET 2
+#define CROSSING_LOG_KEY 0x8000
+
+#ifdef LOG_QUANTIZED_POSITIONS
+    typedef ushort LogCoordinate;
+#else
+    typedef float LogCoordinate;
+#endif
+
+#ifdef LOG_SOLID_MASK
+    __constant uchar logSolidMask[] = LOG_SOLID_MASK;
+#endif
+#ifdef LOG_SURFACE_MASK
+    __constant uchar logSurfaceMask[] = LOG_SURFACE_MASK;
+#endif
+#ifdef LOG_N_REGIONS
+    __constant float logRegionMins[] = LOG_REGION_MINS;
+    __constant float logRegionMaxs[] = LOG_REGION_MAXS;
+#endif
+
+struct Logger {
+    __global float *weights;
+    __global LogCoordinate *positions;
+    __global ushort *keys;
+    __global uint *counter;  // When set, entries are reserved with this atomic counter instead of the local log index.
+    __global float *tallies;  // Tallies, scored independently of the logging policy (see tallies.c).
+    __global float *pathLengths;  // Exit-state detectors, also independent of the logging policy (see detectors.c).
+    __global float *detectorRecords;
+    __global uint *detectorCounts;
+};
+
+typedef struct Logger Logger;
+
+uint reserveLogEntry(Logger *logger, uint *logIndex){
+    if (logger->counter != 0) {
+        return atomic_inc(logger->counter);
+    }
+    return (*logIndex)++;
+}
+
+bool logsPosition(float3 position){
+#ifdef LOG_N_REGIONS
+    for (uint i = 0; i < LOG_N_REGIONS; i++){
+        float3 regionMin = vload3(i, logRegionMins);
+        float3 regionMax = vload3(i, logRegionMaxs);
+        if (all(position >= regionMin) && all(position <= regionMax)) {
+            return true;
+        }
+    }
+    return false;
+#else
+    return true;
+#endif
+}
+
+bool logsInteraction(int solidID, float3 position){
+#ifdef LOG_NO_ABSORPTION
+    return false;
+#else
+    #ifdef LOG_SOLID_MASK
+        if (!logSolidMask[solidID + 1]) return false;
+    #endif
+    return logsPosition(position);
+#endif
+}
+
+bool logsCrossing(uint surfaceID, float3 position){
+#ifdef LOG_NO_CROSSING
+    return false;
+#else
+    #ifdef LOG_SURFACE_MASK
+        if (!logSurfaceMask[surfaceID]) return false;
+    #endif
+    return logsPosition(position);
+#endif
+}
+
+void writeLog(Logger *logger, uint logIndex, float3 position, float weight, ushort key){
+    logger->weights[logIndex] = weight;
+    logger->keys[logIndex] = key;
+#ifdef LOG_QUANTIZED_POSITIONS
+    vstore3(convert_ushort3_sat_rte((position - LOG_ORIGIN) * LOG_SCALE), logIndex, logger->positions);
+#else
+    vstore3(position, logIndex, logger->positions);
+#endif
+}
+
+ushort getSolidLogKey(int solidID){
+    return (ushort)(solidID + SOLID_LOG_KEY_OFFSET);
+}
+
+ushort getCrossingLogKey(uint surfaceID){
+    return (ushort)(CROSSING_LOG_KEY | surfaceID);
+}
@@ -1,16 +1,29 @@
+#include "sceneSpecialization.c"
 #include "random.c"
 #include "vectorOperators.c"
 #include "scatteringMaterial.c"
 #include "intersection.c"
 #include "fresnel.c"
+#include "logger.c"
+#include "tallies.c"
+#include "detectors.c"
 
 __constant int NO_SOLID_ID = -1;
-__constant int NO_SURFACE_ID = -1;
 
 void moveBy(float distance, __global Photon *photons, uint photonID){
     photons[photonID].position += (distance * photons[photonID].direction);
 }
 
+void travelBy(float distance, __global Photon *photons, __constant Material *materials, __global float *tallies,
+              __global float *pathLengths, uint photonID){
+    uint materialID = MATERIAL_ID(photons[photonID].materialID);
+    scoreTrack(tallies, photons[photonID].solidID, photons[photonID].position, photons[photonID].direction, distance,
+               photons[photonID].weight * materials[materialID].mu_a);
+    moveBy(distance, photons, photonID);
+    photons[photonID].opticalPathLength += distance * materials[materialID].n;
+    addPathLength(pathLengths, photonID, materialID, distance);
+}
+
 void scatterBy(float phi, float theta, __global Photon *photons, uint photonID){
     rotateAroundAxisGlobal(&photons[photonID].er, &photons[photonID].direction, phi);
     rotateAroundAxisGlobal(&photons[photonID].direction, &photons[photonID].er, theta);
@@ -20,19 +33,20 @@ void decreaseWeightBy(float delta_weight, __global Photon *photons, uint photonI
     photons[photonID].weight -= delta_weight;
 }
 
-void interact(__global Photon *photons, __constant Material *materials, __global DataPoint *logger,
-              uint logIndex, uint photonID){
-    float delta_weight = photons[photonID].weight * materials[photons[photonID].materialID].albedo;
+void interact(__global Photon *photons, __constant Material *materials, Logger *logger,
+              uint *logIndex, uint photonID){
+    float delta_weight = photons[photonID].weight * materials[MATERIAL_ID(photons[photonID].materialID)].albedo;
     decreaseWeightBy(delta_weight, photons, photonID);
-    logger[logIndex].x = photons[photonID].position.x;
-    logger[logIndex].y = photons[photonID].position.y;
-    logger[logIndex].z = photons[photonID].position.z;
-    logger[logIndex].delta_weight = delta_weight;
-    logger[logIndex].solidID = photons[photonID].solidID;
-    logger[logIndex].surfaceID = NO_SURFACE_ID;
+    scoreAbsorption(logger->tallies, photons[photonID].solidID, photons[photonID].position,
+                    photons[photonID].opticalPathLength, delta_weight);
+    if (!replacesAbsorption(photons[photonID].solidID) &&
+            logsInteraction(photons[photonID].solidID, photons[photonID].position)) {
+        writeLog(logger, reserveLogEntry(logger, logIndex), photons[photonID].position, delta_weight,
+                 getSolidLogKey(photons[photonID].solidID));
+    }
 }
 
-void scatter(__global Photon *photons, __constant Material *materials, __global uint *seeds, __global DataPoint *logger,
+void scatter(__global Photon *photons, __constant Material *materials, __global uint *seeds, Logger *logger,
              uint *logIndex, uint gid, uint photonID){
 
     float rndPhi = getRandomFloatValue(seeds, gid);
@@ -40,8 +54,7 @@ void scatter(__global Photon *photons, __constant Material *materials, __global
     ScatteringAngles angles = getScatteringAngles(rndPhi, rndTheta, photons, materials, photonID);
 
     scatterBy(angles.phi, angles.theta, photons, photonID);
-    interact(photons, materials, logger, *logIndex, photonID);
-    (*logIndex)++;
+    interact(photons, materials, logger, logIndex, photonID);
 }
 
 void roulette(float weightThreshold, __global Photon *photons, __global uint *seeds, uint gid, uint photonID){
@@ -66,35 +79,20 @@ void refract(FresnelIntersection *fresnelIntersection, __global Photon *photons,
 }
 
 void logIntersection(Intersection *intersection, __global Photon *photons, __global Surface *surfaces,
-                    __global DataPoint *logger, uint *logIndex, uint photonID){
-    uint logID = *logIndex;
-    logger[logID].x = photons[photonID].position.x;
-    logger[logID].y = photons[photonID].position.y;
-    logger[logID].z = photons[photonID].position.z;
-    logger[logID].surfaceID = intersection->surfaceID;
-    logger[logID].solidID = surfaces[intersection->surfaceID].insideSolidID;
-
+                    Logger *logger, uint *logIndex, uint photonID){
     bool isLeavingSurface = dot(photons[photonID].direction, intersection->normal) > 0;
-    int sign = isLeavingSurface ? 1 : -1;
-    logger[logID].delta_weight = sign * photons[photonID].weight;
-    (*logIndex)++;
-
-    int outsideSolidID = surfaces[intersection->surfaceID].outsideSolidID;
-    if (outsideSolidID == NO_SOLID_ID){
+    scoreCrossing(logger->tallies, intersection->surfaceID, isLeavingSurface, photons[photonID].opticalPathLength,
+                  photons[photonID].weight);
+    if (!logsCrossing(intersection->surfaceID, photons[photonID].position)) {
         return;
     }
-    logID++;
-    logger[logID].x = photons[photonID].position.x;
-    logger[logID].y = photons[photonID].position.y;
-    logger[logID].z = photons[photonID].position.z;
-    logger[logID].surfaceID = intersection->surfaceID;
-    logger[logID].solidID = outsideSolidID;
-    logger[logID].delta_weight = -sign * photons[photonID].weight;
-    (*logIndex)++;
+    int sign = isLeavingSurface ? 1 : -1;
+    writeLog(logger, reserveLogEntry(logger, logIndex), photons[photonID].position, sign * photons[photonID].weight,
+             getCrossingLogKey(intersection->surfaceID));
 }
 
 float reflectOrRefract(Intersection *intersection, __global Photon *photons, __constant Material *materials,
-        __global Surface *surfaces, __global DataPoint *logger, uint *logIndex, __global uint *seeds, uint gid, uint photonID){
+        __global Surface *surfaces, Logger *logger, uint *logIndex, __global uint *seeds, uint gid, uint photonID){
     FresnelIntersection fresnelIntersection = computeFresnelIntersection(photons[photonID].direction, intersection,
                                                                          materials, surfaces, seeds, gid);
     int stepSign = 1;
@@ -112,9 +110,14 @@ float reflectOrRefract(Intersection *intersection, __global Photon *photons, __c
     else {
         logIntersection(intersection, photons, surfaces, logger, logIndex, photonID);
         refract(&fresnelIntersection, photons, photonID);
-
-        float mut1 = materials[photons[photonID].materialID].mu_t;
-        float mut2 = materials[fresnelIntersection.nextMaterialID].mu_t;
+        recordCrossing(logger->detectorRecords, logger->detectorCounts, logger->pathLengths, intersection->surfaceID,
+                       photons[photonID].position, photons[photonID].direction, intersection->normal,
+                       photons[photonID].weight, photonID);
+        scoreRefraction(logger->tallies, intersection->surfaceID, photons[photonID].position,
+                        photons[photonID].direction, intersection->normal, photons[photonID].weight);
+
+        float mut1 = materials[MATERIAL_ID(photons[photonID].materialID)].mu_t;
+        float mut2 = materials[MATERIAL_ID(fresnelIntersection.nextMaterialID)].mu_t;
         if (mut1 == 0) {
             intersection->distanceLeft = 0;
         } else if (mut2 != 0) {
@@ -138,10 +141,10 @@ float reflectOrRefract(Intersection *intersection, __global Photon *photons, __c
 }
 
 float propagateStep(float distance, __global Photon *photons, __constant Material *materials, Scene *scene,
-                    __global uint *seeds, __global DataPoint *logger, uint *logIndex, uint gid, uint photonID){
+                    __global uint *seeds, Logger *logger, uint *logIndex, uint gid, uint photonID){
 
     if (distance == 0) {
-        float mu_t = materials[photons[photonID].materialID].mu_t;
+        float mu_t = materials[MATERIAL_ID(photons[photonID].materialID)].mu_t;
         float randomNumber = getRandomFloatValue(seeds, gid);
         distance = getScatteringDistance(mu_t, randomNumber);
     }
@@ -152,7 +155,7 @@ float propagateStep(float distance, __global Photon *photons, __constant Materia
     float distanceLeft = 0;
 
     if (intersection.exists && !intersection.isTooClose){
-        moveBy(intersection.distance, photons, photonID);
+        travelBy(intersection.distance, photons, materials, logger->tallies, logger->pathLengths, photonID);
         distanceLeft = reflectOrRefract(&intersection, photons, materials, scene->surfaces, logger, logIndex, seeds, gid, photonID);
     } else {
         if (distance == INFINITY){
@@ -160,7 +163,7 @@ float propagateStep(float distance, __global Photon *photons, __constant Materia
             return 0;
         }
 
-        moveBy(distance, photons, photonID);
+        travelBy(distance, photons, materials, logger->tallies, logger->pathLengths, photonID);
 
         if (intersection.isTooClose){
             int stepSign = 1;
@@ -180,13 +183,17 @@ float propagateStep(float distance, __global Photon *photons, __constant Materia
 
 __kernel void propagate(uint maxPhotons, uint maxInteractions, float weightThreshold, uint workUnitsAmount, __global Photon *photons,
             __constant Material *materials, uint nSolids, __global Solid *solids, __global Surface *surfaces, __global Triangle *triangles,
-            __global Vertex *vertices, __global SolidCandidate *solidCandidates, __global uint *seeds, __global DataPoint *logger){
+            __global Vertex *vertices, __global SolidCandidate *solidCandidates, __global uint *seeds,
+            __global float *logWeights, __global LogCoordinate *logPositions, __global ushort *logKeys,
+            __global float *tallies, __global float *pathLengths, __global float *detectorRecords,
+            __global uint *detectorCounts){
     /*
     OpenCL implementation of the Python module Photon.
     See the Python module documentation for more details.
     */
 
     Scene scene = {nSolids, solids, surfaces, triangles, vertices, solidCandidates};
+    Logger logger = {logWeights, logPositions, logKeys, 0, tallies, pathLengths, detectorRecords, detectorCounts};
 
     uint gid = get_global_id(0);
     uint logIndex = gid * maxInteractions;
@@ -197,16 +204,19 @@ __kernel void propagate(uint maxPhotons, uint maxInteractions, float weightThres
     while (photonCount < maxPhotons){
         uint currentPhotonIndex = gid + (photonCount * workUnitsAmount);
         photons[currentPhotonIndex].er = getAnyOrthogonalGlobal(&photons[currentPhotonIndex].direction);
+        setRandomStream(seeds, gid, photons[currentPhotonIndex].photonID, photons[currentPhotonIndex].randomCounter);
 
         float distance = 0;
         while (photons[currentPhotonIndex].weight != 0){
-            if (logIndex >= (maxLogIndex -1)){  // Added -1 to avoid potential overflow when intersection logs twice
+            if (logIndex >= maxLogIndex){
+                photons[currentPhotonIndex].randomCounter = getRandomCounter(seeds, gid);
                 return;
             }
             distance = propagateStep(distance, photons, materials, &scene,
-                                     seeds, logger, &logIndex, gid, currentPhotonIndex);
+                                     seeds, &logger, &logIndex, gid, currentPhotonIndex);
             roulette(weightThreshold, photons, seeds, gid, currentPhotonIndex);
             }
+        photons[currentPhotonIndex].randomCounter = getRandomCounter(seeds, gid);
         photonCount++;
     }
 }
@@ -246,35 +256,42 @@ __kernel void refractKernel(float3 incidencePlane, float angleDeflection, __glob
     refract(&fresnelIntersection, photons, photonID);
 }
 
-__kernel void interactKernel(__constant Material *materials, __global DataPoint *logger,
+__kernel void interactKernel(__constant Material *materials, __global float *logWeights,
+                             __global LogCoordinate *logPositions, __global ushort *logKeys,
                              uint logIndex, __global Photon *photons, uint photonID){
-    interact(photons, materials, logger, logIndex, photonID);
+    Logger logger = {logWeights, logPositions, logKeys, 0};
+    interact(photons, materials, &logger, &logIndex, photonID);
 }
 
 __kernel void logIntersectionKernel(float3 normal, int surfaceID, __global Surface *surfaces,
-                    __global DataPoint *logger, uint logIndex, __global Photon *photons, uint photonID){
+                    __global float *logWeights, __global LogCoordinate *logPositions, __global ushort *logKeys,
+                    uint logIndex, __global Photon *photons, uint photonID){
+    Logger logger = {logWeights, logPositions, logKeys, 0};
     Intersection intersection;
     intersection.normal = normal;
     intersection.surfaceID = surfaceID;
-    logIntersection(&intersection, photons, surfaces, logger, &logIndex, photonID);
+    logIntersection(&intersection, photons, surfaces, &logger, &logIndex, photonID);
 }
 
 __kernel void reflectOrRefractKernel(float3 normal, int surfaceID, float distanceLeft,
                                      __constant Material *materials, __global Surface *surfaces,
-                                     __global DataPoint *logger, uint logIndex, __global uint *seeds,
+                                     __global float *logWeights, __global LogCoordinate *logPositions,
+                                     __global ushort *logKeys, uint logIndex, __global uint *seeds,
                                      __global Photon *photons, uint photonID){
+    Logger logger = {logWeights, logPositions, logKeys, 0};
     Intersection intersection;
     intersection.normal = normal;
     intersection.surfaceID = surfaceID;
     intersection.distanceLeft = distanceLeft;
-    reflectOrRefract(&intersection, photons, materials, surfaces, logger, &logIndex, seeds, photonID, photonID);
+    reflectOrRefract(&intersection, photons, materials, surfaces, &logger, &logIndex, seeds, photonID, photonID);
 }
 
 __kernel void propagateStepKernel(float distance, __constant Material *materials, __global Surface *surfaces,
-                    __global uint *seeds, __global DataPoint *logger, uint logIndex,
-                    __global Photon *photons, uint photonID){
+                    __global uint *seeds, __global float *logWeights, __global LogCoordinate *logPositions,
+                    __global ushort *logKeys, uint logIndex, __global Photon *photons, uint photonID){
     Scene scene;
     scene.surfaces = surfaces;
+    Logger logger = {logWeights, logPositions, logKeys, 0};
     uint gid = photonID;
-    propagateStep(distance, photons, materials, &scene, seeds, logger, &logIndex, gid, photonID);
+    propagateStep(distance, photons, materials, &scene, seeds, &logger, &logIndex, gid, photonID);
 }
@@ -1,4 +1,21 @@
 
+/*
+Counter-based Philox4x32-10 generator (Salmon et al., 2011).
+
+Each work unit owns a 4-uint state in the seeds buffer:
+    [streamID, counter, key0, key1]
+Random value number n of a stream is lane (n % 4) of philox(counter=(n / 4, streamID, 0, 0), key).
+The streamID is the global photon index, so every photon draws the same values regardless of the
+work unit, the batch or the launch that propagates it. See the Python module randomStream.
+*/
+
+#define SEED_STATE_SIZE 4
+#define PHILOX_M0 0xD2511F53
+#define PHILOX_M1 0xCD9E8D57
+#define PHILOX_W0 0x9E3779B9
+#define PHILOX_W1 0xBB67AE85
+#define PROPAGATION_DOMAIN 0
+
 uint wangHash(uint seed){
     seed = (seed ^ 61) ^ (seed >> 16);
     seed *= 9;
@@ -8,14 +25,50 @@ uint wangHash(uint seed){
     return seed;
 }
 
+uint4 philox4x32(uint4 counter, uint2 key){
+    for (int i = 0; i < 10; i++){
+        uint hi0 = mul_hi((uint)PHILOX_M0, counter.x);
+        uint lo0 = PHILOX_M0 * counter.x;
+        uint hi1 = mul_hi((uint)PHILOX_M1, counter.z);
+        uint lo1 = PHILOX_M1 * counter.z;
+        counter = (uint4)(hi1 ^ counter.y ^ key.x, lo1, hi0 ^ counter.w ^ key.y, lo0);
+        key.x += PHILOX_W0;
+        key.y += PHILOX_W1;
+    }
+    return counter;
+}
+
+float toUniformFloat(uint bits){
+    // Uses the 24 most significant bits, which maps exactly to a float in (0, 1].
+    return (float)((bits >> 8) + 1) * (1.0f / 16777216.0f);
+}
+
+void setRandomStream(__global unsigned int *seeds, unsigned int id, uint streamID, uint counter){
+    seeds[id * SEED_STATE_SIZE] = streamID;
+    seeds[id * SEED_STATE_SIZE + 1] = counter;
+}
+
+uint getRandomCounter(__global unsigned int *seeds, unsigned int id){
+    return seeds[id * SEED_STATE_SIZE + 1];
+}
+
 float getRandomFloatValue(__global unsigned int *seeds, unsigned int id){
-     float result = 0.0f;
-     while(result == 0.0f){
-         uint rnd_seed = wangHash(seeds[id]);
-         seeds[id] = rnd_seed;
-         result = (float)rnd_seed / (float)UINT_MAX;
-     }
-     return result;
+#ifdef MOCK_RANDOM_VALUE
+    // Testing hook: every random value is replaced by this compile-time constant.
+    return MOCK_RANDOM_VALUE;
+#else
+    uint offset = id * SEED_STATE_SIZE;
+    uint n = seeds[offset + 1];
+    seeds[offset + 1] = n + 1;
+
+    uint4 counter = (uint4)(n >> 2, seeds[offset], PROPAGATION_DOMAIN, 0);
+    uint2 key = (uint2)(seeds[offset + 2], seeds[offset + 3]);
+    uint4 bits = philox4x32(counter, key);
+
+    uint lane = n & 3;
+    uint value = lane == 0 ? bits.x : (lane == 1 ? bits.y : (lane == 2 ? bits.z : bits.w));
+    return toUniformFloat(value);
+#endif
 }
 
 // ----------------- TEST KERNELS -----------------
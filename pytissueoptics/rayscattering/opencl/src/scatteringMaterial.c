@@ -1,3 +1,5 @@
+#include "sceneSpecialization.c"
+
 struct ScatteringAngles {
     float phi, theta;
 };
@@ -14,20 +16,24 @@ float getScatteringAnglePhi(float randomNumber){
 }
 
 float getScatteringAngleTheta(float g, float randomNumber){
+#ifndef SCENE_ANISOTROPIC
     if (g == 0){
         return acos(2.0f * randomNumber - 1.0f);
     }
-    else{
-        float temp = (1.0f - g * g) / (1 - g + 2 * g * randomNumber);
-        return acos((1.0f + g * g - temp * temp) / (2 * g));
-    }
+#endif
+    float temp = (1.0f - g * g) / (1 - g + 2 * g * randomNumber);
+    return acos((1.0f + g * g - temp * temp) / (2 * g));
 }
 
 ScatteringAngles getScatteringAngles(float rndPhi, float rndTheta,__global Photon *photons,
                                      __constant Material *materials, uint photonID)
 {
     ScatteringAngles angles;
-    float g = materials[photons[photonID].materialID].g;
+#ifdef SCENE_G
+    float g = SCENE_G;
+#else
+    float g = materials[MATERIAL_ID(photons[photonID].materialID)].g;
+#endif
     angles.phi = getScatteringAnglePhi(rndPhi);
     angles.theta = getScatteringAngleTheta(g, rndTheta);
     return angles;
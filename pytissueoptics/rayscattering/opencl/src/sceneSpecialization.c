@@ -0,0 +1,38 @@
+#ifndef SCENE_SPECIALIZATION
+#define SCENE_SPECIALIZATION
+
+/*
+Compile-time scene constants. CLProgram.specialize() defines some of them from the CLScene (see
+CLScene.getCompileDefinitions) to remove runtime branches and fixed-size loops that are known for a given scene:
+    SCENE_N_SOLIDS: number of solids. Solid loops get a constant bound.
+    SCENE_UNROLL_SOLIDS: the solid loops are small enough to be unrolled.
+    SCENE_HAS_SMOOTHING: 0 when no surface requires normal smoothing.
+    SCENE_SINGLE_MATERIAL: the scene has a single material, so photons always use material 0.
+    SCENE_G: anisotropy factor shared by all materials.
+    SCENE_ANISOTROPIC: no material is isotropic (g != 0).
+When they are not defined, the kernels handle any scene at runtime.
+*/
+
+#ifdef SCENE_N_SOLIDS
+    #define N_SOLIDS(scene) SCENE_N_SOLIDS
+#else
+    #define N_SOLIDS(scene) ((scene)->nSolids)
+#endif
+
+#ifdef SCENE_UNROLL_SOLIDS
+    #define UNROLL_SOLIDS _Pragma("unroll")
+#else
+    #define UNROLL_SOLIDS
+#endif
+
+#ifndef SCENE_HAS_SMOOTHING
+    #define SCENE_HAS_SMOOTHING 1
+#endif
+
+#ifdef SCENE_SINGLE_MATERIAL
+    #define MATERIAL_ID(materialID) 0
+#else
+    #define MATERIAL_ID(materialID) (materialID)
+#endif
+
+#endif
@@ -0,0 +1,218 @@
+#include "atomics.c"
+
+/*
+Tallies accumulated during the propagation (see Tally.py). The data of every tally is concatenated in the tallies
+buffer of the logger and summed with atomic float additions.
+
+Time-resolved tallies (see TimeResolvedTally.py) are histograms of the weight scored at each optical path length (the
+time of flight times the speed of light).
+
+The tallies are compiled with the following definitions (see CLScene). Without TALLY_N, nothing is scored:
+    TALLY_N: number of tallies.
+    TALLY_OFFSETS, TALLY_BINS: first bin of each tally in the tallies buffer and its number of bins.
+    TALLY_MINS, TALLY_SCALES: minimum optical path length of each tally and its number of bins per unit length.
+    TALLY_SOLID_MASK_LENGTH, TALLY_SOLID_MASK: flags of the absorption tallies, indexed by
+        tally * TALLY_SOLID_MASK_LENGTH + solidID + 1 (the world is at index 0, like LOG_SOLID_MASK).
+    TALLY_REGION_MINS, TALLY_REGION_MAXS: bounding box (3 floats per corner) of the absorption tallies.
+    TALLY_N_SURFACES, TALLY_SURFACE_SIGNS: crossings scored by the surface tallies, indexed by
+        tally * TALLY_N_SURFACES + surfaceID. With a sign of 1 (-1), the photons leaving (entering) the inside solid of
+        the surface are scored. The surface is ignored with a sign of 0.
+
+Track-length tallies (see TrackLengthTally.py) are row-major voxel grids of the weight times mu_a times the length of
+each step in each voxel, found with a 3D DDA. The interactions in their solids are not logged. They are compiled with:
+    TRACK_N: number of track-length tallies.
+    TRACK_OFFSETS: first voxel of each grid in the tallies buffer.
+    TRACK_SOLID_IDS: solid ID of each grid (NO_SOLID_ID for the world).
+    TRACK_MINS, TRACK_MAXS, TRACK_BINS: limits (3 floats per corner) and number of voxels (3 per grid) of each grid.
+
+Cylindrical tallies (see CylindricalTally.py) are row-major (radius, depth) grids of the weight absorbed at the
+interactions, like A(r, z) of MCML. The radius is the distance to the axis of the grid and the depth is the distance
+along the axis from its center. They are compiled with:
+    CYLINDER_N: number of cylindrical tallies.
+    CYLINDER_OFFSETS: first bin of each grid in the tallies buffer.
+    CYLINDER_CENTERS, CYLINDER_AXES: center and unit axis (3 floats each) of each grid.
+    CYLINDER_RADIAL_SCALES, CYLINDER_RADIAL_BINS: number of radial bins per unit length and number of radial bins.
+    CYLINDER_DEPTH_MINS, CYLINDER_DEPTH_SCALES, CYLINDER_DEPTH_BINS: minimum depth, number of depth bins per unit
+        length and number of depth bins.
+    CYLINDER_SOLID_MASK_LENGTH, CYLINDER_SOLID_MASK: solids of each grid, like TALLY_SOLID_MASK.
+
+Radial-angular tallies (see RadialAngularTally.py) are row-major (radius, angle) grids of the weight refracted through
+a surface, like Rd(r, alpha) and Tt(r, alpha) of MCML. The angle is between the direction after refraction and the
+normal of the surface, in [0, pi/2]. They are compiled with:
+    ANGULAR_N: number of radial-angular tallies.
+    ANGULAR_OFFSETS: first bin of each grid in the tallies buffer.
+    ANGULAR_CENTERS, ANGULAR_AXES: point and unit direction (3 floats each) of the axis of each grid.
+    ANGULAR_RADIAL_SCALES, ANGULAR_RADIAL_BINS: number of radial bins per unit length and number of radial bins.
+    ANGULAR_ANGLE_SCALES, ANGULAR_ANGLE_BINS: number of angular bins per radian and number of angular bins.
+    ANGULAR_N_SURFACES, ANGULAR_SURFACE_SIGNS: crossings scored by each grid, like TALLY_SURFACE_SIGNS.
+*/
+
+#ifdef TALLY_N
+    __constant uint tallyOffsets[] = TALLY_OFFSETS;
+    __constant uint tallyBins[] = TALLY_BINS;
+    __constant float tallyMins[] = TALLY_MINS;
+    __constant float tallyScales[] = TALLY_SCALES;
+    __constant uchar tallySolidMask[] = TALLY_SOLID_MASK;
+    __constant float tallyRegionMins[] = TALLY_REGION_MINS;
+    __constant float tallyRegionMaxs[] = TALLY_REGION_MAXS;
+    #ifdef TALLY_SURFACE_SIGNS
+        __constant char tallySurfaceSigns[] = TALLY_SURFACE_SIGNS;
+    #endif
+#endif
+#ifdef TRACK_N
+    __constant uint trackOffsets[] = TRACK_OFFSETS;
+    __constant int trackSolidIDs[] = TRACK_SOLID_IDS;
+    __constant float trackMins[] = TRACK_MINS;
+    __constant float trackMaxs[] = TRACK_MAXS;
+    __constant uint trackBins[] = TRACK_BINS;
+#endif
+#ifdef CYLINDER_N
+    __constant uint cylinderOffsets[] = CYLINDER_OFFSETS;
+    __constant float cylinderCenters[] = CYLINDER_CENTERS;
+    __constant float cylinderAxes[] = CYLINDER_AXES;
+    __constant float cylinderRadialScales[] = CYLINDER_RADIAL_SCALES;
+    __constant uint cylinderRadialBins[] = CYLINDER_RADIAL_BINS;
+    __constant float cylinderDepthMins[] = CYLINDER_DEPTH_MINS;
+    __constant float cylinderDepthScales[] = CYLINDER_DEPTH_SCALES;
+    __constant uint cylinderDepthBins[] = CYLINDER_DEPTH_BINS;
+    __constant uchar cylinderSolidMask[] = CYLINDER_SOLID_MASK;
+#endif
+#ifdef ANGULAR_N
+    __constant uint angularOffsets[] = ANGULAR_OFFSETS;
+    __constant float angularCenters[] = ANGULAR_CENTERS;
+    __constant float angularAxes[] = ANGULAR_AXES;
+    __constant float angularRadialScales[] = ANGULAR_RADIAL_SCALES;
+    __constant uint angularRadialBins[] = ANGULAR_RADIAL_BINS;
+    __constant float angularAngleScales[] = ANGULAR_ANGLE_SCALES;
+    __constant uint angularAngleBins[] = ANGULAR_ANGLE_BINS;
+    __constant char angularSurfaceSigns[] = ANGULAR_SURFACE_SIGNS;
+#endif
+
+float getRadialDistance(float3 position, float3 center, float3 axis){
+    float3 relativePosition = position - center;
+    return length(relativePosition - dot(relativePosition, axis) * axis);
+}
+
+void scoreTally(__global float *tallies, uint tallyID, float opticalPathLength, float weight){
+#ifdef TALLY_N
+    float x = (opticalPathLength - tallyMins[tallyID]) * tallyScales[tallyID];
+    if (x >= 0 && x < tallyBins[tallyID]) {
+        atomicAddFloat(tallies + tallyOffsets[tallyID] + (uint)x, weight);
+    }
+#endif
+}
+
+void scoreAbsorption(__global float *tallies, int solidID, float3 position, float opticalPathLength, float weight){
+#ifdef TALLY_N
+    for (uint i = 0; i < TALLY_N; i++){
+        if (!tallySolidMask[i * TALLY_SOLID_MASK_LENGTH + solidID + 1]) continue;
+        if (any(position < vload3(i, tallyRegionMins)) || any(position > vload3(i, tallyRegionMaxs))) continue;
+        scoreTally(tallies, i, opticalPathLength, weight);
+    }
+#endif
+#ifdef CYLINDER_N
+    for (uint i = 0; i < CYLINDER_N; i++){
+        if (!cylinderSolidMask[i * CYLINDER_SOLID_MASK_LENGTH + solidID + 1]) continue;
+        float3 center = vload3(i, cylinderCenters);
+        float3 axis = vload3(i, cylinderAxes);
+        float r = getRadialDistance(position, center, axis) * cylinderRadialScales[i];
+        float z = (dot(position - center, axis) - cylinderDepthMins[i]) * cylinderDepthScales[i];
+        if (r >= cylinderRadialBins[i] || z < 0 || z >= cylinderDepthBins[i]) continue;
+        atomicAddFloat(tallies + cylinderOffsets[i] + (uint)r * cylinderDepthBins[i] + (uint)z, weight);
+    }
+#endif
+}
+
+void scoreCrossing(__global float *tallies, uint surfaceID, bool isLeavingSurface, float opticalPathLength,
+                   float weight){
+#ifdef TALLY_SURFACE_SIGNS
+    int sign = isLeavingSurface ? 1 : -1;
+    for (uint i = 0; i < TALLY_N; i++){
+        if (tallySurfaceSigns[i * TALLY_N_SURFACES + surfaceID] == sign) {
+            scoreTally(tallies, i, opticalPathLength, weight);
+        }
+    }
+#endif
+}
+
+void scoreRefraction(__global float *tallies, uint surfaceID, float3 position, float3 direction, float3 normal,
+                     float weight){
+#ifdef ANGULAR_N
+    float cosine = dot(direction, normal);
+    int sign = cosine > 0 ? 1 : -1;
+    float angle = acos(fmin(fabs(cosine), 1.0f));
+    for (uint i = 0; i < ANGULAR_N; i++){
+        if (angularSurfaceSigns[i * ANGULAR_N_SURFACES + surfaceID] != sign) continue;
+        float r = getRadialDistance(position, vload3(i, angularCenters), vload3(i, angularAxes)) *
+                  angularRadialScales[i];
+        if (r >= angularRadialBins[i]) continue;
+        uint angleBin = min((uint)(angle * angularAngleScales[i]), angularAngleBins[i] - 1);
+        atomicAddFloat(tallies + angularOffsets[i] + (uint)r * angularAngleBins[i] + angleBin, weight);
+    }
+#endif
+}
+
+bool replacesAbsorption(int solidID){
+#ifdef TRACK_N
+    for (uint i = 0; i < TRACK_N; i++){
+        if (trackSolidIDs[i] == solidID) return true;
+    }
+#endif
+    return false;
+}
+
+void scoreTrackInGrid(__global float *grid, float3 gridMin, float3 gridMax, int3 bins, float3 origin,
+                      float3 direction, float length, float value){
+    /*
+    Adds the value times the length of the segment inside each voxel it crosses (Amanatides & Woo). Same traversal
+    as TrackLengthTally._traverse.
+    */
+    float3 voxelSize = (gridMax - gridMin) / convert_float3(bins);
+    int3 isZero = direction == 0;
+    if (any(isZero && (origin < gridMin || origin > gridMax))) return;
+
+    float3 t0 = select((gridMin - origin) / direction, (float3)(-INFINITY), isZero);
+    float3 t1 = select((gridMax - origin) / direction, (float3)(INFINITY), isZero);
+    float3 tLow = fmin(t0, t1);
+    float3 tHigh = fmax(t0, t1);
+    float t = fmax(fmax(tLow.x, tLow.y), fmax(tLow.z, 0.0f));
+    float tEnd = fmin(fmin(tHigh.x, tHigh.y), fmin(tHigh.z, length));
+    if (!(t < tEnd)) return;
+
+    float3 entry = origin + t * direction;
+    int3 voxel = clamp(convert_int3_rtn((entry - gridMin) / voxelSize), (int3)(0), bins - 1);
+    int3 isPositive = direction > 0;
+    int3 step = select((int3)(-1), (int3)(1), isPositive);
+    float3 nextBoundary = gridMin + (convert_float3(voxel) + select((float3)(0), (float3)(1), isPositive)) * voxelSize;
+    float3 tMax = select((nextBoundary - origin) / direction, (float3)(INFINITY), isZero);
+    float3 tDelta = select(voxelSize / fabs(direction), (float3)(INFINITY), isZero);
+
+    while (true){
+        float tNext = fmin(fmin(tMax.x, tMax.y), tMax.z);
+        atomicAddFloat(grid + (voxel.x * bins.y + voxel.y) * bins.z + voxel.z, value * (fmin(tNext, tEnd) - t));
+        if (tNext >= tEnd) return;
+        t = tNext;
+        if (tMax.x == tNext) {
+            voxel.x += step.x;
+            tMax.x += tDelta.x;
+        } else if (tMax.y == tNext) {
+            voxel.y += step.y;
+            tMax.y += tDelta.y;
+        } else {
+            voxel.z += step.z;
+            tMax.z += tDelta.z;
+        }
+        if (any(voxel < 0 || voxel >= bins)) return;
+    }
+}
+
+void scoreTrack(__global float *tallies, int solidID, float3 position, float3 direction, float length, float value){
+#ifdef TRACK_N
+    if (value == 0) return;
+    for (uint i = 0; i < TRACK_N; i++){
+        if (trackSolidIDs[i] != solidID) continue;
+        scoreTrackInGrid(tallies + trackOffsets[i], vload3(i, trackMins), vload3(i, trackMaxs),
+                         convert_int3(vload3(i, trackBins)), position, direction, length, value);
+    }
+#endif
+}
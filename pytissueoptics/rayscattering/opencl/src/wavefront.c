@@ -0,0 +1,138 @@
+#include "propagation.c"
+
+/*
+Wavefront alternative to the propagate megakernel. Instead of following each photon for its whole life, each stage
+of a photon step is a separate kernel launched over a queue of photon IDs (see CLWavefront.py):
+    wavefrontStep: samples the step distance, finds the intersection and moves the photon. The photon is then
+                   dispatched either to the boundary queue or to the scatter queue.
+    wavefrontBoundary: reflects or refracts the photons at their stored intersection, then applies the roulette.
+    wavefrontScatter: scatters and absorbs, then applies the roulette.
+Surviving photons are appended to the active queue for the next step. Queue lengths and the log index are atomic
+counters. Every queue entry also stores a sorting key (material and solid IDs) so the host can group similar work.
+
+All stage kernels share the same arguments so the program is only built once per batch.
+*/
+
+#define ACTIVE_QUEUE_COUNTER 0
+#define BOUNDARY_QUEUE_COUNTER 1
+#define SCATTER_QUEUE_COUNTER 2
+#define LOG_COUNTER 3
+
+#define WAVEFRONT_ARGUMENTS uint queueLength, __global Photon *photons, __global PhotonState *states, __constant Material *materials, \
+        uint nSolids, __global Solid *solids, __global Surface *surfaces, __global Triangle *triangles, \
+        __global Vertex *vertices, __global SolidCandidate *solidCandidates, float weightThreshold, \
+        __global uint *seeds, __global float *logWeights, __global LogCoordinate *logPositions, \
+        __global ushort *logKeys, __global uint *activeQueue, __global uint *activeKeys, \
+        __global uint *boundaryQueue, __global uint *boundaryKeys, __global uint *scatterQueue, \
+        __global uint *scatterKeys, __global uint *counters, __global float *tallies, \
+        __global float *pathLengths, __global float *detectorRecords, __global uint *detectorCounts
+
+uint getQueueKey(__global Photon *photons, uint nSolids, uint photonID){
+    return photons[photonID].materialID * (nSolids + 1) + (uint)(photons[photonID].solidID + 1);
+}
+
+void enqueue(__global Photon *photons, uint nSolids, uint photonID, __global uint *queue, __global uint *queueKeys,
+             __global uint *counters, uint counterID){
+    uint index = atomic_inc(&counters[counterID]);
+    queue[index] = photonID;
+    queueKeys[index] = getQueueKey(photons, nSolids, photonID);
+}
+
+__kernel void wavefrontInit(WAVEFRONT_ARGUMENTS){
+    uint photonID = get_global_id(0);
+    if (photonID >= queueLength) return;
+    photons[photonID].er = getAnyOrthogonalGlobal(&photons[photonID].direction);
+    states[photonID].distance = 0;
+}
+
+__kernel void wavefrontStep(WAVEFRONT_ARGUMENTS){
+    Scene scene = {nSolids, solids, surfaces, triangles, vertices, solidCandidates};
+
+    uint gid = get_global_id(0);
+    if (gid >= queueLength) return;
+    uint photonID = activeQueue[gid];
+    setRandomStream(seeds, photonID, photons[photonID].photonID, photons[photonID].randomCounter);
+
+    float distance = states[photonID].distance;
+    if (distance == 0) {
+        float mu_t = materials[MATERIAL_ID(photons[photonID].materialID)].mu_t;
+        float randomNumber = getRandomFloatValue(seeds, photonID);
+        distance = getScatteringDistance(mu_t, randomNumber);
+    }
+
+    Ray stepRay = {photons[photonID].position, photons[photonID].direction, distance};
+    Intersection intersection = findIntersection(stepRay, &scene, gid);
+
+    if (intersection.exists && !intersection.isTooClose){
+        travelBy(intersection.distance, photons, materials, tallies, pathLengths, photonID);
+        states[photonID].normal = intersection.normal;
+        states[photonID].surfaceID = intersection.surfaceID;
+        states[photonID].distance = intersection.distanceLeft;
+        enqueue(photons, nSolids, photonID, boundaryQueue, boundaryKeys, counters, BOUNDARY_QUEUE_COUNTER);
+    } else if (distance == INFINITY){
+        photons[photonID].weight = 0;
+    } else {
+        travelBy(distance, photons, materials, tallies, pathLengths, photonID);
+
+        if (intersection.isTooClose){
+            int stepSign = 1;
+            int solidIDTowardsNormal = surfaces[intersection.surfaceID].outsideSolidID;
+            if (solidIDTowardsNormal != photons[photonID].solidID) {
+                stepSign = -1;
+            }
+            float3 stepCorrection = stepSign * intersection.normal * EPS_CORRECTION;
+            photons[photonID].position += stepCorrection;
+        }
+
+        enqueue(photons, nSolids, photonID, scatterQueue, scatterKeys, counters, SCATTER_QUEUE_COUNTER);
+    }
+
+    photons[photonID].randomCounter = getRandomCounter(seeds, photonID);
+}
+
+__kernel void wavefrontBoundary(WAVEFRONT_ARGUMENTS){
+    if (get_global_id(0) >= queueLength) return;
+    uint photonID = boundaryQueue[get_global_id(0)];
+    setRandomStream(seeds, photonID, photons[photonID].photonID, photons[photonID].randomCounter);
+    Logger logger = {logWeights, logPositions, logKeys, &counters[LOG_COUNTER], tallies, pathLengths,
+                     detectorRecords, detectorCounts};
+
+    Intersection intersection;
+    intersection.exists = true;
+    intersection.isTooClose = false;
+    intersection.distance = 0;
+    intersection.position = photons[photonID].position;
+    intersection.normal = states[photonID].normal;
+    intersection.surfaceID = states[photonID].surfaceID;
+    intersection.polygonID = 0;
+    intersection.distanceLeft = states[photonID].distance;
+
+    // Log entries are reserved with the log counter when the event is logged, so the local index is unused.
+    uint logIndex = 0;
+    states[photonID].distance = reflectOrRefract(&intersection, photons, materials, surfaces, &logger, &logIndex,
+                                                 seeds, photonID, photonID);
+    roulette(weightThreshold, photons, seeds, photonID, photonID);
+
+    photons[photonID].randomCounter = getRandomCounter(seeds, photonID);
+    if (photons[photonID].weight != 0){
+        enqueue(photons, nSolids, photonID, activeQueue, activeKeys, counters, ACTIVE_QUEUE_COUNTER);
+    }
+}
+
+__kernel void wavefrontScatter(WAVEFRONT_ARGUMENTS){
+    if (get_global_id(0) >= queueLength) return;
+    uint photonID = scatterQueue[get_global_id(0)];
+    setRandomStream(seeds, photonID, photons[photonID].photonID, photons[photonID].randomCounter);
+    Logger logger = {logWeights, logPositions, logKeys, &counters[LOG_COUNTER], tallies, pathLengths,
+                     detectorRecords, detectorCounts};
+
+    uint logIndex = 0;
+    scatter(photons, materials, seeds, &logger, &logIndex, photonID, photonID);
+    states[photonID].distance = 0;
+    roulette(weightThreshold, photons, seeds, photonID, photonID);
+
+    photons[photonID].randomCounter = getRandomCounter(seeds, photonID);
+    if (photons[photonID].weight != 0){
+        enqueue(photons, nSolids, photonID, activeQueue, activeKeys, counters, ACTIVE_QUEUE_COUNTER);
+    }
+}
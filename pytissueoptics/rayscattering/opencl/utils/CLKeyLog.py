@@ -1,115 +1,96 @@
-from multiprocessing.pool import ThreadPool
-from typing import List
-
 import numpy as np
 
-from pytissueoptics.rayscattering.opencl.CLScene import CLScene, NO_LOG_ID, NO_SOLID_LABEL
+from pytissueoptics.rayscattering.opencl.CLScene import CLScene, NO_LOG_ID, NO_SOLID_ID, NO_SURFACE_ID, \
+    FIRST_SOLID_ID, SOLID_LOG_KEY_OFFSET, CROSSING_LOG_KEY
+from pytissueoptics.rayscattering.opencl.buffers import LogCL
 from pytissueoptics.scene.logger import InteractionKey, Logger
 
 
-SOLID_ID_COL = 4
-SURFACE_ID_COL = 5
-
-
 class CLKeyLog:
-    """ Parses a DataPointCL array of shape (N, 6) where each point is of the form
-    (weight, x, y, z, solidID, surfaceID) to extract a dictionary of InteractionKey
-    and their corresponding datapoint array of the form (weight, x, y, z). The
-    translation from IDs to their corresponding labels is done using the given CLScene. """
-    def __init__(self, log: np.ndarray, sceneCL: CLScene):
-        self._log = log
+    """ Parses the columns of a LogCL (see src/logger.c) to extract a dictionary of InteractionKey
+    and their corresponding datapoint array of the form (weight, x, y, z). Each surface crossing
+    entry is expanded to one point for each logged solid of the surface. The translation from IDs
+    to their corresponding labels is done using the given CLScene.
+
+    The extraction is a single counting sort: every point gets an integer key code combining its
+    solidID and surfaceID, the points are reordered once by code and each InteractionKey gets a
+    slice of the sorted array. """
+    def __init__(self, log: LogCL, sceneCL: CLScene):
         self._sceneCL = sceneCL
-
-        self._keyIndices = []
+        self._nSurfaceCodes = len(sceneCL.getSurfaceSolidIDs()[0]) + 1
         self._keyLog = {}
 
-        self._batchSize = min(50000, len(self._log))
-
-        self._extractKeyLog()
+        self._extractKeyLog(log)
 
     def toSceneLogger(self, sceneLogger: Logger):
         """ Writes the extracted key-based log to the given scene logger."""
         for key, points in self._keyLog.items():
             sceneLogger.logDataPointArray(points, key)
 
-    def _extractKeyLog(self):
-        if self._sceneCL.nSolids == 0:
-            return self._extractNoKeyLog()
-        self._sortLocal()
-        self._merge()
-
-    def _extractNoKeyLog(self):
-        noInteractionIndices = np.where(self._log[:, SOLID_ID_COL] == NO_LOG_ID)[0]
-        self._log = self._log[:, :4]
-        self._log = np.delete(self._log, noInteractionIndices, axis=0)
-        self._keyLog[InteractionKey(NO_SOLID_LABEL, None)] = self._log
-
-    def _sortLocal(self):
-        """ Sorts the log locally by solidID and surfaceID,
-        and for each local batch, it also extracts start and end indices for each key. """
-
-        pool = ThreadPool(8)
-        results = []
-        for batchStartIdx in range(0, self._log.shape[0], self._batchSize):
-            res = pool.apply_async(self._sortBatch, args=(batchStartIdx,))
-            results.append(res)
-        pool.close()
-        pool.join()
-        self._keyIndices = [res.get() for res in results]
-
-    def _sortBatch(self, startIdx: int):
-        ba, bb = startIdx, startIdx + self._batchSize
-        batchLog = self._sort(self._log[ba:bb], columns=[SOLID_ID_COL, SURFACE_ID_COL])
-
-        solidChanges = self._getValueChangeIndices(batchLog, column=SOLID_ID_COL)
-
-        batchKeyIndices = {}
-        for i in range(len(solidChanges) - 1):
-            solidID = batchLog[solidChanges[i], SOLID_ID_COL]
-            if solidID == NO_LOG_ID:
-                continue
-            a, b = solidChanges[i], solidChanges[i + 1]
-            batchSolidLog = batchLog[a:b]
-
-            surfaceChanges = self._getValueChangeIndices(batchSolidLog, column=SURFACE_ID_COL)
-            for j in range(len(surfaceChanges) - 1):
-                surfaceID = batchSolidLog[surfaceChanges[j], SURFACE_ID_COL]
-                c, d = surfaceChanges[j], surfaceChanges[j + 1]
-                batchKeyIndices[(int(solidID), int(surfaceID))] = (a + c, a + d)
-
-            batchLog[a:b] = batchSolidLog
-        self._log[ba:bb] = batchLog
-        return batchKeyIndices
-
-    @staticmethod
-    def _getValueChangeIndices(log: np.ndarray, column: int):
-        """ Returns the indices where there is a change in the value of the given column. """
-        indices = np.where(log[:-1, column] != log[1:, column])[0] + 1
-        return np.concatenate(([0], indices, [log.shape[0]]))
-
-    @staticmethod
-    def _sort(log: np.ndarray, columns: List[int]):
-        return log[np.lexsort([log[:, i] for i in columns])]
-
-    def _merge(self):
-        """ Merges the local batches into a single key log with unique interaction keys. """
-        self._log = self._log[:, :4]
-
-        for i, batchKeyIndices in enumerate(self._keyIndices):
-            batchStartIndex = i * self._batchSize
-            for keyIDs, indices in batchKeyIndices.items():
-                if len(indices) == 0:
-                    continue
-                a, b = batchStartIndex + indices[0], batchStartIndex + indices[1]
-                points = self._log[a: b]
-                key = self._getInteractionKey(*keyIDs)
-                if key not in self._keyLog:
-                    self._keyLog[key] = [points]
-                else:
-                    self._keyLog[key].append(points)
-
-        for key in self._keyLog:
-            self._keyLog[key] = np.concatenate(self._keyLog[key])
+    def _extractKeyLog(self, log: LogCL):
+        entryIndices, keyCodes = self._getEntryKeyCodes(log.keys.hostBuffer)
+        if len(keyCodes) == 0:
+            return
+
+        counts = np.bincount(keyCodes)
+        offsets = np.concatenate(([0], np.cumsum(counts)))
+        # Numpy uses a radix sort for stable sorts of 16-bit integers.
+        if offsets.size <= np.iinfo(np.uint16).max:
+            keyCodes = keyCodes.astype(np.uint16)
+        order = np.argsort(keyCodes, kind="stable")
+
+        # Outside datapoints use entry indices shifted by the log length to gather negative weights.
+        sortedIndices = entryIndices[order]
+        signedWeights = np.concatenate([log.weights.hostBuffer, -log.weights.hostBuffer])
+        positions = np.take(log.positions.hostBuffer.reshape((-1, 3)), sortedIndices, axis=0, mode="wrap")
+        points = np.empty((len(order), 4), dtype=np.float32)
+        points[:, 0] = signedWeights[sortedIndices]
+        points[:, 1:] = self._sceneCL.getLogPositions(positions)
+
+        for keyCode in np.flatnonzero(counts):
+            key = self._getInteractionKey(*self._getIDs(keyCode))
+            self._keyLog[key] = points[offsets[keyCode]:offsets[keyCode + 1]]
+
+    def _getEntryKeyCodes(self, keys: np.ndarray) -> (np.ndarray, np.ndarray):
+        """ Returns the log entry index and the key code of every datapoint. Each used entry is first the datapoint of
+        its solid (the inside solid of a crossing). The datapoints of the outside solids of crossings have a negative
+        weight and are marked by an entry index shifted by the log length. """
+        insideCodes, outsideCodes = self._getKeyCodeTables()
+        insideCodes, outsideCodes = insideCodes[keys], outsideCodes[keys]
+        insideIndices = np.flatnonzero(insideCodes >= 0)
+        outsideIndices = np.flatnonzero(outsideCodes >= 0)
+
+        entryIndices = np.concatenate([insideIndices, outsideIndices + len(keys)])
+        keyCodes = np.concatenate([insideCodes[insideIndices], outsideCodes[outsideIndices]])
+        return entryIndices, keyCodes
+
+    def _getKeyCodeTables(self) -> (np.ndarray, np.ndarray):
+        """ Lookup tables from the 16-bit log keys to the key code of the inside and outside datapoints, or -1 when
+        there is no such datapoint (unused entries, crossings without outside solid or solids that are not logged). """
+        insideCodes = np.full(2 ** 16, -1, dtype=np.int64)
+        outsideCodes = np.full(2 ** 16, -1, dtype=np.int64)
+
+        solidIDs = np.arange(NO_SOLID_ID, self._sceneCL.nSolidIDs + FIRST_SOLID_ID)
+        solidIDs = solidIDs[solidIDs != NO_LOG_ID]
+        insideCodes[solidIDs + SOLID_LOG_KEY_OFFSET] = self._getKeyCodes(solidIDs, NO_SURFACE_ID)
+
+        insideSolidIDs, outsideSolidIDs = self._sceneCL.getSurfaceSolidIDs()
+        surfaceIDs = np.arange(len(insideSolidIDs))
+        loggedSolids = self._sceneCL.getLoggedSolidMask()
+        isInsideLogged = loggedSolids[insideSolidIDs + 1]
+        isOutsideLogged = (outsideSolidIDs != NO_SOLID_ID) & loggedSolids[outsideSolidIDs + 1]
+        insideCodes[CROSSING_LOG_KEY + surfaceIDs[isInsideLogged]] = \
+            self._getKeyCodes(insideSolidIDs[isInsideLogged], surfaceIDs[isInsideLogged])
+        outsideCodes[CROSSING_LOG_KEY + surfaceIDs[isOutsideLogged]] = \
+            self._getKeyCodes(outsideSolidIDs[isOutsideLogged], surfaceIDs[isOutsideLogged])
+        return insideCodes, outsideCodes
+
+    def _getKeyCodes(self, solidIDs, surfaceIDs):
+        return (solidIDs - NO_SOLID_ID) * self._nSurfaceCodes + (surfaceIDs - NO_SURFACE_ID)
+
+    def _getIDs(self, keyCode: int) -> (int, int):
+        solidCode, surfaceCode = divmod(int(keyCode), self._nSurfaceCodes)
+        return solidCode + NO_SOLID_ID, surfaceCode + NO_SURFACE_ID
 
     def _getInteractionKey(self, solidID: int, surfaceID: int):
         return InteractionKey(self._sceneCL.getSolidLabel(solidID), self._sceneCL.getSurfaceLabel(solidID, surfaceID))
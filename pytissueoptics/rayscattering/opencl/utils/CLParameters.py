@@ -1,11 +1,11 @@
 import psutil
 import numpy as np
 
-from pytissueoptics.rayscattering.opencl.buffers import DataPointCL
+from pytissueoptics.rayscattering.opencl.buffers import LogCL
 from pytissueoptics.rayscattering.opencl import CONFIG, warnings
 
 
-DATAPOINT_SIZE = DataPointCL.getItemSize()
+LOG_ENTRY_SIZE = LogCL.getItemSize()
 
 
 class CLParameters:
@@ -25,7 +25,7 @@ class CLParameters:
         """
         avgInteractions = avgPhotonsPerBatch * avgInteractionsPerPhoton
         minInteractions = 2 * CONFIG.N_WORK_UNITS
-        batchSize = max(avgInteractions, minInteractions) * DATAPOINT_SIZE
+        batchSize = max(avgInteractions, minInteractions) * LOG_ENTRY_SIZE
         maxSize = CONFIG.MAX_MEMORY_MB * 1024**2
         return min(batchSize, maxSize)
 
@@ -45,7 +45,7 @@ class CLParameters:
 
     @property
     def maxLoggableInteractions(self):
-        return np.int32(self._maxLoggerMemory / DATAPOINT_SIZE)
+        return np.int32(self._maxLoggerMemory / LOG_ENTRY_SIZE)
 
     @property
     def maxLoggableInteractionsPerWorkItem(self):
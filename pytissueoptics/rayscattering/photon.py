@@ -1,24 +1,30 @@
 import math
 import random
-from typing import Optional
+from typing import Dict, List, Optional, Union
 
 from pytissueoptics.rayscattering.fresnel import FresnelIntersect, FresnelIntersection
+from pytissueoptics.rayscattering.loggingPolicy import LoggingPolicy, LOG_ALL
 from pytissueoptics.rayscattering.materials import ScatteringMaterial
+from pytissueoptics.rayscattering.randomStream import RandomStream
+from pytissueoptics.rayscattering.tallies import Tally
 from pytissueoptics.scene.geometry import Environment, Vector
 from pytissueoptics.scene.intersection import Ray
 from pytissueoptics.scene.intersection.intersectionFinder import IntersectionFinder, Intersection
 from pytissueoptics.scene.intersection.mollerTrumboreIntersect import EPS_CORRECTION
-from pytissueoptics.scene.logger import Logger, InteractionKey
+from pytissueoptics.scene.logger import Logger, InteractionKey, LogBuffer
 
 WORLD_LABEL = "world"
 WEIGHT_THRESHOLD = 1e-4
 
 
 class Photon:
-    def __init__(self, position: Vector, direction: Vector):
+    def __init__(self, position: Vector, direction: Vector, randomStream: RandomStream = None):
         self._position = position
         self._direction = direction
         self._weight = 1
+        self._opticalPathLength = 0
+        self._pathLengths: Dict[ScatteringMaterial, float] = {}
+        self._randomStream = randomStream
         self._environment: Environment = None
 
         self._er = self._direction.getAnyOrthogonal()
@@ -27,7 +33,9 @@ class Photon:
         self._fresnelIntersect: FresnelIntersect = None
 
         self._intersectionFinder: Optional[IntersectionFinder] = None
-        self._logger: Optional[Logger] = None
+        self._logger: Optional[Union[Logger, LogBuffer]] = None
+        self._loggingPolicy: LoggingPolicy = LOG_ALL
+        self._tallies: List[Tally] = []
 
     @property
     def isAlive(self) -> bool:
@@ -45,6 +53,16 @@ class Photon:
     def weight(self) -> float:
         return self._weight
 
+    @property
+    def opticalPathLength(self) -> float:
+        """ The distance travelled in each material times its refractive index. """
+        return self._opticalPathLength
+
+    @property
+    def pathLengths(self) -> Dict[ScatteringMaterial, float]:
+        """ The distance travelled in each material. """
+        return self._pathLengths
+
     @property
     def material(self) -> ScatteringMaterial:
         return self._environment.material
@@ -55,11 +73,14 @@ class Photon:
             return WORLD_LABEL
         return self._environment.solid.getLabel()
 
-    def setContext(self, environment: Environment, intersectionFinder: IntersectionFinder = None, logger: Logger = None,
-                   fresnelIntersect=FresnelIntersect()):
+    def setContext(self, environment: Environment, intersectionFinder: IntersectionFinder = None,
+                   logger: Union[Logger, LogBuffer] = None, fresnelIntersect=FresnelIntersect(),
+                   loggingPolicy: LoggingPolicy = None, tallies: List[Tally] = None):
         self._environment: Environment = environment
         self._intersectionFinder = intersectionFinder
         self._logger = logger
+        self._loggingPolicy = loggingPolicy or LOG_ALL
+        self._tallies = tallies or []
         self._hasContext = True
         self._fresnelIntersect = fresnelIntersect
 
@@ -74,7 +95,7 @@ class Photon:
 
     def step(self, distance=0) -> float:
         if distance == 0:
-            distance = self.material.getScatteringDistance()
+            distance = self._getScatteringDistance()
 
         intersection = self._getIntersection(distance)
 
@@ -125,6 +146,7 @@ class Photon:
         else:
             self._logIntersection(intersection)
             self.refract(fresnelIntersection)
+            self._recordCrossing(intersection)
 
             mut1 = self.material.mu_t
             mut2 = fresnelIntersection.nextEnvironment.material.mu_t
@@ -149,9 +171,25 @@ class Photon:
         return intersection.distanceLeft
 
     def _getFresnelIntersection(self, intersection: Intersection) -> FresnelIntersection:
-        return self._fresnelIntersect.compute(self._direction, intersection)
+        if self._randomStream is None:
+            return self._fresnelIntersect.compute(self._direction, intersection)
+        return self._fresnelIntersect.compute(self._direction, intersection, self._randomStream)
+
+    def _getScatteringDistance(self) -> float:
+        if self._randomStream is None:
+            return self.material.getScatteringDistance()
+        return self.material.getScatteringDistance(self._randomStream)
+
+    def _getScatteringAngles(self) -> tuple:
+        if self._randomStream is None:
+            return self.material.getScatteringAngles()
+        return self.material.getScatteringAngles(self._randomStream)
 
     def moveBy(self, distance):
+        if self._environment is not None and self.material is not None:
+            self._scoreTrack(distance)
+            self._opticalPathLength += distance * self.material.n
+            self._pathLengths[self.material] = self._pathLengths.get(self.material, 0) + distance
         self._position += self._direction * distance
 
     def reflect(self, fresnelIntersection: FresnelIntersection):
@@ -163,7 +201,7 @@ class Photon:
                                      fresnelIntersection.angleDeflection)
 
     def scatter(self):
-        theta, phi = self.material.getScatteringAngles()
+        theta, phi = self._getScatteringAngles()
         self.scatterBy(theta, phi)
         self.interact()
 
@@ -183,29 +221,63 @@ class Photon:
         chance = 0.1
         if self._weight >= WEIGHT_THRESHOLD or self._weight == 0:
             return
-        elif random.random() < chance:
+        elif (self._randomStream or random).random() < chance:
             self._weight /= chance
         else:
             self._weight = 0
 
     def _logIntersection(self, intersection: Intersection):
-        if self._logger is None:
-            return
         solidA = intersection.insideEnvironment.solid
         solidLabelA = solidA.getLabel() if solidA else None
-        key = InteractionKey(solidLabelA, intersection.surfaceLabel)
         isLeavingSurface = self._direction.dot(intersection.normal) > 0
+        self._scoreCrossing(intersection, isLeavingSurface)
+        if self._logger is None:
+            return
         sign = 1 if isLeavingSurface else -1
-        self._logger.logDataPoint(sign * self._weight, self._position, key)
+        if self._loggingPolicy.logsCrossing(solidLabelA, intersection.surfaceLabel, self._position):
+            key = InteractionKey(solidLabelA, intersection.surfaceLabel)
+            self._logger.logDataPoint(sign * self._weight, self._position, key)
 
         solidB = intersection.outsideEnvironment.solid
         if solidB is None:
             return
         solidLabelB = solidB.getLabel()
-        key = InteractionKey(solidLabelB, intersection.surfaceLabel)
-        self._logger.logDataPoint(-sign * self._weight, self._position, key)
+        if self._loggingPolicy.logsCrossing(solidLabelB, intersection.surfaceLabel, self._position):
+            key = InteractionKey(solidLabelB, intersection.surfaceLabel)
+            self._logger.logDataPoint(-sign * self._weight, self._position, key)
+
+    def _scoreCrossing(self, intersection: Intersection, isLeavingSurface: bool):
+        """ Scores the crossing for the solids on both sides of the surface. """
+        for tally in self._tallies:
+            for environment, isLeavingSolid in [(intersection.insideEnvironment, isLeavingSurface),
+                                                (intersection.outsideEnvironment, not isLeavingSurface)]:
+                if environment.solid is not None:
+                    tally.scoreCrossing(environment.solid.getLabel(), intersection.surfaceLabel, isLeavingSolid,
+                                        self._opticalPathLength, self._weight)
+
+    def _recordCrossing(self, intersection: Intersection):
+        """ Records the refracted photon for the solids on both sides of the surface. """
+        isLeavingSurface = self._direction.dot(intersection.normal) > 0
+        for tally in self._tallies:
+            for environment, isLeavingSolid in [(intersection.insideEnvironment, isLeavingSurface),
+                                                (intersection.outsideEnvironment, not isLeavingSurface)]:
+                if environment.solid is not None:
+                    tally.recordCrossing(environment.solid.getLabel(), intersection.surfaceLabel, isLeavingSolid,
+                                         self._position, self._direction, intersection.normal, self._weight,
+                                         self._pathLengths)
+
+    def _scoreTrack(self, distance):
+        for tally in self._tallies:
+            tally.scoreTrack(self.solidLabel, self._position, self._direction, distance,
+                             self._weight * self.material.mu_a)
 
     def _logWeightDecrease(self, delta):
-        if self._logger:
+        replacesAbsorption = False
+        for tally in self._tallies:
+            tally.scoreAbsorption(self.solidLabel, self._position, self._opticalPathLength, delta)
+            replacesAbsorption |= tally.replacesAbsorption(self.solidLabel)
+        if replacesAbsorption:
+            return
+        if self._logger is not None and self._loggingPolicy.logsAbsorption(self.solidLabel, self._position):
             key = InteractionKey(self.solidLabel)
             self._logger.logDataPoint(delta, self._position, key)
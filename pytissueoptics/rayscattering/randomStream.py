@@ -0,0 +1,95 @@
+"""
+Counter-based Philox4x32-10 generator shared by the CPU and OpenCL engines (see opencl/src/random.c).
+
+A stream is identified by a seed (64-bit key) and a stream ID (the global photon index). Value number n of a stream
+is lane (n % 4) of philox(counter=(n // 4, streamID, domain, 0), key). Since values only depend on these indices,
+any photon can be replayed alone and a run can be split across workers with disjoint photon index ranges.
+"""
+
+from typing import Optional, Tuple, Union
+
+import numpy as np
+
+PROPAGATION_DOMAIN = 0
+SOURCE_DOMAIN = 1
+
+_M0, _M1 = 0xD2511F53, 0xCD9E8D57
+_W0, _W1 = 0x9E3779B9, 0xBB67AE85
+_MASK = 0xFFFFFFFF
+_ROUNDS = 10
+
+
+def makeSeed(seed: Optional[int] = None) -> int:
+    """ Returns a 64-bit seed. Draws one from numpy's global generator when no seed is given. """
+    if seed is None:
+        return int(np.random.randint(0, 2 ** 32, dtype=np.uint64)) << 32 | \
+               int(np.random.randint(0, 2 ** 32, dtype=np.uint64))
+    return int(seed) & 0xFFFFFFFFFFFFFFFF
+
+
+def getKey(seed: int) -> Tuple[int, int]:
+    return seed & _MASK, (seed >> 32) & _MASK
+
+
+def philox4x32(counters: np.ndarray, key: Tuple[int, int]) -> np.ndarray:
+    """ Vectorized Philox4x32-10. Takes (N, 4) counters and returns (N, 4) uint32 random words. """
+    c = np.asarray(counters, dtype=np.uint64).reshape(-1, 4).T.copy()
+    k0, k1 = np.uint64(key[0]), np.uint64(key[1])
+    mask, shift = np.uint64(_MASK), np.uint64(32)
+    for _ in range(_ROUNDS):
+        p0 = c[0] * np.uint64(_M0)
+        p1 = c[2] * np.uint64(_M1)
+        c = np.stack([(p1 >> shift) ^ c[1] ^ k0, p1 & mask,
+                      (p0 >> shift) ^ c[3] ^ k1, p0 & mask])
+        k0 = (k0 + np.uint64(_W0)) & mask
+        k1 = (k1 + np.uint64(_W1)) & mask
+    return c.T.astype(np.uint32)
+
+
+def toUniformFloat(bits: Union[np.ndarray, int]) -> Union[np.ndarray, float]:
+    """ Maps 32-bit words to (0, 1] using their 24 most significant bits, exactly like the OpenCL kernel. """
+    return ((np.asarray(bits, dtype=np.uint32) >> np.uint32(8)).astype(np.float64) + 1) / 2 ** 24
+
+
+def sampleUniforms(seed: int, streamIDs: np.ndarray, domain: int, block: int = 0) -> np.ndarray:
+    """ Returns 4 uniform values in (0, 1] per stream ID from the given counter domain. Shape (N, 4). """
+    streamIDs = np.asarray(streamIDs, dtype=np.uint64)
+    counters = np.zeros((streamIDs.size, 4), dtype=np.uint64)
+    counters[:, 0] = block
+    counters[:, 1] = streamIDs
+    counters[:, 2] = domain
+    return toUniformFloat(philox4x32(counters, getKey(seed)))
+
+
+def _philox4x32Scalar(c0: int, c1: int, c2: int, c3: int, k0: int, k1: int) -> Tuple[int, int, int, int]:
+    for _ in range(_ROUNDS):
+        p0 = _M0 * c0
+        p1 = _M1 * c2
+        c0, c1, c2, c3 = (p1 >> 32) ^ c1 ^ k0, p1 & _MASK, (p0 >> 32) ^ c3 ^ k1, p0 & _MASK
+        k0 = (k0 + _W0) & _MASK
+        k1 = (k1 + _W1) & _MASK
+    return c0, c1, c2, c3
+
+
+class RandomStream:
+    """
+    Random stream of a single photon. Implements `random()` so it can stand in for the `random` module.
+    Yields the same sequence as the OpenCL kernel for the same seed and stream ID.
+    """
+    def __init__(self, seed: int, streamID: int, counter: int = 0):
+        self._key = getKey(seed)
+        self._streamID = streamID & _MASK
+        self._counter = counter
+        self._block = None
+
+    @property
+    def counter(self) -> int:
+        return self._counter
+
+    def random(self) -> float:
+        n = self._counter
+        lane = n & 3
+        if lane == 0 or self._block is None:
+            self._block = _philox4x32Scalar(n >> 2, self._streamID, PROPAGATION_DOMAIN, 0, *self._key)
+        self._counter = n + 1
+        return ((self._block[lane] >> 8) + 1) / 2 ** 24
@@ -5,14 +5,17 @@ import numpy as np
 
 from pytissueoptics.rayscattering import utils
 from pytissueoptics.rayscattering.energyLogging import EnergyLogger
-from pytissueoptics.rayscattering.opencl.CLPhotons import CLPhotons
+from pytissueoptics.rayscattering.loggingPolicy import LoggingPolicy, LOG_ALL
+from pytissueoptics.rayscattering.opencl.CLPhotons import CLPhotons, PropagationMode
 from pytissueoptics.rayscattering.scatteringScene import ScatteringScene
 from pytissueoptics.rayscattering.photon import Photon
+from pytissueoptics.rayscattering.randomStream import RandomStream, makeSeed, sampleUniforms, SOURCE_DOMAIN
+from pytissueoptics.rayscattering.tallies import Tally, TrackLengthTally
 from pytissueoptics.rayscattering.opencl import IPPTable, CONFIG, validateOpenCL, warnings
 from pytissueoptics.scene.solids import Sphere
 from pytissueoptics.scene.geometry import Vector, Environment
 from pytissueoptics.scene.intersection import FastIntersectionFinder
-from pytissueoptics.scene.logger import Logger
+from pytissueoptics.scene.logger import Logger, LogBuffer, InteractionKey
 from pytissueoptics.scene.solids.cone import Cone
 from pytissueoptics.scene.solids.cylinder import Cylinder
 from pytissueoptics.scene.utils import progressBar
@@ -21,9 +24,24 @@ from pytissueoptics.scene.viewer import Displayable
 
 
 class Source(Displayable):
-    def __init__(self, position: Vector, N: int, useHardwareAcceleration: bool = True, displaySize: float = 0.1):
+    def __init__(self, position: Vector, N: int, useHardwareAcceleration: bool = True, displaySize: float = 0.1,
+                 seed: int = None, firstPhotonID: int = 0,
+                 propagationMode: PropagationMode = PropagationMode.MEGAKERNEL, quantizeLogPositions: bool = False):
+        """
+        Photons are sampled and propagated from counter-based random streams indexed by the photon ID. A given seed
+        thus yields the same photons with or without hardware acceleration. To split a simulation across multiple
+        runs, use the same seed and disjoint photon ID ranges (`firstPhotonID`).
+
+        The `propagationMode` selects the OpenCL scheduler used with hardware acceleration. With
+        `quantizeLogPositions`, the OpenCL device log stores 16-bit positions relative to the scene bounding box, which
+        halves the bytes transferred per interaction (see LogCL).
+        """
         self._position = position
         self._N = N
+        self._seed = makeSeed(seed)
+        self._firstPhotonID = firstPhotonID
+        self._propagationMode = propagationMode
+        self._quantizeLogPositions = quantizeLogPositions
         self._photons: Union[List[Photon], CLPhotons] = []
         self._environment = None
         self.displaySize = displaySize
@@ -34,29 +52,46 @@ class Source(Displayable):
 
         self._loadPhotons()
 
-    def propagate(self, scene: ScatteringScene, logger: Logger = None, showProgress: bool = True):
+    def propagate(self, scene: ScatteringScene, logger: Logger = None, showProgress: bool = True,
+                  loggingPolicy: LoggingPolicy = None, tallies: List[Tally] = None):
+        """
+        Propagates all photons in the scene and logs their interactions to the given logger. An optional
+        `loggingPolicy` restricts the logged interactions to specific event types, solids, surfaces or regions.
+        The given `tallies` are accumulated during the propagation, independently of the logger and its policy.
+        The energy estimated by a `TrackLengthTally` during the propagation is logged in place of the interactions
+        of its solid.
+        """
         self._environment = scene.getEnvironmentAt(self._position)
         self._prepareLogger(logger)
+        trackLengthTallies = [tally for tally in tallies or [] if isinstance(tally, TrackLengthTally)]
+        previousData = [tally.data.copy() for tally in trackLengthTallies]
 
         if self._useHardwareAcceleration:
-            IPP = self._getAverageInteractionsPerPhoton(scene)
-            self._propagateOpenCL(IPP, scene, logger, showProgress)
-            self._updateIPP(scene, logger)
+            IPP = self._getAverageInteractionsPerPhoton(scene, loggingPolicy)
+            self._propagateOpenCL(IPP, scene, logger, showProgress, loggingPolicy, tallies)
+            self._updateIPP(scene, logger, loggingPolicy)
         else:
-            self._propagateCPU(scene, logger, showProgress)
+            self._propagateCPU(scene, logger, showProgress, loggingPolicy, tallies)
 
+        self._logTrackLengthTallies(logger, trackLengthTallies, previousData, loggingPolicy)
         self._saveLogger(logger)
 
-    def _propagateCPU(self, scene: ScatteringScene, logger: Logger = None, showProgress: bool = True):
+    def _propagateCPU(self, scene: ScatteringScene, logger: Logger = None, showProgress: bool = True,
+                      loggingPolicy: LoggingPolicy = None, tallies: List[Tally] = None):
         if showProgress:
             print(f"Propagating {self._N} photons without hardware acceleration...")
         intersectionFinder = FastIntersectionFinder(scene)
+        logBuffer = None if logger is None else LogBuffer(logger)
 
         for i in progressBar(range(self._N), desc="Propagating photons", disable=not showProgress):
-            self._photons[i].setContext(self._environment, intersectionFinder=intersectionFinder, logger=logger)
+            self._photons[i].setContext(self._environment, intersectionFinder=intersectionFinder, logger=logBuffer,
+                                        loggingPolicy=loggingPolicy, tallies=tallies)
             self._photons[i].propagate()
 
-    def _getAverageInteractionsPerPhoton(self, scene: ScatteringScene) -> float:
+        if logBuffer is not None:
+            logBuffer.flush()
+
+    def _getAverageInteractionsPerPhoton(self, scene: ScatteringScene, loggingPolicy: LoggingPolicy = None) -> float:
         """
         Returns the average number of interactions per photon (IPP) for a given experiment (scene and source
         combination). This is used to optimize the hardware accelerated kernel (OpenCL).
@@ -65,18 +100,23 @@ class Source(Displayable):
         propagating 1000 photons (using a gross estimate of the IPP by assuming an infinite medium of mean scene
         albedo). The measured IPP is stored in the hash table for future use and updated (cumulative average) after
         each propagation.
+
+        With a logging policy, only the logged interactions are counted, so the IPP of each policy is stored
+        separately.
         """
-        experimentHash = self._getExperimentHash(scene)
+        experimentHash = self._getExperimentHash(scene, loggingPolicy)
 
         if experimentHash not in IPPTable():
-            self._measureIPP(scene)
+            self._measureIPP(scene, loggingPolicy)
 
         return IPPTable().getIPP(experimentHash)
 
-    def _getExperimentHash(self, scene: ScatteringScene) -> int:
-        return hash((scene, self))
+    def _getExperimentHash(self, scene: ScatteringScene, loggingPolicy: LoggingPolicy = None) -> int:
+        if loggingPolicy is None:
+            return hash((scene, self))
+        return hash((scene, self, loggingPolicy))
 
-    def _measureIPP(self, scene: ScatteringScene):
+    def _measureIPP(self, scene: ScatteringScene, loggingPolicy: LoggingPolicy = None):
         warnings.warn("This experiment was not seen before. The program will need to estimate the average interactions "
                       "per photon (IPP). \n... Estimating IPP]")
 
@@ -86,26 +126,28 @@ class Source(Displayable):
         self._loadPhotons()
         tempLogger = Logger()
         estimatedIPP = scene.getEstimatedIPP(CONFIG.WEIGHT_THRESHOLD)
-        self._propagateOpenCL(estimatedIPP, scene, tempLogger, showProgress=False)
-        self._updateIPP(scene, tempLogger)
+        self._propagateOpenCL(estimatedIPP, scene, tempLogger, showProgress=False, loggingPolicy=loggingPolicy)
+        self._updateIPP(scene, tempLogger, loggingPolicy)
 
         self._N = tempN
         self._loadPhotons()
 
         warnings.warn(f"... [IPP test took {time.time() - t0:.2f}s]")
 
-    def _updateIPP(self, scene: ScatteringScene, logger: Logger = None):
+    def _updateIPP(self, scene: ScatteringScene, logger: Logger = None, loggingPolicy: LoggingPolicy = None):
         if logger is None:
             return
         measuredIPP = logger.nDataPoints / self._N
         table = IPPTable()
-        table.updateIPP(self._getExperimentHash(scene), self._N, measuredIPP)
+        table.updateIPP(self._getExperimentHash(scene, loggingPolicy), self._N, measuredIPP)
 
     def _propagateOpenCL(self, IPP: float, scene: ScatteringScene, logger: Logger = None,
-                         showProgress: bool = True):
+                         showProgress: bool = True, loggingPolicy: LoggingPolicy = None,
+                         tallies: List[Tally] = None):
         if showProgress:
             print(f"Propagating {self._N} photons with hardware acceleration on device {CONFIG.device.name}...")
-        self._photons.setContext(scene, self._environment, logger=logger)
+        self._photons.setContext(scene, self._environment, logger=logger, loggingPolicy=loggingPolicy,
+                                 tallies=tallies)
         self._photons.propagate(IPP=IPP, verbose=showProgress)
 
     def getInitialPositionsAndDirections(self) -> Tuple[np.ndarray, np.ndarray]:
@@ -113,6 +155,12 @@ class Source(Displayable):
         initial positions and normalized directions of the photons as (N, 3) numpy arrays. """
         raise NotImplementedError
 
+    def _getRandomUniforms(self) -> np.ndarray:
+        """ Returns 4 uniform random values in (0, 1] per photon as a (N, 4) array. The values only depend on the
+        seed and the photon ID, so subclasses can request them multiple times. """
+        photonIDs = np.arange(self._firstPhotonID, self._firstPhotonID + self._N)
+        return sampleUniforms(self._seed, photonIDs, SOURCE_DOMAIN)
+
     def _loadPhotons(self):
         if self._useHardwareAcceleration:
             self._loadPhotonsOpenCL()
@@ -122,11 +170,14 @@ class Source(Displayable):
     def _loadPhotonsCPU(self):
         positions, directions = self.getInitialPositionsAndDirections()
         for i in range(self._N):
-            self._photons.append(Photon(Vector(*positions[i]), Vector(*directions[i])))
+            randomStream = RandomStream(self._seed, self._firstPhotonID + i)
+            self._photons.append(Photon(Vector(*positions[i]), Vector(*directions[i]), randomStream=randomStream))
 
     def _loadPhotonsOpenCL(self):
         positions, directions = self.getInitialPositionsAndDirections()
-        self._photons = CLPhotons(positions, directions)
+        self._photons = CLPhotons(positions, directions, seed=self._seed, firstPhotonID=self._firstPhotonID,
+                                  propagationMode=self._propagationMode,
+                                  quantizeLogPositions=self._quantizeLogPositions)
 
     def _prepareLogger(self, logger: Optional[Logger]):
         if logger is None:
@@ -144,6 +195,9 @@ class Source(Displayable):
         sourceSolid = self._environment.solid
         logger.info["sourceSolidLabel"] = sourceSolid.getLabel() if sourceSolid else None
 
+        if "seed" not in logger.info:
+            logger.info["seed"] = self._seed
+
         if "sourceHash" not in logger.info:
             logger.info["sourceHash"] = hash(self)
         else:
@@ -151,6 +205,20 @@ class Source(Displayable):
                 utils.warn("WARNING: The logger was previously used with a different source. This may corrupt "
                            "statistics and visualization. Proceed at your own risk.")
 
+    @staticmethod
+    def _logTrackLengthTallies(logger: Optional[Logger], tallies: List[TrackLengthTally],
+                               previousData: List[np.ndarray], loggingPolicy: LoggingPolicy = None):
+        """ Logs the energy estimated during the propagation at the center of the voxels, with the interaction key
+        of the solid of each tally. Like the absorption interactions, the voxels are filtered by the logging policy. """
+        if logger is None:
+            return
+        loggingPolicy = loggingPolicy or LOG_ALL
+        for tally, data in zip(tallies, previousData):
+            dataPoints = tally.getDataPoints(tally.data - data)
+            dataPoints = dataPoints[loggingPolicy.getAbsorptionMask(tally.solidLabel, dataPoints[:, 1:])]
+            if len(dataPoints) > 0:
+                logger.logDataPointArray(dataPoints, InteractionKey(tally.solidLabel))
+
     def _saveLogger(self, logger: Logger):
         if logger is None:
             return
@@ -164,6 +232,10 @@ class Source(Displayable):
     def getPhotonCount(self) -> int:
         return self._N
 
+    @property
+    def seed(self) -> int:
+        return self._seed
+
     def addToViewer(self, viewer: MayaviViewer, representation='surface', colormap='Wistia', opacity=1.0, **kwargs):
         sphere = Sphere(radius=self.displaySize/2, position=self._position)
         viewer.add(sphere, representation=representation, colormap=colormap, opacity=opacity, **kwargs)
@@ -182,7 +254,9 @@ class Source(Displayable):
 
 class DirectionalSource(Source):
     def __init__(self, position: Vector, direction: Vector, diameter: float, N: int,
-                 useHardwareAcceleration: bool = True, displaySize: float = 0.1):
+                 useHardwareAcceleration: bool = True, displaySize: float = 0.1, seed: int = None,
+                 firstPhotonID: int = 0, propagationMode: PropagationMode = PropagationMode.MEGAKERNEL,
+                 quantizeLogPositions: bool = False):
         self._diameter = diameter
         self._direction = direction
         self._direction.normalize()
@@ -190,7 +264,9 @@ class DirectionalSource(Source):
         self._xAxis.normalize()
         self._yAxis = self._direction.cross(self._xAxis)
         self._yAxis.normalize()
-        super().__init__(position=position, N=N, useHardwareAcceleration=useHardwareAcceleration, displaySize=displaySize)
+        super().__init__(position=position, N=N, useHardwareAcceleration=useHardwareAcceleration,
+                         displaySize=displaySize, seed=seed, firstPhotonID=firstPhotonID,
+                         propagationMode=propagationMode, quantizeLogPositions=quantizeLogPositions)
 
     def getInitialPositionsAndDirections(self) -> Tuple[np.ndarray, np.ndarray]:
         positions = self._getInitialPositions()
@@ -211,13 +287,14 @@ class DirectionalSource(Source):
         viewer.add(base, arrow, representation=representation, colormap=colormap, opacity=opacity, **kwargs)
 
     def _getInitialPositions(self):
-        return self._getUniformlySampledDisc(self._diameter) + self._position.array
+        randomPairs = self._getRandomUniforms()[:, 0:2]
+        return self._getUniformlySampledDisc(self._diameter, randomPairs) + self._position.array
 
-    def _getUniformlySampledDisc(self, diameter) -> np.ndarray:
+    def _getUniformlySampledDisc(self, diameter, randomPairs: np.ndarray) -> np.ndarray:
         # The square root method was used, since the rejection method was slower in numpy because of index lookup.
         # https://stackoverflow.com/questions/5837572/generate-a-random-point-within-a-circle-uniformly
-        r = diameter / 2 * np.sqrt(np.random.random((self._N, 1)))
-        theta = np.random.random((self._N, 1)) * 2 * np.pi
+        r = diameter / 2 * np.sqrt(randomPairs[:, 0:1])
+        theta = randomPairs[:, 1:2] * 2 * np.pi
         x = r * np.cos(theta)
         y = r * np.sin(theta)
         x = np.tile(x, (1, 3))
@@ -239,16 +316,23 @@ class DirectionalSource(Source):
 
 
 class PencilPointSource(DirectionalSource):
-    def __init__(self, position: Vector, direction: Vector, N: int, useHardwareAcceleration: bool = True, displaySize: float = 0.1):
+    def __init__(self, position: Vector, direction: Vector, N: int, useHardwareAcceleration: bool = True, displaySize: float = 0.1,
+                 seed: int = None, firstPhotonID: int = 0,
+                 propagationMode: PropagationMode = PropagationMode.MEGAKERNEL, quantizeLogPositions: bool = False):
         super().__init__(position=position, direction=direction, diameter=0, N=N,
-                         useHardwareAcceleration=useHardwareAcceleration, displaySize=displaySize)
+                         useHardwareAcceleration=useHardwareAcceleration, displaySize=displaySize, seed=seed,
+                         firstPhotonID=firstPhotonID, propagationMode=propagationMode,
+                         quantizeLogPositions=quantizeLogPositions)
 
 
 class IsotropicPointSource(Source):
     def getInitialPositionsAndDirections(self) -> Tuple[np.ndarray, np.ndarray]:
         positions = np.full((self._N, 3), self._position.array)
-        directions = np.random.randn(self._N, 3)
-        directions /= np.linalg.norm(directions, axis=1, keepdims=True)
+        randoms = self._getRandomUniforms()
+        cosTheta = 2 * randoms[:, 0] - 1
+        sinTheta = np.sqrt(1 - cosTheta ** 2)
+        phi = 2 * np.pi * randoms[:, 1]
+        directions = np.stack([sinTheta * np.cos(phi), sinTheta * np.sin(phi), cosTheta], axis=1)
         return positions, directions
 
     @property
@@ -258,15 +342,20 @@ class IsotropicPointSource(Source):
 
 class DivergentSource(DirectionalSource):
     def __init__(self, position: Vector, direction: Vector, diameter: float, divergence: float, N: int,
-                 useHardwareAcceleration: bool = True, displaySize: float = 0.1):
+                 useHardwareAcceleration: bool = True, displaySize: float = 0.1, seed: int = None,
+                 firstPhotonID: int = 0, propagationMode: PropagationMode = PropagationMode.MEGAKERNEL,
+                 quantizeLogPositions: bool = False):
         self._divergence = divergence
 
         super().__init__(position=position, direction=direction, diameter=diameter, N=N,
-                         useHardwareAcceleration=useHardwareAcceleration, displaySize=displaySize)
+                         useHardwareAcceleration=useHardwareAcceleration, displaySize=displaySize, seed=seed,
+                         firstPhotonID=firstPhotonID, propagationMode=propagationMode,
+                         quantizeLogPositions=quantizeLogPositions)
 
     def _getInitialDirections(self):
         thetaDiameter = np.tan(self._divergence/2) * 2
-        directions = self._getUniformlySampledDisc(thetaDiameter)
+        randomPairs = self._getRandomUniforms()[:, 2:4]
+        directions = self._getUniformlySampledDisc(thetaDiameter, randomPairs)
         directions += self._direction.array
         directions /= np.linalg.norm(directions, axis=1, keepdims=True)
         return directions
@@ -1,6 +1,6 @@
 import os
 from dataclasses import dataclass
-from typing import Dict
+from typing import Dict, Iterable, Iterator, Optional
 
 import numpy as np
 
@@ -9,6 +9,7 @@ from pytissueoptics.rayscattering.display.views.defaultViews import View2DProjec
 from pytissueoptics.rayscattering.energyLogging import EnergyLogger
 from pytissueoptics.rayscattering.opencl.CLScene import NO_SOLID_LABEL
 from pytissueoptics.rayscattering.energyLogging import PointCloud, PointCloudFactory
+from pytissueoptics.scene.logger import InteractionKey
 
 
 @dataclass
@@ -28,6 +29,7 @@ class Stats:
     def __init__(self, logger: EnergyLogger):
         self._logger = logger
         self._pointCloudFactory = PointCloudFactory(logger)
+        self._useEnergyTotals = logger.hasEnergyTotals
         self._extractFromViews = not logger.has3D
 
         self._photonCount = logger.info["photonCount"]
@@ -102,15 +104,22 @@ class Stats:
         return reportString
 
     def getAbsorbance(self, solidLabel: str, useTotalEnergy=False) -> float:
+        if self._useEnergyTotals:
+            energyInput = self.getEnergyInput(solidLabel) if not useTotalEnergy else self.getPhotonCount()
+            return 100 * self._logger.getEnergyTotal(InteractionKey(solidLabel)) / energyInput
         if self._extractFromViews:
             return self._getAbsorbanceFromViews(solidLabel, useTotalEnergy)
-        points = self._getPointCloud(solidLabel).solidPoints
+        points = (pointCloud.solidPoints for pointCloud in self._getPointCloudChunks(solidLabel))
         energyInput = self.getEnergyInput(solidLabel) if not useTotalEnergy else self.getPhotonCount()
         return 100 * self._sumEnergy(points) / energyInput
 
     def _getAbsorbanceFromViews(self, solidLabel: str, useTotalEnergy=False) -> float:
         energyInput = self.getEnergyInput(solidLabel) if not useTotalEnergy else self.getPhotonCount()
-        absorbedEnergy = self._getAbsorbedEnergyFromViews(solidLabel)
+        voxelGrid = self._logger.getVoxelGrid(solidLabel)
+        if voxelGrid is not None:
+            absorbedEnergy = voxelGrid.getSum()
+        else:
+            absorbedEnergy = self._getAbsorbedEnergyFromViews(solidLabel)
         return 100 * absorbedEnergy / energyInput
 
     def _getAbsorbedEnergyFromViews(self, solidLabel: str) -> float:
@@ -142,15 +151,26 @@ class Stats:
     def getEnergyInput(self, solidLabel: str = None) -> float:
         if solidLabel is None:
             return self.getPhotonCount()
+        if self._useEnergyTotals:
+            return self._getEnergyCrossingSolidFromTotals(solidLabel, leaving=False)
         if self._extractFromViews:
             return self._getEnergyInputFromViews(solidLabel)
-        points = self._getPointCloudOfSurfaces(solidLabel).enteringSurfacePoints
+        points = (pointCloud.enteringSurfacePoints for pointCloud in self._getPointCloudOfSurfacesChunks(solidLabel))
         energy = self._sumEnergy(points)
 
         if utils.labelsEqual(self._sourceSolidLabel, solidLabel):
             energy += self.getPhotonCount()
         return energy
 
+    def _getEnergyCrossingSolidFromTotals(self, solidLabel: str, leaving: bool) -> float:
+        energy = 0
+        for surfaceLabel in self._logger.getSeenSurfaceLabels(solidLabel):
+            energy += self._logger.getEnergyTotal(InteractionKey(solidLabel, surfaceLabel), leaving=leaving)
+
+        if utils.labelsEqual(self._sourceSolidLabel, solidLabel) and not leaving:
+            energy += self.getPhotonCount()
+        return energy
+
     def _getEnergyInputFromViews(self, solidLabel: str) -> float:
         return self._getEnergyCrossingSolidFromViews(solidLabel, leaving=False)
 
@@ -190,13 +210,21 @@ class Stats:
     def getTransmittance(self, solidLabel: str, surfaceLabel: str = None, useTotalEnergy=False):
         """ Uses local energy input for the desired solid by default. Specify 'useTotalEnergy' = True
         to compare instead with total input energy of the scene. """
+        if self._useEnergyTotals:
+            if surfaceLabel is None:
+                energyLeaving = self._getEnergyCrossingSolidFromTotals(solidLabel, leaving=True)
+            else:
+                energyLeaving = self._logger.getEnergyTotal(InteractionKey(solidLabel, surfaceLabel), leaving=True)
+            energyInput = self.getEnergyInput(solidLabel) if not useTotalEnergy else self.getPhotonCount()
+            return 100 * energyLeaving / energyInput
         if self._extractFromViews:
             return self._getTransmittanceFromViews(solidLabel, surfaceLabel, useTotalEnergy)
 
         if surfaceLabel is None:
-            points = self._getPointCloudOfSurfaces(solidLabel).leavingSurfacePoints
+            pointClouds = self._getPointCloudOfSurfacesChunks(solidLabel)
         else:
-            points = self._getPointCloud(solidLabel, surfaceLabel).leavingSurfacePoints
+            pointClouds = self._getPointCloudChunks(solidLabel, surfaceLabel)
+        points = (pointCloud.leavingSurfacePoints for pointCloud in pointClouds)
 
         energyInput = self.getEnergyInput(solidLabel) if not useTotalEnergy else self.getPhotonCount()
         return 100 * self._sumEnergy(points) / energyInput
@@ -211,14 +239,14 @@ class Stats:
         return 100 * energyLeaving / energyInput
 
     @staticmethod
-    def _sumEnergy(points: np.ndarray):
-        return np.abs(np.sum(points[:, 0])) if points is not None else 0
+    def _sumEnergy(pointChunks: Iterable[Optional[np.ndarray]]):
+        return np.abs(sum(np.sum(points[:, 0]) for points in pointChunks if points is not None))
 
-    def _getPointCloud(self, solidLabel: str = None, surfaceLabel: str = None) -> PointCloud:
-        return self._pointCloudFactory.getPointCloud(solidLabel, surfaceLabel)
+    def _getPointCloudChunks(self, solidLabel: str = None, surfaceLabel: str = None) -> Iterator[PointCloud]:
+        return self._pointCloudFactory.getPointCloudChunks(solidLabel, surfaceLabel)
 
-    def _getPointCloudOfSurfaces(self, solidLabel: str = None) -> PointCloud:
-        return self._pointCloudFactory.getPointCloudOfSurfaces(solidLabel)
+    def _getPointCloudOfSurfacesChunks(self, solidLabel: str = None) -> Iterator[PointCloud]:
+        return self._pointCloudFactory.getPointCloudOfSurfacesChunks(solidLabel)
 
     @staticmethod
     def _saveReport(report: str, filepath: str = None):
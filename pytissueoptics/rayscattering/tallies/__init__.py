@@ -0,0 +1,7 @@
+from .tally import Tally
+from .timeResolvedTally import TimeResolvedTally, SPEED_OF_LIGHT
+from .trackLengthTally import TrackLengthTally
+from .detector import Detector
+from .radialTally import RadialTally
+from .cylindricalTally import CylindricalTally
+from .radialAngularTally import RadialAngularTally
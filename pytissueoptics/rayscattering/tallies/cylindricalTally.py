@@ -0,0 +1,76 @@
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from pytissueoptics.rayscattering.tallies.radialTally import RadialTally
+from pytissueoptics.scene.geometry import Vector
+
+
+class CylindricalTally(RadialTally):
+    def __init__(self, maxRadius: float, radialBins: int, depthLimits: Tuple[float, float], depthBins: int,
+                 solidLabels: List[str] = None, center: Vector = None, axis: Vector = None):
+        """
+        Cylindrical grid A(r, z) of the weight absorbed at the interactions, like the absorption output of MCML. The
+        radius r is the distance to the axis and the depth z is the distance along the axis from the center. The grid
+        is accumulated during the propagation by the CPU and OpenCL engines (see `Source.propagate`), so it does not
+        require logging the interactions. The absorbed energy density of a layered tissue is `getDensity(nPhotons)`.
+
+        :param maxRadius: The radius of the grid. The weight absorbed farther from the axis is ignored.
+        :param radialBins: The number of radial bins.
+        :param depthLimits: The (min, max) depth of the grid along the axis.
+        :param depthBins: The number of depth bins.
+        :param solidLabels: (Optional) The solids of the tally, for instance the layers of a stack of cuboids
+            (see `Solid.getLayerLabels`). The world material is labeled "world". Defaults to every solid.
+        :param center: The origin of the depths, on the axis, like the center of the top surface of a stack.
+            Defaults to the origin.
+        :param axis: The direction of the depths. Defaults to the z axis, the depth axis of a stack of cuboids.
+        """
+        super().__init__(maxRadius, radialBins, depthBins, center, axis)
+        self._depthLimits = (min(depthLimits), max(depthLimits))
+        self._depthBins = depthBins
+        self._solidLabels = None if solidLabels is None else list(solidLabels)
+
+    @property
+    def depthLimits(self) -> Tuple[float, float]:
+        return self._depthLimits
+
+    @property
+    def depthBins(self) -> int:
+        return self._depthBins
+
+    @property
+    def depthBinEdges(self) -> np.ndarray:
+        return np.linspace(*self._depthLimits, self._depthBins + 1)
+
+    @property
+    def depths(self) -> np.ndarray:
+        """ The depth at the center of each depth bin. """
+        edges = self.depthBinEdges
+        return (edges[:-1] + edges[1:]) / 2
+
+    @property
+    def solidLabels(self) -> Optional[List[str]]:
+        return self._solidLabels
+
+    def detectsAbsorption(self, solidLabel: str) -> bool:
+        return self._solidLabels is None or solidLabel in self._solidLabels
+
+    def scoreAbsorption(self, solidLabel: str, position: Vector, opticalPathLength: float, weight: float):
+        if not self.detectsAbsorption(solidLabel):
+            return
+        radialBin = self._getRadialBin(position)
+        if radialBin is None:
+            return
+        depthMin, depthMax = self._depthLimits
+        z = ((position - self._center).dot(self._axis) - depthMin) * self._depthBins / (depthMax - depthMin)
+        if 0 <= z < self._depthBins:
+            self._data[radialBin, int(z)] += weight
+
+    def getDensity(self, nPhotons: int = 1) -> np.ndarray:
+        """ The weight absorbed per unit volume in each bin, per photon (A(r, z) of MCML). """
+        volumes = self.ringAreas[:, None] * np.diff(self.depthBinEdges)[None, :]
+        return self._data / volumes / nPhotons
+
+    def getDepthProfile(self, nPhotons: int = 1) -> np.ndarray:
+        """ The weight absorbed per unit depth, per photon (A(z) of MCML). """
+        return self._data.sum(axis=0) / np.diff(self.depthBinEdges) / nPhotons
@@ -0,0 +1,159 @@
+import math
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from pytissueoptics.rayscattering.materials import ScatteringMaterial
+from pytissueoptics.rayscattering.tallies.tally import Tally
+from pytissueoptics.scene.geometry import Vector
+
+
+class Detector(Tally):
+    def __init__(self, solidLabel: str, surfaceLabel: str, surfaceEnergyLeaving: bool = True, axis: Vector = None,
+                 acceptanceAngle: float = math.pi / 2, center: Vector = None, radius: float = None):
+        """
+        Exit-state detector on a surface of a solid, like an optical fiber or the pupil of a camera. Each photon
+        crossing the surface inside the aperture and the acceptance cone of the detector is recorded with its position,
+        its direction after refraction, its weight and the distance it travelled in each material. These partial path
+        lengths allow perturbation Monte Carlo: the weight of a record for a change `delta_mu_a` of the absorption
+        coefficient of a material is `weight * exp(-delta_mu_a * pathLength)`. With the OpenCL engine, the photons are
+        filtered on the device and only the records of the detected photons are transferred.
+
+        :param solidLabel: The solid of the detector. The world material is labeled "world".
+        :param surfaceLabel: A surface of the solid.
+        :param surfaceEnergyLeaving: Detect the photons leaving the solid through the surface instead of the photons
+            entering it.
+        :param axis: (Optional) Axis of the acceptance cone, pointing along the detected photons (for instance, away
+            from the tissue for a fiber collecting the reflected light). Defaults to the normal of the surface at the
+            crossing, oriented along the photon.
+        :param acceptanceAngle: Half-angle of the acceptance cone, in radians. For a fiber of numerical aperture NA
+            in a medium of refractive index n, it is asin(NA / n). Defaults to pi/2, which accepts every photon around
+            the normal of the surface.
+        :param center: (Optional) Center of the aperture. Requires a radius.
+        :param radius: (Optional) Only detect the photons crossing the surface within this distance of the center.
+        """
+        assert (center is None) == (radius is None), "An aperture requires both a center and a radius."
+        super().__init__(0)
+        self._solidLabel = solidLabel
+        self._surfaceLabel = surfaceLabel
+        self._surfaceEnergyLeaving = surfaceEnergyLeaving
+        self._axis = None
+        if axis is not None:
+            self._axis = axis.copy()
+            self._axis.normalize()
+        self._acceptanceAngle = acceptanceAngle
+        self._center = center
+        self._radius = radius
+
+        self._materials: List[ScatteringMaterial] = []
+        self._records = []
+
+    @property
+    def solidLabel(self) -> str:
+        return self._solidLabel
+
+    @property
+    def surfaceLabel(self) -> str:
+        return self._surfaceLabel
+
+    @property
+    def axis(self) -> Optional[Vector]:
+        return self._axis
+
+    @property
+    def minCosine(self) -> float:
+        """ The cosine of the acceptance angle. """
+        return math.cos(self._acceptanceAngle)
+
+    @property
+    def center(self) -> Optional[Vector]:
+        return self._center
+
+    @property
+    def radius(self) -> Optional[float]:
+        return self._radius
+
+    @property
+    def materials(self) -> List[ScatteringMaterial]:
+        """ The materials of the columns of `pathLengths`. """
+        return self._materials
+
+    @property
+    def positions(self) -> np.ndarray:
+        """ The (x, y, z) position of each record on the surface. """
+        return self._getRecords()[:, 0:3]
+
+    @property
+    def directions(self) -> np.ndarray:
+        """ The (x, y, z) direction of each record, after refraction. """
+        return self._getRecords()[:, 3:6]
+
+    @property
+    def weights(self) -> np.ndarray:
+        return self._getRecords()[:, 6]
+
+    @property
+    def pathLengths(self) -> np.ndarray:
+        """ The distance travelled in each material (see `materials`) by each record. """
+        return self._getRecords()[:, 7:]
+
+    def getPathLengths(self, material: ScatteringMaterial) -> np.ndarray:
+        """ The distance travelled in the given material by each record. """
+        if material not in self._materials:
+            return np.zeros(len(self))
+        return self.pathLengths[:, self._materials.index(material)]
+
+    def __len__(self):
+        """ The number of records. """
+        return len(self._getRecords())
+
+    def detectsCrossing(self, solidLabel: str, surfaceLabel: str, isLeavingSolid: bool) -> bool:
+        """ Whether the photons crossing this surface of the solid in the given direction can be detected. """
+        return self._solidLabel == solidLabel and self._surfaceLabel == surfaceLabel and \
+            self._surfaceEnergyLeaving == isLeavingSolid
+
+    def recordCrossing(self, solidLabel: str, surfaceLabel: str, isLeavingSolid: bool, position: Vector,
+                       direction: Vector, normal: Vector, weight: float,
+                       pathLengths: Dict[ScatteringMaterial, float]):
+        if not self.detectsCrossing(solidLabel, surfaceLabel, isLeavingSolid):
+            return
+        if not self._accepts(position, direction, normal):
+            return
+        self.addRecords(np.array([position.array]), np.array([direction.array]), np.array([weight]),
+                        np.array([list(pathLengths.values())]).reshape(1, -1), list(pathLengths))
+
+    def _accepts(self, position: Vector, direction: Vector, normal: Vector) -> bool:
+        """ Same acceptance as the OpenCL kernel (see src/detectors.c). """
+        if self._axis is None:
+            cosine = abs(direction.dot(normal))
+        else:
+            cosine = direction.dot(self._axis)
+        if cosine < self.minCosine:
+            return False
+        return self._center is None or (position - self._center).getNorm() <= self._radius
+
+    def addRecords(self, positions: np.ndarray, directions: np.ndarray, weights: np.ndarray,
+                   pathLengths: np.ndarray, materials: List[ScatteringMaterial]):
+        """ Used internally to add records whose path lengths are given in the order of the given materials. """
+        for material in materials:
+            if material not in self._materials:
+                self._materials.append(material)
+        records = np.zeros((len(weights), 7 + len(self._materials)))
+        records[:, 0:3] = positions
+        records[:, 3:6] = directions
+        records[:, 6] = weights
+        records[:, [7 + self._materials.index(material) for material in materials]] = pathLengths
+        self._records.append(records)
+
+    def _getRecords(self) -> np.ndarray:
+        """ Merges the records added so far, with a path length column for each material. """
+        width = 7 + len(self._materials)
+        if len(self._records) != 1 or self._records[0].shape[1] != width:
+            records = [np.pad(chunk, ((0, 0), (0, width - chunk.shape[1]))) for chunk in self._records]
+            self._records = [np.concatenate(records, axis=0) if records else np.zeros((0, width))]
+        return self._records[0]
+
+    def clear(self):
+        super().clear()
+        self._materials = []
+        self._records = []
@@ -0,0 +1,98 @@
+import math
+from typing import Dict
+
+import numpy as np
+
+from pytissueoptics.rayscattering.materials import ScatteringMaterial
+from pytissueoptics.rayscattering.tallies.radialTally import RadialTally
+from pytissueoptics.scene.geometry import Vector
+
+
+class RadialAngularTally(RadialTally):
+    def __init__(self, solidLabel: str, surfaceLabel: str, maxRadius: float, radialBins: int, angularBins: int,
+                 surfaceEnergyLeaving: bool = True, center: Vector = None, axis: Vector = None):
+        """
+        Grid of the weight escaping through a surface, binned by the radius r of the crossing (its distance to the
+        axis) and by the angle alpha between the direction after refraction and the normal of the surface, like the
+        diffuse reflectance Rd(r, alpha) and the total transmittance Tt(r, alpha) of MCML. The grid is accumulated
+        during the propagation by the CPU and OpenCL engines (see `Source.propagate`), so it does not require logging
+        the crossings. The angular bins cover [0, pi/2].
+
+        For a stack of cuboids along z (see `Cuboid.stack`), the reflectance is scored on the front surface of the
+        first layer, for instance ("L1", "L1_front"), and the transmittance on the back surface of the last layer.
+
+        :param solidLabel: The solid of the surface, like a layer of a stack. The world material is labeled "world".
+        :param surfaceLabel: A surface of the solid.
+        :param maxRadius: The radius of the grid. The weight crossing farther from the axis is ignored.
+        :param radialBins: The number of radial bins.
+        :param angularBins: The number of angular bins.
+        :param surfaceEnergyLeaving: Score the weight leaving the solid through the surface instead of the weight
+            entering it.
+        :param center: A point of the axis, like the center of the source. Defaults to the origin.
+        :param axis: The direction of the axis. Defaults to the z axis, the depth axis of a stack of cuboids.
+        """
+        super().__init__(maxRadius, radialBins, angularBins, center, axis)
+        self._angularBins = angularBins
+        self._solidLabel = solidLabel
+        self._surfaceLabel = surfaceLabel
+        self._surfaceEnergyLeaving = surfaceEnergyLeaving
+
+    @property
+    def angularBins(self) -> int:
+        return self._angularBins
+
+    @property
+    def angleBinEdges(self) -> np.ndarray:
+        return np.linspace(0, math.pi / 2, self._angularBins + 1)
+
+    @property
+    def angles(self) -> np.ndarray:
+        """ The angle at the center of each angular bin, in radians. """
+        edges = self.angleBinEdges
+        return (edges[:-1] + edges[1:]) / 2
+
+    @property
+    def solidAngles(self) -> np.ndarray:
+        """ The solid angle of the cone section of each angular bin. """
+        return 2 * math.pi * -np.diff(np.cos(self.angleBinEdges))
+
+    @property
+    def solidLabel(self) -> str:
+        return self._solidLabel
+
+    @property
+    def surfaceLabel(self) -> str:
+        return self._surfaceLabel
+
+    def detectsCrossing(self, solidLabel: str, surfaceLabel: str, isLeavingSolid: bool) -> bool:
+        """ Whether the weight crossing this surface of the solid in the given direction is scored. """
+        return self._solidLabel == solidLabel and self._surfaceLabel == surfaceLabel and \
+            self._surfaceEnergyLeaving == isLeavingSolid
+
+    def recordCrossing(self, solidLabel: str, surfaceLabel: str, isLeavingSolid: bool, position: Vector,
+                       direction: Vector, normal: Vector, weight: float,
+                       pathLengths: Dict[ScatteringMaterial, float]):
+        if not self.detectsCrossing(solidLabel, surfaceLabel, isLeavingSolid):
+            return
+        radialBin = self._getRadialBin(position)
+        if radialBin is None:
+            return
+        self._data[radialBin, self._getAngularBin(direction, normal)] += weight
+
+    def _getAngularBin(self, direction: Vector, normal: Vector) -> int:
+        """ Same binning as the OpenCL kernel (see src/tallies.c). The angle of pi/2 is in the last bin. """
+        angle = math.acos(min(abs(direction.dot(normal)), 1))
+        return min(int(angle * self._angularBins / (math.pi / 2)), self._angularBins - 1)
+
+    def getDensity(self, nPhotons: int = 1) -> np.ndarray:
+        """ The weight per unit area and per steradian in each bin, per photon (Rd(r, alpha) or Tt(r, alpha) of MCML).
+        """
+        return self._data / (self.ringAreas[:, None] * self.solidAngles[None, :]) / nPhotons
+
+    def getRadialProfile(self, nPhotons: int = 1) -> np.ndarray:
+        """ The weight per unit area, per photon (Rd(r) or Tt(r) of MCML). """
+        return self._data.sum(axis=1) / self.ringAreas / nPhotons
+
+    def getAngularProfile(self, nPhotons: int = 1) -> np.ndarray:
+        """ The weight per steradian, per photon (Rd(alpha) or Tt(alpha) of MCML). """
+        return self._data.sum(axis=0) / self.solidAngles / nPhotons
@@ -0,0 +1,68 @@
+import math
+from typing import Optional
+
+import numpy as np
+
+from pytissueoptics.rayscattering.tallies.tally import Tally
+from pytissueoptics.scene.geometry import Vector
+
+
+class RadialTally(Tally):
+    def __init__(self, maxRadius: float, radialBins: int, otherBins: int, center: Vector = None, axis: Vector = None):
+        """
+        Base class of the tallies binned by the distance to an axis, like the MCML outputs of a layered tissue. The
+        radial bins cover [0, maxRadius) and are the first dimension of `data`.
+
+        :param maxRadius: The radius of the last bin. The weight scored farther from the axis is ignored.
+        :param radialBins: The number of radial bins.
+        :param otherBins: The number of bins of the second dimension of `data`.
+        :param center: A point of the axis. Defaults to the origin.
+        :param axis: The direction of the axis. Defaults to the z axis, the depth axis of a stack of cuboids.
+        """
+        super().__init__((radialBins, otherBins))
+        self._maxRadius = maxRadius
+        self._radialBins = radialBins
+        self._center = Vector(0, 0, 0) if center is None else center.copy()
+        self._axis = Vector(0, 0, 1) if axis is None else axis.copy()
+        self._axis.normalize()
+
+    @property
+    def maxRadius(self) -> float:
+        return self._maxRadius
+
+    @property
+    def radialBins(self) -> int:
+        return self._radialBins
+
+    @property
+    def center(self) -> Vector:
+        return self._center
+
+    @property
+    def axis(self) -> Vector:
+        return self._axis
+
+    @property
+    def radialBinEdges(self) -> np.ndarray:
+        return np.linspace(0, self._maxRadius, self._radialBins + 1)
+
+    @property
+    def radii(self) -> np.ndarray:
+        """ The radius at the center of each radial bin. """
+        edges = self.radialBinEdges
+        return (edges[:-1] + edges[1:]) / 2
+
+    @property
+    def ringAreas(self) -> np.ndarray:
+        """ The area of the ring of each radial bin. """
+        edges = self.radialBinEdges
+        return math.pi * (edges[1:] ** 2 - edges[:-1] ** 2)
+
+    def _getRadialBin(self, position: Vector) -> Optional[int]:
+        """ Same binning as the OpenCL kernel (see src/tallies.c): the radial bins are right-open. """
+        relativePosition = position - self._center
+        radialPosition = relativePosition - self._axis * relativePosition.dot(self._axis)
+        x = radialPosition.getNorm() * self._radialBins / self._maxRadius
+        if x < self._radialBins:
+            return int(x)
+        return None
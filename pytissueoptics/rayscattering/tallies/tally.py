@@ -0,0 +1,52 @@
+from typing import Dict
+
+import numpy as np
+
+from pytissueoptics.rayscattering.materials import ScatteringMaterial
+from pytissueoptics.scene.geometry import Vector
+
+
+class Tally:
+    """
+    Base class of the tallies accumulated during the propagation (see `Source.propagate`). The CPU and OpenCL engines
+    call every scoring method of every tally, and each tally ignores the events it does not detect. The scores are
+    accumulated in `data`, which the OpenCL engine sums on the device as a flat float32 array of the same size.
+    """
+    def __init__(self, shape):
+        self._data = np.zeros(shape, dtype=np.float64)
+
+    @property
+    def data(self) -> np.ndarray:
+        return self._data
+
+    def scoreAbsorption(self, solidLabel: str, position: Vector, opticalPathLength: float, weight: float):
+        """ Scores the weight absorbed at an interaction. """
+        pass
+
+    def scoreCrossing(self, solidLabel: str, surfaceLabel: str, isLeavingSolid: bool, opticalPathLength: float,
+                      weight: float):
+        """ Scores the weight crossing a surface of a solid. """
+        pass
+
+    def scoreTrack(self, solidLabel: str, position: Vector, direction: Vector, length: float, value: float):
+        """ Scores a step of the given length from a position, with a value per unit length. """
+        pass
+
+    def recordCrossing(self, solidLabel: str, surfaceLabel: str, isLeavingSolid: bool, position: Vector,
+                       direction: Vector, normal: Vector, weight: float,
+                       pathLengths: Dict[ScatteringMaterial, float]):
+        """ Records the state of a photon that crossed a surface of a solid, with its direction after refraction and
+        the distance it travelled in each material. """
+        pass
+
+    def replacesAbsorption(self, solidLabel: str) -> bool:
+        """ Whether the tally estimates the weight absorbed in this solid instead of the interactions. The
+        interactions of this solid are then not logged. """
+        return False
+
+    def add(self, data: np.ndarray):
+        """ Used internally to add the scores accumulated by the OpenCL engine. """
+        self._data += data.reshape(self._data.shape)
+
+    def clear(self):
+        self._data[:] = 0
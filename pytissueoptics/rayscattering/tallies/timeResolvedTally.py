@@ -0,0 +1,109 @@
+from typing import Optional, Tuple
+
+import numpy as np
+
+from pytissueoptics.rayscattering.tallies.tally import Tally
+from pytissueoptics.scene.geometry import BoundingBox, Vector
+
+SPEED_OF_LIGHT = 29.9792458  # cm/ns
+
+
+class TimeResolvedTally(Tally):
+    def __init__(self, timeLimits: Tuple[float, float], bins: int, solidLabel: str = None, surfaceLabel: str = None,
+                 surfaceEnergyLeaving: bool = True, region: BoundingBox = None, speedOfLight: float = SPEED_OF_LIGHT):
+        """
+        Time-resolved histogram of the photon weight reaching a detector, like the temporal point spread function
+        (TPSF) of a diffuse optical tomography measurement. The time of flight of a photon is its optical path length
+        (the distance travelled in each material times its refractive index) divided by the speed of light. The
+        histogram is accumulated during the propagation by the CPU and OpenCL engines (see `Source.propagate`), so it
+        does not require logging the interactions.
+
+        :param timeLimits: The (min, max) time of flight of the histogram, in the time unit of `speedOfLight`.
+        :param bins: The number of time bins.
+        :param solidLabel: (Optional) The solid of the detector. The world material is labeled "world".
+        :param surfaceLabel: (Optional) A surface of the solid. When given, the detector scores the weight crossing
+            this surface. Otherwise, it scores the weight absorbed in the solid, or anywhere without a solidLabel.
+        :param surfaceEnergyLeaving: Score the weight leaving the solid through the surface instead of the weight
+            entering it.
+        :param region: (Optional) Only score the weight absorbed inside this bounding box (boundaries included).
+        :param speedOfLight: The speed of light in vacuum, in scene length units per time unit. Default to cm/ns.
+        """
+        assert surfaceLabel is None or solidLabel is not None, "A surface detector requires a solidLabel."
+        super().__init__(bins)
+        self._timeLimits = (min(timeLimits), max(timeLimits))
+        self._bins = bins
+        self._solidLabel = solidLabel
+        self._surfaceLabel = surfaceLabel
+        self._surfaceEnergyLeaving = surfaceEnergyLeaving
+        self._region = region
+        self._speedOfLight = speedOfLight
+
+    @property
+    def timeBinEdges(self) -> np.ndarray:
+        return np.linspace(*self._timeLimits, self._bins + 1)
+
+    @property
+    def times(self) -> np.ndarray:
+        """ The time at the center of each bin. """
+        edges = self.timeBinEdges
+        return (edges[:-1] + edges[1:]) / 2
+
+    @property
+    def bins(self) -> int:
+        return self._bins
+
+    @property
+    def opticalPathLimits(self) -> Tuple[float, float]:
+        return self._timeLimits[0] * self._speedOfLight, self._timeLimits[1] * self._speedOfLight
+
+    @property
+    def solidLabel(self) -> Optional[str]:
+        return self._solidLabel
+
+    @property
+    def surfaceLabel(self) -> Optional[str]:
+        return self._surfaceLabel
+
+    @property
+    def surfaceEnergyLeaving(self) -> bool:
+        return self._surfaceEnergyLeaving
+
+    @property
+    def region(self) -> Optional[BoundingBox]:
+        return self._region
+
+    def detectsAbsorption(self, solidLabel: str) -> bool:
+        """ Whether the weight absorbed in this solid is scored (inside the region, if any). """
+        if self._surfaceLabel is not None:
+            return False
+        return self._solidLabel is None or self._solidLabel == solidLabel
+
+    def detectsCrossing(self, solidLabel: str, surfaceLabel: str, isLeavingSolid: bool) -> bool:
+        """ Whether the weight crossing this surface of the solid in the given direction is scored. """
+        if self._surfaceLabel is None:
+            return False
+        return self._solidLabel == solidLabel and self._surfaceLabel == surfaceLabel and \
+            self._surfaceEnergyLeaving == isLeavingSolid
+
+    def scoreAbsorption(self, solidLabel: str, position: Vector, opticalPathLength: float, weight: float):
+        if not self.detectsAbsorption(solidLabel):
+            return
+        if self._region is not None and not self._regionContains(position):
+            return
+        self._score(opticalPathLength, weight)
+
+    def scoreCrossing(self, solidLabel: str, surfaceLabel: str, isLeavingSolid: bool, opticalPathLength: float,
+                      weight: float):
+        if self.detectsCrossing(solidLabel, surfaceLabel, isLeavingSolid):
+            self._score(opticalPathLength, weight)
+
+    def _score(self, opticalPathLength: float, weight: float):
+        """ Same binning as the OpenCL kernel (see src/tallies.c): the bins are right-open. """
+        opticalPathMin, opticalPathMax = self.opticalPathLimits
+        x = (opticalPathLength - opticalPathMin) * self._bins / (opticalPathMax - opticalPathMin)
+        if 0 <= x < self._bins:
+            self._data[int(x)] += weight
+
+    def _regionContains(self, position: Vector) -> bool:
+        limits = np.asarray(self._region.xyzLimits)
+        return bool(np.all((limits[:, 0] <= position.array) & (position.array <= limits[:, 1])))
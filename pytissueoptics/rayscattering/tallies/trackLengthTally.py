@@ -0,0 +1,118 @@
+import math
+from typing import Iterator, List, Tuple, Union
+
+import numpy as np
+
+from pytissueoptics.rayscattering.tallies.tally import Tally
+from pytissueoptics.scene.geometry import Vector
+
+
+class TrackLengthTally(Tally):
+    def __init__(self, limits: List[Tuple[float, float]], voxelSize: Union[float, Tuple[float, float, float]],
+                 solidLabel: str):
+        """
+        Track-length estimator of the energy absorbed in a solid, on a 3D voxel grid. Instead of depositing the weight
+        lost at each interaction, each step of a photon in the solid adds its weight times mu_a times the length of
+        the step inside each voxel it crosses (found with a 3D DDA over the grid). This has the same expected value as
+        the interaction deposits, but every step contributes to every voxel it crosses, so the map is much smoother
+        for the same number of photons, especially where the absorption is low. The fluence of a voxel is its energy
+        divided by mu_a, by the voxel volume and by the number of photons.
+
+        When propagating with a logger (see `Source.propagate`), the interactions of the solid are not logged.
+        Instead, the energy estimated during the propagation is logged at the center of each voxel, so the
+        EnergyLogger views, profiles and statistics of the solid use the track-length estimate.
+
+        :param limits: The (min, max) limits of the grid along each axis. Steps outside the limits are not scored, so
+                the limits usually cover the bounding box of the solid.
+        :param voxelSize: The size of the voxels along each axis. The limits are divided in a whole number of voxels,
+                so the size of the voxels is rounded to fit the limits.
+        :param solidLabel: The solid of the tally. The world material is labeled "world".
+        """
+        if isinstance(voxelSize, (int, float)):
+            voxelSize = (voxelSize, voxelSize, voxelSize)
+        self._limits = [(float(min(l)), float(max(l))) for l in limits]
+        self._bins = tuple(max(1, round((l[1] - l[0]) / size)) for l, size in zip(self._limits, voxelSize))
+        self._solidLabel = solidLabel
+        super().__init__(self._bins)
+
+    @property
+    def limits(self) -> List[Tuple[float, float]]:
+        return self._limits
+
+    @property
+    def bins(self) -> Tuple[int, int, int]:
+        return self._bins
+
+    @property
+    def voxelSize(self) -> Tuple[float, float, float]:
+        return tuple((l[1] - l[0]) / bins for l, bins in zip(self._limits, self._bins))
+
+    @property
+    def solidLabel(self) -> str:
+        return self._solidLabel
+
+    def replacesAbsorption(self, solidLabel: str) -> bool:
+        return solidLabel == self._solidLabel
+
+    def scoreTrack(self, solidLabel: str, position: Vector, direction: Vector, length: float, value: float):
+        if solidLabel != self._solidLabel or value == 0:
+            return
+        for voxel, segmentLength in self._traverse(position.array, direction.array, length):
+            self._data[voxel] += value * segmentLength
+
+    def _traverse(self, origin: np.ndarray, direction: np.ndarray, length: float) -> Iterator[tuple]:
+        """ Yields each voxel crossed by the segment and the length of the segment inside it (Amanatides & Woo).
+        Same traversal as the OpenCL kernel (see src/tallies.c). """
+        voxelSize = self.voxelSize
+        tStart, tEnd = 0.0, length
+        for axis in range(3):
+            minimum, maximum = self._limits[axis]
+            if direction[axis] == 0:
+                if not minimum <= origin[axis] <= maximum:
+                    return
+                continue
+            t0 = (minimum - origin[axis]) / direction[axis]
+            t1 = (maximum - origin[axis]) / direction[axis]
+            tStart, tEnd = max(tStart, min(t0, t1)), min(tEnd, max(t0, t1))
+        if not tStart < tEnd:
+            return
+
+        voxel, step, tMax, tDelta = [], [], [], []
+        for axis in range(3):
+            minimum, bins, size = self._limits[axis][0], self._bins[axis], voxelSize[axis]
+            entry = origin[axis] + tStart * direction[axis]
+            index = min(max(math.floor((entry - minimum) / size), 0), bins - 1)
+            voxel.append(index)
+            step.append(1 if direction[axis] > 0 else -1)
+            if direction[axis] == 0:
+                tMax.append(math.inf)
+                tDelta.append(math.inf)
+                continue
+            nextBoundary = minimum + (index + (direction[axis] > 0)) * size
+            tMax.append((nextBoundary - origin[axis]) / direction[axis])
+            tDelta.append(size / abs(direction[axis]))
+
+        t = tStart
+        while True:
+            tNext = min(tMax)
+            yield tuple(voxel), min(tNext, tEnd) - t
+            if tNext >= tEnd:
+                return
+            t = tNext
+            axis = tMax.index(tNext)
+            voxel[axis] += step[axis]
+            tMax[axis] += tDelta[axis]
+            if not 0 <= voxel[axis] < self._bins[axis]:
+                return
+
+    def getDataPoints(self, data: np.ndarray = None) -> np.ndarray:
+        """ Returns the datapoints (value, x, y, z) of the voxels with energy, positioned at the center of the voxels.
+        :param data: (Optional) Grid of the same shape to use instead of the tally data.
+        """
+        data = self._data if data is None else data
+        voxelIndices = np.nonzero(data)
+        dataPoints = np.empty((len(voxelIndices[0]), 4), dtype=np.float32)
+        dataPoints[:, 0] = data[voxelIndices]
+        for axis, (indices, size) in enumerate(zip(voxelIndices, self.voxelSize)):
+            dataPoints[:, axis + 1] = self._limits[axis][0] + (indices + 0.5) * size
+        return dataPoints
@@ -0,0 +1,104 @@
+import unittest
+
+import numpy as np
+
+from pytissueoptics.rayscattering.display.utils import binning
+
+
+class TestBinning(unittest.TestCase):
+    LIMITS = [(-1, 1), (0, 2), (0, 3)]
+    BINS = [10, 4, 6]
+
+    def setUp(self):
+        randomGenerator = np.random.default_rng(0)
+        self.coordinates = randomGenerator.uniform(-1.5, 3.5, (5000, 3))
+        self.weights = randomGenerator.random(5000)
+
+    def testWhenHistogram_shouldBinLikeNumpyHistogramdd(self):
+        expectedHistogram, _ = np.histogramdd(self.coordinates, bins=self.BINS, range=self.LIMITS,
+                                              weights=self.weights)
+
+        histogram = binning.histogram(self.coordinates, self.LIMITS, self.BINS, weights=self.weights)
+
+        self.assertEqual(np.float32, histogram.dtype)
+        self.assertTrue(np.allclose(expectedHistogram, histogram, atol=1e-4))
+
+    def testWhenHistogramWithoutWeights_shouldCountPoints(self):
+        expectedHistogram, _ = np.histogramdd(self.coordinates, bins=self.BINS, range=self.LIMITS)
+
+        histogram = binning.histogram(self.coordinates, self.LIMITS, self.BINS)
+
+        self.assertTrue(np.array_equal(expectedHistogram, histogram))
+
+    def testGivenPointsOnTheUpperLimits_whenHistogram_shouldBinThemInTheLastBins(self):
+        coordinates = np.array([[1, 2, 3]])
+
+        histogram = binning.histogram(coordinates, self.LIMITS, self.BINS)
+
+        self.assertEqual(1, histogram[-1, -1, -1])
+
+    def testGivenAnOutputHistogram_whenHistogramOfChunks_shouldAccumulateAllChunksInTheOutput(self):
+        histogram = np.zeros(self.BINS, dtype=np.float32)
+
+        for coordinates, weights in zip(np.split(self.coordinates, 5), np.split(self.weights, 5)):
+            binning.histogram(coordinates, self.LIMITS, self.BINS, weights=weights, out=histogram)
+
+        expectedHistogram = binning.histogram(self.coordinates, self.LIMITS, self.BINS, weights=self.weights)
+        self.assertTrue(np.allclose(expectedHistogram, histogram, atol=1e-4))
+
+    def testGivenMoreBinsThanPoints_whenHistogram_shouldOnlyAccumulateTheBinsThatWereHit(self):
+        bins = [200, 200, 200]
+        coordinates = self.coordinates[:100]
+        expectedHistogram, _ = np.histogramdd(coordinates, bins=bins, range=self.LIMITS, weights=self.weights[:100])
+
+        histogram = binning.histogram(coordinates, self.LIMITS, bins, weights=self.weights[:100])
+
+        self.assertTrue(np.allclose(expectedHistogram, histogram))
+
+    def testWhenGetBinIndices_shouldReturnFlatIndicesOrMinusOneOutside(self):
+        coordinates = np.array([[-0.95, 0.1, 0.1], [0.95, 1.9, 2.9], [-2, 1, 1]])
+
+        binIndices = binning.getBinIndices(coordinates, self.LIMITS, self.BINS)
+
+        self.assertEqual([0, np.prod(self.BINS) - 1, -1], binIndices.tolist())
+
+    def testGivenANonContiguousHistogram_whenAccumulateBins_shouldRaiseException(self):
+        histogram = np.zeros((10, 10), dtype=np.float32).T
+        with self.assertRaises(ValueError):
+            binning.accumulateBins(histogram, np.array([1, 2]))
+
+    def testGivenAHistogramSpecWithASignAndASlice_whenHistogramDataPoints_shouldOnlyWeighTheDataPointsOfTheSpec(self):
+        dataPoints = np.array([[1, 0.1, 0.5, 0.5], [-2, 0.1, 0.5, 0.5], [4, 0.9, 0.5, 0.5], [-8, 0.9, 0.5, 0.9]])
+        spec = binning.HistogramSpec(columns=(1,), limits=((0, 1),), bins=(2,))
+
+        self.assertEqual([-1, -4], binning.histogramDataPoints(dataPoints, spec).tolist())
+        self.assertEqual([1, 4], binning.histogramDataPoints(dataPoints, spec._replace(sign=1)).tolist())
+        self.assertEqual([2, 8], binning.histogramDataPoints(dataPoints, spec._replace(sign=-1)).tolist())
+        sliceSpec = spec._replace(sliceColumn=3, sliceLimits=(0.4, 0.6))
+        self.assertEqual([-1, 4], binning.histogramDataPoints(dataPoints, sliceSpec).tolist())
+
+    def testGivenTargetBinsThatAreUnionsOfSourceBins_whenRebin_shouldCropAndCoarsenExactly(self):
+        source = binning.histogram(self.coordinates[:, :2], [(-1, 1), (0, 2)], [10, 8], weights=self.weights)
+        expected = binning.histogram(self.coordinates[:, :2], [(-0.6, 1), (0.5, 1.5)], [4, 2], weights=self.weights)
+        matrices = [binning.getRebinningMatrix((-1, 1), 10, (-0.6, 1), 4),
+                    binning.getRebinningMatrix((0, 2), 8, (0.5, 1.5), 2)]
+
+        self.assertTrue(all(binning.isExactRebinning(matrix) for matrix in matrices))
+        self.assertTrue(np.allclose(expected, binning.rebinHistogram(source, matrices), rtol=1e-5))
+
+    def testGivenTargetBinsNotAlignedWithSourceBins_whenRebin_shouldSplitSourceBinsInProportionToTheirOverlap(self):
+        matrix = binning.getRebinningMatrix((0, 2), 2, (0.5, 2), 3)
+
+        self.assertFalse(binning.isExactRebinning(matrix))
+        self.assertTrue(np.allclose([[0.5, 0, 0], [0, 0.5, 0.5]], matrix))
+        self.assertTrue(np.allclose([1, 2, 2], binning.rebinHistogram(np.array([2, 4]), [matrix])))
+
+    def testGivenTargetLimitsOutsideTheSourceLimits_shouldNotHaveARebinningMatrix(self):
+        self.assertIsNone(binning.getRebinningMatrix((0, 2), 4, (-0.5, 2), 5))
+        self.assertIsNone(binning.getRebinningMatrix((0, 2), 4, (0, 2.5), 5))
+
+    def testWhenGetBinOverlaps_shouldReturnTheFractionOfEachIntervalInTheBinsItOverlaps(self):
+        binIndices, fractions = binning.getBinOverlaps(np.array([0.25, 1.75]), 0.5, (0, 2), 4)
+
+        self.assertEqual([[0, 1], [3, 3]], binIndices.tolist())
+        self.assertTrue(np.allclose([[0.5, 0.5], [0.5, 0]], fractions))
@@ -0,0 +1,71 @@
+import pickle
+import unittest
+
+import numpy as np
+
+from pytissueoptics.rayscattering.display.utils import HistogramData
+from pytissueoptics.rayscattering.display.utils.histogramData import MAX_SPARSE_DENSITY
+
+
+class TestHistogramData(unittest.TestCase):
+    SHAPE = (10, 20)
+
+    def setUp(self):
+        self.data = HistogramData(self.SHAPE)
+
+    def testShouldBeEmptyAndSparse(self):
+        self.assertTrue(self.data.isSparse)
+        self.assertEqual(0, self.data.nBytes)
+        self.assertEqual(0, self.data.sum())
+
+    def testWhenAccumulateFewBins_shouldStaySparse(self):
+        self.data.accumulate(np.array([3, 5, 3, -1]), np.array([1, 2, 3, 4]))
+
+        self.assertTrue(self.data.isSparse)
+        binIndices, values = self.data.getBins()
+        self.assertEqual([3, 5], binIndices.tolist())
+        self.assertEqual([4, 2], values.tolist())
+        self.assertEqual(6, self.data.sum())
+
+    def testWhenAccumulateManyBins_shouldSwitchToDenseArrayWithTheSameData(self):
+        nBins = int(MAX_SPARSE_DENSITY * self.data.size) + 1
+        binIndices = np.random.permutation(self.data.size)[:nBins]
+        weights = np.random.rand(nBins)
+        expectedArray = np.zeros(self.SHAPE, dtype=np.float32)
+        expectedArray.reshape(-1)[binIndices] = weights
+
+        self.data.accumulate(binIndices[:10], weights[:10])
+        self.data.accumulate(binIndices[10:], weights[10:])
+
+        self.assertFalse(self.data.isSparse)
+        self.assertTrue(np.allclose(expectedArray, self.data.toArray()))
+
+    def testWhenAccumulateWithoutWeights_shouldCountDatapoints(self):
+        self.data.accumulate(np.array([0, 0, 7]))
+
+        self.assertEqual(2, self.data.toArray()[0, 0])
+        self.assertEqual(1, self.data.toArray()[0, 7])
+
+    def testWhenClear_shouldBeEmptyAndSparse(self):
+        self.data.accumulate(np.arange(self.data.size))
+
+        self.data.clear()
+
+        self.assertTrue(self.data.isSparse)
+        self.assertEqual(0, self.data.sum())
+
+    def testWhenFromArray_shouldHaveTheSameData(self):
+        array = np.zeros(self.SHAPE, dtype=np.float32)
+        array[2, 3] = 5
+
+        data = HistogramData.fromArray(array)
+
+        self.assertTrue(data.isSparse)
+        self.assertTrue(np.array_equal(array, data.toArray()))
+
+    def testWhenPickled_shouldKeepItsData(self):
+        self.data.accumulate(np.array([1, 2]), np.array([1, 2]))
+
+        data = pickle.loads(pickle.dumps(self.data))
+
+        self.assertTrue(np.array_equal(self.data.toArray(), data.toArray()))
@@ -0,0 +1,85 @@
+import unittest
+
+import numpy as np
+
+from pytissueoptics.rayscattering.display.utils import PointCloudDecimator
+from pytissueoptics.rayscattering.display.utils.pointCloudDecimator import MAX_DECIMATION_LEVEL, \
+    STREAMING_CELLS_PER_POINT
+
+
+class TestPointCloudDecimator(unittest.TestCase):
+    LIMITS = [(0, 1), (0, 1), (0, 1)]
+
+    def testGivenNoDatapoints_shouldReturnNone(self):
+        decimator = PointCloudDecimator(10, self.LIMITS)
+        decimator.add(None)
+        self.assertIsNone(decimator.getDataPoints())
+
+    def testGivenDatapointsWithinTheBudget_shouldReturnThemUnchanged(self):
+        decimator = PointCloudDecimator(3, self.LIMITS)
+        dataPoints = np.array([[1, 0.1, 0.1, 0.1], [2, 0.2, 0.2, 0.2]])
+
+        decimator.add(dataPoints[:1])
+        decimator.add(dataPoints[1:])
+
+        self.assertFalse(decimator.isDecimating)
+        self.assertTrue(np.array_equal(dataPoints, decimator.getDataPoints()))
+
+    def testGivenNoBudget_shouldReturnEveryDatapoint(self):
+        decimator = PointCloudDecimator(None, self.LIMITS)
+        decimator.add(np.random.random((1000, 4)))
+        self.assertEqual(1000, len(decimator.getDataPoints()))
+
+    def testGivenMoreDatapointsThanTheBudget_shouldMergeThemAtTheirWeightedCentroidAndConserveTheEnergy(self):
+        decimator = PointCloudDecimator(2, self.LIMITS)
+
+        decimator.add(np.array([[1, 0.1, 0.1, 0.1], [3, 0.2, 0.1, 0.1], [2, 0.9, 0.9, 0.9]]))
+
+        dataPoints = decimator.getDataPoints()
+        dataPoints = dataPoints[np.argsort(dataPoints[:, 1])]
+        self.assertTrue(np.allclose([[4, 0.175, 0.1, 0.1], [2, 0.9, 0.9, 0.9]], dataPoints))
+
+    def testShouldNotReturnMoreThanTheBudget(self):
+        rng = np.random.default_rng(0)
+        dataPoints = np.hstack([rng.exponential(1, (20000, 1)), rng.random((20000, 3))])
+        for adaptive in [False, True]:
+            with self.subTest(adaptive=adaptive):
+                decimator = PointCloudDecimator(500, self.LIMITS, adaptive=adaptive)
+                for chunk in np.array_split(dataPoints, 7):
+                    decimator.add(chunk)
+
+                decimatedPoints = decimator.getDataPoints()
+
+                self.assertLessEqual(len(decimatedPoints), 500)
+                self.assertAlmostEqual(np.sum(dataPoints[:, 0]), np.sum(decimatedPoints[:, 0]), delta=0.1)
+
+    def testGivenMoreOccupiedCellsThanTheStreamingLimit_shouldCoarsenTheStreamingCellsAndConserveTheEnergy(self):
+        rng = np.random.default_rng(0)
+        dataPoints = np.hstack([rng.exponential(1, (50000, 1)), rng.random((50000, 3))])
+        decimator = PointCloudDecimator(100, self.LIMITS)
+
+        for chunk in np.array_split(dataPoints, 10):
+            decimator.add(chunk)
+            self.assertLessEqual(len(decimator._keys), STREAMING_CELLS_PER_POINT * 100)
+
+        decimatedPoints = decimator.getDataPoints()
+        self.assertLess(decimator.level, MAX_DECIMATION_LEVEL)
+        self.assertLessEqual(len(decimatedPoints), 100)
+        self.assertAlmostEqual(np.sum(dataPoints[:, 0]), np.sum(decimatedPoints[:, 0]), delta=0.1)
+
+    def testGivenAdaptiveDecimation_shouldUseTheBudgetLeftToRefineWhereTheEnergyConcentrates(self):
+        rng = np.random.default_rng(0)
+        background = np.hstack([np.full((5000, 1), 0.001), rng.random((5000, 3))])
+        hotSpot = np.hstack([np.ones((5000, 1)), 0.5 + 0.02 * rng.random((5000, 3))])
+        dataPoints = np.vstack([background, hotSpot])
+
+        uniform = PointCloudDecimator(1000, self.LIMITS, adaptive=False)
+        adaptive = PointCloudDecimator(1000, self.LIMITS, adaptive=True)
+        uniform.add(dataPoints)
+        adaptive.add(dataPoints)
+
+        uniformPoints, adaptivePoints = uniform.getDataPoints(), adaptive.getDataPoints()
+        self.assertGreater(len(adaptivePoints), len(uniformPoints))
+        self.assertLessEqual(len(adaptivePoints), 1000)
+        isInHotSpot = lambda points: np.all(np.abs(points[:, 1:] - 0.51) < 0.02, axis=1)
+        self.assertGreater(np.sum(isInHotSpot(adaptivePoints)), np.sum(isInHotSpot(uniformPoints)))
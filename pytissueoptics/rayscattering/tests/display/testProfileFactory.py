@@ -9,6 +9,7 @@ from pytissueoptics.rayscattering.materials import ScatteringMaterial
 from pytissueoptics.rayscattering.display.profiles import ProfileFactory, Profile1D
 from pytissueoptics.rayscattering.display.utils import Direction
 from pytissueoptics.rayscattering.energyLogging import EnergyLogger
+from pytissueoptics.rayscattering.opencl import hardwareAccelerationIsAvailable
 from pytissueoptics.rayscattering.scatteringScene import ScatteringScene
 from pytissueoptics.scene.logger import InteractionKey
 
@@ -113,6 +114,27 @@ class TestProfileFactory(unittest.TestCase):
         expectedData = np.array([1, 0, 0, 0])
         self.assertTrue(np.array_equal(expectedData, profile.data))
 
+    @unittest.skipIf(not hardwareAccelerationIsAvailable(), 'Requires OpenCL.')
+    def testGivenHardwareAcceleration_whenCreateProfiles_shouldExtractTheSameProfilesAsOnTheCPU(self):
+        self.TEST_LOGGER = EnergyLogger(self.TEST_SCENE, defaultBinSize=self.DEFAULT_BIN_SIZE,
+                                        useHardwareAcceleration=True)
+        self._fillLoggerData()
+        surfaceData = np.array([[1, 1.5, 1.5, 1.5], [-1, -1.5, -1.5, -1.5]])
+        self.TEST_LOGGER.logDataPointArray(surfaceData, InteractionKey("cube", "top"))
+        self.profileFactory = ProfileFactory(self.TEST_SCENE, self.TEST_LOGGER)
+
+        profile = self.profileFactory.create(Direction.Z_POS)
+        leavingProfile = self.profileFactory.create(Direction.Z_POS, solidLabel="cube", surfaceLabel="top",
+                                                    surfaceEnergyLeaving=True, binSize=1)
+        enteringProfile = self.profileFactory.create(Direction.Z_POS, solidLabel="cube", surfaceLabel="top",
+                                                     surfaceEnergyLeaving=False, binSize=1)
+
+        expectedData = np.zeros(40)
+        expectedData[[5, 15, 25, 35]] = [0, 2, 4, 6]
+        self.assertTrue(np.array_equal(expectedData, profile.data))
+        self.assertTrue(np.array_equal([0, 0, 0, 1], leavingProfile.data))
+        self.assertTrue(np.array_equal([1, 0, 0, 0], enteringProfile.data))
+
     def testWhenCreateProfileWithBadLabelCapitalization_shouldCorrectLabels(self):
         self.TEST_LOGGER.logDataPointArray(np.array([[1, 0, 0, 0]]), InteractionKey("cube", "top"))
         profile = self.profileFactory.create(Direction.Z_POS, solidLabel="Cube", surfaceLabel="Top",
@@ -184,20 +206,55 @@ class TestProfileFactory(unittest.TestCase):
         expectedData = np.array([0, 1, 2, 3]) * 2
         self.assertTrue(np.array_equal(expectedData, profile.data))
 
-    def testGiven2DLoggerWithASingleView_whenCreateProfileAlongThisViewWithDifferentBinSize_shouldRaiseException(self):
+    def testGiven2DLoggerWithASingleView_whenCreateProfileAlongThisViewWithCoarserBins_shouldSumTheBinsOfTheView(self):
         singleView = View2DProjectionX()
         self.TEST_LOGGER = EnergyLogger(self.TEST_SCENE, keep3D=False, defaultBinSize=1.0, views=[singleView])
         self._fillLoggerData()
         self.profileFactory = ProfileFactory(self.TEST_SCENE, self.TEST_LOGGER)
 
-        with self.assertRaises(RuntimeError):
-            self.profileFactory.create(Direction.Z_POS, binSize=0.5)
+        profile = self.profileFactory.create(Direction.Z_POS, binSize=2)
+
+        expectedData = np.array([1, 5]) * 2
+        self.assertTrue(np.array_equal(expectedData, profile.data))
+
+    def testGiven2DLoggerWithASingleView_whenCreateProfileWithDifferentBinSize_shouldApproximateAndWarn(self):
+        singleView = View2DProjectionX()
+        self.TEST_LOGGER = EnergyLogger(self.TEST_SCENE, keep3D=False, defaultBinSize=1.0, views=[singleView])
+        self._fillLoggerData()
+        self.profileFactory = ProfileFactory(self.TEST_SCENE, self.TEST_LOGGER)
+
+        with self.assertWarns(UserWarning):
+            profile = self.profileFactory.create(Direction.Z_POS, binSize=0.5)
+
+        expectedData = np.array([0, 0, 1, 1, 2, 2, 3, 3])
+        self.assertTrue(np.allclose(expectedData, profile.data))
+
+    def testGiven2DLoggerWithVoxels_whenCreateSolidProfileWithoutMatchingView_shouldExtractProfileFromVoxels(self):
+        self.TEST_LOGGER = EnergyLogger(self.TEST_SCENE, keep3D=False, defaultBinSize=1.0, views=[], voxelSize=0.5)
+        self._fillLoggerData()
+        self.profileFactory = ProfileFactory(self.TEST_SCENE, self.TEST_LOGGER)
+
+        profile = self.profileFactory.create(Direction.Z_POS, binSize=0.5, solidLabel="cube")
+
+        expectedData = np.array([0, 0, 0, 1, 0, 2, 0, 3])
+        self.assertTrue(np.array_equal(expectedData, profile.data))
+
+    def testGiven2DLoggerWithASingleView_whenCreateProfileAlongThisViewWithContainedLimits_shouldCropTheView(self):
+        singleView = View2DProjectionX()
+        self.TEST_LOGGER = EnergyLogger(self.TEST_SCENE, keep3D=False, defaultBinSize=1.0, views=[singleView])
+        self._fillLoggerData()
+        self.profileFactory = ProfileFactory(self.TEST_SCENE, self.TEST_LOGGER)
+
+        profile = self.profileFactory.create(Direction.Z_POS, binSize=1.0, limits=(0, 2))
+
+        expectedData = np.array([2, 3]) * 2
+        self.assertTrue(np.array_equal(expectedData, profile.data))
 
-    def testGiven2DLoggerWithASingleView_whenCreateProfileAlongThisViewWithDifferentLimits_shouldRaiseException(self):
+    def testGiven2DLoggerWithASingleView_whenCreateProfileAlongThisViewBeyondItsLimits_shouldRaiseException(self):
         singleView = View2DProjectionX()
         self.TEST_LOGGER = EnergyLogger(self.TEST_SCENE, keep3D=False, defaultBinSize=1.0, views=[singleView])
         self._fillLoggerData()
         self.profileFactory = ProfileFactory(self.TEST_SCENE, self.TEST_LOGGER)
 
         with self.assertRaises(RuntimeError):
-            self.profileFactory.create(Direction.Z_POS, binSize=1.0, limits=(0, 2))
+            self.profileFactory.create(Direction.Z_POS, binSize=1.0, limits=(0, 3))
@@ -96,13 +96,38 @@ class TestView2D(unittest.TestCase):
         self.assertEqual(expectedBinsU, view.binsU)
         self.assertEqual(expectedBinsV, view.binsV)
 
-    def testGivenNotEnoughMemory_whenSetContext_shouldRaiseException(self):
+    def testGivenNotEnoughMemory_whenSetContext_shouldNotAllocateTheData(self):
         view = View2DProjectionX()
         limits3D = [(0, 200), (0, 200), (0, 200)]
         binSize3D = (0.0001, 0.0001, 0.0001)
 
+        view.setContext(limits3D, binSize3D)
+        view.extractData(np.array([[1, 0, 100, 100]]))
+
+        self.assertEqual(1, view.getSum())
+
+    def testGivenNotEnoughMemory_whenGetImageData_shouldRaiseException(self):
+        view = View2DProjectionX()
+        view.setContext([(0, 200), (0, 200), (0, 200)], (0.0001, 0.0001, 0.0001))
+
         with self.assertRaises(MemoryError):
-            view.setContext(limits3D, binSize3D)
+            view.getImageData()
+
+    def testGivenTransposedViewWithSparseData_whenInitDataFrom_shouldHaveTheSameImageAsTheDenseData(self):
+        view = View2DProjectionX()
+        transposedView = View2DProjection(Direction.X_POS, Direction.Y_NEG)
+        for v in (view, transposedView):
+            v.setContext([(0, 1), (0, 2), (0, 3)], (0.1, 0.1, 0.1))
+        view.extractData(np.array([[1, 0, 0.15, 0.15], [2, 0, 1.55, 2.85]]))
+        self.assertTrue(view._dataUV.isSparse)
+        expectedTransposedView = View2DProjection(Direction.X_POS, Direction.Y_NEG)
+        expectedTransposedView.setContext([(0, 1), (0, 2), (0, 3)], (0.1, 0.1, 0.1))
+        expectedTransposedView.extractData(np.array([[1, 0, 0.15, 0.15], [2, 0, 1.55, 2.85]]))
+
+        transposedView.initDataFrom(view)
+
+        self.assertTrue(np.array_equal(expectedTransposedView.getImageData(logScale=False),
+                                       transposedView.getImageData(logScale=False)))
 
     def testGivenProjectionView_whenExtractData_shouldProject3DPointsToThis2DView(self):
         view = View2DProjectionX()
@@ -123,6 +148,89 @@ class TestView2D(unittest.TestCase):
 
         self.assertEqual(0, view.getSum())
 
+    def testWhenExtractData_shouldBinLikeHistogram2D(self):
+        view = View2DProjectionZ()
+        view.setContext([(-1, 1), (-2, 2), (0, 3)], (0.1, 0.4, 0.3))
+        dataPoints = np.random.default_rng(0).uniform(-3, 3, (1000, 4))
+        dataPoints[:10, 1:] = [1, 2, 3]
+
+        view.extractData(dataPoints)
+
+        histogram, _, _ = np.histogram2d(dataPoints[:, 1 + view.axisU], dataPoints[:, 1 + view.axisV],
+                                         weights=dataPoints[:, 0], bins=(view.binsU, view.binsV),
+                                         range=(sorted(view.limitsU), sorted(view.limitsV)))
+        self.assertTrue(np.allclose(np.flip(histogram, axis=1), view.getImageData(logScale=False, autoFlip=False),
+                                    atol=1e-5))
+
+    def testGivenDatapointsOnInnerBinEdges_whenExtractData_shouldBinThemInOneOfTheTwoAdjacentBinsInFloat32(self):
+        view = View2DProjectionZ()
+        view.setContext([(-1, 1), (-2, 2), (0, 3)], (0.1, 0.4, 0.3))
+        edgesU = np.linspace(*sorted(view.limitsU), view.binsU + 1)
+        edgesV = np.linspace(*sorted(view.limitsV), view.binsV + 1)
+        u, v = [grid.ravel() for grid in np.meshgrid(edgesU[1:-1], edgesV[1:-1], indexing="ij")]
+        # The bin of the histogram2d edge semantics (right-open bins) along each axis.
+        expectedU = np.searchsorted(edgesU, u, side="right") - 1
+        expectedV = np.searchsorted(edgesV, v, side="right") - 1
+
+        for offset, isExact in [(0, False), (1e-4, True), (-1e-4, True)]:
+            dataPoints = np.ones((len(u), 4))
+            dataPoints[:, 1 + view.axisU] = u + offset
+            dataPoints[:, 1 + view.axisV] = v + offset
+            binU, flippedBinV = np.divmod(view.getBinIndices(dataPoints), view.binsV)
+            binV = view.binsV - 1 - flippedBinV
+
+            if isExact:
+                # Beyond float32 precision of the edges, the datapoints are binned like histogram2d.
+                self.assertTrue(np.array_equal(expectedU - (offset < 0), binU))
+                self.assertTrue(np.array_equal(expectedV - (offset < 0), binV))
+            else:
+                # On the edges, the float32 bin computation can round to either adjacent bin.
+                self.assertTrue(np.all((binU == expectedU) | (binU == expectedU - 1)))
+                self.assertTrue(np.all((binV == expectedV) | (binV == expectedV - 1)))
+
+            view.extractData(dataPoints)
+        self.assertEqual(3 * len(u), np.sum(view.getImageData(logScale=False)))
+
+    def testGivenViewsWithSameBinningKey_whenExtractDataWithBinIndicesOfOneView_shouldExtractTheSameData(self):
+        projectionView = View2DProjectionX()
+        surfaceView = View2DSurfaceX(solidLabel="cube", surfaceLabel="left", surfaceEnergyLeaving=False)
+        for view in (projectionView, surfaceView):
+            view.setContext([(2, 3), (2, 3), (2, 3)], (0.1, 0.1, 0.1))
+        self.assertEqual(projectionView.binningKey, surfaceView.binningKey)
+        dataPoints = np.array([[0.5, 0, 2.05, 2.05],
+                               [-0.5, 5, 2.05, 2.05],
+                               [-1, 0, 2.5, 2.95]])
+        expectedView = View2DSurfaceX(solidLabel="cube", surfaceLabel="left", surfaceEnergyLeaving=False)
+        expectedView.setContext([(2, 3), (2, 3), (2, 3)], (0.1, 0.1, 0.1))
+        expectedView.extractData(dataPoints)
+
+        surfaceView.extractData(dataPoints, projectionView.getBinIndices(dataPoints))
+
+        self.assertTrue(np.array_equal(expectedView.getImageData(logScale=False),
+                                       surfaceView.getImageData(logScale=False)))
+        self.assertEqual(1.5, surfaceView.getSum())
+
+    def testWhenGetBinIndices_shouldReturnMinusOneForPointsOutsideTheView(self):
+        view = View2DProjectionX()
+        view.setContext([(2, 3), (2, 3), (2, 3)], (0.1, 0.1, 0.1))
+        dataPoints = np.array([[1, 0, 2.05, 2.05],
+                               [1, 0, 3.5, 2.05],
+                               [1, 0, 3, 3]])
+
+        binIndices = view.getBinIndices(dataPoints)
+
+        self.assertEqual(-1, binIndices[1])
+        self.assertEqual((view.binsU - 1) * view.binsV, binIndices[2])
+
+    def testWhenClearData_shouldHaveNoData(self):
+        view = View2DProjectionX()
+        view.setContext([(2, 3), (2, 3), (2, 3)], (0.1, 0.1, 0.1))
+        view.extractData(np.array([[1, 0, 2.05, 2.05]]))
+
+        view.clearData()
+
+        self.assertEqual(0, view.getSum())
+
     def testWhenGetImageDataWithoutLogScale_shouldReturnImageOfRawData(self):
         view = View2DProjectionX()
         view.setContext([(2, 3), (2, 3), (2, 3)], (0.1, 0.1, 0.1))
@@ -262,12 +370,20 @@ class TestView2D(unittest.TestCase):
         view2.setContext([(2, 4), (2, 4), (2, 4)], (0.1, 0.1, 0.1))
         self.assertTrue(view1.isContainedBy(view2))
 
-    def testGivenAViewWithDifferentBinSize_shouldNotBeContainedByTheOther(self):
+    def testGivenAViewWithSmallerBinSize_shouldBeContainedButNotExactlyByTheOther(self):
         view1 = View2DProjectionX()
         view2 = View2DProjectionX()
         view1.setContext([(2, 4), (2, 4), (2, 4)], (0.1, 0.1, 0.1))
         view2.setContext([(2, 4), (2, 4), (2, 4)], (0.2, 0.2, 0.2))
-        self.assertFalse(view1.isContainedBy(view2))
+        self.assertTrue(view1.isContainedBy(view2))
+        self.assertFalse(view1.isExactlyContainedBy(view2))
+
+    def testGivenAViewWithAMultipleOfTheBinSize_shouldBeExactlyContainedByTheOther(self):
+        view1 = View2DProjectionX()
+        view2 = View2DProjectionX()
+        view1.setContext([(2, 4), (2, 4), (2, 4)], (0.5, 0.5, 0.5))
+        view2.setContext([(2, 4), (2, 4), (2, 4)], (0.25, 0.25, 0.25))
+        self.assertTrue(view1.isExactlyContainedBy(view2))
 
     def testGivenAViewWithDifferentSolidLabel_shouldNotBeContainedByTheOther(self):
         view1 = View2DProjectionX(solidLabel="A label")
@@ -297,20 +413,21 @@ class TestView2D(unittest.TestCase):
         view2.setContext([(3, 4), (3, 4), (3, 4)], (0.1, 0.1, 0.1))
         self.assertFalse(view1.isContainedBy(view2))
 
-    @unittest.skip("Not implemented yet")
     def testGivenAViewSmaller_shouldBeContainedByTheOther(self):
         view1 = View2DProjectionX()
         view2 = View2DProjectionX()
-        view1.setContext([(3, 4), (3, 4), (3, 4)], (0.1, 0.1, 0.1))
-        view2.setContext([(2, 5), (2, 5), (2, 5)], (0.1, 0.1, 0.1))
+        view1.setContext([(3, 4), (3, 4), (3, 4)], (0.25, 0.25, 0.25))
+        view2.setContext([(2, 5), (2, 5), (2, 5)], (0.25, 0.25, 0.25))
         self.assertTrue(view1.isContainedBy(view2))
+        self.assertTrue(view1.isExactlyContainedBy(view2))
 
-    def testGivenAViewSmallerWithSameNumberOfBins_shouldNotBeContainedByTheOther(self):
+    def testGivenAViewSmallerWithSameNumberOfBins_shouldNotBeExactlyContainedByTheOther(self):
         view1 = View2DProjectionX()
         view2 = View2DProjectionX()
         view1.setContext([(3, 4), (3, 4), (3, 4)], (0.1, 0.1, 0.1))
         view2.setContext([(2, 4), (2, 4), (2, 4)], (0.2, 0.2, 0.2))
-        self.assertFalse(view1.isContainedBy(view2))
+        self.assertTrue(view1.isContainedBy(view2))
+        self.assertFalse(view1.isExactlyContainedBy(view2))
 
     def testGivenASurfaceViewEqual_shouldBeContainedByTheOther(self):
         view1 = View2DSurfaceX(solidLabel="A", surfaceLabel="B", surfaceEnergyLeaving=True)
@@ -489,6 +606,40 @@ class TestView2D(unittest.TestCase):
 
         self.assertTrue(np.array_equal(viewExpected.getImageData(), viewReceiver.getImageData()))
 
+    def testWhenInitDataFromAViewThatContainsThisViewWithFinerBins_shouldCropAndCoarsenTheData(self):
+        viewGiver = View2DProjection(Direction.X_POS, Direction.Z_POS)
+        viewGiver.setContext([(0, 4), (0, 4), (0, 4)], (0.5, 0.5, 0.5))
+        dataPoints = np.hstack([np.ones((100, 1)), np.random.default_rng(0).uniform(0, 4, (100, 3))])
+        viewGiver.extractData(dataPoints)
+        limitsYZ = {1: (1, 3), 2: (2, 4)}
+        for horizontalDirection in [Direction.Y_POS, Direction.Y_NEG, Direction.Z_POS, Direction.Z_NEG]:
+            with self.subTest(projection=Direction.X_NEG.name, horizontal=horizontalDirection.name):
+                limits = limitsYZ[horizontalDirection.axis], limitsYZ[3 - horizontalDirection.axis]
+                viewReceiver = View2DProjection(Direction.X_NEG, horizontalDirection, limits=limits, binSize=1)
+                viewExpected = View2DProjection(Direction.X_NEG, horizontalDirection, limits=limits, binSize=1)
+                viewReceiver.setContext([(0, 4), (0, 4), (0, 4)], (0.5, 0.5, 0.5))
+                viewExpected.setContext([(0, 4), (0, 4), (0, 4)], (0.5, 0.5, 0.5))
+                viewExpected.extractData(dataPoints)
+
+                viewReceiver.initDataFrom(viewGiver)
+
+                self.assertTrue(np.allclose(viewExpected.getImageData(logScale=False),
+                                            viewReceiver.getImageData(logScale=False)))
+
+    def testWhenInitDataFromAViewWithBinsNotAlignedWithThisView_shouldSpreadTheDataOfEachBinOverTheBinsItOverlaps(self):
+        viewGiver = View2DProjectionX()
+        viewReceiver = View2DProjectionX(limits=((0, 1), (0, 1)), binSize=0.25)
+        viewGiver.setContext([(0, 1), (0, 1), (0, 1)], (0.5, 0.5, 0.5))
+        viewReceiver.setContext([(0, 1), (0, 1), (0, 1)], (0.5, 0.5, 0.5))
+        viewGiver.extractData(np.array([[1, 0.1, 0.1, 0.1]]))
+
+        viewReceiver.initDataFrom(viewGiver)
+
+        image = viewReceiver.getImageData(logScale=False, autoFlip=False)
+        self.assertEqual(1, viewReceiver.getSum())
+        self.assertTrue(np.allclose(0.25, image[:2, 2:]))
+        self.assertEqual(0, image[2:].sum() + image[:, :2].sum())
+
     def testShouldHaveProperName(self):
         view = View2DProjectionX()
         self.assertEqual("View2DProjectionX of Scene", view.name)
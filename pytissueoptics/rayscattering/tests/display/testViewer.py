@@ -14,7 +14,7 @@ from pytissueoptics.rayscattering.source import Source
 from pytissueoptics.rayscattering.display.viewer import Viewer, Visibility, PointCloudStyle
 from pytissueoptics.rayscattering.display.profiles import ProfileFactory, Profile1D
 from pytissueoptics.rayscattering.display.views import View2D
-from pytissueoptics.rayscattering.energyLogging import PointCloudFactory, PointCloud
+from pytissueoptics.rayscattering.energyLogging import PointCloudFactory, PointCloud, VoxelGrid
 
 
 def patchMayaviRender(func):
@@ -29,10 +29,12 @@ class TestViewer(unittest.TestCase):
         self.source = mock(Source)
         when(self.source).addToViewer(...).thenReturn()
         when(self.scene).addToViewer(...).thenReturn()
+        when(self.scene).getBoundingBox().thenReturn(None)
         self.logger = mock(EnergyLogger)
         self.logger.defaultBinSize = 1
         self.logger.infiniteLimits = ((-10, 10), (-10, 10), (-10, 10))
         self.logger.has3D = True
+        self.logger.hasEnergyTotals = True
         self.logger.info = {"photonCount": 0, "sourceSolidLabel": None}
         self.viewer = Viewer(self.scene, self.source, self.logger)
 
@@ -134,7 +136,7 @@ class TestViewer(unittest.TestCase):
         mockPointCloudFactory = mock(PointCloudFactory)
         aPointCloud = PointCloud(solidPoints=np.array([[0.5, 0, 0, 0]]),
                                  surfacePoints=np.array([[1, 0, 0, 0], [-1, 0, 0, 0]]))
-        when(mockPointCloudFactory).getPointCloud(...).thenReturn(aPointCloud)
+        when(mockPointCloudFactory).getPointCloudChunks(...).thenReturn([aPointCloud])
         self.viewer._pointCloudFactory = mockPointCloudFactory
 
         self.viewer.show3D(visibility=Visibility.POINT_CLOUD)
@@ -152,7 +154,7 @@ class TestViewer(unittest.TestCase):
     def testGivenNoData_whenShow3DWithPointCloud_shouldNotDisplayPointCloud(self, mockAddDataPoints, mockShow, *args):
         mockPointCloudFactory = mock(PointCloudFactory)
         aPointCloud = PointCloud()
-        when(mockPointCloudFactory).getPointCloud(...).thenReturn(aPointCloud)
+        when(mockPointCloudFactory).getPointCloudChunks(...).thenReturn([aPointCloud])
         self.viewer._pointCloudFactory = mockPointCloudFactory
 
         self.viewer.show3D(visibility=Visibility.POINT_CLOUD)
@@ -166,7 +168,7 @@ class TestViewer(unittest.TestCase):
         mockPointCloudFactory = mock(PointCloudFactory)
         aPointCloud = PointCloud(solidPoints=np.array([[0.5, 0, 0, 0]]),
                                  surfacePoints=np.array([[1, 0, 0, 0], [-1, 0, 0, 0]]))
-        when(mockPointCloudFactory).getPointCloud(...).thenReturn(aPointCloud)
+        when(mockPointCloudFactory).getPointCloudChunks(...).thenReturn([aPointCloud])
         self.viewer._pointCloudFactory = mockPointCloudFactory
 
         self.viewer.show3D(visibility=Visibility.POINT_CLOUD,
@@ -182,7 +184,7 @@ class TestViewer(unittest.TestCase):
         mockPointCloudFactory = mock(PointCloudFactory)
         aPointCloud = PointCloud(solidPoints=np.array([[0.5, 0, 0, 0]]),
                                  surfacePoints=np.array([[1, 0, 0, 0], [-1, 1, 1, 1]]))
-        when(mockPointCloudFactory).getPointCloud(...).thenReturn(aPointCloud)
+        when(mockPointCloudFactory).getPointCloudChunks(...).thenReturn([aPointCloud])
         self.viewer._pointCloudFactory = mockPointCloudFactory
 
         self.viewer.show3D(visibility=Visibility.POINT_CLOUD,
@@ -231,14 +233,14 @@ class TestViewer(unittest.TestCase):
     def testGiven3DLogger_whenShow3DDefault_shouldDisplayEverythingExceptViews(self, mockAddImage, mockShow, *args):
         mockPointCloudFactory = mock(PointCloudFactory)
         aPointCloud = PointCloud()
-        when(mockPointCloudFactory).getPointCloud(...).thenReturn(aPointCloud)
+        when(mockPointCloudFactory).getPointCloudChunks(...).thenReturn([aPointCloud])
         self.viewer._pointCloudFactory = mockPointCloudFactory
 
         self.viewer.show3D()
 
         verify(self.source, times=1).addToViewer(...)
         verify(self.scene, times=1).addToViewer(...)
-        verify(mockPointCloudFactory, times=1).getPointCloud(...)
+        verify(mockPointCloudFactory, times=1).getPointCloudChunks(...)
         mockAddImage.assert_not_called()
         mockShow.assert_called_once()
 
@@ -249,14 +251,14 @@ class TestViewer(unittest.TestCase):
         self.logger.has3D = False
 
         mockPointCloudFactory = mock(PointCloudFactory)
-        when(mockPointCloudFactory).getPointCloud(...).thenReturn()
+        when(mockPointCloudFactory).getPointCloudChunks(...).thenReturn([])
         self.viewer._pointCloudFactory = mockPointCloudFactory
 
         self.viewer.show3D()
 
         verify(self.source, times=1).addToViewer(...)
         verify(self.scene, times=1).addToViewer(...)
-        verify(mockPointCloudFactory, times=0).getPointCloud(...)
+        verify(mockPointCloudFactory, times=0).getPointCloudChunks(...)
         mockAddImage.assert_called()
         mockShow.assert_called_once()
 
@@ -267,7 +269,7 @@ class TestViewer(unittest.TestCase):
         self.logger.has3D = False
 
         mockPointCloudFactory = mock(PointCloudFactory)
-        when(mockPointCloudFactory).getPointCloud(...).thenReturn()
+        when(mockPointCloudFactory).getPointCloudChunks(...).thenReturn([])
         self.viewer._pointCloudFactory = mockPointCloudFactory
 
         with self.assertWarns(UserWarning):
@@ -275,10 +277,25 @@ class TestViewer(unittest.TestCase):
 
         verify(self.source, times=1).addToViewer(...)
         verify(self.scene, times=1).addToViewer(...)
-        verify(mockPointCloudFactory, times=0).getPointCloud(...)
+        verify(mockPointCloudFactory, times=0).getPointCloudChunks(...)
         mockAddImage.assert_called()
         mockShow.assert_called_once()
 
+    @patch('pytissueoptics.rayscattering.display.viewer.MAYAVI_AVAILABLE', True)
+    @patch('pytissueoptics.rayscattering.display.utils.volumeSlicer.VolumeSlicer')
+    def testGiven2DLoggerWithVoxelsOfTheScene_whenShow3DVolumeSlicer_shouldShowTheVoxels(self, mockVolumeSlicer):
+        voxelGrid = VoxelGrid([(-2, 2), (-2, 2), (0, 5)], 1)
+        voxelGrid.extractData(np.array([[1, 0.5, 0.5, 0.5]]))
+        self.logger.has3D = False
+        self.logger.hasVoxels = True
+        when(self.logger).getVoxelGrid().thenReturn(voxelGrid)
+
+        self.viewer.show3DVolumeSlicer(logScale=False)
+
+        volume = mockVolumeSlicer.call_args[0][0]
+        self.assertTrue(np.array_equal(voxelGrid.getData(), volume))
+        mockVolumeSlicer.return_value.show.assert_called_once()
+
     def _givenLoggerWithXSceneView(self):
         sceneView = View2DProjectionX()
         sceneView.setContext(limits3D=[(-2, 2), (-2, 2), (0, 5)], binSize3D=(1, 1, 1))
@@ -1,14 +1,18 @@
 import io
 import os
+import pickle
 import tempfile
+import threading
 import unittest
+import warnings
 from unittest.mock import patch, MagicMock
 
 import numpy as np
 
 from pytissueoptics.rayscattering.materials import ScatteringMaterial
 from pytissueoptics.rayscattering.scatteringScene import ScatteringScene
-from pytissueoptics.rayscattering.energyLogging import EnergyLogger
+from pytissueoptics.rayscattering.energyLogging import EnergyLogger, OctreeTally
+from pytissueoptics.rayscattering.opencl import hardwareAccelerationIsAvailable
 from pytissueoptics.rayscattering.display.utils import Direction
 from pytissueoptics.rayscattering.display.views import *
 from pytissueoptics.scene.solids import Cube
@@ -114,6 +118,28 @@ class TestEnergyLogger(unittest.TestCase):
         self.assertEqual(initialNumberOfViews + 1, len(self.logger.views))
         self.assertAlmostEqual(0.8, customView.getSum())
 
+    def testGiven2DLoggerWithData_whenAddCroppedViewWithAlignedBins_shouldInitializeViewExactlyWithoutWarning(self):
+        self.logger = EnergyLogger(self.TEST_SCENE, keep3D=False, defaultBinSize=0.125)
+        self.logger.logDataPoint(0.8, self.CUBE_CENTER, self.INTERACTION_KEY)
+        croppedView = View2DProjectionX(solidLabel="cube", limits=((0.5, 1), (0.5, 1)), binSize=0.25)
+
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            self.assertTrue(self.logger.addView(croppedView))
+
+        self.assertEqual((2, 2), (croppedView.binsU, croppedView.binsV))
+        self.assertAlmostEqual(0.8, croppedView.getSum())
+
+    def testGiven2DLoggerWithData_whenAddViewWithBinsNotAlignedWithExistingViews_shouldApproximateViewAndWarn(self):
+        self.logger = EnergyLogger(self.TEST_SCENE, keep3D=False, defaultBinSize=0.125)
+        self.logger.logDataPoint(0.8, self.CUBE_CENTER, self.INTERACTION_KEY)
+        finerView = View2DProjectionX(solidLabel="cube", binSize=0.1)
+
+        with self.assertWarns(UserWarning):
+            self.assertTrue(self.logger.addView(finerView))
+
+        self.assertAlmostEqual(0.8, finerView.getSum(), places=6)
+
     def testGiven2DLoggerWithData_whenAddCustomViewNotContainedByExistingViews_shouldNotInitializeViewAndWarn(self):
         self.logger = EnergyLogger(self.TEST_SCENE, keep3D=False)
         self.logger.logDataPoint(0.8, self.CUBE_CENTER, self.INTERACTION_KEY)
@@ -226,6 +252,316 @@ class TestEnergyLogger(unittest.TestCase):
             self.assertTrue(np.array_equal(previousLogger.getDataPoints(), logger.getDataPoints()))
             self.assertEqual(previousLogger.info, logger.info)
 
+    def testGivenALoggerSavedToAStore_whenCreatingNewLoggerFromStore_shouldLoadPreviousLoggerAndViews(self):
+        previousLogger = EnergyLogger(self.TEST_SCENE, keep3D=False)
+        previousLogger.logDataPointArray(np.array([[0.5, 0.5, 0.5, 0.5]]), self.INTERACTION_KEY)
+        previousLogger.info["some key"] = "some metadata"
+
+        with tempfile.TemporaryDirectory() as tempDir:
+            storePath = os.path.join(tempDir, "test.logdir")
+            previousLogger.save(storePath)
+
+            logger = EnergyLogger(self.TEST_SCENE, storePath, keep3D=False)
+
+            self.assertEqual(1, logger.nDataPoints)
+            self.assertEqual(previousLogger.info, logger.info)
+            self.assertEqual(len(previousLogger.views), len(logger.views))
+            self.assertTrue(np.array_equal(previousLogger.getView(0).getImageData(), logger.getView(0).getImageData()))
+
+    def testGivenAMemoryBudget_whenLoggingMoreThanTheBudget_shouldSpillTheDataOutOfMemory(self):
+        logger = EnergyLogger(self.TEST_SCENE, maxMemoryMB=0.01)
+        dataPoints = np.random.rand(2000, 4)
+
+        for rows in np.split(dataPoints, 10):
+            logger.logDataPointArray(rows, self.INTERACTION_KEY)
+
+        self.assertLessEqual(logger._nBytesInMemory, 0.01 * 2 ** 20)
+        self.assertEqual(2000, logger.nDataPoints)
+        self.assertTrue(np.allclose(dataPoints, logger.getDataPoints(self.INTERACTION_KEY)))
+
+    def testGivenAMemoryBudget_shouldCompileViewsFromTheSpilledData(self):
+        logger = EnergyLogger(self.TEST_SCENE, views=[], maxMemoryMB=0.01)
+        dataPoints = np.random.rand(2000, 4)
+        for rows in np.split(dataPoints, 10):
+            logger.logDataPointArray(rows, self.INTERACTION_KEY)
+        view = View2DProjectionX(solidLabel=self.CUBE.getLabel())
+
+        logger.addView(view)
+
+        self.assertAlmostEqual(np.sum(dataPoints[:, 0]), view.getSum(), places=2)
+
+    def testGivenAMemoryBudget_whenClose_shouldFlushTheSpilledDataAndStopTheSpillingThread(self):
+        logger = EnergyLogger(self.TEST_SCENE, views=[], maxMemoryMB=0.01)
+        dataPoints = np.random.rand(2000, 4)
+        for rows in np.split(dataPoints, 10):
+            logger.logDataPointArray(rows, self.INTERACTION_KEY)
+        nThreads = threading.active_count()
+
+        logger.close()
+
+        self.assertEqual(nThreads - 1, threading.active_count())
+        self.assertTrue(np.allclose(dataPoints, logger.getDataPoints(self.INTERACTION_KEY)))
+
+    def testGivenViewsWithDifferentBinnings_whenCompileViews_shouldNotLeaveIdleThreads(self):
+        logger = EnergyLogger(self.TEST_SCENE, keep3D=False)
+        nThreads = threading.active_count()
+
+        logger.logDataPointArray(np.random.rand(100, 4), self.INTERACTION_KEY)
+
+        self.assertGreater(len({view.binningKey for view in logger.views}), 1)
+        self.assertEqual(nThreads, threading.active_count())
+
+    def testGivenAVoxelSize_whenLogDataPoints_shouldBinTheAbsorbedEnergyOfEachSolidToItsVoxelGrid(self):
+        logger = EnergyLogger(self.TEST_SCENE, keep3D=False, voxelSize=0.1)
+
+        logger.logDataPointArray(np.array([[0.5, 0.05, 0.05, 0.05], [0.25, 0.95, 0.95, 0.95]]), self.INTERACTION_KEY)
+        logger.logDataPointArray(np.array([[1, 0.5, 0.5, 1]]), InteractionKey("cube", "cube_top"))
+        logger.logDataPointArray(np.array([[1, 3, 3, 3]]), InteractionKey("world"))
+
+        self.assertTrue(logger.hasVoxels)
+        self.assertEqual(["cube"], list(logger.voxelGrids.keys()))
+        voxelGrid = logger.getVoxelGrid("cube")
+        self.assertEqual((10, 10, 10), voxelGrid.bins)
+        self.assertEqual(0.5, voxelGrid.getData()[0, 0, 0])
+        self.assertEqual(0.25, voxelGrid.getData()[-1, -1, -1])
+        self.assertEqual(0.75, voxelGrid.getSum())
+
+    def testGivenVoxelsOfTheWholeScene_whenLogDataPoints_shouldBinTheAbsorbedEnergyToASingleVoxelGrid(self):
+        logger = EnergyLogger(self.TEST_SCENE, keep3D=False, voxelSize=0.1, voxelsPerSolid=False)
+
+        logger.logDataPointArray(np.array([[0.5, 0.05, 0.05, 0.05]]), self.INTERACTION_KEY)
+        logger.logDataPointArray(np.array([[0.25, 0.95, 0.95, 0.95]]), InteractionKey("world"))
+
+        self.assertIsNone(logger.getVoxelGrid("cube"))
+        self.assertEqual(0.75, logger.getVoxelGrid().getSum())
+
+    def testGiven2DLoggerWithVoxels_whenAddViewNotContainedByExistingViews_shouldInitializeViewFromTheVoxels(self):
+        logger = EnergyLogger(self.TEST_SCENE, keep3D=False, voxelSize=0.1)
+        logger.logDataPoint(0.8, self.CUBE_CENTER, self.INTERACTION_KEY)
+        customView = View2DSliceX(position=self.CUBE_CENTER.x, thickness=0.2, solidLabel="cube")
+
+        self.assertTrue(logger.addView(customView))
+
+        self.assertAlmostEqual(0.8, customView.getSum())
+
+    def testGivenALoggerWithVoxels_whenSaveAndLoad_shouldLoadTheVoxels(self):
+        logger = EnergyLogger(self.TEST_SCENE, keep3D=False, voxelSize=0.1)
+        logger.logDataPoint(0.8, self.CUBE_CENTER, self.INTERACTION_KEY)
+        with tempfile.TemporaryDirectory() as tempDir:
+            for filename in ("test.log", "test.logdir"):
+                filePath = os.path.join(tempDir, filename)
+                logger.save(filePath)
+
+                loadedLogger = EnergyLogger(self.TEST_SCENE, filePath, keep3D=False)
+
+                self.assertAlmostEqual(0.8, loadedLogger.getVoxelGrid("cube").getSum())
+
+    def testGivenAnOctreeTally_whenLogDataPoints_shouldTallyTheAbsorbedEnergyOfItsSolid(self):
+        octreeTally = OctreeTally([(0, 1)] * 3, 0.1, solidLabel="cube")
+        logger = EnergyLogger(self.TEST_SCENE, keep3D=False, octreeTally=octreeTally)
+
+        logger.logDataPointArray(np.array([[0.5, 0.05, 0.05, 0.05], [0.25, 0.95, 0.95, 0.95]]), self.INTERACTION_KEY)
+        logger.logDataPointArray(np.array([[1, 0.5, 0.5, 1]]), InteractionKey("cube", "cube_top"))
+        logger.logDataPointArray(np.array([[1, 0.5, 0.5, 0.5]]), InteractionKey("world"))
+
+        self.assertEqual(0.75, logger.octreeTally.getSum())
+
+    def testGivenALoggerWithAnOctreeTally_whenSaveAndLoad_shouldLoadTheOctreeTally(self):
+        logger = EnergyLogger(self.TEST_SCENE, keep3D=False, octreeTally=OctreeTally([(0, 1)] * 3, 0.1))
+        logger.logDataPoint(0.8, self.CUBE_CENTER, self.INTERACTION_KEY)
+        with tempfile.TemporaryDirectory() as tempDir:
+            for filename in ("test.log", "test.logdir"):
+                filePath = os.path.join(tempDir, filename)
+                logger.save(filePath)
+
+                loadedLogger = EnergyLogger(self.TEST_SCENE, filePath, keep3D=False)
+
+                self.assertAlmostEqual(0.8, loadedLogger.octreeTally.getSum())
+
+    def testWhenLogDataPoints_shouldKeepTheEnergyTotalOfEachKeyEvenIfThe3DDataIsDiscarded(self):
+        for keep3D in [False, True]:
+            with self.subTest(["using2DLogger", "using3DLogger"][keep3D]):
+                logger = EnergyLogger(self.TEST_SCENE, keep3D=keep3D)
+                surfaceKey = InteractionKey("cube", "cube_top")
+                logger.logDataPointArray(np.array([[0.5, 0.5, 0.5, 0.5], [0.25, 0.5, 0.5, 0.5]]), self.INTERACTION_KEY)
+                logger.logDataPointArray(np.array([[-1, 0.5, 0.5, 1], [0.2, 0.5, 0.5, 1], [0.1, 0.5, 0.5, 1]]),
+                                         surfaceKey)
+
+                self.assertTrue(logger.hasEnergyTotals)
+                self.assertAlmostEqual(0.75, logger.getEnergyTotal(self.INTERACTION_KEY))
+                self.assertAlmostEqual(0.3, logger.getEnergyTotal(surfaceKey, leaving=True))
+                self.assertAlmostEqual(1, logger.getEnergyTotal(surfaceKey, leaving=False))
+                self.assertEqual(0, logger.getEnergyTotal(InteractionKey("cube", "cube_bottom")))
+
+    def testGivenALoggerSavedWithoutEnergyTotals_whenLoad_shouldSumTheEnergyTotalsFromThe3DData(self):
+        self.logger.logDataPoint(0.8, self.CUBE_CENTER, self.INTERACTION_KEY)
+        with tempfile.TemporaryDirectory() as tempDir:
+            filePath = os.path.join(tempDir, "test.log")
+            self.logger.save(filePath)
+            with open(filePath, "rb") as file:
+                # Loggers saved before the energy totals were tracked had 12 objects.
+                objectsWithoutEnergyTotals = pickle.load(file)[:12]
+            with open(filePath, "wb") as file:
+                pickle.dump(objectsWithoutEnergyTotals, file)
+
+            loadedLogger = EnergyLogger(self.TEST_SCENE, filePath)
+
+        self.assertTrue(loadedLogger.hasEnergyTotals)
+        self.assertAlmostEqual(0.8, loadedLogger.getEnergyTotal(self.INTERACTION_KEY))
+
+    def testGivenALoggerWithEnergyTotals_whenSaveAndLoad_shouldLoadTheEnergyTotals(self):
+        logger = EnergyLogger(self.TEST_SCENE, keep3D=False)
+        logger.logDataPoint(0.8, self.CUBE_CENTER, self.INTERACTION_KEY)
+        with tempfile.TemporaryDirectory() as tempDir:
+            for filename in ("test.log", "test.logdir"):
+                filePath = os.path.join(tempDir, filename)
+                logger.save(filePath)
+
+                loadedLogger = EnergyLogger(self.TEST_SCENE, filePath, keep3D=False)
+
+                self.assertAlmostEqual(0.8, loadedLogger.getEnergyTotal(self.INTERACTION_KEY))
+
+    @unittest.skipIf(not hardwareAccelerationIsAvailable(), 'Requires OpenCL.')
+    def testGivenHardwareAcceleration_whenCompileViews_shouldExtractTheSameViewsAsOnTheCPU(self):
+        randomGenerator = np.random.default_rng(0)
+        dataPoints = np.hstack([randomGenerator.normal(0, 1, (5000, 1)), randomGenerator.random((5000, 3))])
+        surfaceKey = InteractionKey("cube", "cube_top")
+        loggers = [EnergyLogger(self.TEST_SCENE, useHardwareAcceleration=useHardwareAcceleration)
+                   for useHardwareAcceleration in [False, True]]
+        for logger in loggers:
+            logger.logDataPointArray(np.abs(dataPoints), self.INTERACTION_KEY)
+            logger.logDataPointArray(dataPoints, surfaceKey)
+            logger.addView(View2DSliceZ(position=0.5, solidLabel="cube", thickness=0.2))
+            for view in logger.views:
+                logger.updateView(view)
+
+        self.assertIsNotNone(loggers[1].dataPointProcessor)
+        for view, deviceView in zip(loggers[0].views, loggers[1].views):
+            with self.subTest(view=view.name):
+                self.assertTrue(np.allclose(view.getImageData(logScale=False),
+                                            deviceView.getImageData(logScale=False), atol=1e-4))
+
+    def testGivenMaxPointsPerKey_whenLogManyDataPoints_shouldOnlyKeepASampleOfTheDataPointsOfEachKey(self):
+        logger = EnergyLogger(self.TEST_SCENE, maxPointsPerKey=100)
+        for _ in range(10):
+            logger.logDataPointArray(np.hstack([np.full((50, 1), 0.1), np.random.random((50, 3))]),
+                                     self.INTERACTION_KEY)
+
+        self.assertLessEqual(len(logger.getDataPoints(self.INTERACTION_KEY)), 200)
+        self.assertEqual(500, logger.nDataPoints)
+        self.assertAlmostEqual(50, logger.getEnergyTotal(self.INTERACTION_KEY))
+        self.assertGreater(np.sum(logger.getDataPoints(self.INTERACTION_KEY)[:, 0]), 0)
+
+    def testGivenMaxPointsPerKey_whenSampleDataPoints_shouldKeepTheMostEnergeticDataPoints(self):
+        logger = EnergyLogger(self.TEST_SCENE, maxPointsPerKey=10)
+        logger.logDataPoint(100, self.CUBE_CENTER, self.INTERACTION_KEY)
+
+        logger.logDataPointArray(np.hstack([np.full((50, 1), 0.01), np.random.random((50, 3))]), self.INTERACTION_KEY)
+
+        self.assertEqual(10, len(logger.getDataPoints(self.INTERACTION_KEY)))
+        self.assertIn(100, logger.getDataPoints(self.INTERACTION_KEY)[:, 0])
+
+    def testGivenMaxPointsPerKeyAndASeed_whenLogTheSameDataPoints_shouldKeepTheSameSample(self):
+        dataPoints = np.hstack([np.random.exponential(1, (500, 1)), np.random.random((500, 3))])
+        samples = []
+        for seed in [1, 1, 2]:
+            logger = EnergyLogger(self.TEST_SCENE, views=[], maxPointsPerKey=50, seed=seed)
+            for chunk in np.split(dataPoints, 10):
+                logger.logDataPointArray(chunk, self.INTERACTION_KEY)
+            samples.append(logger.getDataPoints(self.INTERACTION_KEY))
+
+        self.assertTrue(np.array_equal(samples[0], samples[1]))
+        self.assertFalse(np.array_equal(samples[0], samples[2]))
+
+    def testGivenMaxPointsPerKeyAndTheSeedOfASource_shouldKeepTheSameSample(self):
+        dataPoints = np.hstack([np.random.exponential(1, (500, 1)), np.random.random((500, 3))])
+        samples = []
+        for _ in range(2):
+            logger = EnergyLogger(self.TEST_SCENE, views=[], maxPointsPerKey=50)
+            logger.info["seed"] = 1234
+            logger.logDataPointArray(dataPoints, self.INTERACTION_KEY)
+            samples.append(logger.getDataPoints(self.INTERACTION_KEY))
+
+        self.assertTrue(np.array_equal(samples[0], samples[1]))
+
+    def testGivenASpatialIndex_whenSampleDataPoints_shouldQueryTheSample(self):
+        logger = EnergyLogger(self.TEST_SCENE, maxPointsPerKey=10)
+        logger.logDataPointArray(np.hstack([np.full((15, 1), 0.1), np.random.random((15, 3))]), self.INTERACTION_KEY)
+        logger.buildSpatialIndex()
+
+        logger.logDataPointArray(np.hstack([np.full((15, 1), 0.1), np.random.random((15, 3))]), self.INTERACTION_KEY)
+
+        sample = logger.getDataPoints(self.INTERACTION_KEY)
+        self.assertEqual(10, len(sample))
+        self.assertAlmostEqual(np.sum(sample[:, 0]), logger.query(self.INTERACTION_KEY, bbox=((0, 1), (0, 1), (0, 1))))
+
+    def testGivenSavedLoggerStore_whenSampleDataPointsAndSaveAgain_shouldRewriteTheSample(self):
+        logger = EnergyLogger(self.TEST_SCENE, maxPointsPerKey=10)
+        logger.logDataPointArray(np.hstack([np.full((10, 1), 0.1), np.random.random((10, 3))]), self.INTERACTION_KEY)
+        with tempfile.TemporaryDirectory() as tempDir:
+            filePath = os.path.join(tempDir, "test.logdir")
+            logger.save(filePath)
+            logger.logDataPointArray(np.hstack([np.full((20, 1), 0.1), np.random.random((20, 3))]),
+                                     self.INTERACTION_KEY)
+            logger.save(filePath)
+
+            loadedLogger = EnergyLogger(self.TEST_SCENE, filePath, maxPointsPerKey=10)
+
+            self.assertTrue(np.allclose(logger.getDataPoints(self.INTERACTION_KEY),
+                                        loadedLogger.getDataPoints(self.INTERACTION_KEY)))
+            self.assertEqual(30, loadedLogger.nDataPoints)
+
+    def testGivenCompiledView_whenSampleDataPoints_shouldCompileTheViewAgainFromTheSample(self):
+        logger = EnergyLogger(self.TEST_SCENE, maxPointsPerKey=10)
+        logger.logDataPointArray(np.hstack([np.full((10, 1), 0.1), np.random.random((10, 3))]), self.INTERACTION_KEY)
+        cubeViewZ = logger.views[5]
+        logger.updateView(cubeViewZ)
+
+        logger.logDataPointArray(np.hstack([np.full((20, 1), 0.1), np.random.random((20, 3))]), self.INTERACTION_KEY)
+        logger.updateView(cubeViewZ)
+
+        expectedSum = np.sum(logger.getDataPoints(self.INTERACTION_KEY)[:, 0])
+        self.assertAlmostEqual(expectedSum, cubeViewZ.getSum(), places=5)
+
+    def testGivenCompiledView_whenLogMoreDataAndUpdateView_shouldOnlyExtractTheNewData(self):
+        self.logger.logDataPoint(0.5, self.CUBE_CENTER, self.INTERACTION_KEY)
+        cubeViewZ = self.logger.views[5]
+        self.logger.updateView(cubeViewZ)
+
+        self.logger.logDataPoint(0.25, self.CUBE_CENTER, self.INTERACTION_KEY)
+        self.logger.updateView(cubeViewZ)
+
+        self.assertAlmostEqual(0.75, cubeViewZ.getSum())
+
+    def testWhenCompileViewsWithSameBinning_shouldExtractTheSameDataAsEachViewAlone(self):
+        def createViews():
+            return [View2DProjectionX(), View2DProjectionX(solidLabel="cube"), View2DProjectionY(solidLabel="cube"),
+                    View2DSliceX(position=0.5, solidLabel="cube")]
+        dataPoints = np.random.rand(1000, 4)
+        views = createViews()
+        self.logger = EnergyLogger(self.TEST_SCENE, keep3D=False, views=views)
+
+        self.logger.logDataPointArray(dataPoints, self.INTERACTION_KEY)
+
+        for view, expectedView in zip(views, createViews()):
+            EnergyLogger(self.TEST_SCENE, keep3D=False, views=[expectedView])
+            expectedView.extractData(dataPoints)
+            self.assertTrue(np.array_equal(expectedView.getImageData(logScale=False),
+                                           view.getImageData(logScale=False)))
+
+    def testGivenALoggerSavedWithCompiledViews_whenLoadAndUpdateViews_shouldOnlyExtractTheNewData(self):
+        self.logger.logDataPoint(0.5, self.CUBE_CENTER, self.INTERACTION_KEY)
+        self.logger.updateView(self.logger.views[5])
+        with tempfile.TemporaryDirectory() as tempDir:
+            filePath = os.path.join(tempDir, "test.log")
+            self.logger.save(filePath)
+            logger = EnergyLogger(self.TEST_SCENE, filePath)
+
+            logger.logDataPoint(0.25, self.CUBE_CENTER, self.INTERACTION_KEY)
+            logger.updateView(logger.views[5])
+
+            self.assertAlmostEqual(0.75, logger.views[5].getSum())
+
     def testGivenLoggerFromFile_shouldWarnIfLoadedWithDifferentScene(self):
         anotherScene = ScatteringScene([self.CUBE], worldMaterial=ScatteringMaterial(0.5, 0.5, 0.5))
         previousLogger = EnergyLogger(self.TEST_SCENE)
@@ -0,0 +1,149 @@
+import tracemalloc
+import unittest
+
+import numpy as np
+
+from pytissueoptics.rayscattering.display.utils import Direction, HistogramSpec
+from pytissueoptics.rayscattering.display.views import View2DProjectionZ, View2DSliceZ
+from pytissueoptics.rayscattering.energyLogging import OctreeTally, VoxelGrid
+
+
+class TestOctreeTally(unittest.TestCase):
+    LIMITS = [(0, 1), (0, 1), (0, 1)]
+
+    def testWhenNotFull_shouldNotSplit(self):
+        tally = OctreeTally(self.LIMITS, 0.1, splitCount=4)
+
+        tally.extractData(np.array([[1, 0.1, 0.1, 0.1]] * 4))
+
+        self.assertEqual(1, tally.nCells)
+        self.assertEqual(4, tally.getSum())
+
+    def testWhenPassingTheSplitCount_shouldSplitTheCellInOctants(self):
+        tally = OctreeTally(self.LIMITS, 0.1, splitCount=4)
+
+        tally.extractData(np.array([[1, 0.1, 0.1, 0.1]] * 4 + [[1, 0.9, 0.1, 0.1]]))
+
+        self.assertEqual(9, tally.nCells)
+        origins, sizes, values = tally.getCells()
+        self.assertTrue(np.allclose([[0, 0, 0], [0.5, 0, 0]], origins))
+        self.assertTrue(np.allclose(0.5, sizes))
+        self.assertTrue(np.allclose([4, 1], values))
+
+    def testWhenPassingTheSplitWeight_shouldSplitTheCell(self):
+        tally = OctreeTally(self.LIMITS, 0.5, splitCount=100, splitWeight=1)
+
+        tally.extractData(np.array([[2, 0.1, 0.1, 0.1]]))
+
+        self.assertEqual(9, tally.nCells)
+
+    def testShouldNotSplitCellsBelowTheMinimumCellSize(self):
+        tally = OctreeTally(self.LIMITS, 0.1, splitCount=1)
+
+        tally.extractData(np.array([[1, 0.01, 0.01, 0.01]] * 10))
+
+        self.assertEqual(3, tally.maxDepth)
+        _, sizes, _ = tally.getCells()
+        self.assertTrue(np.allclose(0.125, sizes))
+        self.assertEqual(10, tally.getSum())
+
+    def testGivenEnergyBeforeASplit_shouldKeepItInTheParentCell(self):
+        tally = OctreeTally(self.LIMITS, 0.1, splitCount=2)
+        tally.extractData(np.array([[1, 0.1, 0.1, 0.1]] * 2))
+
+        tally.extractData(np.array([[1, 0.1, 0.1, 0.1]]))
+
+        origins, sizes, values = tally.getCells()
+        self.assertTrue(np.allclose([[0, 0, 0], [0, 0, 0]], origins))
+        self.assertTrue(np.allclose([[1, 1, 1], [0.5, 0.5, 0.5]], sizes))
+        self.assertTrue(np.allclose([2, 1], values))
+
+    def testShouldIgnoreDatapointsOutsideTheLimits(self):
+        tally = OctreeTally(self.LIMITS, 0.1)
+
+        tally.extractData(np.array([[1, 1.5, 0.5, 0.5]]))
+
+        self.assertEqual(0, tally.getSum())
+
+    def testWhenGetHistogram_shouldSpreadTheEnergyOfEachCellOverTheBinsItOverlaps(self):
+        tally = OctreeTally(self.LIMITS, 0.1)
+        tally.extractData(np.array([[8, 0.1, 0.1, 0.1]]))
+        spec = HistogramSpec(columns=(1, 2), limits=((0, 1), (-0.5, 0.5)), bins=(2, 4))
+
+        histogram = tally.getHistogram(spec)
+
+        self.assertTrue(np.allclose([[0, 0, 1, 1], [0, 0, 1, 1]], histogram))
+
+    def testWhenGetHistogramOfASlice_shouldOnlyIncludeTheFractionOfTheCellsInsideTheSlice(self):
+        tally = OctreeTally(self.LIMITS, 0.1)
+        tally.extractData(np.array([[8, 0.1, 0.1, 0.1]]))
+        spec = HistogramSpec(columns=(1,), limits=((0, 1),), bins=(1,), sliceColumn=3, sliceLimits=(0.9, 1.5))
+
+        histogram = tally.getHistogram(spec)
+
+        self.assertTrue(np.allclose([0.8], histogram))
+
+    def testGivenACoarseCell_whenExtractAFineSlice_shouldOnlyAllocateMemoryForTheBins(self):
+        tally = OctreeTally(self.LIMITS, 0.1)
+        tally.extractData(np.array([[1, 0.5, 0.5, 0.5]] * 10))
+        view = View2DSliceZ(position=0.5, thickness=0.002, binSize=0.005)
+        view.setContext(self.LIMITS, (0.005, 0.005, 0.005))
+        nBins = view.binsU * view.binsV
+
+        tracemalloc.start()
+        tally.extractView(view)
+        _, peakMemory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        self.assertAlmostEqual(10 * 0.002, view.getSum(), places=5)
+        self.assertLess(peakMemory, 256 * nBins)
+
+    def testWhenExtractProjection_shouldMatchTheProjectionOfTheDatapoints(self):
+        dataPoints = self._makeConcentratedDataPoints()
+        tally = OctreeTally(self.LIMITS, 0.05, splitCount=16)
+        tally.extractData(dataPoints)
+        view = View2DProjectionZ()
+        expectedView = View2DProjectionZ()
+        expectedView.setContext(self.LIMITS, (0.1, 0.1, 0.1))
+        expectedView.extractData(dataPoints)
+
+        tally.extractView(view, binSize=0.1)
+
+        self.assertAlmostEqual(expectedView.getSum(), view.getSum(), places=3)
+        imageData, expectedImageData = view.getImageData(logScale=False), expectedView.getImageData(logScale=False)
+        self.assertTrue(np.allclose(expectedImageData, imageData, atol=0.05 * expectedImageData.max()))
+
+    def testWhenExtractSlice_shouldOnlyIncludeTheEnergyOfTheSlice(self):
+        tally = OctreeTally(self.LIMITS, 0.125, splitCount=1)
+        tally.extractData(np.array([[1, 0.05, 0.05, 0.05], [1, 0.05, 0.05, 0.05], [1, 0.95, 0.95, 0.95]]))
+        view = View2DSliceZ(position=0.0625, thickness=0.125)
+
+        tally.extractView(view, binSize=0.125)
+
+        self.assertAlmostEqual(2, view.getSum(), places=5)
+
+    def testWhenGetProfile_shouldReturnTheProfileAlongTheDirectionWithTheEnergyOfLargeCellsSpreadOverTheirBins(self):
+        tally = OctreeTally(self.LIMITS, 0.25, splitCount=1)
+        tally.extractData(np.array([[1, 0.1, 0.1, 0.1], [2, 0.1, 0.1, 0.1], [3, 0.9, 0.1, 0.1]]))
+
+        profile = tally.getProfile(Direction.X_POS)
+
+        self.assertTrue(np.allclose([3, 0, 1.5, 1.5], profile.data))
+        self.assertEqual((0, 1), profile.limits)
+
+    def testGivenConcentratedEnergy_shouldTakeLessMemoryThanADenseVoxelGridOfTheSameResolution(self):
+        dataPoints = self._makeConcentratedDataPoints()
+        tally = OctreeTally(self.LIMITS, 1 / 128, splitCount=64)
+        voxelGrid = VoxelGrid(self.LIMITS, 1 / 128)
+
+        tally.extractData(dataPoints)
+        voxelGrid.extractData(dataPoints)
+
+        self.assertAlmostEqual(voxelGrid.getSum(), tally.getSum(), places=2)
+        self.assertLess(tally.nBytes, np.prod(voxelGrid.bins) * 4 / 10)
+
+    @staticmethod
+    def _makeConcentratedDataPoints() -> np.ndarray:
+        rng = np.random.default_rng(0)
+        positions = np.clip(rng.normal(0.5, 0.03, (20000, 3)), 0, 1)
+        return np.hstack([np.full((20000, 1), 0.01), positions])
@@ -54,6 +54,24 @@ class TestPointCloudFactory(unittest.TestCase):
         self.assertEqual(self.N_POINTS_PER_SURFACE * 2, len(pointCloud.surfacePoints))
         self.assertIsNone(pointCloud.solidPoints)
 
+    def testWhenGetPointCloudChunks_shouldYieldAllSolidAndSurfacePoints(self):
+        logger = self._createTestLogger()
+        pointCloudFactory = PointCloudFactory(logger)
+        pointClouds = list(pointCloudFactory.getPointCloudChunks())
+
+        solidPoints = [p.solidPoints for p in pointClouds if p.solidPoints is not None]
+        surfacePoints = [p.surfacePoints for p in pointClouds if p.surfacePoints is not None]
+        self.assertEqual(self.N_POINTS_PER_SOLID * 2, len(np.concatenate(solidPoints)))
+        self.assertEqual(self.N_POINTS_PER_SURFACE * 2, len(np.concatenate(surfacePoints)))
+
+    def testWhenGetPointCloudOfSurfacesChunksOfSpecificSolid_shouldOnlyYieldSurfacePointsOfThisSolid(self):
+        logger = self._createTestLogger()
+        pointCloudFactory = PointCloudFactory(logger)
+        pointClouds = list(pointCloudFactory.getPointCloudOfSurfacesChunks(self.SOLID_LABEL_A))
+
+        self.assertEqual(self.N_POINTS_PER_SURFACE, sum(len(p.surfacePoints) for p in pointClouds))
+        self.assertTrue(all(p.solidPoints is None for p in pointClouds))
+
     def testGivenEmptyLogger_whenGetPointCloud_shouldReturnEmptyPointCloud(self):
         logger = Logger()
         pointCloudFactory = PointCloudFactory(logger)
@@ -0,0 +1,50 @@
+import unittest
+
+import numpy as np
+
+from pytissueoptics.rayscattering.energyLogging.prioritySampling import getPriorities, prioritySample
+
+
+class TestPrioritySampling(unittest.TestCase):
+    def testGivenFewerDatapointsThanTheSampleSize_shouldReturnTheDatapointsUnchanged(self):
+        dataPoints = np.array([[1, 0, 0, 0], [-2, 1, 1, 1]], dtype=np.float32)
+
+        sample, priorities = prioritySample(dataPoints, getPriorities(dataPoints[:, 0]), 2)
+
+        self.assertTrue(np.array_equal(dataPoints, sample))
+
+    def testShouldKeepTheDatapointsOfHighestPriorityAndRaiseTheirValueToTheThreshold(self):
+        dataPoints = np.array([[1, 0, 0, 0], [-1, 1, 0, 0], [1, 2, 0, 0], [5, 3, 0, 0]])
+        priorities = np.array([1, 4, 2, 6])
+
+        sample, samplePriorities = prioritySample(dataPoints, priorities, 2)
+
+        order = np.argsort(sample[:, 1])
+        self.assertTrue(np.array_equal([[-2, 1, 0, 0], [5, 3, 0, 0]], sample[order]))
+        self.assertTrue(np.array_equal([4, 6], samplePriorities[order]))
+
+    def testShouldEstimateTheSumOfAnySubsetWithoutBias(self):
+        rng = np.random.default_rng(0)
+        dataPoints = np.hstack([rng.exponential(1, (1000, 1)), rng.random((1000, 3))])
+        isInRegion = dataPoints[:, 1] < 0.3
+
+        estimates = []
+        for _ in range(400):
+            sample, _ = prioritySample(dataPoints, getPriorities(dataPoints[:, 0], rng), 100)
+            estimates.append(np.sum(sample[sample[:, 1] < 0.3, 0]))
+
+        expected = np.sum(dataPoints[isInRegion, 0])
+        self.assertAlmostEqual(expected, np.mean(estimates), delta=4 * np.std(estimates) / np.sqrt(len(estimates)))
+
+    def testWhenSamplingTheSampleWithMoreDatapoints_shouldBeTheSameAsSamplingEverythingAtOnce(self):
+        rng = np.random.default_rng(1)
+        dataPoints = np.hstack([rng.exponential(1, (300, 1)), rng.random((300, 3))])
+        priorities = getPriorities(dataPoints[:, 0], rng)
+
+        sample, samplePriorities = prioritySample(dataPoints[:200], priorities[:200], 50)
+        sample, _ = prioritySample(np.vstack([sample, dataPoints[200:]]),
+                                   np.concatenate([samplePriorities, priorities[200:]]), 50)
+        expectedSample, _ = prioritySample(dataPoints, priorities, 50)
+
+        order, expectedOrder = np.argsort(sample[:, 1]), np.argsort(expectedSample[:, 1])
+        self.assertTrue(np.allclose(expectedSample[expectedOrder], sample[order]))
@@ -0,0 +1,51 @@
+import unittest
+
+import numpy as np
+
+from pytissueoptics.rayscattering.energyLogging import VoxelGrid
+
+
+class TestVoxelGrid(unittest.TestCase):
+    LIMITS = [(0, 1), (0, 2), (-1, 1)]
+
+    def testShouldDivideTheLimitsInVoxelsOfTheGivenSize(self):
+        voxelGrid = VoxelGrid(self.LIMITS, 0.1)
+
+        self.assertEqual((10, 20, 20), voxelGrid.bins)
+        self.assertTrue(np.allclose((0.1, 0.1, 0.1), voxelGrid.voxelSize))
+
+    def testGivenNoData_shouldNotAllocateTheVoxels(self):
+        voxelGrid = VoxelGrid(self.LIMITS, 0.001)
+        self.assertEqual(0, voxelGrid.nBytes)
+
+    def testWhenExtractData_shouldAddTheValueOfEachDatapointToItsVoxel(self):
+        voxelGrid = VoxelGrid(self.LIMITS, 0.1)
+
+        voxelGrid.extractData(np.array([[1, 0.05, 0.05, -0.95], [2, 0.05, 0.05, -0.95], [3, 0.95, 1.95, 0.95]]))
+
+        data = voxelGrid.getData()
+        self.assertEqual(3, data[0, 0, 0])
+        self.assertEqual(3, data[-1, -1, -1])
+        self.assertEqual(6, voxelGrid.getSum())
+
+    def testWhenExtractDataOutsideTheLimits_shouldIgnoreTheDatapoints(self):
+        voxelGrid = VoxelGrid(self.LIMITS, 0.1)
+
+        voxelGrid.extractData(np.array([[1, 2, 0.5, 0]]))
+
+        self.assertEqual(0, voxelGrid.getSum())
+
+    def testGivenClippedGrid_whenExtractDataOutsideTheLimits_shouldAddTheDatapointsToTheNearestVoxel(self):
+        voxelGrid = VoxelGrid(self.LIMITS, 0.1, clip=True)
+
+        voxelGrid.extractData(np.array([[1, 1.0001, 0.05, -0.95]]))
+
+        self.assertEqual(1, voxelGrid.getData()[-1, 0, 0])
+
+    def testWhenGetDataPoints_shouldReturnTheValueOfEachVoxelAtItsCenter(self):
+        voxelGrid = VoxelGrid(self.LIMITS, 0.1)
+        voxelGrid.extractData(np.array([[1, 0.02, 0.08, -0.95], [2, 0.95, 1.95, 0.95]]))
+
+        dataPoints = voxelGrid.getDataPoints()
+
+        self.assertTrue(np.allclose([[1, 0.05, 0.05, -0.95], [2, 0.95, 1.95, 0.95]], dataPoints))
@@ -9,7 +9,8 @@ from pytissueoptics import Vector, ScatteringMaterial, ScatteringScene
 from pytissueoptics.rayscattering.opencl import OPENCL_AVAILABLE
 from pytissueoptics.rayscattering.opencl.config.CLConfig import OPENCL_SOURCE_DIR
 from pytissueoptics.rayscattering.opencl.CLProgram import CLProgram
-from pytissueoptics.rayscattering.opencl.CLScene import NO_SURFACE_ID, NO_LOG_ID, NO_SOLID_ID, CLScene
+from pytissueoptics.rayscattering.opencl.CLScene import NO_LOG_ID, NO_SOLID_ID, CLScene, SOLID_LOG_KEY_OFFSET, \
+    CROSSING_LOG_KEY
 from pytissueoptics.rayscattering.opencl.buffers import *
 from pytissueoptics.scene.intersection.mollerTrumboreIntersect import EPS_CORRECTION
 
@@ -34,8 +35,7 @@ class PhotonResult:
 class DataPointResult:
     deltaWeight: float
     position: Vector
-    solidID: int
-    surfaceID: int
+    key: int
 
 
 @unittest.skipIf(not OPENCL_AVAILABLE, 'Requires PyOpenCL.')
@@ -149,7 +149,7 @@ class TestCLPhoton(unittest.TestCase):
     def testWhenInteract_shouldDecreasePhotonWeight(self):
         material = ScatteringMaterial(5, 2, 0.9, 1.4)
 
-        photonResult = self._photonFunc("interact", MaterialCL([material]), DataPointCL(1), 0)
+        photonResult = self._photonFunc("interact", MaterialCL([material]), LogCL(1), 0)
 
         expectedWeightLoss = self.INITIAL_WEIGHT * material.getAlbedo()
         self.assertAlmostEqual(self.INITIAL_WEIGHT - expectedWeightLoss, photonResult.weight)
@@ -163,7 +163,7 @@ class TestCLPhoton(unittest.TestCase):
 
         surfaceID = 0
         surfaces = SurfaceCL([SurfaceCLInfo(0, 0, 0, 0, insideSolidID, outsideSolidID, False)])
-        logger = DataPointCL(2)
+        logger = LogCL(2)
 
         self._photonFunc("logIntersection", intersectionNormal, 0, surfaces, logger, 0)
         dataPoint1 = self._getDataPointResult(logger, i=0)
@@ -172,11 +172,10 @@ class TestCLPhoton(unittest.TestCase):
         weightCrossing = self.INITIAL_WEIGHT
         self.assertAlmostEqual(weightCrossing, dataPoint1.deltaWeight)
         self._assertVectorAlmostEqual(self.INITIAL_POSITION, dataPoint1.position)
-        self.assertEqual(self.INITIAL_SOLID_ID, dataPoint1.solidID)
-        self.assertEqual(surfaceID, dataPoint1.surfaceID)
+        self.assertEqual(CROSSING_LOG_KEY | surfaceID, dataPoint1.key)
 
         self.assertAlmostEqual(0, dataPoint2.deltaWeight)
-        self.assertAlmostEqual(NO_LOG_ID, dataPoint2.solidID)
+        self.assertEqual(NO_LOG_ID, dataPoint2.key)
 
     def testWhenLogIntersectionWithPhotonEnteringFromWorld_shouldLogOnlyOneIntersectionOnSolidInsideWithNegativeWeightCrossing(self):
         self.INITIAL_DIRECTION = Vector(0, 1, -1)
@@ -188,7 +187,7 @@ class TestCLPhoton(unittest.TestCase):
 
         surfaceID = 0
         surfaces = SurfaceCL([SurfaceCLInfo(0, 0, 0, 0, insideSolidID, outsideSolidID, False)])
-        logger = DataPointCL(2)
+        logger = LogCL(2)
 
         self._photonFunc("logIntersection", intersectionNormal, surfaceID, surfaces, logger, 0)
         dataPoint1 = self._getDataPointResult(logger, i=0)
@@ -197,12 +196,12 @@ class TestCLPhoton(unittest.TestCase):
         weightCrossing = self.INITIAL_WEIGHT
         self.assertAlmostEqual(-weightCrossing, dataPoint1.deltaWeight)
         self._assertVectorAlmostEqual(self.INITIAL_POSITION, dataPoint1.position)
-        self.assertEqual(insideSolidID, dataPoint1.solidID)
+        self.assertEqual(CROSSING_LOG_KEY | surfaceID, dataPoint1.key)
 
         self.assertAlmostEqual(0, dataPoint2.deltaWeight)
-        self.assertAlmostEqual(NO_LOG_ID, dataPoint2.solidID)
+        self.assertEqual(NO_LOG_ID, dataPoint2.key)
 
-    def testWhenLogIntersectionBetweenTwoSolids_shouldLogIntersectionOnEachSolidWithCorrectWeightCrossings(self):
+    def testWhenLogIntersectionBetweenTwoSolids_shouldLogASingleCrossingWithWeightCrossingRelativeToInsideSolid(self):
         # => Photon is leaving solid
         self.INITIAL_DIRECTION = Vector(0, 1, 1)
         self.INITIAL_DIRECTION.normalize()
@@ -211,7 +210,7 @@ class TestCLPhoton(unittest.TestCase):
         outsideSolidID = self.INITIAL_SOLID_ID + 11
 
         surfaces = SurfaceCL([SurfaceCLInfo(0, 0, 0, 0, insideSolidID, outsideSolidID, False)])
-        logger = DataPointCL(2)
+        logger = LogCL(2)
 
         self._photonFunc("logIntersection", intersectionNormal, 0, surfaces, logger, 0)
         dataPoint1 = self._getDataPointResult(logger, i=0)
@@ -219,14 +218,13 @@ class TestCLPhoton(unittest.TestCase):
 
         weightCrossing = self.INITIAL_WEIGHT
         self.assertAlmostEqual(weightCrossing, dataPoint1.deltaWeight)
-        self.assertEqual(self.INITIAL_SOLID_ID, dataPoint1.solidID)
+        self.assertEqual(CROSSING_LOG_KEY | 0, dataPoint1.key)
 
-        self.assertAlmostEqual(-weightCrossing, dataPoint2.deltaWeight)
-        self.assertAlmostEqual(outsideSolidID, dataPoint2.solidID)
+        self.assertEqual(NO_LOG_ID, dataPoint2.key)
 
     def testWhenInteract_shouldLogInteraction(self):
         material = ScatteringMaterial(5, 2, 0.9, 1.4)
-        logger = DataPointCL(1)
+        logger = LogCL(1)
 
         self._photonFunc("interact", MaterialCL([material]), logger, 0)
         dataPoint = self._getDataPointResult(logger)
@@ -234,8 +232,7 @@ class TestCLPhoton(unittest.TestCase):
         expectedWeightLoss = self.INITIAL_WEIGHT * material.getAlbedo()
         self.assertAlmostEqual(expectedWeightLoss, dataPoint.deltaWeight)
         self._assertVectorAlmostEqual(self.INITIAL_POSITION, dataPoint.position)
-        self.assertEqual(self.INITIAL_SOLID_ID, dataPoint.solidID)
-        self.assertEqual(NO_SURFACE_ID, dataPoint.surfaceID)
+        self.assertEqual(self.INITIAL_SOLID_ID + SOLID_LOG_KEY_OFFSET, dataPoint.key)
 
     def testWhenReflectOrRefractWithReflectingIntersection_shouldReflectPhotonAndMoveItBackABit(self):
         # => Photon is trying to enter solid
@@ -246,7 +243,7 @@ class TestCLPhoton(unittest.TestCase):
         self._mockFresnelIntersection(isReflected=True, incidencePlane=Vector(0, 0, 1),
                                       angleDeflection=np.pi / 2)
 
-        logger = DataPointCL(2)
+        logger = LogCL(2)
         surfaces = SurfaceCL([SurfaceCLInfo(0, 0, 0, 0, insideSolidID=9, outsideSolidID=NO_SOLID_ID, toSmooth=False)])
         photonResult = self._photonFunc("reflectOrRefract", intersectionNormal, 0, 10,
                                         MaterialCL([ScatteringMaterial()]), surfaces, logger, 0, SeedCL(1))
@@ -259,7 +256,7 @@ class TestCLPhoton(unittest.TestCase):
         self.assertEqual(NO_SOLID_ID, photonResult.solidID)
 
         dataPoint = self._getDataPointResult(logger)
-        self.assertEqual(NO_LOG_ID, dataPoint.solidID)
+        self.assertEqual(NO_LOG_ID, dataPoint.key)
 
     def testWhenReflectOrRefractWithRefractingIntersection_shouldRefractPhotonAndMoveABitAfterSurface(self):
         # => Photon enters solid
@@ -273,7 +270,7 @@ class TestCLPhoton(unittest.TestCase):
                                       angleDeflection=-np.pi / 4, nextMaterialID=insideMaterialID,
                                       nextSolidID=insideSolidID)
 
-        logger = DataPointCL(2)
+        logger = LogCL(2)
         surfaces = SurfaceCL([SurfaceCLInfo(0, 0, 0, 0, insideSolidID, outsideSolidID=NO_SOLID_ID, toSmooth=False)])
         photonResult = self._photonFunc("reflectOrRefract", intersectionNormal, 0, 10,
                                         MaterialCL([ScatteringMaterial()]), surfaces, logger, 0, SeedCL(1))
@@ -291,13 +288,13 @@ class TestCLPhoton(unittest.TestCase):
         dataPoint = self._getDataPointResult(logger)
         self.assertEqual(-self.INITIAL_WEIGHT, dataPoint.deltaWeight)
         self._assertVectorAlmostEqual(self.INITIAL_POSITION, dataPoint.position)
-        self.assertEqual(insideSolidID, dataPoint.solidID)
+        self.assertEqual(CROSSING_LOG_KEY | 0, dataPoint.key)
 
     def testWhenStepToInfinityWithNoIntersection_shouldKillPhoton(self):
         stepDistance = math.inf
         self._mockFindIntersection(exists=False)
 
-        logger = DataPointCL(2)
+        logger = LogCL(2)
         surfaces = SurfaceCL([SurfaceCLInfo(0, 0, 0, 0, insideSolidID=9, outsideSolidID=10, toSmooth=False)])
         photonResult = self._photonFunc("propagateStep", stepDistance,
                                         MaterialCL([ScatteringMaterial()]), surfaces, SeedCL(1), logger, 0)
@@ -308,7 +305,7 @@ class TestCLPhoton(unittest.TestCase):
         stepDistance = 10
         self._mockFindIntersection(exists=False)
 
-        logger = DataPointCL(2)
+        logger = LogCL(2)
         surfaces = SurfaceCL([SurfaceCLInfo(0, 0, 0, 0, insideSolidID=9, outsideSolidID=10, toSmooth=False)])
         photonResult = self._photonFunc("propagateStep", stepDistance,
                                         MaterialCL([ScatteringMaterial()]), surfaces, SeedCL(1), logger, 0)
@@ -316,7 +313,7 @@ class TestCLPhoton(unittest.TestCase):
         expectedPosition = self.INITIAL_POSITION + self.INITIAL_DIRECTION * stepDistance
         self._assertVectorAlmostEqual(expectedPosition, photonResult.position)
         interaction = self._getDataPointResult(logger)
-        self.assertEqual(self.INITIAL_SOLID_ID, interaction.solidID)
+        self.assertEqual(self.INITIAL_SOLID_ID + SOLID_LOG_KEY_OFFSET, interaction.key)
 
     def testWhenStepTooCloseToIntersectionFromOutside_shouldMovePhotonBackABitAndScatter(self):
         stepDistance = 10
@@ -324,7 +321,7 @@ class TestCLPhoton(unittest.TestCase):
         self.INITIAL_DIRECTION = Vector(0, 0, -1)
         self._mockFindIntersection(exists=True, isTooClose=True, normal=Vector(0, 0, 1))
 
-        logger = DataPointCL(2)
+        logger = LogCL(2)
         surfaces = SurfaceCL([SurfaceCLInfo(0, 0, 0, 0, insideSolidID=9, outsideSolidID=NO_SOLID_ID, toSmooth=False)])
         photonResult = self._photonFunc("propagateStep", stepDistance,
                                         MaterialCL([ScatteringMaterial()]), surfaces, SeedCL(1), logger, 0)
@@ -332,7 +329,7 @@ class TestCLPhoton(unittest.TestCase):
         expectedPosition = self.INITIAL_POSITION + self.INITIAL_DIRECTION * (stepDistance - EPS_CORRECTION)
         self._assertVectorAlmostEqual(expectedPosition, photonResult.position)
         interaction = self._getDataPointResult(logger)
-        self.assertEqual(self.INITIAL_SOLID_ID, interaction.solidID)
+        self.assertEqual(self.INITIAL_SOLID_ID + SOLID_LOG_KEY_OFFSET, interaction.key)
 
     def testWhenStepTooCloseToIntersectionFromInside_shouldMovePhotonBackABitAndScatter(self):
         stepDistance = 10
@@ -340,7 +337,7 @@ class TestCLPhoton(unittest.TestCase):
         self.INITIAL_DIRECTION = Vector(0, 0, 1)
         self._mockFindIntersection(exists=True, isTooClose=True, normal=Vector(0, 0, 1))
 
-        logger = DataPointCL(2)
+        logger = LogCL(2)
         surfaces = SurfaceCL([SurfaceCLInfo(0, 0, 0, 0, insideSolidID=self.INITIAL_SOLID_ID,
                                             outsideSolidID=NO_SOLID_ID, toSmooth=False)])
         photonResult = self._photonFunc("propagateStep", stepDistance,
@@ -349,13 +346,13 @@ class TestCLPhoton(unittest.TestCase):
         expectedPosition = self.INITIAL_POSITION + self.INITIAL_DIRECTION * (stepDistance - EPS_CORRECTION)
         self._assertVectorAlmostEqual(expectedPosition, photonResult.position)
         interaction = self._getDataPointResult(logger)
-        self.assertEqual(self.INITIAL_SOLID_ID, interaction.solidID)
+        self.assertEqual(self.INITIAL_SOLID_ID + SOLID_LOG_KEY_OFFSET, interaction.key)
 
     def testWhenStepWithNoDistance_shouldStepWithANewScatteringDistance(self):
         stepDistance = 0
         self._mockFindIntersection(exists=False)
 
-        logger = DataPointCL(2)
+        logger = LogCL(2)
         surfaces = SurfaceCL([SurfaceCLInfo(0, 0, 0, 0, insideSolidID=9, outsideSolidID=10, toSmooth=False)])
         photonResult = self._photonFunc("propagateStep", stepDistance,
                                         MaterialCL([ScatteringMaterial(5, 2)]), surfaces, SeedCL(1), logger, 0)
@@ -368,7 +365,7 @@ class TestCLPhoton(unittest.TestCase):
         self._mockFindIntersection(exists=True, distance=intersectionDistance)
         self._mockFresnelIntersection(isReflected=True)
 
-        logger = DataPointCL(2)
+        logger = LogCL(2)
         surfaces = SurfaceCL([SurfaceCLInfo(0, 0, 0, 0, insideSolidID=9,
                                             outsideSolidID=self.INITIAL_SOLID_ID, toSmooth=False)])
         photonResult = self._photonFunc("propagateStep", stepDistance,
@@ -383,7 +380,7 @@ class TestCLPhoton(unittest.TestCase):
         self._mockFindIntersection(exists=True, distance=intersectionDistance)
         self._mockFresnelIntersection(isReflected=False)
 
-        logger = DataPointCL(2)
+        logger = LogCL(2)
         surfaces = SurfaceCL([SurfaceCLInfo(0, 0, 0, 0, insideSolidID=9,
                                             outsideSolidID=self.INITIAL_SOLID_ID, toSmooth=False)])
         photonResult = self._photonFunc("propagateStep", stepDistance,
@@ -418,6 +415,7 @@ class TestCLPhoton(unittest.TestCase):
         self.assertNotEqual(0, photonResult.weight)
 
     def _photonFunc(self, funcName: str, *args) -> PhotonResult:
+        args = [column for arg in args for column in (arg.columns if isinstance(arg, LogCL) else [arg])]
         self._addMissingDeclarations(args)
 
         photonBuffer = PhotonCL(positions=np.array([self.INITIAL_POSITION.array]),
@@ -438,14 +436,18 @@ class TestCLPhoton(unittest.TestCase):
         maxInteractions = int(np.ceil(avgInteractions) * factorOfMaxInteractions)
 
         s = self._getCLSceneOfInfiniteMedium(material)
-        logger = DataPointCL(maxInteractions)
+        logger = LogCL(maxInteractions)
         photonBuffer = PhotonCL(positions=np.array([self.INITIAL_POSITION.array]),
                                 directions=np.array([self.INITIAL_DIRECTION.array]),
                                 materialID=0, solidID=self.INITIAL_SOLID_ID, weight=self.INITIAL_WEIGHT)
         self.program.launchKernel(kernelName="propagate", N=1,
                                   arguments=[np.int32(1), np.int32(maxInteractions), np.float32(WEIGHT_THRESHOLD), np.int32(1),
                                              photonBuffer, s.materials, s.nSolids, s.solids, s.surfaces, s.triangles,
-                                             s.vertices, s.solidCandidates, SeedCL(1), logger])
+                                             s.vertices, s.solidCandidates, SeedCL(1), *logger.columns,
+                                             BufferOf(np.zeros(1, dtype=np.float32)),
+                                             BufferOf(np.zeros(1, dtype=np.float32)),
+                                             BufferOf(np.zeros(1, dtype=np.float32)),
+                                             BufferOf(np.zeros(1, dtype=np.uint32))])
         return self._getPhotonResult(photonBuffer)
 
     @staticmethod
@@ -457,7 +459,7 @@ class TestCLPhoton(unittest.TestCase):
     def _addMissingDeclarations(self, kernelArguments):
         self.program._include = ''
         requiredObjects = [MaterialCL([ScatteringMaterial()]), SurfaceCL([]), SeedCL(1), VertexCL([]),
-                           DataPointCL(1), SolidCandidateCL(1, 1), TriangleCL([]), SolidCL([])]
+                           SolidCandidateCL(1, 1), TriangleCL([]), SolidCL([])]
         missingObjects = []
         for obj in requiredObjects:
             if any(isinstance(arg, type(obj)) for arg in kernelArguments):
@@ -473,9 +475,12 @@ class TestCLPhoton(unittest.TestCase):
         return PhotonResult(position=Vector(*data[:3]), direction=Vector(*data[4:7]), er=Vector(*data[8:11]),
                             weight=data[12], materialID=data[13], solidID=data[14])
 
-    def _getDataPointResult(self, dataPointBuffer: DataPointCL, i=0):
-        data = self.program.getData(dataPointBuffer)[i]
-        return DataPointResult(deltaWeight=data[0], position=Vector(*data[1:4]), solidID=data[4], surfaceID=data[5])
+    def _getDataPointResult(self, logger: LogCL, i=0):
+        for column in logger.columns:
+            self.program.getData(column, returnData=False)
+        position = logger.positions.hostBuffer[3 * i: 3 * i + 3]
+        return DataPointResult(deltaWeight=logger.weights.hostBuffer[i], position=Vector(*position),
+                               key=int(logger.keys.hostBuffer[i]))
 
     def _assertVectorAlmostEqual(self, v1: Vector, v2: Vector, places=6):
         self.assertAlmostEqual(v1.x, v2.x, places=places)
@@ -490,19 +495,7 @@ class TestCLPhoton(unittest.TestCase):
         self.fail("Vectors are equal")
 
     def _mockRandomValue(self, value):
-        getRandomFloatValueFunction = """float getRandomFloatValue(__global unsigned int *seeds, unsigned int id){
-     float result = 0.0f;
-     while(result == 0.0f){
-         uint rnd_seed = wangHash(seeds[id]);
-         seeds[id] = rnd_seed;
-         result = (float)rnd_seed / (float)UINT_MAX;
-     }
-     return result;
-}"""
-        mockFunction = """float getRandomFloatValue(__global unsigned int *seeds, unsigned int id){
-        return %f;
-    }""" % value
-        self.program.mock(getRandomFloatValueFunction, mockFunction)
+        self.program.specialize({"MOCK_RANDOM_VALUE": "%ff" % value})
 
     def _mockFresnelIntersection(self, isReflected: bool,
                                  incidencePlane: Vector = Vector(0, 1, 0), angleDeflection: float = np.pi / 2,
@@ -8,6 +8,7 @@ from pytissueoptics.rayscattering.opencl import OPENCL_AVAILABLE
 from pytissueoptics.rayscattering.opencl.config.CLConfig import OPENCL_SOURCE_DIR
 from pytissueoptics.rayscattering.opencl.buffers import SeedCL, EmptyBuffer
 from pytissueoptics.rayscattering.opencl.CLProgram import CLProgram
+from pytissueoptics.rayscattering.randomStream import RandomStream
 
 
 @unittest.skipIf(not OPENCL_AVAILABLE, 'Requires PyOpenCL.')
@@ -59,3 +60,17 @@ class TestCLRandom(unittest.TestCase):
         randomValues1 = self.program.getData(valueBuffer1)
         randomValues2 = self.program.getData(valueBuffer2)
         self.assertTrue(np.all(randomValues1 == randomValues2))
+
+    def testGivenSeed_shouldGenerateSameRandomValuesAsRandomStream(self):
+        nWorkUnits = 10
+        seed = 42
+        seeds = SeedCL(nWorkUnits, seed=seed)
+        valueBuffers = [EmptyBuffer(nWorkUnits) for _ in range(5)]
+        for valueBuffer in valueBuffers:
+            self.program.launchKernel("fillRandomFloatBuffer", N=nWorkUnits, arguments=[seeds, valueBuffer])
+
+        randomValues = np.stack([self.program.getData(valueBuffer) for valueBuffer in valueBuffers], axis=1)
+
+        streams = [RandomStream(seed, streamID=i) for i in range(nWorkUnits)]
+        expectedValues = np.array([[stream.random() for _ in range(5)] for stream in streams], dtype=np.float32)
+        self.assertTrue(np.array_equal(expectedValues, randomValues))
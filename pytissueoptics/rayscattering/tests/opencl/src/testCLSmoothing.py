@@ -85,7 +85,7 @@ class TestCLNormalSmoothing(unittest.TestCase):
     def _addMissingDeclarations(self):
         self.program._include = ''
         missingObjects = [MaterialCL([ScatteringMaterial()]), SurfaceCL([]), SeedCL(1),
-                           DataPointCL(1), SolidCandidateCL(1, 1), SolidCL([])]
+                          SolidCandidateCL(1, 1), SolidCL([])]
 
         for clObject in missingObjects:
             clObject.make(self.program.device)
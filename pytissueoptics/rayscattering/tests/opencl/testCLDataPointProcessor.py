@@ -0,0 +1,43 @@
+import unittest
+
+import numpy as np
+
+from pytissueoptics.rayscattering.display.utils.binning import HistogramSpec, histogramDataPoints
+from pytissueoptics.rayscattering.opencl import OPENCL_AVAILABLE
+from pytissueoptics.rayscattering.opencl.CLDataPointProcessor import CLDataPointProcessor
+
+
+@unittest.skipIf(not OPENCL_AVAILABLE, 'Requires PyOpenCL.')
+class TestCLDataPointProcessor(unittest.TestCase):
+    def setUp(self):
+        randomGenerator = np.random.default_rng(0)
+        self.dataPoints = np.hstack([randomGenerator.normal(0, 1, (20000, 1)),
+                                     randomGenerator.uniform(-0.5, 1.5, (20000, 3))]).astype(np.float32)
+        self.processor = CLDataPointProcessor(chunkRows=3000)
+
+    def testWhenHistogram_shouldBinLikeTheHostHistogramOfTheSpec(self):
+        specs = [HistogramSpec(columns=(1, 2), limits=((0, 1), (0, 1)), bins=(10, 20)),
+                 HistogramSpec(columns=(1, 2, 3), limits=((0, 1), (0, 0.5), (-0.2, 1)), bins=(4, 5, 6), sign=1),
+                 HistogramSpec(columns=(3,), limits=((0, 1),), bins=(7,), sign=-1),
+                 HistogramSpec(columns=(2, 3), limits=((0, 1), (0, 1)), bins=(5, 5), sliceColumn=1,
+                               sliceLimits=(0.2, 0.4))]
+
+        histograms = self.processor.histograms(np.array_split(self.dataPoints, 3), specs)
+
+        for spec, histogram in zip(specs, histograms):
+            with self.subTest(spec=spec):
+                self.assertEqual(spec.bins, histogram.shape)
+                self.assertTrue(np.allclose(histogramDataPoints(self.dataPoints, spec), histogram, atol=1e-3))
+
+    def testWhenGetSums_shouldReturnTheSumOfPositiveAndNegativeValues(self):
+        values = self.dataPoints[:, 0].astype(np.float64)
+
+        sums = self.processor.getSums([self.dataPoints[:5000], None, self.dataPoints[5000:]])
+
+        self.assertTrue(np.allclose([np.sum(values[values > 0]), -np.sum(values[values < 0])], sums))
+
+    def testGivenNoDataPoints_shouldReturnEmptyHistogramsAndSums(self):
+        spec = HistogramSpec(columns=(1,), limits=((0, 1),), bins=(3,))
+
+        self.assertEqual([0, 0, 0], self.processor.histogram([], spec).tolist())
+        self.assertEqual([0, 0], self.processor.getSums([]).tolist())
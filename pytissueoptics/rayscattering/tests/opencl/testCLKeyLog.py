@@ -3,10 +3,12 @@ import unittest
 import numpy as np
 from mockito import mock, when, verify, arg_that
 
-from pytissueoptics import Cube, ScatteringMaterial, Sphere, ScatteringScene, EnergyLogger
+from pytissueoptics import Cube, ScatteringMaterial, Sphere, ScatteringScene, EnergyLogger, LoggingPolicy
 from pytissueoptics.rayscattering.opencl.utils import CLKeyLog
 from pytissueoptics.rayscattering.opencl import OPENCL_AVAILABLE
-from pytissueoptics.rayscattering.opencl.CLScene import CLScene, NO_LOG_ID, NO_SOLID_ID, NO_SURFACE_ID, NO_SOLID_LABEL
+from pytissueoptics.rayscattering.opencl.buffers import LogCL
+from pytissueoptics.rayscattering.opencl.CLScene import CLScene, NO_LOG_ID, NO_SOLID_ID, NO_SOLID_LABEL, \
+    SOLID_LOG_KEY_OFFSET, CROSSING_LOG_KEY
 from pytissueoptics.scene.logger import InteractionKey
 
 
@@ -19,20 +21,29 @@ class TestCLKeyLog(unittest.TestCase):
         self.sphere = Sphere(1, material=material2, label="sphere")
         self.scene = ScatteringScene([self.cube, self.sphere])
 
+    @staticmethod
+    def _createLog(entries, quantizedPositions=False) -> LogCL:
+        """ Creates a LogCL from a list of (weight, position, key) entries. """
+        log = LogCL(len(entries), quantizedPositions=quantizedPositions)
+        for i, (weight, position, key) in enumerate(entries):
+            log.weights.hostBuffer[i] = weight
+            log.positions.hostBuffer[3 * i: 3 * i + 3] = position
+            log.keys.hostBuffer[i] = key
+        return log
+
     def _createTestLog(self, sceneCL):
         cubeID = sceneCL.getSolidID(self.cube)
         cubeSurfaceIDs = sceneCL.getSurfaceIDs(cubeID)
         sphereID = sceneCL.getSolidID(self.sphere)
         sphereSurfaceIDs = sceneCL.getSurfaceIDs(sphereID)
 
-        log = np.array([[0, 0, 0, 0, cubeID, NO_SURFACE_ID],
-                        [2, 0, 0, 0, sphereID, NO_SURFACE_ID],
-                        [3, 0, 0, 0, NO_SOLID_ID, NO_SURFACE_ID],
-                        [4, 9, 9, 9, NO_LOG_ID, 9],
-                        [5, 0, 0, 0, cubeID, cubeSurfaceIDs[1]],
-                        [6, 0, 0, 0, sphereID, sphereSurfaceIDs[1]],
-                        [1, 0, 0, 0, cubeID, NO_SURFACE_ID]])
-        return log
+        return self._createLog([(0, (0, 0, 0), cubeID + SOLID_LOG_KEY_OFFSET),
+                                (2, (0, 0, 0), sphereID + SOLID_LOG_KEY_OFFSET),
+                                (3, (0, 0, 0), NO_SOLID_ID + SOLID_LOG_KEY_OFFSET),
+                                (4, (9, 9, 9), NO_LOG_ID),
+                                (5, (0, 0, 0), CROSSING_LOG_KEY | cubeSurfaceIDs[1]),
+                                (6, (0, 0, 0), CROSSING_LOG_KEY | sphereSurfaceIDs[1]),
+                                (1, (0, 0, 0), cubeID + SOLID_LOG_KEY_OFFSET)])
 
     def testGivenCLKeyLog_whenTransferToSceneLogger_shouldLogDataWithInteractionKeys(self):
         sceneCL = CLScene(self.scene, nWorkUnits=10)
@@ -43,7 +54,7 @@ class TestCLKeyLog(unittest.TestCase):
 
         clKeyLog.toSceneLogger(sceneLogger)
 
-        verify(sceneLogger, times=5).logDataPointArray(...)
+        verify(sceneLogger, times=6).logDataPointArray(...)
 
         expectedCubeData = arg_that(lambda arg: np.array_equal(arg, np.array([[0, 0, 0, 0], [1, 0, 0, 0]])))
         verify(sceneLogger).logDataPointArray(expectedCubeData, InteractionKey(self.cube.getLabel()))
@@ -51,17 +62,33 @@ class TestCLKeyLog(unittest.TestCase):
         expectedValuesWithKeys = [(2, InteractionKey(self.sphere.getLabel())),
                                   (3, InteractionKey(NO_SOLID_LABEL)),
                                   (5, InteractionKey(self.cube.getLabel(), self.cube.surfaceLabels[0])),
-                                  (6, InteractionKey(self.sphere.getLabel(), self.sphere.surfaceLabels[0]))]
+                                  (6, InteractionKey(self.sphere.getLabel(), self.sphere.surfaceLabels[0])),
+                                  (-6, InteractionKey(self.cube.getLabel(), self.sphere.surfaceLabels[0]))]
         for value, expectedKey in expectedValuesWithKeys:
-            expectedData = arg_that(lambda arg: np.array_equal(arg, np.array([[value, 0, 0, 0]])))
+            expectedData = arg_that(lambda arg, v=value: np.array_equal(arg, np.array([[v, 0, 0, 0]])))
             verify(sceneLogger).logDataPointArray(expectedData, expectedKey)
 
+    def testGivenLoggingPolicyOfASingleSolid_whenTransferToSceneLogger_shouldOnlyLogCrossingsOfThisSolid(self):
+        sceneCL = CLScene(self.scene, nWorkUnits=10, loggingPolicy=LoggingPolicy(solids=[self.sphere.getLabel()]))
+        sphereSurfaceIDs = sceneCL.getSurfaceIDs(sceneCL.getSolidID(self.sphere))
+        log = self._createLog([(6, (0, 0, 0), CROSSING_LOG_KEY | sphereSurfaceIDs[1])])
+        clKeyLog = CLKeyLog(log, sceneCL)
+        sceneLogger = mock(EnergyLogger)
+        when(sceneLogger).logDataPointArray(...).thenReturn()
+
+        clKeyLog.toSceneLogger(sceneLogger)
+
+        verify(sceneLogger, times=1).logDataPointArray(...)
+        expectedData = arg_that(lambda arg: np.array_equal(arg, np.array([[6, 0, 0, 0]])))
+        verify(sceneLogger).logDataPointArray(expectedData,
+                                              InteractionKey(self.sphere.getLabel(), self.sphere.surfaceLabels[0]))
+
     def testGivenCLKeyLogForInfiniteScene_whenTransferToSceneLogger_shouldLogDataWithInteractionKeys(self):
         self.scene = ScatteringScene([], worldMaterial=ScatteringMaterial(1, 0.8, 0.8, 1.4))
         sceneCL = CLScene(self.scene, nWorkUnits=10)
-        log = np.array([[1, 0, 0, 0, NO_SOLID_ID, NO_SURFACE_ID],
-                        [2, 0, 0, 0, NO_LOG_ID, 99],
-                        [3, 0, 0, 0, NO_SOLID_ID, NO_SURFACE_ID]])
+        log = self._createLog([(1, (0, 0, 0), NO_SOLID_ID + SOLID_LOG_KEY_OFFSET),
+                               (2, (0, 0, 0), NO_LOG_ID),
+                               (3, (0, 0, 0), NO_SOLID_ID + SOLID_LOG_KEY_OFFSET)])
         clKeyLog = CLKeyLog(log, sceneCL)
         sceneLogger = mock(EnergyLogger)
         when(sceneLogger).logDataPointArray(...).thenReturn()
@@ -71,3 +98,17 @@ class TestCLKeyLog(unittest.TestCase):
         verify(sceneLogger, times=1).logDataPointArray(...)
         expectedWorldData = arg_that(lambda arg: np.array_equal(arg, np.array([[1, 0, 0, 0], [3, 0, 0, 0]])))
         verify(sceneLogger).logDataPointArray(expectedWorldData, InteractionKey(NO_SOLID_LABEL))
+
+    def testGivenQuantizedLogPositions_whenTransferToSceneLogger_shouldLogPositionsInSceneCoordinates(self):
+        sceneCL = CLScene(self.scene, nWorkUnits=10, quantizeLogPositions=True)
+        cubeID = sceneCL.getSolidID(self.cube)
+        log = self._createLog([(1, (0, 2 ** 16 - 1, 2 ** 15), cubeID + SOLID_LOG_KEY_OFFSET)],
+                              quantizedPositions=True)
+        clKeyLog = CLKeyLog(log, sceneCL)
+        sceneLogger = mock(EnergyLogger)
+        when(sceneLogger).logDataPointArray(...).thenReturn()
+
+        clKeyLog.toSceneLogger(sceneLogger)
+
+        expectedData = arg_that(lambda arg: np.allclose(arg, np.array([[1, -2, 2, 0]]), atol=1e-3))
+        verify(sceneLogger).logDataPointArray(expectedData, InteractionKey(self.cube.getLabel()))
@@ -2,9 +2,10 @@ import unittest
 
 import numpy as np
 
-from pytissueoptics import ScatteringScene, ScatteringMaterial, EnergyLogger, Cube
-from pytissueoptics.rayscattering.opencl.CLPhotons import CLPhotons
-from pytissueoptics.scene.geometry import Environment
+from pytissueoptics import ScatteringScene, ScatteringMaterial, EnergyLogger, Cube, Cuboid, TimeResolvedTally, \
+    TrackLengthTally, Detector, CylindricalTally, RadialAngularTally
+from pytissueoptics.rayscattering.opencl.CLPhotons import CLPhotons, PropagationMode
+from pytissueoptics.scene.geometry import Environment, Vector
 from pytissueoptics.rayscattering.opencl import WEIGHT_THRESHOLD
 from pytissueoptics.scene.logger import InteractionKey
 
@@ -70,6 +71,103 @@ class TestCLPhotons(unittest.TestCase):
 
         self.assertAlmostEqual(energyInput, energyScattered + energyLeaving, places=2)
 
+    def testGivenTimeResolvedTallies_whenPropagate_shouldScoreTheWeightAbsorbedAndCrossingTheSurfaces(self):
+        N = 100
+        material = ScatteringMaterial(5, 2, 0.9, 1.4)
+        worldMaterial = ScatteringMaterial()
+        cube = Cube(1, material=material, label="cube")
+        scene = ScatteringScene([cube], worldMaterial=worldMaterial)
+        absorptionTally = TimeResolvedTally((0, 1), 10, solidLabel="cube")
+        inputTally = TimeResolvedTally((0, 1), 10, solidLabel="cube", surfaceLabel="cube_front",
+                                       surfaceEnergyLeaving=False)
+
+        positions = np.full((N, 3), 0)
+        positions[:, 2] = -1
+        directions = np.full((N, 3), 0)
+        directions[:, 2] = 1
+        photons = CLPhotons(positions, directions)
+        photons.setContext(scene, Environment(worldMaterial), tallies=[absorptionTally, inputTally])
+
+        photons.propagate(IPP=scene.getEstimatedIPP(WEIGHT_THRESHOLD), verbose=False)
+
+        self.assertGreater(inputTally.data[0], 0.9 * N)
+        self.assertEqual(inputTally.data[0], np.sum(inputTally.data))
+        self.assertGreater(np.sum(absorptionTally.data), 0)
+        self.assertLess(np.sum(absorptionTally.data), np.sum(inputTally.data))
+
+    def testGivenATrackLengthTally_whenPropagate_shouldScoreTheAbsorbedEnergyInPlaceOfTheInteractions(self):
+        N = 100
+        worldMaterial = ScatteringMaterial(5, 2, 0.9, 1.4)
+        infiniteScene = ScatteringScene([], worldMaterial=worldMaterial)
+        logger = EnergyLogger(infiniteScene)
+        tally = TrackLengthTally([(-5, 5), (-5, 5), (-5, 5)], voxelSize=0.5, solidLabel="world")
+
+        positions = np.full((N, 3), 0)
+        directions = np.full((N, 3), 0)
+        directions[:, 2] = 1
+        photons = CLPhotons(positions, directions)
+        photons.setContext(infiniteScene, Environment(worldMaterial), logger=logger, tallies=[tally])
+
+        photons.propagate(IPP=infiniteScene.getEstimatedIPP(WEIGHT_THRESHOLD), verbose=False)
+
+        self.assertIsNone(logger.getDataPoints(InteractionKey("world")))
+        self.assertAlmostEqual(1, np.sum(tally.data) / N, delta=0.1)
+
+    def testGivenDetectors_whenPropagate_shouldRecordTheDetectedPhotonsWithTheirPathLengths(self):
+        N = 100
+        material = ScatteringMaterial(5, 2, 0.9, 1.4)
+        worldMaterial = ScatteringMaterial()
+        cube = Cube(1, material=material, label="cube")
+        scene = ScatteringScene([cube], worldMaterial=worldMaterial)
+        reflectanceDetector = Detector("cube", "cube_front")
+        fiberDetector = Detector("cube", "cube_front", axis=Vector(0, 0, -1), acceptanceAngle=0.5,
+                                 center=Vector(0, 0, -0.5), radius=0.2)
+
+        positions = np.full((N, 3), 0)
+        positions[:, 2] = -1
+        directions = np.full((N, 3), 0)
+        directions[:, 2] = 1
+        photons = CLPhotons(positions, directions)
+        photons.setContext(scene, Environment(worldMaterial), tallies=[reflectanceDetector, fiberDetector])
+
+        photons.propagate(IPP=scene.getEstimatedIPP(WEIGHT_THRESHOLD), verbose=False)
+
+        self.assertGreater(len(reflectanceDetector), 0)
+        self.assertLessEqual(len(fiberDetector), len(reflectanceDetector))
+        self.assertTrue(np.allclose(-0.5, reflectanceDetector.positions[:, 2]))
+        self.assertTrue(np.all(reflectanceDetector.directions[:, 2] < 0))
+        self.assertTrue(np.allclose(0.5, reflectanceDetector.getPathLengths(worldMaterial)))
+        self.assertTrue(np.all(reflectanceDetector.getPathLengths(material) > 0))
+        self.assertTrue(np.all(fiberDetector.directions[:, 2] <= -np.cos(0.5)))
+
+    def testGivenMCMLTalliesOfAStack_whenPropagate_shouldScoreTheReflectanceTransmittanceAndAbsorption(self):
+        N = 100
+        worldMaterial = ScatteringMaterial()
+        layer1 = Cuboid(4, 4, 0.5, material=ScatteringMaterial(10, 1, 0.8, 1.4), label="L1")
+        layer2 = Cuboid(4, 4, 0.5, material=ScatteringMaterial(5, 0.5, 0.9, 1.3), label="L2")
+        stack = layer1.stack(layer2, "back", stackLabel="tissue")
+        scene = ScatteringScene([stack], worldMaterial=worldMaterial)
+        reflectance = RadialAngularTally("L1", "L1_front", maxRadius=2, radialBins=10, angularBins=5)
+        transmittance = RadialAngularTally("L2", "L2_back", maxRadius=2, radialBins=10, angularBins=5)
+        absorption = CylindricalTally(maxRadius=2, radialBins=10, depthLimits=(-1, 1), depthBins=10,
+                                      solidLabels=stack.getLayerLabels())
+
+        positions = np.full((N, 3), 0)
+        positions[:, 2] = -1
+        directions = np.full((N, 3), 0)
+        directions[:, 2] = 1
+        photons = CLPhotons(positions, directions)
+        photons.setContext(scene, Environment(worldMaterial), tallies=[reflectance, transmittance, absorption])
+
+        photons.propagate(IPP=scene.getEstimatedIPP(WEIGHT_THRESHOLD), verbose=False)
+
+        totalWeight = reflectance.data.sum() + transmittance.data.sum() + absorption.data.sum()
+        self.assertGreater(reflectance.data.sum(), 0)
+        self.assertGreater(transmittance.data.sum(), 0)
+        self.assertGreater(absorption.data.sum(), 0)
+        self.assertLessEqual(totalWeight, N)
+        self.assertGreater(totalWeight, 0.8 * N)
+
     def testWhenPropagateOnly1Photon_shouldPropagate(self):
         N = 1
         # Testing in infinite scene so that photons will scatter all their energy
@@ -89,3 +187,64 @@ class TestCLPhotons(unittest.TestCase):
         dataPoints = logger.getDataPoints()
         totalWeightScattered = float(np.sum(dataPoints[:, 0]))
         self.assertAlmostEqual(N, totalWeightScattered, places=2)
+
+    def testGivenWavefrontMode_whenPropagate_shouldPropagateUntilAllPhotonsHaveNoMoreEnergy(self):
+        N = 100
+        worldMaterial = ScatteringMaterial(5, 2, 0.9, 1.4)
+        infiniteScene = ScatteringScene([], worldMaterial=worldMaterial)
+
+        for mode in [PropagationMode.WAVEFRONT, PropagationMode.SORTED_WAVEFRONT]:
+            with self.subTest(mode.name):
+                logger = EnergyLogger(infiniteScene)
+                positions = np.full((N, 3), 0)
+                directions = np.full((N, 3), 0)
+                directions[:, 2] = 1
+                photons = CLPhotons(positions, directions, propagationMode=mode)
+                photons.setContext(infiniteScene, Environment(worldMaterial), logger=logger)
+
+                photons.propagate(IPP=infiniteScene.getEstimatedIPP(WEIGHT_THRESHOLD), verbose=False)
+
+                totalWeightScattered = float(np.sum(logger.getDataPoints()[:, 0]))
+                self.assertAlmostEqual(N, totalWeightScattered, places=2)
+
+    def testGivenWavefrontMode_whenPropagateInSolids_shouldConserveEnergyAcrossSurfaces(self):
+        N = 100
+        material = ScatteringMaterial(5, 2, 0.9, 1.4)
+        worldMaterial = ScatteringMaterial()
+        cube = Cube(1, material=material, label="cube")
+        scene = ScatteringScene([cube], worldMaterial=worldMaterial)
+        logger = EnergyLogger(scene)
+
+        positions = np.full((N, 3), 0)
+        positions[:, 2] = -1
+        directions = np.full((N, 3), 0)
+        directions[:, 2] = 1
+        photons = CLPhotons(positions, directions, propagationMode=PropagationMode.SORTED_WAVEFRONT)
+        photons.setContext(scene, Environment(worldMaterial), logger=logger)
+
+        photons.propagate(IPP=scene.getEstimatedIPP(WEIGHT_THRESHOLD), verbose=False)
+
+        energyInput = -np.sum(logger.getDataPoints(InteractionKey("cube", "cube_front"))[:, 0])
+        energyScattered = np.sum(logger.getDataPoints(InteractionKey("cube"))[:, 0])
+        energyLeaving = 0
+        for surfaceLabel in logger.getStoredSurfaceLabels("cube"):
+            if "front" in surfaceLabel:
+                continue
+            energyLeaving += np.sum(logger.getDataPoints(InteractionKey("cube", surfaceLabel))[:, 0])
+        self.assertAlmostEqual(energyInput, energyScattered + energyLeaving, places=2)
+
+    def testGivenSameSeed_whenPropagate_shouldLogSameData(self):
+        N = 100
+        worldMaterial = ScatteringMaterial(5, 2, 0.9, 1.4)
+        infiniteScene = ScatteringScene([], worldMaterial=worldMaterial)
+        loggers = [EnergyLogger(infiniteScene), EnergyLogger(infiniteScene)]
+
+        for logger in loggers:
+            positions = np.full((N, 3), 0)
+            directions = np.full((N, 3), 0)
+            directions[:, 2] = 1
+            photons = CLPhotons(positions, directions, seed=42)
+            photons.setContext(infiniteScene, Environment(worldMaterial), logger=logger)
+            photons.propagate(IPP=infiniteScene.getEstimatedIPP(WEIGHT_THRESHOLD), verbose=False)
+
+        self.assertTrue(np.array_equal(loggers[0].getDataPoints(), loggers[1].getDataPoints()))
@@ -0,0 +1,204 @@
+import unittest
+
+from pytissueoptics import Cube, Cuboid, ScatteringMaterial, Sphere, ScatteringScene, Vector, LoggingPolicy, LogEvent, \
+    TimeResolvedTally, TrackLengthTally, Detector, CylindricalTally, RadialAngularTally
+from pytissueoptics.rayscattering.opencl import OPENCL_AVAILABLE
+from pytissueoptics.rayscattering.opencl.CLScene import CLScene, MAX_UNROLLED_SOLIDS
+from pytissueoptics.scene.geometry import BoundingBox
+
+
+@unittest.skipIf(not OPENCL_AVAILABLE, 'Requires PyOpenCL.')
+class TestCLScene(unittest.TestCase):
+    def testGivenInfiniteScene_shouldDefineNoSolidsAndSingleMaterial(self):
+        scene = ScatteringScene([], worldMaterial=ScatteringMaterial(2, 0.8, 0.8, 1.4))
+
+        definitions = CLScene(scene, nWorkUnits=10).getCompileDefinitions()
+
+        self.assertEqual("0", definitions["SCENE_N_SOLIDS"])
+        self.assertEqual("0", definitions["SCENE_HAS_SMOOTHING"])
+        self.assertIn("SCENE_UNROLL_SOLIDS", definitions)
+        self.assertIn("SCENE_SINGLE_MATERIAL", definitions)
+        self.assertAlmostEqual(0.8, float(definitions["SCENE_G"].rstrip("f")), places=6)
+
+    def testGivenSmoothSolidsWithDifferentAnisotropies_shouldDefineSmoothingAndAnisotropicScene(self):
+        cube = Cube(4, material=ScatteringMaterial(2, 0.8, 0.8, 1.4), label="cube")
+        sphere = Sphere(1, material=ScatteringMaterial(5, 0.5, 0.9, 1.4), label="sphere")
+        scene = ScatteringScene([cube, sphere], worldMaterial=ScatteringMaterial(g=0.7))
+
+        definitions = CLScene(scene, nWorkUnits=10).getCompileDefinitions()
+
+        self.assertEqual("2", definitions["SCENE_N_SOLIDS"])
+        self.assertEqual("1", definitions["SCENE_HAS_SMOOTHING"])
+        self.assertIn("SCENE_ANISOTROPIC", definitions)
+        self.assertNotIn("SCENE_SINGLE_MATERIAL", definitions)
+        self.assertNotIn("SCENE_G", definitions)
+
+    def testGivenAnIsotropicMaterial_shouldNotDefineAnisotropicScene(self):
+        cube = Cube(4, material=ScatteringMaterial(2, 0.8, 0, 1.4), label="cube")
+        scene = ScatteringScene([cube], worldMaterial=ScatteringMaterial(g=0.7))
+
+        definitions = CLScene(scene, nWorkUnits=10).getCompileDefinitions()
+
+        self.assertNotIn("SCENE_ANISOTROPIC", definitions)
+        self.assertNotIn("SCENE_G", definitions)
+
+    def testGivenManySolids_shouldNotUnrollSolidLoops(self):
+        material = ScatteringMaterial(2, 0.8, 0.8, 1.4)
+        cubes = [Cube(0.5, position=Vector(i, 0, 0), material=material, label=f"cube{i}")
+                 for i in range(MAX_UNROLLED_SOLIDS + 1)]
+        scene = ScatteringScene(cubes)
+
+        definitions = CLScene(scene, nWorkUnits=10).getCompileDefinitions()
+
+        self.assertEqual(str(MAX_UNROLLED_SOLIDS + 1), definitions["SCENE_N_SOLIDS"])
+        self.assertNotIn("SCENE_UNROLL_SOLIDS", definitions)
+
+    def testGivenDefaultLoggingPolicy_shouldNotDefineLoggingPolicy(self):
+        cube = Cube(4, material=ScatteringMaterial(2, 0.8, 0.8, 1.4), label="cube")
+        scene = ScatteringScene([cube])
+
+        definitions = CLScene(scene, nWorkUnits=10).getCompileDefinitions()
+
+        self.assertFalse(any(name.startswith("LOG_") for name in definitions))
+
+    def testGivenLoggingPolicy_shouldDefineLoggedEventsSolidsSurfacesAndRegions(self):
+        cube = Cube(4, material=ScatteringMaterial(2, 0.8, 0.8, 1.4), label="cube")
+        sphere = Sphere(1, material=ScatteringMaterial(5, 0.5, 0.9, 1.4), label="sphere")
+        scene = ScatteringScene([cube, sphere])
+        policy = LoggingPolicy(events=LogEvent.CROSSING, solids=["sphere"],
+                               regions=[BoundingBox([0, 1], [0, 2], [0, 3])])
+        sceneCL = CLScene(scene, nWorkUnits=10, loggingPolicy=policy)
+
+        definitions = sceneCL.getCompileDefinitions()
+
+        self.assertIn("LOG_NO_ABSORPTION", definitions)
+        self.assertNotIn("LOG_NO_CROSSING", definitions)
+        solidMask = [0] * (len(scene.solids) + 2)
+        solidMask[sceneCL.getSolidID(sphere) + 1] = 1
+        self.assertEqual("{" + ",".join(map(str, solidMask)) + "}", definitions["LOG_SOLID_MASK"])
+        surfaceMask = [int(sceneCL.getSurfaceLabel(sceneCL.getSurfaceSolidIDs()[0][i], i) in sphere.surfaceLabels)
+                       for i in range(len(sceneCL.getSurfaceSolidIDs()[0]))]
+        self.assertEqual("{" + ",".join(map(str, surfaceMask)) + "}", definitions["LOG_SURFACE_MASK"])
+        self.assertEqual("1", definitions["LOG_N_REGIONS"])
+        self.assertEqual("{0.0f,0.0f,0.0f}", definitions["LOG_REGION_MINS"])
+        self.assertEqual("{1.0f,2.0f,3.0f}", definitions["LOG_REGION_MAXS"])
+
+    def testGivenAStackLoggingPolicy_shouldDefineTheLoggedFlagOfEachLayer(self):
+        layer1 = Cuboid(2, 2, 1, material=ScatteringMaterial(2, 0.8, 0.8, 1.4), label="L1")
+        layer2 = Cuboid(2, 2, 1, material=ScatteringMaterial(5, 0.5, 0.9, 1.3), label="L2")
+        scene = ScatteringScene([layer1.stack(layer2, "back", stackLabel="tissue")])
+        sceneCL = CLScene(scene, nWorkUnits=10, loggingPolicy=LoggingPolicy(solids=["L2"]))
+
+        definitions = sceneCL.getCompileDefinitions()
+
+        self.assertEqual(3, sceneCL.nSolidIDs)
+        solidMask = [0] * (sceneCL.nSolidIDs + 2)
+        solidMask[sceneCL.getSolidID(layer2) + 1] = 1
+        self.assertEqual("{" + ",".join(map(str, solidMask)) + "}", definitions["LOG_SOLID_MASK"])
+
+    def testGivenNoTallies_shouldNotDefineTallies(self):
+        cube = Cube(4, material=ScatteringMaterial(2, 0.8, 0.8, 1.4), label="cube")
+
+        definitions = CLScene(ScatteringScene([cube]), nWorkUnits=10).getCompileDefinitions()
+
+        self.assertFalse(any(name.startswith("TALLY_") for name in definitions))
+
+    def testGivenTimeResolvedTallies_shouldDefineTheirBinsSolidsRegionsAndSurfaces(self):
+        cube = Cube(4, material=ScatteringMaterial(2, 0.8, 0.8, 1.4), label="cube")
+        sphere = Sphere(1, material=ScatteringMaterial(5, 0.5, 0.9, 1.4), label="sphere")
+        scene = ScatteringScene([cube, sphere])
+        tallies = [TimeResolvedTally((0, 1), 4, solidLabel="sphere", region=BoundingBox([0, 1], [0, 2], [0, 3]),
+                                     speedOfLight=2),
+                   TimeResolvedTally((1, 2), 8, solidLabel="sphere", surfaceLabel=sphere.surfaceLabels[0],
+                                     surfaceEnergyLeaving=False, speedOfLight=2)]
+        sceneCL = CLScene(scene, nWorkUnits=10, tallies=tallies)
+
+        definitions = sceneCL.getCompileDefinitions()
+
+        self.assertEqual("2", definitions["TALLY_N"])
+        self.assertEqual("{0,4}", definitions["TALLY_OFFSETS"])
+        self.assertEqual("{4,8}", definitions["TALLY_BINS"])
+        self.assertEqual("{0.0f,2.0f}", definitions["TALLY_MINS"])
+        self.assertEqual("{2.0f,4.0f}", definitions["TALLY_SCALES"])
+        solidMask = [0] * 2 * (len(scene.solids) + 2)
+        solidMask[sceneCL.getSolidID(sphere) + 1] = 1
+        self.assertEqual("{" + ",".join(map(str, solidMask)) + "}", definitions["TALLY_SOLID_MASK"])
+        self.assertTrue(definitions["TALLY_REGION_MINS"].startswith("{0.0f,0.0f,0.0f,"))
+        self.assertTrue(definitions["TALLY_REGION_MAXS"].startswith("{1.0f,2.0f,3.0f,"))
+        insideSolidIDs, outsideSolidIDs = sceneCL.getSurfaceSolidIDs()
+        surfaceSigns = [0] * len(insideSolidIDs)
+        surfaceSigns += [-1 if sceneCL.getSurfaceLabel(solidID, i) == sphere.surfaceLabels[0] else 0
+                         for i, solidID in enumerate(insideSolidIDs)]
+        self.assertEqual("{" + ",".join(map(str, surfaceSigns)) + "}", definitions["TALLY_SURFACE_SIGNS"])
+
+    def testGivenTrackLengthTallies_shouldDefineTheGridsOfTheTalliesOfSolidsInTheScene(self):
+        cube = Cube(4, material=ScatteringMaterial(2, 0.8, 0.8, 1.4), label="cube")
+        sphere = Sphere(1, material=ScatteringMaterial(5, 0.5, 0.9, 1.4), label="sphere")
+        tallies = [TrackLengthTally([(-1, 1), (-1, 1), (-1, 1)], voxelSize=0.5, solidLabel="sphere"),
+                   TimeResolvedTally((0, 1), 4, solidLabel="cube"),
+                   TrackLengthTally([(-2, 2), (-2, 2), (0, 2)], voxelSize=(1, 2, 0.5), solidLabel="world"),
+                   TrackLengthTally([(-2, 2), (-2, 2), (0, 2)], voxelSize=1, solidLabel="not in scene")]
+        sceneCL = CLScene(ScatteringScene([cube, sphere]), nWorkUnits=10, tallies=tallies)
+
+        definitions = sceneCL.getCompileDefinitions()
+
+        self.assertEqual("{64}", definitions["TALLY_OFFSETS"])
+        self.assertEqual("2", definitions["TRACK_N"])
+        self.assertEqual("{0,68}", definitions["TRACK_OFFSETS"])
+        self.assertEqual("{" + f"{sceneCL.getSolidID(sphere)},-1" + "}", definitions["TRACK_SOLID_IDS"])
+        self.assertEqual("{-1.0f,-1.0f,-1.0f,-2.0f,-2.0f,0.0f}", definitions["TRACK_MINS"])
+        self.assertEqual("{1.0f,1.0f,1.0f,2.0f,2.0f,2.0f}", definitions["TRACK_MAXS"])
+        self.assertEqual("{4,4,4,4,2,4}", definitions["TRACK_BINS"])
+
+    def testGivenDetectors_shouldDefineTheirSurfacesAcceptanceConesAndApertures(self):
+        cube = Cube(4, material=ScatteringMaterial(2, 0.8, 0.8, 1.4), label="cube")
+        scene = ScatteringScene([cube])
+        detectors = [Detector("cube", cube.surfaceLabels[0]),
+                     Detector("cube", cube.surfaceLabels[1], axis=Vector(0, 0, 2), acceptanceAngle=0,
+                              center=Vector(1, 2, 3), radius=0.5)]
+        sceneCL = CLScene(scene, nWorkUnits=10, tallies=detectors)
+
+        definitions = sceneCL.getCompileDefinitions()
+
+        self.assertEqual("2", definitions["DETECTOR_N"])
+        self.assertEqual(str(len(scene.getMaterials())), definitions["DETECTOR_N_MATERIALS"])
+        insideSolidIDs, _ = sceneCL.getSurfaceSolidIDs()
+        surfaceSigns = [int(sceneCL.getSurfaceLabel(solidID, i) == detector.surfaceLabel)
+                        for detector in detectors for i, solidID in enumerate(insideSolidIDs)]
+        self.assertEqual(str(len(insideSolidIDs)), definitions["DETECTOR_N_SURFACES"])
+        self.assertEqual("{" + ",".join(map(str, surfaceSigns)) + "}", definitions["DETECTOR_SURFACE_SIGNS"])
+        self.assertEqual("{0.0f,0.0f,0.0f,0.0f,0.0f,1.0f}", definitions["DETECTOR_AXES"])
+        self.assertTrue(definitions["DETECTOR_MIN_COSINES"].endswith(",1.0f}"))
+        self.assertEqual("{0.0f,0.0f,0.0f,1.0f,2.0f,3.0f}", definitions["DETECTOR_CENTERS"])
+        self.assertTrue(definitions["DETECTOR_RADII"].endswith(",0.5f}"))
+
+    def testGivenMCMLTalliesOfAStack_shouldDefineTheirGridsLayersAndSurfaces(self):
+        layer1 = Cuboid(2, 2, 1, material=ScatteringMaterial(2, 0.8, 0.8, 1.4), label="L1")
+        layer2 = Cuboid(2, 2, 1, material=ScatteringMaterial(5, 0.5, 0.9, 1.3), label="L2")
+        stack = layer1.stack(layer2, "back", stackLabel="tissue")
+        tallies = [RadialAngularTally("L1", "L1_front", maxRadius=1, radialBins=4, angularBins=2),
+                   CylindricalTally(maxRadius=2, radialBins=2, depthLimits=(-1, 1), depthBins=4,
+                                    solidLabels=["L2"], center=Vector(0, 0, -1), axis=Vector(0, 0, 2))]
+        sceneCL = CLScene(ScatteringScene([stack]), nWorkUnits=10, tallies=tallies)
+
+        definitions = sceneCL.getCompileDefinitions()
+
+        self.assertEqual("1", definitions["ANGULAR_N"])
+        self.assertEqual("{0}", definitions["ANGULAR_OFFSETS"])
+        self.assertEqual("{4.0f}", definitions["ANGULAR_RADIAL_SCALES"])
+        self.assertEqual("{2}", definitions["ANGULAR_ANGLE_BINS"])
+        insideSolidIDs, _ = sceneCL.getSurfaceSolidIDs()
+        surfaceSigns = [int(sceneCL.getSurfaceLabel(solidID, i) == "L1_front")
+                        for i, solidID in enumerate(insideSolidIDs)]
+        self.assertEqual("{" + ",".join(map(str, surfaceSigns)) + "}", definitions["ANGULAR_SURFACE_SIGNS"])
+
+        self.assertEqual("1", definitions["CYLINDER_N"])
+        self.assertEqual("{8}", definitions["CYLINDER_OFFSETS"])
+        self.assertEqual("{0.0f,0.0f,-1.0f}", definitions["CYLINDER_CENTERS"])
+        self.assertEqual("{0.0f,0.0f,1.0f}", definitions["CYLINDER_AXES"])
+        self.assertEqual("{1.0f}", definitions["CYLINDER_RADIAL_SCALES"])
+        self.assertEqual("{-1.0f}", definitions["CYLINDER_DEPTH_MINS"])
+        self.assertEqual("{2.0f}", definitions["CYLINDER_DEPTH_SCALES"])
+        solidMask = [0] * (sceneCL.nSolidIDs + 2)
+        solidMask[sceneCL.getSolidID(layer2) + 1] = 1
+        self.assertEqual("{" + ",".join(map(str, solidMask)) + "}", definitions["CYLINDER_SOLID_MASK"])
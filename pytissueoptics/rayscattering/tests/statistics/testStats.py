@@ -1,5 +1,6 @@
 import io
 import os
+import pickle
 import sys
 import tempfile
 import unittest
@@ -25,8 +26,9 @@ class TestStats(unittest.TestCase):
                                                                 "  Absorbed 20.00% of total power",
                                                                 '']
 
-    def _setUp(self, keep3D=True, sourceSolidLabel=None, noViews=False):
-        logger = self.makeTestCubeLogger(keep3D=keep3D, sourceSolidLabel=sourceSolidLabel, noViews=noViews)
+    def _setUp(self, keep3D=True, sourceSolidLabel=None, noViews=False, voxelSize=None):
+        logger = self.makeTestCubeLogger(keep3D=keep3D, sourceSolidLabel=sourceSolidLabel, noViews=noViews,
+                                         voxelSize=voxelSize)
         self.stats = Stats(logger)
 
     def testWhenGetEnergyInput_shouldReturnTotalPhotonCount(self):
@@ -43,21 +45,60 @@ class TestStats(unittest.TestCase):
                 energy = self.stats.getEnergyInput("cube")
                 self.assertEqual(1, energy)
 
-    def testGiven2DLoggerWithNoViewsOfSolid_whenGetAbsorbanceOfSolid_shouldRaiseException(self):
+    def _setUpWithoutEnergyTotals(self, voxelSize=None):
+        logger = self.makeTestCubeLogger(keep3D=False, noViews=True, voxelSize=voxelSize)
+        with tempfile.TemporaryDirectory() as tempDir:
+            filePath = os.path.join(tempDir, "test.log")
+            logger.save(filePath)
+            with open(filePath, "rb") as file:
+                # Loggers saved before the energy totals were tracked had 12 objects.
+                objectsWithoutEnergyTotals = pickle.load(file)[:12]
+            with open(filePath, "wb") as file:
+                pickle.dump(objectsWithoutEnergyTotals, file)
+            logger = EnergyLogger(logger._scene, filePath, keep3D=False, views=[])
+        self.stats = Stats(logger)
+
+    def testGiven2DLoggerWithNoViewsOfSolid_whenGetAbsorbanceOfSolid_shouldUseTheEnergyTotals(self):
         self._setUp(keep3D=False, noViews=True)
+        self.assertAlmostEqual(80, self.stats.getAbsorbance("cube"))
+
+    def testGiven2DLoggerWithoutEnergyTotalsOrViewsOfSolid_whenGetAbsorbanceOfSolid_shouldRaiseException(self):
+        self._setUpWithoutEnergyTotals()
         with self.assertRaises(Exception):
             self.stats.getAbsorbance("cube")
 
-    def testGiven2DLoggerWithNoViewsOfSolid_whenGetEnergyInputOfSolid_shouldRaiseException(self):
+    def testGiven2DLoggerWithVoxelsAndNoViewsOfSolid_whenGetAbsorbanceOfSolid_shouldUseTheVoxels(self):
+        self._setUpWithoutEnergyTotals(voxelSize=0.1)
+        self.assertIsNotNone(self.stats._logger.getVoxelGrid("cube"))
+        self.assertAlmostEqual(80, self.stats.getAbsorbance("cube", useTotalEnergy=True), places=5)
+
+    def testGiven2DLoggerWithNoViewsOfSolid_whenGetEnergyInputOfSolid_shouldUseTheEnergyTotals(self):
         self._setUp(keep3D=False, noViews=True)
+        self.assertAlmostEqual(1, self.stats.getEnergyInput("cube"))
+
+    def testGiven2DLoggerWithoutEnergyTotalsOrViewsOfSolid_whenGetEnergyInputOfSolid_shouldRaiseException(self):
+        self._setUpWithoutEnergyTotals()
         with self.assertRaises(Exception):
             self.stats.getEnergyInput("cube")
 
-    def testGiven2DLoggerWithNoViewsOfSurface_whenGetTransmittanceOfSurface_shouldRaiseException(self):
+    def testGiven2DLoggerWithNoViewsOfSurface_whenGetTransmittanceOfSurface_shouldUseTheEnergyTotals(self):
         self._setUp(keep3D=False, noViews=True)
+        self.assertAlmostEqual(20, self.stats.getTransmittance("cube", "cube_back"))
+
+    def testGiven2DLoggerWithoutEnergyTotalsOrViewsOfSurface_whenGetTransmittanceOfSurface_shouldRaiseException(self):
+        self._setUpWithoutEnergyTotals()
         with self.assertRaises(Exception):
             self.stats.getTransmittance("cube", "cube_front")
 
+    def testGiven2DLoggerWithNoViews_whenReport_shouldPrintAFullReportFromTheEnergyTotals(self):
+        self._setUp(keep3D=False, noViews=True)
+
+        with patch('sys.stdout', new_callable=io.StringIO) as mock_stdout:
+            self.stats.report()
+            reportLines = mock_stdout.getvalue().splitlines()
+
+        self.assertEqual(self.EXPECTED_REPORT_LINES, reportLines)
+
     def testGivenSourceInSolid_whenGetEnergyInput_shouldAddSourceEnergyToSolidInputEnergy(self):
         for keep3D in [False, True]:
             with self.subTest(["using2DLogger", "using3DLogger"][keep3D]):
@@ -124,7 +165,7 @@ class TestStats(unittest.TestCase):
             self.stats.report(solidLabel="non-existing")
 
     @staticmethod
-    def makeTestCubeLogger(keep3D=True, sourceSolidLabel=None, noViews=False) -> EnergyLogger:
+    def makeTestCubeLogger(keep3D=True, sourceSolidLabel=None, noViews=False, voxelSize=None) -> EnergyLogger:
         """ We log a few points taken from a unit cube centered at the origin where a single photon
         was propagated. We log one point entering front surface at z=0 with weight=1, then 8 points
         of weight 0.1 centered from z=0.1 to z=0.8, and one point exiting back surface at z=1 with
@@ -132,9 +173,9 @@ class TestStats(unittest.TestCase):
         """
         cube = Cube(1, position=Vector(0, 0, 0.5), material=ScatteringMaterial())
         scene = ScatteringScene([cube])
-        logger = EnergyLogger(scene, keep3D=keep3D)
+        logger = EnergyLogger(scene, keep3D=keep3D, voxelSize=voxelSize)
         if noViews:
-            logger = EnergyLogger(scene, keep3D=keep3D, views=[])
+            logger = EnergyLogger(scene, keep3D=keep3D, views=[], voxelSize=voxelSize)
         solidInteraction = InteractionKey("cube")
         frontInteraction = InteractionKey("cube", "cube_front")
         backInteraction = InteractionKey("cube", "cube_back")
@@ -0,0 +1,60 @@
+import math
+import unittest
+
+import numpy as np
+
+from pytissueoptics.rayscattering.tallies import CylindricalTally
+from pytissueoptics.scene.geometry import Vector
+
+
+class TestCylindricalTally(unittest.TestCase):
+    def testShouldHaveTheRadiusAndDepthAtTheCenterOfEachBin(self):
+        tally = CylindricalTally(maxRadius=2, radialBins=4, depthLimits=(1, 0), depthBins=2)
+
+        self.assertTrue(np.allclose([0.25, 0.75, 1.25, 1.75], tally.radii))
+        self.assertTrue(np.allclose([0.25, 0.75], tally.depths))
+        self.assertEqual((4, 2), tally.data.shape)
+
+    def testWhenScoreAbsorption_shouldAddTheWeightToTheBinOfItsRadiusAndDepth(self):
+        tally = CylindricalTally(maxRadius=2, radialBins=2, depthLimits=(0, 1), depthBins=2)
+
+        tally.scoreAbsorption("layer", Vector(0.6, 0.8, 0.7), opticalPathLength=0, weight=0.5)
+        tally.scoreAbsorption("layer", Vector(0, 0.5, 0.2), opticalPathLength=0, weight=0.25)
+
+        self.assertEqual([[0.25, 0], [0, 0.5]], tally.data.tolist())
+
+    def testWhenScoreOutsideTheGrid_shouldNotScore(self):
+        tally = CylindricalTally(maxRadius=1, radialBins=2, depthLimits=(0, 1), depthBins=2)
+
+        tally.scoreAbsorption("layer", Vector(1, 0, 0.5), opticalPathLength=0, weight=1)
+        tally.scoreAbsorption("layer", Vector(0, 0, 1), opticalPathLength=0, weight=1)
+        tally.scoreAbsorption("layer", Vector(0, 0, -0.1), opticalPathLength=0, weight=1)
+
+        self.assertEqual(0, np.sum(tally.data))
+
+    def testGivenSolidLabels_shouldOnlyScoreTheAbsorptionInTheseSolids(self):
+        tally = CylindricalTally(maxRadius=1, radialBins=1, depthLimits=(0, 1), depthBins=1,
+                                 solidLabels=["L1", "L2"])
+
+        tally.scoreAbsorption("L2", Vector(0, 0, 0.5), opticalPathLength=0, weight=1)
+        tally.scoreAbsorption("world", Vector(0, 0, 0.5), opticalPathLength=0, weight=1)
+
+        self.assertEqual([[1]], tally.data.tolist())
+
+    def testGivenACenterAndAnAxis_shouldMeasureTheRadiusAndDepthFromTheAxis(self):
+        tally = CylindricalTally(maxRadius=2, radialBins=2, depthLimits=(0, 2), depthBins=2,
+                                 center=Vector(1, 0, 0), axis=Vector(2, 0, 0))
+
+        tally.scoreAbsorption("layer", Vector(2.5, 1.5, 0), opticalPathLength=0, weight=1)
+
+        self.assertEqual(1, tally.data[1, 1])
+
+    def testShouldHaveTheAbsorbedWeightPerUnitVolumeAndPerPhoton(self):
+        tally = CylindricalTally(maxRadius=2, radialBins=2, depthLimits=(0, 0.5), depthBins=1)
+        tally.scoreAbsorption("layer", Vector(0, 0, 0.1), opticalPathLength=0, weight=4)
+        tally.scoreAbsorption("layer", Vector(1.5, 0, 0.1), opticalPathLength=0, weight=6)
+
+        density = tally.getDensity(nPhotons=2)
+
+        self.assertTrue(np.allclose([[4 / 2 / (math.pi * 0.5)], [6 / 2 / (3 * math.pi * 0.5)]], density))
+        self.assertTrue(np.allclose([10 / 2 / 0.5], tally.getDepthProfile(nPhotons=2)))
@@ -0,0 +1,98 @@
+import math
+import unittest
+
+import numpy as np
+
+from pytissueoptics.rayscattering.materials import ScatteringMaterial
+from pytissueoptics.rayscattering.tallies import Detector
+from pytissueoptics.scene.geometry import Vector
+
+
+class TestDetector(unittest.TestCase):
+    SOLID_LABEL = "cube"
+    SURFACE_LABEL = "cube_front"
+    MATERIAL = ScatteringMaterial(1, 0.1, 0.8, 1.4)
+    NORMAL = Vector(0, 0, -1)
+
+    def testShouldOnlyDetectTheCrossingsOfItsSurfaceInItsDirection(self):
+        detector = Detector(self.SOLID_LABEL, self.SURFACE_LABEL)
+
+        self.assertTrue(detector.detectsCrossing(self.SOLID_LABEL, self.SURFACE_LABEL, isLeavingSolid=True))
+        self.assertFalse(detector.detectsCrossing(self.SOLID_LABEL, self.SURFACE_LABEL, isLeavingSolid=False))
+        self.assertFalse(detector.detectsCrossing(self.SOLID_LABEL, "cube_back", isLeavingSolid=True))
+        self.assertFalse(detector.detectsCrossing("sphere", self.SURFACE_LABEL, isLeavingSolid=True))
+
+    def testWhenRecordCrossing_shouldRecordThePositionDirectionWeightAndPathLengths(self):
+        detector = Detector(self.SOLID_LABEL, self.SURFACE_LABEL)
+        world = ScatteringMaterial()
+
+        self._record(detector, Vector(1, 2, 3), Vector(0, 0, -1), weight=0.5, pathLengths={world: 1, self.MATERIAL: 2})
+
+        self.assertEqual(1, len(detector))
+        self.assertEqual([[1, 2, 3]], detector.positions.tolist())
+        self.assertEqual([[0, 0, -1]], detector.directions.tolist())
+        self.assertEqual([0.5], detector.weights.tolist())
+        self.assertEqual([world, self.MATERIAL], detector.materials)
+        self.assertEqual([[1, 2]], detector.pathLengths.tolist())
+
+    def testGivenNoAxis_shouldAcceptThePhotonsInsideTheConeAroundTheSurfaceNormal(self):
+        detector = Detector(self.SOLID_LABEL, self.SURFACE_LABEL, acceptanceAngle=math.radians(30))
+        insideDirection, outsideDirection = Vector(0.4, 0, -1), Vector(0.7, 0, -1)
+        insideDirection.normalize()
+        outsideDirection.normalize()
+
+        self._record(detector, Vector(), insideDirection)
+        self._record(detector, Vector(), outsideDirection)
+
+        self.assertEqual(1, len(detector))
+        self.assertTrue(np.allclose([insideDirection.array], detector.directions))
+
+    def testGivenAnAxis_shouldAcceptThePhotonsInsideTheConeAroundTheAxis(self):
+        detector = Detector(self.SOLID_LABEL, self.SURFACE_LABEL, axis=Vector(1, 0, -1),
+                            acceptanceAngle=math.radians(30))
+        direction = Vector(1, 0, -1.2)
+        direction.normalize()
+
+        self._record(detector, Vector(), direction)
+        self._record(detector, Vector(), Vector(0, 0, -1))
+
+        self.assertEqual(1, len(detector))
+
+    def testGivenAnAperture_shouldOnlyAcceptThePhotonsCrossingWithinTheRadiusOfTheCenter(self):
+        detector = Detector(self.SOLID_LABEL, self.SURFACE_LABEL, center=Vector(1, 1, 0), radius=0.5)
+
+        self._record(detector, Vector(1.3, 1, 0), Vector(0, 0, -1))
+        self._record(detector, Vector(0, 0, 0), Vector(0, 0, -1))
+
+        self.assertEqual([[1.3, 1, 0]], detector.positions.tolist())
+
+    def testGivenRecordsWithDifferentMaterials_shouldHaveAPathLengthColumnPerMaterial(self):
+        detector = Detector(self.SOLID_LABEL, self.SURFACE_LABEL)
+        otherMaterial = ScatteringMaterial(2, 0.2, 0.9, 1.3)
+
+        self._record(detector, Vector(), Vector(0, 0, -1), pathLengths={self.MATERIAL: 1})
+        detector.addRecords(np.zeros((2, 3)), np.zeros((2, 3)), np.ones(2), np.array([[3, 4], [5, 6]]),
+                            [otherMaterial, self.MATERIAL])
+
+        self.assertEqual([self.MATERIAL, otherMaterial], detector.materials)
+        self.assertEqual([[1, 0], [4, 3], [6, 5]], detector.pathLengths.tolist())
+        self.assertEqual([1, 4, 6], detector.getPathLengths(self.MATERIAL).tolist())
+        self.assertEqual([0, 0, 0], detector.getPathLengths(ScatteringMaterial()).tolist())
+
+    def testWhenClear_shouldRemoveTheRecords(self):
+        detector = Detector(self.SOLID_LABEL, self.SURFACE_LABEL)
+        self._record(detector, Vector(), Vector(0, 0, -1))
+
+        detector.clear()
+
+        self.assertEqual(0, len(detector))
+        self.assertEqual([], detector.materials)
+
+    def testGivenAnApertureWithoutARadius_shouldNotCreateTheDetector(self):
+        with self.assertRaises(AssertionError):
+            Detector(self.SOLID_LABEL, self.SURFACE_LABEL, center=Vector())
+
+    def _record(self, detector: Detector, position: Vector, direction: Vector, weight: float = 1,
+                pathLengths: dict = None):
+        detector.recordCrossing(self.SOLID_LABEL, self.SURFACE_LABEL, True, position, direction, self.NORMAL, weight,
+                                pathLengths or {self.MATERIAL: 1})
@@ -0,0 +1,66 @@
+import math
+import unittest
+
+import numpy as np
+
+from pytissueoptics.rayscattering.materials import ScatteringMaterial
+from pytissueoptics.rayscattering.tallies import RadialAngularTally
+from pytissueoptics.scene.geometry import Vector
+
+
+class TestRadialAngularTally(unittest.TestCase):
+    SOLID_LABEL = "L1"
+    SURFACE_LABEL = "L1_front"
+    NORMAL = Vector(0, 0, -1)
+
+    def testShouldHaveTheRadiusAndAngleAtTheCenterOfEachBin(self):
+        tally = RadialAngularTally(self.SOLID_LABEL, self.SURFACE_LABEL, maxRadius=1, radialBins=2, angularBins=3)
+
+        self.assertTrue(np.allclose([0.25, 0.75], tally.radii))
+        self.assertTrue(np.allclose([math.pi / 12, math.pi / 4, 5 * math.pi / 12], tally.angles))
+        self.assertEqual((2, 3), tally.data.shape)
+
+    def testShouldOnlyScoreTheCrossingsOfItsSurfaceInItsDirection(self):
+        tally = RadialAngularTally(self.SOLID_LABEL, self.SURFACE_LABEL, maxRadius=1, radialBins=1, angularBins=1)
+
+        self.assertTrue(tally.detectsCrossing(self.SOLID_LABEL, self.SURFACE_LABEL, isLeavingSolid=True))
+        self.assertFalse(tally.detectsCrossing(self.SOLID_LABEL, self.SURFACE_LABEL, isLeavingSolid=False))
+        self.assertFalse(tally.detectsCrossing(self.SOLID_LABEL, "L1_back", isLeavingSolid=True))
+        self.assertFalse(tally.detectsCrossing("L2", self.SURFACE_LABEL, isLeavingSolid=True))
+
+    def testWhenRecordCrossing_shouldAddTheWeightToTheBinOfItsRadiusAndExitAngle(self):
+        tally = RadialAngularTally(self.SOLID_LABEL, self.SURFACE_LABEL, maxRadius=2, radialBins=2, angularBins=2)
+        obliqueDirection = Vector(1, 0, -0.5)
+        obliqueDirection.normalize()
+
+        self._record(tally, Vector(0.5, 0, -1), Vector(0, 0, -1), weight=0.5)
+        self._record(tally, Vector(1, 1, -1), obliqueDirection, weight=0.25)
+
+        self.assertEqual([[0.5, 0], [0, 0.25]], tally.data.tolist())
+
+    def testWhenRecordCrossingTangentToTheSurface_shouldScoreInTheLastAngularBin(self):
+        tally = RadialAngularTally(self.SOLID_LABEL, self.SURFACE_LABEL, maxRadius=1, radialBins=1, angularBins=3)
+
+        self._record(tally, Vector(0, 0, 0), Vector(1, 0, 0))
+
+        self.assertEqual([[0, 0, 1]], tally.data.tolist())
+
+    def testWhenRecordCrossingOutsideTheRadius_shouldNotScore(self):
+        tally = RadialAngularTally(self.SOLID_LABEL, self.SURFACE_LABEL, maxRadius=1, radialBins=2, angularBins=1,
+                                   center=Vector(1, 0, 0))
+
+        self._record(tally, Vector(0, 0, 0), Vector(0, 0, -1))
+
+        self.assertEqual(0, np.sum(tally.data))
+
+    def testShouldHaveTheWeightPerUnitAreaAndSolidAnglePerPhoton(self):
+        tally = RadialAngularTally(self.SOLID_LABEL, self.SURFACE_LABEL, maxRadius=1, radialBins=1, angularBins=1)
+        self._record(tally, Vector(0, 0, 0), Vector(0, 0, -1), weight=3)
+
+        self.assertTrue(np.allclose([[3 / 2 / (math.pi * 2 * math.pi)]], tally.getDensity(nPhotons=2)))
+        self.assertTrue(np.allclose([3 / 2 / math.pi], tally.getRadialProfile(nPhotons=2)))
+        self.assertTrue(np.allclose([3 / 2 / (2 * math.pi)], tally.getAngularProfile(nPhotons=2)))
+
+    def _record(self, tally: RadialAngularTally, position: Vector, direction: Vector, weight: float = 1):
+        tally.recordCrossing(self.SOLID_LABEL, self.SURFACE_LABEL, True, position, direction, self.NORMAL, weight,
+                             {ScatteringMaterial(): 1})
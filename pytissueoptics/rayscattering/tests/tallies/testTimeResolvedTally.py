@@ -0,0 +1,74 @@
+import unittest
+
+import numpy as np
+
+from pytissueoptics.rayscattering.tallies import TimeResolvedTally
+from pytissueoptics.scene.geometry import BoundingBox, Vector
+
+
+class TestTimeResolvedTally(unittest.TestCase):
+    POSITION = Vector(0, 0, 0)
+
+    def testShouldHaveTheTimeAtTheCenterOfEachBin(self):
+        tally = TimeResolvedTally((0, 1), 4)
+
+        self.assertTrue(np.allclose([0.125, 0.375, 0.625, 0.875], tally.times))
+
+    def testShouldHaveTheOpticalPathLimitsOfTheTimeLimits(self):
+        tally = TimeResolvedTally((1, 2), 4, speedOfLight=3)
+
+        self.assertEqual((3, 6), tally.opticalPathLimits)
+
+    def testWhenScoreAbsorption_shouldAddTheWeightToTheBinOfItsTimeOfFlight(self):
+        tally = TimeResolvedTally((0, 1), 4, speedOfLight=10)
+
+        tally.scoreAbsorption("cube", self.POSITION, opticalPathLength=3, weight=0.5)
+        tally.scoreAbsorption("cube", self.POSITION, opticalPathLength=3.1, weight=0.25)
+
+        self.assertTrue(np.array_equal([0, 0.75, 0, 0], tally.data))
+
+    def testWhenScoreOutsideTheTimeLimits_shouldNotScore(self):
+        tally = TimeResolvedTally((0, 1), 4, speedOfLight=1)
+
+        tally.scoreAbsorption("cube", self.POSITION, opticalPathLength=1, weight=1)
+        tally.scoreAbsorption("cube", self.POSITION, opticalPathLength=-0.1, weight=1)
+
+        self.assertEqual(0, np.sum(tally.data))
+
+    def testGivenASolidLabel_shouldOnlyScoreTheAbsorptionInThisSolid(self):
+        tally = TimeResolvedTally((0, 1), 1, solidLabel="cube", speedOfLight=1)
+
+        tally.scoreAbsorption("cube", self.POSITION, 0.5, 1)
+        tally.scoreAbsorption("sphere", self.POSITION, 0.5, 1)
+
+        self.assertEqual([1], tally.data)
+
+    def testGivenARegion_shouldOnlyScoreTheAbsorptionInsideTheRegion(self):
+        tally = TimeResolvedTally((0, 1), 1, region=BoundingBox([0, 1], [0, 1], [0, 1]), speedOfLight=1)
+
+        tally.scoreAbsorption("cube", Vector(1, 0.5, 0), 0.5, 1)
+        tally.scoreAbsorption("cube", Vector(1.1, 0.5, 0), 0.5, 1)
+
+        self.assertEqual([1], tally.data)
+
+    def testGivenASurfaceLabel_shouldOnlyScoreTheCrossingsOfThisSurfaceInTheGivenDirection(self):
+        tally = TimeResolvedTally((0, 1), 1, solidLabel="cube", surfaceLabel="cube_top", speedOfLight=1)
+
+        tally.scoreCrossing("cube", "cube_top", isLeavingSolid=True, opticalPathLength=0.5, weight=1)
+        tally.scoreCrossing("cube", "cube_top", isLeavingSolid=False, opticalPathLength=0.5, weight=1)
+        tally.scoreCrossing("cube", "cube_bottom", isLeavingSolid=True, opticalPathLength=0.5, weight=1)
+        tally.scoreAbsorption("cube", self.POSITION, 0.5, 1)
+
+        self.assertEqual([1], tally.data)
+
+    def testGivenASurfaceLabelWithoutSolidLabel_shouldNotCreate(self):
+        with self.assertRaises(AssertionError):
+            TimeResolvedTally((0, 1), 1, surfaceLabel="cube_top")
+
+    def testWhenClear_shouldResetTheData(self):
+        tally = TimeResolvedTally((0, 1), 2, speedOfLight=1)
+        tally.add(np.array([1, 2]))
+
+        tally.clear()
+
+        self.assertTrue(np.array_equal([0, 0], tally.data))
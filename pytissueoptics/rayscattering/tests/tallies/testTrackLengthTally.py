@@ -0,0 +1,71 @@
+import unittest
+
+import numpy as np
+
+from pytissueoptics.rayscattering.tallies import TrackLengthTally
+from pytissueoptics.scene.geometry import Vector
+
+
+class TestTrackLengthTally(unittest.TestCase):
+    LIMITS = [(0, 4), (0, 2), (0, 1)]
+
+    def testShouldDivideTheLimitsInVoxels(self):
+        tally = TrackLengthTally(self.LIMITS, 0.5, "cube")
+
+        self.assertEqual((8, 4, 2), tally.bins)
+        self.assertEqual((0.5, 0.5, 0.5), tally.voxelSize)
+        self.assertEqual((8, 4, 2), tally.data.shape)
+
+    def testWhenScoreTrackAlongAnAxis_shouldAddTheValueTimesTheLengthInEachVoxel(self):
+        tally = TrackLengthTally(self.LIMITS, 1, "cube")
+
+        tally.scoreTrack("cube", Vector(0.5, 0.5, 0.5), Vector(1, 0, 0), length=2, value=3)
+
+        self.assertTrue(np.allclose([1.5, 3, 1.5, 0], tally.data[:, 0, 0]))
+        self.assertAlmostEqual(6, np.sum(tally.data))
+
+    def testWhenScoreADiagonalTrack_shouldScoreItsWholeLengthInTheVoxelsItCrosses(self):
+        tally = TrackLengthTally(self.LIMITS, 0.25, "cube")
+        direction = Vector(3, 1, 0.5)
+        direction.normalize()
+
+        tally.scoreTrack("cube", Vector(0.1, 0.3, 0.2), direction, length=2.5, value=1)
+
+        self.assertAlmostEqual(2.5, np.sum(tally.data))
+        self.assertGreater(np.count_nonzero(tally.data), 10)
+
+    def testWhenScoreATrackLeavingTheGrid_shouldOnlyScoreTheLengthInsideTheGrid(self):
+        tally = TrackLengthTally(self.LIMITS, 1, "cube")
+
+        tally.scoreTrack("cube", Vector(-1, 0.5, 0.5), Vector(1, 0, 0), length=10, value=1)
+
+        self.assertTrue(np.allclose([1, 1, 1, 1], tally.data[:, 0, 0]))
+
+    def testWhenScoreATrackOutsideTheGrid_shouldNotScore(self):
+        tally = TrackLengthTally(self.LIMITS, 1, "cube")
+
+        tally.scoreTrack("cube", Vector(0.5, 3, 0.5), Vector(1, 0, 0), length=2, value=1)
+        tally.scoreTrack("cube", Vector(-2, 0.5, 0.5), Vector(1, 0, 0), length=1, value=1)
+
+        self.assertEqual(0, np.sum(tally.data))
+
+    def testWhenScoreATrackInAnotherSolid_shouldNotScore(self):
+        tally = TrackLengthTally(self.LIMITS, 1, "cube")
+
+        tally.scoreTrack("sphere", Vector(0.5, 0.5, 0.5), Vector(1, 0, 0), length=2, value=1)
+
+        self.assertEqual(0, np.sum(tally.data))
+
+    def testShouldReplaceTheAbsorptionOfItsSolid(self):
+        tally = TrackLengthTally(self.LIMITS, 1, "cube")
+
+        self.assertTrue(tally.replacesAbsorption("cube"))
+        self.assertFalse(tally.replacesAbsorption("sphere"))
+
+    def testShouldReturnTheDataPointsOfTheVoxelsWithEnergyAtTheirCenter(self):
+        tally = TrackLengthTally(self.LIMITS, 1, "cube")
+        tally.scoreTrack("cube", Vector(0.5, 0.5, 0.5), Vector(1, 0, 0), length=1, value=2)
+
+        dataPoints = tally.getDataPoints()
+
+        self.assertTrue(np.allclose([[1, 0.5, 0.5, 0.5], [1, 1.5, 0.5, 0.5]], dataPoints))
@@ -0,0 +1,70 @@
+import unittest
+
+import numpy as np
+
+from pytissueoptics.rayscattering.loggingPolicy import LoggingPolicy, LogEvent
+from pytissueoptics.scene.geometry import BoundingBox, Vector
+
+
+class TestLoggingPolicy(unittest.TestCase):
+    POSITION = Vector(0, 0, 0)
+
+    def testByDefault_shouldLogEverything(self):
+        policy = LoggingPolicy()
+
+        self.assertTrue(policy.logsAbsorption("cube", self.POSITION))
+        self.assertTrue(policy.logsCrossing("cube", "cube_top", self.POSITION))
+        self.assertFalse(policy.logsNothing)
+
+    def testGivenEventTypes_shouldOnlyLogTheseEvents(self):
+        policy = LoggingPolicy(events=LogEvent.CROSSING)
+
+        self.assertFalse(policy.logsAbsorption("cube", self.POSITION))
+        self.assertTrue(policy.logsCrossing("cube", "cube_top", self.POSITION))
+
+    def testGivenNoEvent_shouldLogNothing(self):
+        self.assertTrue(LoggingPolicy(events=LogEvent.NONE).logsNothing)
+
+    def testGivenIncludedSolids_shouldOnlyLogTheseSolids(self):
+        policy = LoggingPolicy(solids=["sphere"])
+
+        self.assertTrue(policy.logsAbsorption("sphere", self.POSITION))
+        self.assertFalse(policy.logsAbsorption("cube", self.POSITION))
+        self.assertFalse(policy.logsCrossing("cube", "sphere_ellipsoid", self.POSITION))
+
+    def testGivenExcludedSolids_shouldNotLogTheseSolids(self):
+        policy = LoggingPolicy(excludedSolids=["world"])
+
+        self.assertFalse(policy.logsAbsorption("world", self.POSITION))
+        self.assertTrue(policy.logsAbsorption("cube", self.POSITION))
+
+    def testGivenIncludedAndExcludedSurfaces_shouldOnlyLogCrossingsOfIncludedSurfacesThatAreNotExcluded(self):
+        policy = LoggingPolicy(surfaces=["cube_top", "cube_bottom"], excludedSurfaces=["cube_bottom"])
+
+        self.assertTrue(policy.logsCrossing("cube", "cube_top", self.POSITION))
+        self.assertFalse(policy.logsCrossing("cube", "cube_bottom", self.POSITION))
+        self.assertFalse(policy.logsCrossing("cube", "cube_left", self.POSITION))
+        self.assertTrue(policy.logsAbsorption("cube", self.POSITION))
+
+    def testGivenRegions_shouldOnlyLogInteractionsInsideARegion(self):
+        policy = LoggingPolicy(regions=[BoundingBox([0, 1], [0, 1], [0, 1]), BoundingBox([2, 3], [0, 1], [0, 1])])
+
+        self.assertTrue(policy.logsAbsorption("cube", Vector(0, 0.5, 1)))
+        self.assertTrue(policy.logsCrossing("cube", "cube_top", Vector(2.5, 0.5, 0.5)))
+        self.assertFalse(policy.logsAbsorption("cube", Vector(1.5, 0.5, 0.5)))
+
+    def testGivenRegions_whenGetAbsorptionMask_shouldOnlySelectPositionsInsideARegion(self):
+        policy = LoggingPolicy(regions=[BoundingBox([0, 1], [0, 1], [0, 1]), BoundingBox([2, 3], [0, 1], [0, 1])])
+        positions = np.array([[0, 0.5, 1], [2.5, 0.5, 0.5], [1.5, 0.5, 0.5]])
+
+        self.assertEqual([True, True, False], policy.getAbsorptionMask("cube", positions).tolist())
+        self.assertFalse(LoggingPolicy(solids=["sphere"]).getAbsorptionMask("cube", positions).any())
+        self.assertFalse(LoggingPolicy(events=LogEvent.CROSSING).getAbsorptionMask("cube", positions).any())
+
+    def testGivenTwoEquivalentPolicies_shouldHaveTheSameHash(self):
+        policy = LoggingPolicy(solids=["a", "b"], regions=[BoundingBox([0, 1], [0, 1], [0, 1])])
+        samePolicy = LoggingPolicy(solids=["b", "a"], regions=[BoundingBox([0, 1], [0, 1], [0, 1])])
+
+        self.assertEqual(hash(policy), hash(samePolicy))
+        self.assertEqual(policy, samePolicy)
+        self.assertNotEqual(hash(policy), hash(LoggingPolicy(solids=["a"])))
@@ -8,9 +8,13 @@ from mockito import mock, when, verify
 from pytissueoptics.rayscattering import Photon
 from pytissueoptics.rayscattering.photon import WORLD_LABEL, WEIGHT_THRESHOLD
 from pytissueoptics.rayscattering.fresnel import FresnelIntersection, FresnelIntersect
+from pytissueoptics.rayscattering.loggingPolicy import LoggingPolicy, LogEvent
 from pytissueoptics.rayscattering.materials import ScatteringMaterial
+from pytissueoptics.rayscattering.randomStream import RandomStream
+from pytissueoptics.rayscattering.tallies import TimeResolvedTally, TrackLengthTally, Detector, CylindricalTally, \
+    RadialAngularTally
 from pytissueoptics.scene import Vector, Logger
-from pytissueoptics.scene.geometry import Environment
+from pytissueoptics.scene.geometry import Environment, BoundingBox
 from pytissueoptics.scene.intersection.intersectionFinder import Intersection, IntersectionFinder
 from pytissueoptics.scene.intersection.mollerTrumboreIntersect import MollerTrumboreIntersect, EPS_CORRECTION
 from pytissueoptics.scene.logger import InteractionKey
@@ -387,6 +391,145 @@ class TestPhoton(unittest.TestCase):
         verify(logger, times=1).logDataPoint(...)
         verify(logger, times=0).logDataPoint(self.photon.weight, intersectionPoint, interactionKey)
 
+    def testGivenALoggingPolicyOfASingleSolid_whenSteppingOutsideASolid_shouldOnlyLogIntersectionOnThisSolid(self):
+        distance = 8
+        logger = self._createLogger()
+        intersectionFinder = self._createIntersectionFinder(distance, normal=self.INITIAL_DIRECTION.copy())
+        self.photon.setContext(Environment(ScatteringMaterial()), intersectionFinder=intersectionFinder, logger=logger,
+                               loggingPolicy=LoggingPolicy(solids=[self.SOLID_OUTSIDE_LABEL]))
+
+        self.photon.step(distance + 2)
+
+        intersectionPoint = self.INITIAL_POSITION + self.INITIAL_DIRECTION * distance
+        interactionKey = InteractionKey(self.SOLID_OUTSIDE_LABEL, self.SURFACE_LABEL)
+        verify(logger, times=1).logDataPoint(...)
+        verify(logger).logDataPoint(-self.photon.weight, intersectionPoint, interactionKey)
+
+    def testGivenALoggingPolicyWithoutCrossings_whenSteppingOutsideASolid_shouldNotLogIntersection(self):
+        distance = 8
+        logger = self._createLogger()
+        intersectionFinder = self._createIntersectionFinder(distance, normal=self.INITIAL_DIRECTION.copy())
+        self.photon.setContext(Environment(ScatteringMaterial()), intersectionFinder=intersectionFinder, logger=logger,
+                               loggingPolicy=LoggingPolicy(events=LogEvent.ABSORPTION))
+
+        self.photon.step(distance + 2)
+
+        verify(logger, times=0).logDataPoint(...)
+
+    def testGivenALoggingPolicyWithARegion_whenScatterOutsideTheRegion_shouldNotLogWeightLoss(self):
+        logger = self._createLogger()
+        region = BoundingBox([-1, 1], [-1, 1], [-1, 1])
+        self.photon.setContext(Environment(ScatteringMaterial(mu_s=3, mu_a=1, g=0.8)), logger=logger,
+                               loggingPolicy=LoggingPolicy(regions=[region]))
+
+        self.photon.scatter()
+
+        verify(logger, times=0).logDataPoint(...)
+
+    def testWhenStep_shouldAccumulateTheOpticalPathLength(self):
+        noIntersectionFinder = mock(IntersectionFinder)
+        when(noIntersectionFinder).findIntersection(...).thenReturn(None)
+        self.photon.setContext(self._createEnvironment(n=1.4), intersectionFinder=noIntersectionFinder)
+
+        self.photon.step(5)
+        self.photon.step(2)
+
+        self.assertAlmostEqual(1.4 * 7, self.photon.opticalPathLength)
+
+    def testGivenTimeResolvedTallies_whenSteppingOutsideASolid_shouldScoreTheCrossingForTheSolidsOnBothSides(self):
+        distance = 8
+        leavingTally = TimeResolvedTally((0, 20), 2, self.SOLID_INSIDE_LABEL, self.SURFACE_LABEL, speedOfLight=1)
+        enteringTally = TimeResolvedTally((0, 20), 2, self.SOLID_OUTSIDE_LABEL, self.SURFACE_LABEL,
+                                          surfaceEnergyLeaving=False, speedOfLight=1)
+        otherTally = TimeResolvedTally((0, 20), 2, self.SOLID_INSIDE_LABEL, self.SURFACE_LABEL,
+                                       surfaceEnergyLeaving=False, speedOfLight=1)
+        intersectionFinder = self._createIntersectionFinder(distance, normal=self.INITIAL_DIRECTION.copy())
+        self.photon.setContext(Environment(ScatteringMaterial()), intersectionFinder=intersectionFinder,
+                               tallies=[leavingTally, enteringTally, otherTally])
+
+        self.photon.step(distance + 2)
+
+        self.assertEqual([1, 0], leavingTally.data.tolist())
+        self.assertEqual([1, 0], enteringTally.data.tolist())
+        self.assertEqual([0, 0], otherTally.data.tolist())
+
+    def testGivenATimeResolvedTallyWithARegion_whenScatter_shouldOnlyScoreTheWeightLossInsideTheRegion(self):
+        insideTally = TimeResolvedTally((0, 1), 1, region=BoundingBox([1, 3], [1, 3], [-1, 1]))
+        outsideTally = TimeResolvedTally((0, 1), 1, region=BoundingBox([-1, 1], [-1, 1], [-1, 1]))
+        self.photon.setContext(Environment(ScatteringMaterial(mu_s=3, mu_a=1, g=0.8)),
+                               tallies=[insideTally, outsideTally])
+
+        self.photon.scatter()
+
+        self.assertAlmostEqual(self.photon.material.getAlbedo(), insideTally.data[0])
+        self.assertEqual(0, outsideTally.data[0])
+
+    def testGivenATrackLengthTally_whenStep_shouldScoreTheWeightTimesMuATimesTheStepLength(self):
+        tally = TrackLengthTally([(0, 4), (0, 4), (-4, 0)], 1, WORLD_LABEL)
+        self.photon.setContext(Environment(ScatteringMaterial(mu_s=3, mu_a=0.5, g=0.8)), tallies=[tally])
+
+        self.photon.step(2)
+
+        self.assertAlmostEqual(1, tally.data.sum())
+        self.assertEqual([0.5, 0.5, 0, 0], tally.data[2, 2, ::-1].tolist())
+
+    def testGivenATrackLengthTallyOfTheSolid_whenScatter_shouldNotLogTheInteraction(self):
+        logger = self._createLogger()
+        tally = TrackLengthTally([(0, 4), (0, 4), (-4, 0)], 1, WORLD_LABEL)
+        self.photon.setContext(Environment(ScatteringMaterial(mu_s=3, mu_a=0.5, g=0.8)), logger=logger,
+                               tallies=[tally])
+
+        self.photon.scatter()
+
+        verify(logger, times=0).logDataPoint(...)
+
+    def testGivenDetectors_whenSteppingOutsideASolid_shouldRecordThePhotonForTheSolidsOnBothSides(self):
+        distance = 8
+        material = ScatteringMaterial()
+        leavingDetector = Detector(self.SOLID_INSIDE_LABEL, self.SURFACE_LABEL)
+        enteringDetector = Detector(self.SOLID_OUTSIDE_LABEL, self.SURFACE_LABEL, surfaceEnergyLeaving=False)
+        narrowDetector = Detector(self.SOLID_INSIDE_LABEL, self.SURFACE_LABEL, axis=Vector(1, 0, -1),
+                                  acceptanceAngle=0.5)
+        intersectionFinder = self._createIntersectionFinder(distance, normal=self.INITIAL_DIRECTION.copy())
+        self.photon.setContext(Environment(material), intersectionFinder=intersectionFinder,
+                               tallies=[leavingDetector, enteringDetector, narrowDetector])
+
+        self.photon.step(distance + 2)
+
+        for detector in [leavingDetector, enteringDetector]:
+            self.assertEqual([[2, 2, -distance]], detector.positions.tolist())
+            self.assertEqual([self.INITIAL_DIRECTION.array], detector.directions.tolist())
+            self.assertEqual([1], detector.weights.tolist())
+            self.assertEqual([distance], detector.getPathLengths(material).tolist())
+        self.assertEqual(0, len(narrowDetector))
+
+    def testGivenARadialAngularTally_whenSteppingOutsideASolid_shouldScoreTheRadiusAndAngleOfTheCrossing(self):
+        distance = 8
+        tally = RadialAngularTally(self.SOLID_INSIDE_LABEL, self.SURFACE_LABEL, maxRadius=4, radialBins=4,
+                                   angularBins=2)
+        otherTally = RadialAngularTally(self.SOLID_INSIDE_LABEL, self.SURFACE_LABEL, maxRadius=4, radialBins=4,
+                                        angularBins=2, surfaceEnergyLeaving=False)
+        intersectionFinder = self._createIntersectionFinder(distance, normal=self.INITIAL_DIRECTION.copy())
+        self.photon.setContext(Environment(ScatteringMaterial()), intersectionFinder=intersectionFinder,
+                               tallies=[tally, otherTally])
+
+        self.photon.step(distance + 2)
+
+        self.assertEqual([[0, 0], [0, 0], [1, 0], [0, 0]], tally.data.tolist())
+        self.assertEqual(0, otherTally.data.sum())
+
+    def testGivenACylindricalTally_whenScatter_shouldScoreTheWeightLossAtTheRadiusAndDepthOfThePhoton(self):
+        tally = CylindricalTally(maxRadius=4, radialBins=4, depthLimits=(-1, 1), depthBins=2)
+        otherTally = CylindricalTally(maxRadius=4, radialBins=4, depthLimits=(-1, 1), depthBins=2,
+                                      solidLabels=[self.SOLID_INSIDE_LABEL])
+        self.photon.setContext(Environment(ScatteringMaterial(mu_s=3, mu_a=1, g=0.8)), tallies=[tally, otherTally])
+
+        self.photon.scatter()
+
+        self.assertAlmostEqual(self.photon.material.getAlbedo(), tally.data[2, 1])
+        self.assertAlmostEqual(self.photon.material.getAlbedo(), tally.data.sum())
+        self.assertEqual(0, otherTally.data.sum())
+
     def testWhenRouletteWithWeightAboveThreshold_shouldIgnoreRoulette(self):
         self.photon._weight = 1.1 * WEIGHT_THRESHOLD
         self.photon.roulette()
@@ -408,6 +551,17 @@ class TestPhoton(unittest.TestCase):
 
         self.assertTrue(self.photon._weight == 0.9 * WEIGHT_THRESHOLD / rouletteChance)
 
+    def testGivenSameRandomStream_whenPropagate_shouldFollowTheSamePath(self):
+        environment = Environment(ScatteringMaterial(mu_s=2, mu_a=1, g=0.8))
+        photons = [Photon(self.INITIAL_POSITION.copy(), self.INITIAL_DIRECTION.copy(),
+                          randomStream=RandomStream(seed=42, streamID=3)) for _ in range(2)]
+        for photon in photons:
+            photon.setContext(environment)
+            photon.propagate()
+
+        self.assertEqual(photons[0].position, photons[1].position)
+        self.assertNotEqual(self.INITIAL_POSITION, photons[0].position)
+
     def testWhenInteractWithWeightAtFloatLimit_shouldKillPhoton(self):
         environment = self._createEnvironment(albedo=1.0)
         self.photon.setContext(environment)
@@ -444,8 +598,9 @@ class TestPhoton(unittest.TestCase):
         return intersectionFinder
 
     @staticmethod
-    def _createEnvironment(scatteringDistance=1, phi=0.1, theta=0.2, albedo=0.1):
+    def _createEnvironment(scatteringDistance=1, phi=0.1, theta=0.2, albedo=0.1, n=1.0):
         material = mock(ScatteringMaterial)
+        material.n = n
         when(material).getScatteringDistance().thenReturn(scatteringDistance)
         when(material).getScatteringAngles().thenReturn((theta, phi))
         when(material).getAlbedo().thenReturn(albedo)
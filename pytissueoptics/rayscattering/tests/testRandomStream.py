@@ -0,0 +1,56 @@
+import unittest
+
+import numpy as np
+
+from pytissueoptics.rayscattering.randomStream import RandomStream, philox4x32, sampleUniforms, makeSeed, \
+    PROPAGATION_DOMAIN, SOURCE_DOMAIN
+
+
+class TestRandomStream(unittest.TestCase):
+    def testShouldMatchPhiloxKnownAnswers(self):
+        counters = np.array([[0, 0, 0, 0],
+                             [0xFFFFFFFF] * 4,
+                             [0x243F6A88, 0x85A308D3, 0x13198A2E, 0x03707344]])
+        keys = [(0, 0), (0xFFFFFFFF, 0xFFFFFFFF), (0xA4093822, 0x299F31D0)]
+        expected = [[0x6627E8D5, 0xE169C58D, 0xBC57AC4C, 0x9B00DBD8],
+                    [0x408F276D, 0x41C83B0E, 0xA20BC7C6, 0x6D5451FD],
+                    [0xD16CFE09, 0x94FDCCEB, 0x5001E420, 0x24126EA1]]
+
+        for counter, key, expectedWords in zip(counters, keys, expected):
+            self.assertEqual(expectedWords, philox4x32(counter, key)[0].tolist())
+
+    def testShouldGenerateValuesBetweenZeroExcludedAndOne(self):
+        values = sampleUniforms(seed=0, streamIDs=np.arange(10000), domain=PROPAGATION_DOMAIN)
+        self.assertTrue(np.all(values > 0))
+        self.assertTrue(np.all(values <= 1))
+
+    def testShouldGenerateSameSequenceAsVectorizedSampling(self):
+        stream = RandomStream(seed=42, streamID=7)
+        values = [stream.random() for _ in range(8)]
+
+        firstBlock = sampleUniforms(42, [7], PROPAGATION_DOMAIN, block=0)[0]
+        secondBlock = sampleUniforms(42, [7], PROPAGATION_DOMAIN, block=1)[0]
+        self.assertEqual(values, firstBlock.tolist() + secondBlock.tolist())
+        self.assertEqual(8, stream.counter)
+
+    def testGivenCounter_shouldResumeSequence(self):
+        stream = RandomStream(seed=42, streamID=7)
+        values = [stream.random() for _ in range(6)]
+
+        resumedStream = RandomStream(seed=42, streamID=7, counter=3)
+        self.assertEqual(values[3:], [resumedStream.random() for _ in range(3)])
+
+    def testGivenDifferentStreams_shouldGenerateDifferentValues(self):
+        values = [RandomStream(seed=42, streamID=i).random() for i in range(100)]
+        self.assertEqual(100, len(set(values)))
+
+    def testGivenDifferentDomains_shouldGenerateDifferentValues(self):
+        propagationValues = sampleUniforms(42, [0], PROPAGATION_DOMAIN)
+        sourceValues = sampleUniforms(42, [0], SOURCE_DOMAIN)
+        self.assertFalse(np.any(propagationValues == sourceValues))
+
+    def testGivenNoSeed_shouldDrawSeedFromNumpy(self):
+        np.random.seed(0)
+        seed = makeSeed()
+        np.random.seed(0)
+        self.assertEqual(seed, makeSeed())
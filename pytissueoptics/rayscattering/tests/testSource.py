@@ -3,15 +3,16 @@ import tempfile
 import unittest
 
 import numpy as np
-from mockito import mock, when, verify
+from mockito import mock, when, verify, ANY, arg_that
 
-from pytissueoptics.rayscattering import PencilPointSource, Photon, EnergyLogger
+from pytissueoptics.rayscattering import PencilPointSource, Photon, EnergyLogger, LoggingPolicy, LogEvent, \
+    TimeResolvedTally, TrackLengthTally
 from pytissueoptics.rayscattering.materials import ScatteringMaterial
 from pytissueoptics.rayscattering.source import Source, IsotropicPointSource, DirectionalSource, DivergentSource
 from pytissueoptics.rayscattering.scatteringScene import ScatteringScene
-from pytissueoptics.scene.geometry import Environment, Vector
+from pytissueoptics.scene.geometry import BoundingBox, Environment, Vector
 from pytissueoptics.scene.solids import Solid
-from pytissueoptics.scene.logger import Logger
+from pytissueoptics.scene.logger import Logger, LogBuffer, InteractionKey
 
 
 class TestSource(unittest.TestCase):
@@ -30,6 +31,62 @@ class TestSource(unittest.TestCase):
         self.source.propagate(self._createTissue(), showProgress=False)
         verify(self.photon).propagate()
 
+    def testGivenALoggingPolicy_whenPropagate_shouldSetLoggingPolicyOfPhotons(self):
+        policy = LoggingPolicy(events=LogEvent.CROSSING)
+        self.source.propagate(self._createTissue(), showProgress=False, loggingPolicy=policy)
+        verify(self.photon).setContext(self.SOURCE_ENV, intersectionFinder=ANY, logger=None, loggingPolicy=policy,
+                                       tallies=None)
+
+    def testGivenTallies_whenPropagate_shouldSetTalliesOfPhotons(self):
+        tallies = [TimeResolvedTally((0, 1), 10)]
+        self.source.propagate(self._createTissue(), showProgress=False, tallies=tallies)
+        verify(self.photon).setContext(self.SOURCE_ENV, intersectionFinder=ANY, logger=None, loggingPolicy=None,
+                                       tallies=tallies)
+
+    def testGivenATrackLengthTally_whenPropagate_shouldLogTheEnergyScoredDuringPropagationAtVoxelCenters(self):
+        tally = TrackLengthTally([(0, 2), (0, 2), (0, 2)], voxelSize=1, solidLabel="slab")
+        tally.add(np.ones(tally.bins))
+        scoredData = np.zeros(tally.bins)
+        scoredData[1, 0, 1] = 0.5
+        when(self.photon).propagate().thenAnswer(lambda: tally.add(scoredData))
+        logger = EnergyLogger(mock(ScatteringScene), views=[])
+
+        self.source.propagate(self._createTissue(), logger=logger, showProgress=False, tallies=[tally])
+
+        dataPoints = logger.getDataPoints(InteractionKey("slab"))
+        self.assertEqual([[0.5, 1.5, 0.5, 1.5]], dataPoints.tolist())
+
+    def testGivenATrackLengthTallyAndAPolicyExcludingItsSolid_whenPropagate_shouldNotLogTheTally(self):
+        tally = TrackLengthTally([(0, 2), (0, 2), (0, 2)], voxelSize=1, solidLabel="slab")
+        when(self.photon).propagate().thenAnswer(lambda: tally.add(np.ones(tally.bins)))
+        logger = EnergyLogger(mock(ScatteringScene), views=[])
+
+        for policy in [LoggingPolicy(events=LogEvent.CROSSING), LoggingPolicy(excludedSolids=["slab"])]:
+            self.source.propagate(self._createTissue(), logger=logger, showProgress=False, loggingPolicy=policy,
+                                  tallies=[tally])
+
+        self.assertEqual([], logger.getStoredSolidLabels())
+
+    def testGivenATrackLengthTallyAndAPolicyWithRegions_whenPropagate_shouldOnlyLogTheVoxelsInsideTheRegions(self):
+        tally = TrackLengthTally([(0, 2), (0, 2), (0, 2)], voxelSize=1, solidLabel="slab")
+        when(self.photon).propagate().thenAnswer(lambda: tally.add(np.ones(tally.bins)))
+        logger = EnergyLogger(mock(ScatteringScene), views=[])
+        policy = LoggingPolicy(regions=[BoundingBox([1, 2], [0, 1], [0, 2])])
+
+        self.source.propagate(self._createTissue(), logger=logger, showProgress=False, loggingPolicy=policy,
+                              tallies=[tally])
+
+        dataPoints = logger.getDataPoints(InteractionKey("slab"))
+        self.assertEqual([[1, 1.5, 0.5, 0.5], [1, 1.5, 0.5, 1.5]], dataPoints.tolist())
+
+    def testGivenALogger_whenPropagate_shouldLogPhotonsThroughABufferOfThisLogger(self):
+        logger = EnergyLogger(mock(ScatteringScene), views=[])
+        self.source.propagate(self._createTissue(), logger=logger, showProgress=False)
+
+        isBufferOfLogger = arg_that(lambda logBuffer: isinstance(logBuffer, LogBuffer) and logBuffer.logger is logger)
+        verify(self.photon).setContext(self.SOURCE_ENV, intersectionFinder=ANY, logger=isBufferOfLogger,
+                                       loggingPolicy=None, tallies=None)
+
     def testWhenPropagate_shouldUpdatePhotonCountInLogger(self):
         logger = EnergyLogger(mock(ScatteringScene), views=[])
         self.source.propagate(self._createTissue(), logger=logger, showProgress=False)
@@ -60,6 +117,11 @@ class TestSource(unittest.TestCase):
         self.source.propagate(self._createTissue(), logger=logger, showProgress=False)
         self.assertEqual(logger.info['sourceHash'], hash(self.source))
 
+    def testWhenPropagate_shouldSetSourceSeedInLogger(self):
+        logger = EnergyLogger(mock(ScatteringScene), views=[])
+        self.source.propagate(self._createTissue(), logger=logger, showProgress=False)
+        self.assertEqual(logger.info['seed'], self.source.seed)
+
     def testGivenLoggerWithFilePath_whenPropagate_shouldSaveLogger(self):
         with tempfile.TemporaryDirectory() as tempdir:
             filepath = os.path.join(tempdir, 'test.log')
@@ -134,6 +196,22 @@ class TestIsotropicPointSource(unittest.TestCase):
         for photon in pointSource.photons:
             self.assertEqual(sourcePosition, photon.position)
 
+    def testGivenSameSeed_shouldHaveSamePhotonDirections(self):
+        source1 = IsotropicPointSource(position=Vector(), N=10, useHardwareAcceleration=False, seed=42)
+        source2 = IsotropicPointSource(position=Vector(), N=10, useHardwareAcceleration=False, seed=42)
+        _, directions1 = source1.getInitialPositionsAndDirections()
+        _, directions2 = source2.getInitialPositionsAndDirections()
+        self.assertTrue(np.array_equal(directions1, directions2))
+        self.assertTrue(np.allclose(np.linalg.norm(directions1, axis=1), 1))
+
+    def testGivenFirstPhotonID_shouldHaveSamePhotonsAsTheCorrespondingSliceOfALargerSource(self):
+        fullSource = IsotropicPointSource(position=Vector(), N=10, useHardwareAcceleration=False, seed=42)
+        splitSource = IsotropicPointSource(position=Vector(), N=4, useHardwareAcceleration=False, seed=42,
+                                           firstPhotonID=6)
+        _, fullDirections = fullSource.getInitialPositionsAndDirections()
+        _, splitDirections = splitSource.getInitialPositionsAndDirections()
+        self.assertTrue(np.array_equal(fullDirections[6:], splitDirections))
+
     def testGivenTwoIsotropicSourcesWithSamePropertiesExceptPhotonCount_shouldHaveSameHash(self):
         source1 = IsotropicPointSource(position=Vector(), N=1, useHardwareAcceleration=False)
         source2 = IsotropicPointSource(position=Vector(), N=2, useHardwareAcceleration=False)
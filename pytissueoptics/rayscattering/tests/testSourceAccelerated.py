@@ -38,6 +38,12 @@ class TestSourceAccelerated(unittest.TestCase):
         source = SinglePhotonSourceAccelerated()
         self.assertIsNotNone(source.photons)
 
+    @patch('pytissueoptics.rayscattering.source.CLPhotons')
+    def testGivenQuantizedLogPositions_shouldLoadPhotonsWithQuantizedLogPositions(self, _CLPhotonsClassMock):
+        _CLPhotonsClassMock.return_value = self.photons
+        SinglePhotonSourceAccelerated(quantizeLogPositions=True)
+        self.assertTrue(_CLPhotonsClassMock.call_args.kwargs["quantizeLogPositions"])
+
     @tempTablePath
     @patch('pytissueoptics.rayscattering.source.CLPhotons')
     def testWhenPropagateNewExperiment_shouldWarnThatIPPWillBeEstimated(self, _CLPhotonsClassMock):
@@ -60,7 +66,7 @@ class TestSourceAccelerated(unittest.TestCase):
         with self.assertWarns(UserWarning):
             source.propagate(scene, logger, showProgress=False)
 
-        verify(self.photons).setContext(scene, self.SOURCE_ENV, logger=logger)
+        verify(self.photons).setContext(scene, self.SOURCE_ENV, logger=logger, loggingPolicy=None, tallies=None)
 
     @tempTablePath
     @patch('pytissueoptics.rayscattering.source.CLPhotons')
@@ -120,8 +126,8 @@ class TestSourceAccelerated(unittest.TestCase):
 
 
 class SinglePhotonSourceAccelerated(Source):
-    def __init__(self, position=Vector(0, 0, 0)):
-        super().__init__(position, N=1, useHardwareAcceleration=True)
+    def __init__(self, position=Vector(0, 0, 0), quantizeLogPositions=False):
+        super().__init__(position, N=1, useHardwareAcceleration=True, quantizeLogPositions=quantizeLogPositions)
 
     def getInitialPositionsAndDirections(self):
         return np.array([[0, 0, 0]]), np.array([[0, 0, 1]])
@@ -1 +1,3 @@
 from .logger import Logger, InteractionKey
+from .logBuffer import LogBuffer
+from .spatialIndex import SpatialIndex
@@ -1,66 +1,194 @@
-import copy
-from typing import Optional
+from concurrent.futures import Executor, Future
+from typing import Iterator, List, Optional, Union, Tuple
 
 import numpy as np
 
+from pytissueoptics.scene.logger.loggerStore import LoggerStore
+
+MIN_BLOCK_SIZE = 64
+
 
 class ListArrayContainer:
-    def __init__(self):
-        self._list = None
-        self._array = None
+    """
+    Growable 2D array of rows. Rows are written to preallocated blocks that grow geometrically, so appending N rows
+    (one by one as lists or in bulk as arrays) only costs O(N) copies. The merged array returned by `getData` is
+    cached until the next write and replaces the blocks, so repeated reads are free.
+
+    The dtype is given or inferred from the first appended data (lists are stored as float64).
+
+    The rows can be spilled to an array file of a LoggerStore to free the memory. The first rows are then a
+    read-only memory map of the file.
+    """
+    def __init__(self, dtype: np.dtype = None):
+        self._dtype = None if dtype is None else np.dtype(dtype)
+        self._blocks: List[np.ndarray] = []
+        self._lastBlockLength = 0
+        self._length = 0
+        self._spilledLength = 0
+        self._pendingSpill: Optional[Tuple[Optional[Future], LoggerStore, str, int, int]] = None
+        self._mergedData: Optional[np.ndarray] = None
+
+    @classmethod
+    def fromArray(cls, array: np.ndarray) -> 'ListArrayContainer':
+        """ Wraps the given array without copying it (e.g. a memory-mapped file). The array is never written to. """
+        container = cls(array.dtype)
+        container._blocks = [array]
+        container._lastBlockLength = len(array)
+        container._length = len(array)
+        container._spilledLength = len(array) if isinstance(array, np.memmap) else 0
+        return container
 
     def __len__(self):
-        length = 0
-        if self._list is not None:
-            length += len(self._list)
-        if self._array is not None:
-            length += self._array.shape[0]
-        return length
+        return self._length
 
     @property
-    def _width(self):
-        if self._list is not None:
-            return len(self._list[0])
-        elif self._array is not None:
-            return self._array.shape[1]
-        else:
+    def dtype(self) -> Optional[np.dtype]:
+        return self._dtype
+
+    @property
+    def width(self) -> Optional[int]:
+        if not self._blocks:
             return None
+        return self._blocks[0].shape[1]
 
     def _assertSameWidth(self, data):
-        if self._width is None:
+        if self.width is None:
             return
         if isinstance(data, list):
-            assert len(data) == self._width
+            assert len(data) == self.width
         elif isinstance(data, np.ndarray):
-            assert data.shape[1] == self._width
+            assert data.shape[1] == self.width
 
-    def append(self, item):
+    def append(self, item: Union[list, np.ndarray]):
         self._assertSameWidth(item)
         if isinstance(item, list):
-            if self._list is None:
-                self._list = [copy.deepcopy(item)]
-            else:
-                self._list.append(item)
+            self._appendRow(item)
         elif isinstance(item, np.ndarray):
-            if self._array is None:
-                self._array = copy.deepcopy(item)
-            else:
-                self._array = np.concatenate((self._array, item), axis=0)
+            self._appendArray(item)
+
+    def _appendRow(self, row: list):
+        if self._dtype is None:
+            self._dtype = np.dtype(np.float64)
+        if not self._blocks or self._lastBlockLength == len(self._blocks[-1]):
+            self._addBlock(len(row), minSize=1)
+        self._blocks[-1][self._lastBlockLength] = row
+        self._lastBlockLength += 1
+        self._length += 1
+        self._mergedData = None
+
+    def _appendArray(self, array: np.ndarray):
+        if len(array) == 0:
+            return
+        if self._dtype is None:
+            self._dtype = array.dtype
+        n = len(array)
+        nFree = min(n, len(self._blocks[-1]) - self._lastBlockLength) if self._blocks else 0
+        if nFree > 0:
+            self._blocks[-1][self._lastBlockLength:self._lastBlockLength + nFree] = array[:nFree]
+            self._lastBlockLength += nFree
+            array = array[nFree:]
+        if len(array) > 0:
+            self._addBlock(array.shape[1], minSize=len(array))
+            self._blocks[-1][:len(array)] = array
+            self._lastBlockLength = len(array)
+        self._length += n
+        self._mergedData = None
+
+    def _addBlock(self, width: int, minSize: int):
+        """ Blocks grow geometrically with the number of rows stored. """
+        if self._blocks:
+            self._blocks[-1] = self._blocks[-1][:self._lastBlockLength]
+        size = max(minSize, self._length - self._spilledLength, MIN_BLOCK_SIZE)
+        self._blocks.append(np.empty((size, width), dtype=self._dtype))
+        self._lastBlockLength = 0
 
     def extend(self, other: 'ListArrayContainer'):
-        if self._list is None:
-            self._list = copy.deepcopy(other._list)
-        elif other._list is not None:
-            self._list.extend(other._list)
-        if other._array is not None:
-            self.append(other._array)
+        otherData = other.getData()
+        if otherData is not None:
+            self._appendArray(otherData)
 
     def getData(self) -> Optional[np.ndarray]:
-        if self._list is None and self._array is None:
+        if self._length == 0:
             return None
-        if self._list is None:
-            return self._array
-        if self._array is None:
-            return np.array(self._list)
-        mergedData = np.concatenate((np.array(self._list), self._array), axis=0)
+        if self._mergedData is None:
+            self._mergedData = self._merge()
+        return self._mergedData
+
+    def getChunks(self, start: int = 0, maxRows: int = None) -> Iterator[np.ndarray]:
+        """ Yields the rows from the index `start` as consecutive arrays of at most `maxRows` rows, without merging
+        the blocks. """
+        self._resolveSpill()
+        offset = 0
+        for i, block in enumerate(self._blocks):
+            length = self._lastBlockLength if i == len(self._blocks) - 1 else len(block)
+            for chunkStart in range(max(0, start - offset), length, maxRows or max(length, 1)):
+                yield block[chunkStart:length if maxRows is None else min(chunkStart + maxRows, length)]
+            offset += length
+
+    @property
+    def nBytesInMemory(self) -> int:
+        """ Size of the rows held in memory, excluding the rows spilled to a file or being spilled. """
+        nSpillingBlocks = self._pendingSpill[4] if self._pendingSpill else 0
+        return sum(block.nbytes for block in self._blocks[nSpillingBlocks:] if not isinstance(block, np.memmap))
+
+    def spill(self, store: LoggerStore, filename: str, start: int, executor: Executor = None):
+        """
+        Writes the rows from the index `start` to the array file of the store, which must already hold the previous
+        rows. The written rows are then replaced by a memory map of the file. When an executor is given, the rows are
+        written in the background and only replaced when the container is read or spilled again.
+        """
+        self._resolveSpill()
+        if self._length == start:
+            return
+        chunks = list(self.getChunks(start))
+        self._blocks[-1] = self._blocks[-1][:self._lastBlockLength]
+
+        if start == 0:
+            write, args = store.writeArray, (filename, chunks)
+        else:
+            write, args = store.appendArray, (filename, chunks, start, self.width)
+        future = executor.submit(write, *args) if executor else write(*args)
+        self._pendingSpill = (future, store, filename, self._length, len(self._blocks))
+        if executor is None:
+            self._resolveSpill()
+
+    def _resolveSpill(self):
+        if self._pendingSpill is None:
+            return
+        future, store, filename, length, nBlocks = self._pendingSpill
+        self._pendingSpill = None
+        if future is not None:
+            future.result()
+        isLastBlock = nBlocks == len(self._blocks)
+        self._blocks[:nBlocks] = [store.openArray(filename, length, self.width)]
+        if isLastBlock:
+            self._lastBlockLength = length
+        self._spilledLength = length
+        self._mergedData = None
+
+    def _merge(self) -> np.ndarray:
+        self._resolveSpill()
+        self._blocks[-1] = self._blocks[-1][:self._lastBlockLength]
+        if len(self._blocks) == 1:
+            mergedData = self._blocks[0]
+        else:
+            mergedData = np.concatenate(self._blocks, axis=0)
+            self._spilledLength = 0
+        self._blocks = [mergedData]
+        self._lastBlockLength = len(mergedData)
         return mergedData
+
+    def __getstate__(self):
+        return {"dtype": self._dtype, "data": self.getData()}
+
+    def __setstate__(self, state: dict):
+        self.__init__(state.get("dtype"))
+        if "data" in state:
+            data = state["data"]
+        else:
+            # Containers pickled before the block storage had a list of rows and an array.
+            rows, array = state.get("_list"), state.get("_array")
+            parts = [np.array(part) for part in (rows, array) if part is not None]
+            data = np.concatenate(parts, axis=0) if parts else None
+        if data is not None:
+            self._appendArray(data)
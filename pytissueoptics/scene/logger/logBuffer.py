@@ -0,0 +1,73 @@
+import array
+from typing import Dict, List
+
+import numpy as np
+
+from pytissueoptics.scene.geometry import Vector
+from pytissueoptics.scene.logger.logger import Logger, InteractionKey
+
+DEFAULT_BUFFER_SIZE = 2 ** 16
+
+
+class LogBuffer:
+    """
+    Preallocated buffer of datapoints flushed in bulk to a logger. Logging a datapoint only stores its value, its
+    position and the integer ID of its InteractionKey in typed arrays, so the logger receives one datapoint array per
+    key at each flush instead of one call per datapoint. The buffer is flushed when full and has to be flushed once
+    more when the logging is done.
+
+    The buffer has the same `logDataPoint` signature as the Logger, so it can be used in its place.
+    """
+    def __init__(self, logger: Logger, size: int = DEFAULT_BUFFER_SIZE):
+        self._logger = logger
+        self._size = size
+        self._dataPoints = array.array('d', bytes(8 * 4 * size))
+        self._keyIDs = array.array('l', bytes(array.array('l').itemsize * size))
+        self._length = 0
+
+        self._keys: List[InteractionKey] = []
+        self._keyToID: Dict[InteractionKey, int] = {}
+
+    def __len__(self):
+        return self._length
+
+    @property
+    def logger(self) -> Logger:
+        return self._logger
+
+    def logDataPoint(self, value: float, position: Vector, key: InteractionKey):
+        keyID = self._keyToID.get(key)
+        if keyID is None:
+            keyID = self._addKey(key)
+
+        i = self._length
+        j = 4 * i
+        self._dataPoints[j] = value
+        self._dataPoints[j + 1] = position.x
+        self._dataPoints[j + 2] = position.y
+        self._dataPoints[j + 3] = position.z
+        self._keyIDs[i] = keyID
+        self._length = i + 1
+
+        if self._length == self._size:
+            self.flush()
+
+    def _addKey(self, key: InteractionKey) -> int:
+        keyID = len(self._keys)
+        self._keys.append(key)
+        self._keyToID[key] = keyID
+        return keyID
+
+    def flush(self):
+        """ Logs the buffered datapoints of each key as a single array, in the order they were buffered. """
+        if self._length == 0:
+            return
+        dataPoints = np.frombuffer(self._dataPoints, dtype=np.float64, count=4 * self._length).reshape((-1, 4))
+        keyIDs = np.frombuffer(self._keyIDs, dtype=np.dtype(self._keyIDs.typecode), count=self._length)
+        self._length = 0
+
+        counts = np.bincount(keyIDs, minlength=len(self._keys))
+        offsets = np.concatenate(([0], np.cumsum(counts)))
+        sortedDataPoints = dataPoints[np.argsort(keyIDs, kind="stable")]
+        for keyID in np.flatnonzero(counts):
+            self._logger.logDataPointArray(sortedDataPoints[offsets[keyID]:offsets[keyID + 1]], self._keys[keyID])
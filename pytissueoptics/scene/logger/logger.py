@@ -1,15 +1,22 @@
+import hashlib
 import os
 import pickle
 import warnings
 from dataclasses import dataclass
-from typing import List, Dict, Optional, Union
+from concurrent.futures import Executor
+from typing import List, Dict, Optional, Union, Tuple, Iterator
 from enum import Enum
 
 import numpy as np
 
 from pytissueoptics.scene.logger.listArrayContainer import ListArrayContainer
+from pytissueoptics.scene.logger.loggerStore import LoggerStore, isStorePath
+from pytissueoptics.scene.logger.spatialIndex import SpatialIndex, BoundingBox, INDEX_BLOCK_ROWS, \
+    isInsideBoundingBox, getDataPointLimits
 from pytissueoptics.scene.geometry import Vector
 
+CHUNK_ROWS = 2 ** 20
+
 
 @dataclass(frozen=True)
 class InteractionKey:
@@ -38,6 +45,11 @@ class Logger:
         self.info: dict = {}
         self._filepath = None
         self._labels = {}
+        self._mergedData: Dict[DataType, Optional[np.ndarray]] = {}
+        self._store: Optional[LoggerStore] = None
+        self._storedLengths: Dict[Tuple[InteractionKey, DataType], int] = {}
+        self._spatialIndexes: Dict[InteractionKey, SpatialIndex] = {}
+        self._indexStore: Optional[LoggerStore] = None
 
         if fromFilepath:
             self.load(fromFilepath)
@@ -89,6 +101,7 @@ class Logger:
         if key is None:
             key = InteractionKey(None, None)
         self._validateKey(key)
+        self._mergedData.pop(dataType, None)
         previousData = getattr(self._data[key], dataType.value)
         if previousData is None:
             previousData = ListArrayContainer()
@@ -125,15 +138,145 @@ class Logger:
             container = getattr(self._data[key], dataType.value)
             return container.getData()
         else:
-            container = ListArrayContainer()
-            for interactionData in self._data.values():
-                points = getattr(interactionData, dataType.value)
-                if points is None:
-                    continue
-                container.extend(points)
-            if len(container) == 0:
-                return None
-            return container.getData()
+            if dataType not in self._mergedData:
+                self._mergedData[dataType] = self._mergeData(dataType)
+            return self._mergedData[dataType]
+
+    def getDataPointChunks(self, key: InteractionKey = None, maxRows: int = CHUNK_ROWS) -> Iterator[np.ndarray]:
+        """ Yields the datapoints of `getDataPoints` as consecutive arrays of at most `maxRows` rows, so they never
+        have to be loaded in memory all at once. """
+        return self._getDataChunks(DataType.DATA_POINT, key, maxRows)
+
+    def _getDataChunks(self, dataType: DataType, key: InteractionKey = None,
+                       maxRows: int = CHUNK_ROWS) -> Iterator[np.ndarray]:
+        if key and key.solidLabel:
+            if not self._keyExists(key):
+                return
+            containers = [getattr(self._data[key], dataType.value)]
+        else:
+            containers = [getattr(interactionData, dataType.value) for interactionData in self._data.values()]
+        for container in containers:
+            if container is not None:
+                yield from container.getChunks(maxRows=maxRows)
+
+    def buildSpatialIndex(self, key: InteractionKey = None, blockRows: int = INDEX_BLOCK_ROWS):
+        """
+        Builds a spatial index of the datapoints of the given key, or of every key, for the bounding box queries of
+        `query`. The index keeps a copy of the datapoints in Morton order, split in blocks with their bounding box and
+        the sum of their values (see SpatialIndex). Calling it again only adds the datapoints logged since. Datapoints
+        logged after the index was built are still queried, by a scan. The index is not saved with the logger.
+
+        When the datapoints are memory-mapped from a LoggerStore (loaded from a store or spilled to disk), the copy is
+        written to a temporary store and memory-mapped as well, so building the index never loads the datapoints in
+        memory all at once.
+        """
+        for key in self._getDataPointKeys(key):
+            container = self._data[key].dataPoints
+            index = self._getSpatialIndex(key)
+            if index is None:
+                limits = getDataPointLimits(container.getChunks(maxRows=CHUNK_ROWS))
+                if self._store is None:
+                    index = SpatialIndex(limits, blockRows)
+                else:
+                    if self._indexStore is None:
+                        self._indexStore = LoggerStore.temporary()
+                    index = SpatialIndex(limits, blockRows, self._indexStore,
+                                         self._getStoreFilename(key, DataType.DATA_POINT))
+                self._spatialIndexes[key] = index
+            index.extend(container.getChunks(start=len(index), maxRows=CHUNK_ROWS))
+
+    def query(self, key: InteractionKey = None, bbox: BoundingBox = None,
+              reduce: str = "sum") -> Union[float, np.ndarray]:
+        """
+        Returns the sum of the values of the datapoints of the given key (or of every key) inside the bounding box
+        ((xMin, xMax), (yMin, yMax), (zMin, zMax)), limits included, with `reduce='sum'`, or these datapoints with
+        `reduce='points'`. Without a bounding box, every datapoint is included.
+
+        The keys with a spatial index (see `buildSpatialIndex`) only read the blocks of datapoints that cross the
+        bounding box, and sum the blocks inside it from their sums. Other datapoints are scanned in chunks.
+        """
+        if reduce not in ("sum", "points"):
+            raise ValueError(f"Invalid reduce '{reduce}'. Available: 'sum', 'points'.")
+        total, dataPoints = 0.0, []
+        for key in self._getDataPointKeys(key):
+            container = self._data[key].dataPoints
+            index = self._getSpatialIndex(key)
+            indexedLength = 0
+            if index is not None and bbox is not None:
+                indexedLength = len(index)
+                if reduce == "sum":
+                    total += index.getSum(bbox)
+                else:
+                    dataPoints.append(index.getDataPoints(bbox))
+            for chunk in container.getChunks(start=indexedLength, maxRows=CHUNK_ROWS):
+                if bbox is not None:
+                    chunk = chunk[isInsideBoundingBox(chunk[:, 1:], bbox)]
+                if reduce == "sum":
+                    total += float(np.sum(chunk[:, 0], dtype=np.float64))
+                else:
+                    dataPoints.append(chunk)
+        if reduce == "sum":
+            return total
+        if not dataPoints:
+            return np.zeros((0, 4))
+        return np.concatenate(dataPoints, axis=0)
+
+    def _getDataPointKeys(self, key: InteractionKey = None) -> List[InteractionKey]:
+        """ Returns the given key, or every key, if it has datapoints. """
+        if key and key.solidLabel:
+            keys = [key] if self._keyExists(key) else []
+        else:
+            keys = list(self._data.keys())
+        return [key for key in keys if self._data[key].dataPoints is not None and len(self._data[key].dataPoints) > 0]
+
+    def _getSpatialIndex(self, key: InteractionKey) -> Optional[SpatialIndex]:
+        """ Returns the spatial index of the key, unless its datapoints were replaced since it was built. """
+        index = self._spatialIndexes.get(key)
+        if index is not None and len(index) > len(self._data[key].dataPoints):
+            del self._spatialIndexes[key]
+            return None
+        return index
+
+    def _mergeData(self, dataType: DataType) -> Optional[np.ndarray]:
+        arrays = []
+        for interactionData in self._data.values():
+            container = getattr(interactionData, dataType.value)
+            if container is None or len(container) == 0:
+                continue
+            arrays.append(container.getData())
+        if not arrays:
+            return None
+        if len(arrays) == 1:
+            return arrays[0]
+        return np.concatenate(arrays, axis=0)
+
+    def _getContainers(self) -> Iterator[Tuple[InteractionKey, DataType, ListArrayContainer]]:
+        for key, interactionData in self._data.items():
+            for dataType in DataType:
+                container = getattr(interactionData, dataType.value)
+                if container is not None and len(container) > 0:
+                    yield key, dataType, container
+
+    @property
+    def _nBytesInMemory(self) -> int:
+        return sum(container.nBytesInMemory for _, _, container in self._getContainers())
+
+    def _spillData(self, executor: Executor = None):
+        """ Moves the data held in memory to the array files of the logger store (a temporary store if the logger
+        was not loaded from or saved to a store). The data is then memory-mapped from these files. """
+        if self._store is None:
+            self._store = LoggerStore.temporary()
+        for key, dataType, container in self._getContainers():
+            start = self._storedLengths.get((key, dataType), 0)
+            container.spill(self._store, self._getStoreFilename(key, dataType), start, executor)
+            self._storedLengths[(key, dataType)] = len(container)
+        self._mergedData.clear()
+
+    def _clearData(self):
+        self._data.clear()
+        self._mergedData.clear()
+        self._storedLengths.clear()
+        self._spatialIndexes.clear()
 
     def _keyExists(self, key: InteractionKey) -> bool:
         if key.solidLabel not in self.getStoredSolidLabels():
@@ -146,12 +289,18 @@ class Logger:
         return False
 
     def save(self, filepath: str = None):
+        """ Saves the logger to a single pickle file, or to a LoggerStore directory when the path is a directory or
+        ends with '.logdir' (see LoggerStore). """
         if filepath is None and self._filepath is None:
             filepath = self.DEFAULT_LOGGER_PATH
             warnings.warn(f"No filepath specified. Saving to {filepath}.")
         elif filepath is None:
             filepath = self._filepath
 
+        if isStorePath(filepath):
+            self._saveToStore(LoggerStore(filepath))
+            return
+
         with open(filepath, "wb") as file:
             pickle.dump((self._data, self.info, self._labels), file)
 
@@ -163,8 +312,65 @@ class Logger:
                           "at this location if the logger is saved later on.".format(filepath))
             return
 
+        if isStorePath(filepath):
+            self._loadFromStore(LoggerStore(filepath))
+            return
+
         with open(filepath, "rb") as file:
             self._data, self.info, self._labels = pickle.load(file)
+        self._mergedData.clear()
+        self._spatialIndexes.clear()
+
+    def _saveToStore(self, store: LoggerStore, header: dict = None):
+        """ Writes the data arrays and the header to the store. When saving again to the store the logger was loaded
+        from (or last saved to), only the new rows are appended to the existing array files. """
+        isSameStore = self._store is not None and os.path.abspath(self._store.path) == os.path.abspath(store.path)
+        storedLengths = self._storedLengths if isSameStore else {}
+        oldFilenames = {entry["filename"] for entry in store.readHeader()["arrays"]} if store.exists() else set()
+
+        entries = []
+        self._storedLengths = {}
+        for key, dataType, container in self._getContainers():
+            filename = self._getStoreFilename(key, dataType)
+            storedLength = storedLengths.get((key, dataType))
+            if storedLength is not None and storedLength <= len(container):
+                store.appendArray(filename, container.getChunks(start=storedLength), storedLength, container.width)
+            else:
+                store.writeArray(filename, container.getChunks())
+            self._storedLengths[(key, dataType)] = len(container)
+            entries.append({"solidLabel": key.solidLabel, "surfaceLabel": key.surfaceLabel,
+                            "dataType": dataType.value, "filename": filename,
+                            "length": len(container), "width": container.width})
+
+        for filename in oldFilenames - {entry["filename"] for entry in entries}:
+            store.removeArray(filename)
+        store.writeHeader({"info": self.info, "labels": self._labels, "arrays": entries, **(header or {})})
+        self._store = store
+
+    def _loadFromStore(self, store: LoggerStore) -> dict:
+        """ Loads the header and memory-maps the data arrays of the store. Returns the header. """
+        header = store.readHeader()
+        self.info = header["info"]
+        self._labels = header["labels"]
+        self._data = {}
+        self._storedLengths = {}
+        for entry in header["arrays"]:
+            key = InteractionKey(entry["solidLabel"], entry["surfaceLabel"])
+            dataType = DataType(entry["dataType"])
+            array = store.openArray(entry["filename"], entry["length"], entry["width"])
+            if key not in self._data:
+                self._data[key] = InteractionData()
+            setattr(self._data[key], dataType.value, ListArrayContainer.fromArray(array))
+            self._storedLengths[(key, dataType)] = entry["length"]
+        self._mergedData.clear()
+        self._spatialIndexes.clear()
+        self._store = store
+        return header
+
+    @staticmethod
+    def _getStoreFilename(key: InteractionKey, dataType: DataType) -> str:
+        keyHash = hashlib.sha256(repr((key.solidLabel, key.surfaceLabel)).encode("utf-8")).hexdigest()[:16]
+        return f"{dataType.value}-{keyHash}.bin"
 
     @property
     def hasFilePath(self):
@@ -0,0 +1,126 @@
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import weakref
+from typing import Iterable, Optional
+
+import numpy as np
+
+STORE_FORMAT = "pytissueoptics-logger"
+STORE_VERSION = 1
+STORE_SUFFIX = ".logdir"
+STORE_DTYPE = np.float32
+
+
+def isStorePath(path: str) -> bool:
+    """ Loggers are saved to a LoggerStore (instead of a single pickle file) when the path is a directory or ends with
+    the store suffix. """
+    return path.endswith(STORE_SUFFIX) or os.path.isdir(path)
+
+
+class LoggerStore:
+    """
+    Versioned on-disk format of a Logger. The store is a directory holding:
+        header.json: The format version, the logger info and labels, and the description of every array file.
+        <name>.pkl: (Optional) Pickled objects of the logger subclasses, like the 2D views of an EnergyLogger.
+        <dataType>-<keyHash>.bin: The raw rows of each InteractionKey and data type, stored as row-major float32.
+
+    Array files can be memory-mapped, so a logger is loaded without reading its 3D data until it is used. New rows
+    are appended at the end of the existing files without rewriting them. Files are always replaced (never truncated)
+    when rewritten, so arrays already mapped from the previous files stay valid.
+    """
+    HEADER_FILENAME = "header.json"
+
+    def __init__(self, path: str):
+        self._path = path
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    def exists(self) -> bool:
+        return os.path.exists(self._headerPath)
+
+    @property
+    def _headerPath(self) -> str:
+        return os.path.join(self._path, self.HEADER_FILENAME)
+
+    def readHeader(self) -> dict:
+        with open(self._headerPath, "r") as file:
+            header = json.load(file)
+        if header.get("format") != STORE_FORMAT:
+            raise ValueError(f"The directory '{self._path}' is not a logger store.")
+        if header["version"] > STORE_VERSION:
+            raise ValueError(f"The logger store at '{self._path}' uses the format version {header['version']} which "
+                             f"is not supported by this version of PyTissueOptics (version {STORE_VERSION}).")
+        return header
+
+    def writeHeader(self, header: dict):
+        os.makedirs(self._path, exist_ok=True)
+        header = {"format": STORE_FORMAT, "version": STORE_VERSION, **header}
+        with open(self._temporaryPath(self.HEADER_FILENAME), "w") as file:
+            json.dump(header, file, indent=4, default=_toJSON)
+        self._replace(self.HEADER_FILENAME)
+
+    def readObject(self, name: str):
+        with open(os.path.join(self._path, f"{name}.pkl"), "rb") as file:
+            return pickle.load(file)
+
+    def writeObject(self, name: str, obj):
+        os.makedirs(self._path, exist_ok=True)
+        filename = f"{name}.pkl"
+        with open(self._temporaryPath(filename), "wb") as file:
+            pickle.dump(obj, file)
+        self._replace(filename)
+
+    def writeArray(self, filename: str, chunks: Iterable[np.ndarray]):
+        """ Replaces the content of the array file with the rows of the given chunks. """
+        os.makedirs(self._path, exist_ok=True)
+        with open(self._temporaryPath(filename), "wb") as file:
+            self._writeChunks(file, chunks)
+        self._replace(filename)
+
+    def appendArray(self, filename: str, chunks: Iterable[np.ndarray], start: int, width: int):
+        """ Writes the rows of the given chunks after the first `start` rows of the array file. Rows that were
+        written after them (without being saved to the header) are overwritten. """
+        with open(os.path.join(self._path, filename), "r+b") as file:
+            file.seek(start * width * np.dtype(STORE_DTYPE).itemsize)
+            file.truncate()
+            self._writeChunks(file, chunks)
+
+    @staticmethod
+    def _writeChunks(file, chunks: Iterable[np.ndarray]):
+        for chunk in chunks:
+            np.ascontiguousarray(chunk, dtype=STORE_DTYPE).tofile(file)
+
+    @classmethod
+    def temporary(cls) -> 'LoggerStore':
+        """ Creates a store in a new temporary directory, which is deleted with the store. """
+        store = cls(tempfile.mkdtemp(suffix=STORE_SUFFIX))
+        weakref.finalize(store, shutil.rmtree, store.path, ignore_errors=True)
+        return store
+
+    def openArray(self, filename: str, length: int, width: int) -> Optional[np.ndarray]:
+        """ Returns a read-only memory map of the first `length` rows of the array file. """
+        if length == 0:
+            return None
+        return np.memmap(os.path.join(self._path, filename), dtype=STORE_DTYPE, mode="r", shape=(length, width))
+
+    def removeArray(self, filename: str):
+        filepath = os.path.join(self._path, filename)
+        if os.path.exists(filepath):
+            os.remove(filepath)
+
+    def _temporaryPath(self, filename: str) -> str:
+        return os.path.join(self._path, filename + ".tmp")
+
+    def _replace(self, filename: str):
+        os.replace(self._temporaryPath(filename), os.path.join(self._path, filename))
+
+
+def _toJSON(obj):
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} cannot be saved in a logger store header.")
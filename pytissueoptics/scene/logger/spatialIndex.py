@@ -0,0 +1,152 @@
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from pytissueoptics.scene.logger.loggerStore import LoggerStore
+from pytissueoptics.scene.utils.morton import mortonEncode, getMortonCells
+
+INDEX_BLOCK_ROWS = 1024
+INDEX_MORTON_LEVEL = 10
+
+BoundingBox = Sequence[Tuple[float, float]]
+
+
+def isInsideBoundingBox(positions: np.ndarray, bbox: BoundingBox) -> np.ndarray:
+    """ Returns whether each (x, y, z) position is inside the bounding box ((xMin, xMax), (yMin, yMax), (zMin, zMax)),
+    limits included. """
+    isInside = np.ones(len(positions), dtype=bool)
+    for axis, (minLimit, maxLimit) in enumerate(bbox):
+        isInside &= (positions[:, axis] >= minLimit) & (positions[:, axis] <= maxLimit)
+    return isInside
+
+
+class SpatialIndex:
+    """
+    Spatial index of datapoints (value, x, y, z) for bounding box queries. The datapoints are copied in Morton (Z-order)
+    order and split in blocks of `blockRows` neighboring datapoints, each with the bounding box and the sum of the
+    values of its datapoints. A query skips the blocks outside the bounding box, uses the sum of the blocks inside it
+    and only scans the datapoints of the blocks that cross its boundary.
+
+    The datapoints are added in chunks (see `extend`) and each chunk is sorted on its own, so the index can be built
+    from data that does not fit in memory at once, at the cost of looser blocks. Positions outside the limits of the
+    index are clamped to its border cells, which only loosens the blocks.
+
+    When a LoggerStore is given, the sorted chunks are written to the array file `filename` of the store and read
+    back as a memory map, so only the block bounding boxes and sums are held in memory.
+    """
+    def __init__(self, limits: BoundingBox, blockRows: int = INDEX_BLOCK_ROWS, store: LoggerStore = None,
+                 filename: str = None):
+        self._limits = limits
+        self._blockRows = blockRows
+        self._length = 0
+        self._store = store
+        self._filename = filename
+
+        self._chunks: List[np.ndarray] = []
+        self._blockChunks = np.zeros(0, dtype=np.intp)
+        self._blockStarts = np.zeros(0, dtype=np.intp)
+        self._blockEnds = np.zeros(0, dtype=np.intp)
+        self._blockMins = np.zeros((0, 3))
+        self._blockMaxs = np.zeros((0, 3))
+        self._blockSums = np.zeros(0, dtype=np.float64)
+
+    def __len__(self):
+        """ The number of indexed datapoints. """
+        return self._length
+
+    @property
+    def nBlocks(self) -> int:
+        return len(self._blockSums)
+
+    @property
+    def nBytesInMemory(self) -> int:
+        """ Size of the index held in memory, excluding the sorted datapoints written to the store. """
+        arrays = [self._blockChunks, self._blockStarts, self._blockEnds, self._blockMins, self._blockMaxs,
+                  self._blockSums]
+        chunks = [chunk for chunk in self._chunks if not isinstance(chunk, np.memmap)]
+        return sum(chunk.nbytes for chunk in chunks) + sum(array.nbytes for array in arrays)
+
+    def extend(self, chunks: Iterable[np.ndarray]):
+        """ Adds the datapoints of each chunk to the index. """
+        for chunk in chunks:
+            if len(chunk) > 0:
+                self._addChunk(chunk)
+
+    def _addChunk(self, chunk: np.ndarray):
+        codes = mortonEncode(getMortonCells(chunk[:, 1:], self._limits, INDEX_MORTON_LEVEL))
+        dataPoints = chunk[np.argsort(codes, kind="stable")]
+        starts = np.arange(0, len(dataPoints), self._blockRows)
+
+        self._blockChunks = np.append(self._blockChunks, np.full(len(starts), len(self._chunks)))
+        self._blockStarts = np.append(self._blockStarts, starts)
+        self._blockEnds = np.append(self._blockEnds, np.append(starts[1:], len(dataPoints)))
+        self._blockMins = np.vstack([self._blockMins, np.minimum.reduceat(dataPoints[:, 1:], starts)])
+        self._blockMaxs = np.vstack([self._blockMaxs, np.maximum.reduceat(dataPoints[:, 1:], starts)])
+        self._blockSums = np.append(self._blockSums, np.add.reduceat(dataPoints[:, 0], starts, dtype=np.float64))
+        if self._store is not None:
+            dataPoints = self._writeChunk(dataPoints)
+        self._chunks.append(dataPoints)
+        self._length += len(dataPoints)
+
+    def _writeChunk(self, dataPoints: np.ndarray) -> np.ndarray:
+        """ Writes the sorted datapoints after the previous chunks in the array file of the store and returns their
+        memory map. """
+        width = dataPoints.shape[1]
+        if self._length == 0:
+            self._store.writeArray(self._filename, [dataPoints])
+        else:
+            self._store.appendArray(self._filename, [dataPoints], self._length, width)
+        return self._store.openArray(self._filename, self._length + len(dataPoints), width)[self._length:]
+
+    def getSum(self, bbox: BoundingBox) -> float:
+        """ Returns the sum of the values of the datapoints inside the bounding box (limits included). """
+        isInside, isCrossing = self._classifyBlocks(bbox)
+        total = np.sum(self._blockSums[isInside])
+        for dataPoints in self._getBlockDataPoints(isCrossing):
+            total += np.sum(dataPoints[isInsideBoundingBox(dataPoints[:, 1:], bbox), 0], dtype=np.float64)
+        return float(total)
+
+    def getDataPoints(self, bbox: BoundingBox) -> np.ndarray:
+        """ Returns the datapoints inside the bounding box (limits included), in the order of the index. """
+        isInside, isCrossing = self._classifyBlocks(bbox)
+        dataPoints = list(self._getBlockDataPoints(isInside))
+        for points in self._getBlockDataPoints(isCrossing):
+            dataPoints.append(points[isInsideBoundingBox(points[:, 1:], bbox)])
+        if not dataPoints:
+            return np.zeros((0, 4))
+        return np.concatenate(dataPoints, axis=0)
+
+    def _classifyBlocks(self, bbox: BoundingBox) -> Tuple[np.ndarray, np.ndarray]:
+        """ Returns which blocks are completely inside the bounding box and which blocks cross its boundary. """
+        minima = np.array([l[0] for l in bbox], dtype=np.float64)
+        maxima = np.array([l[1] for l in bbox], dtype=np.float64)
+        isInside = np.all((self._blockMins >= minima) & (self._blockMaxs <= maxima), axis=1)
+        isOutside = np.any((self._blockMaxs < minima) | (self._blockMins > maxima), axis=1)
+        return isInside, ~isInside & ~isOutside
+
+    def _getBlockDataPoints(self, isSelected: np.ndarray) -> Iterable[np.ndarray]:
+        """ Yields the datapoints of the selected blocks, merging the consecutive blocks of each chunk. """
+        blocks = np.flatnonzero(isSelected)
+        if len(blocks) == 0:
+            return
+        isNewRange = np.ones(len(blocks), dtype=bool)
+        isNewRange[1:] = (np.diff(blocks) != 1) | (np.diff(self._blockChunks[blocks]) != 0)
+        rangeFirstBlocks = blocks[isNewRange]
+        rangeLastBlocks = np.append(blocks[np.flatnonzero(isNewRange)[1:] - 1], blocks[-1])
+        for first, last in zip(rangeFirstBlocks, rangeLastBlocks):
+            yield self._chunks[self._blockChunks[first]][self._blockStarts[first]:self._blockEnds[last]]
+
+
+def getDataPointLimits(chunks: Iterable[np.ndarray]) -> Optional[List[Tuple[float, float]]]:
+    """ Returns the (min, max) limits of the positions of the datapoint chunks along each axis, or None without
+    datapoints. """
+    minima, maxima = None, None
+    for chunk in chunks:
+        if len(chunk) == 0:
+            continue
+        chunkMinima, chunkMaxima = np.min(chunk[:, 1:], axis=0), np.max(chunk[:, 1:], axis=0)
+        minima = chunkMinima if minima is None else np.minimum(minima, chunkMinima)
+        maxima = chunkMaxima if maxima is None else np.maximum(maxima, chunkMaxima)
+    if minima is None:
+        return None
+    return [(float(minimum), float(maximum)) for minimum, maximum in zip(minima, maxima)]
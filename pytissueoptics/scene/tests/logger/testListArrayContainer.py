@@ -1,8 +1,13 @@
+import os
+import pickle
+import tempfile
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
 
 from pytissueoptics.scene.logger.listArrayContainer import ListArrayContainer
+from pytissueoptics.scene.logger.loggerStore import LoggerStore
 
 
 class TestListArrayContainer(unittest.TestCase):
@@ -50,7 +55,7 @@ class TestListArrayContainer(unittest.TestCase):
 
         self.listArrayContainer.extend(self.otherListArrayContainer)
 
-        self.assertTrue(np.array_equal(np.array([[1, 2, 3], [7, 8, 9], [4, 5, 6], [10, 11, 12]]),
+        self.assertTrue(np.array_equal(np.array([[1, 2, 3], [4, 5, 6], [7, 8, 9], [10, 11, 12]]),
                                        self.listArrayContainer.getData()))
         self.assertTrue(np.array_equal(np.array([[7, 8, 9], [10, 11, 12]]), self.otherListArrayContainer.getData()))
 
@@ -69,3 +74,109 @@ class TestListArrayContainer(unittest.TestCase):
 
         self.otherListArrayContainer.append(np.array([[4, 5, 6]]))
         self.assertTrue(np.array_equal(np.array([[1, 2, 3]]), self.listArrayContainer.getData()))
+
+    def testWhenAppendingManyRowsAndArrays_shouldKeepRowsInOrder(self):
+        expectedData = []
+        for i in range(300):
+            if i % 3 == 0:
+                self.listArrayContainer.append([i, i, i])
+                expectedData.append([i, i, i])
+            else:
+                self.listArrayContainer.append(np.full((i, 3), i))
+                expectedData.extend([[i, i, i]] * i)
+
+        self.assertEqual(len(expectedData), len(self.listArrayContainer))
+        self.assertTrue(np.array_equal(np.array(expectedData), self.listArrayContainer.getData()))
+
+    def testGivenADtype_shouldStoreDataWithThisDtype(self):
+        container = ListArrayContainer(dtype=np.float32)
+        container.append([1, 2, 3])
+        container.append(np.array([[4, 5, 6]], dtype=np.float64))
+
+        self.assertEqual(np.float32, container.getData().dtype)
+
+    def testWhenAppendingArray_shouldKeepTheArrayDtype(self):
+        self.listArrayContainer.append(np.array([[1, 2, 3]], dtype=np.float32))
+        self.assertEqual(np.float32, self.listArrayContainer.getData().dtype)
+
+    def testWhenAppendingAfterGettingData_shouldUpdateData(self):
+        self.listArrayContainer.append([1, 2, 3])
+        self.listArrayContainer.getData()
+
+        self.listArrayContainer.append([4, 5, 6])
+
+        self.assertTrue(np.array_equal(np.array([[1, 2, 3], [4, 5, 6]]), self.listArrayContainer.getData()))
+
+    def testWhenPickled_shouldRestoreData(self):
+        self.listArrayContainer.append(np.array([[1, 2, 3]], dtype=np.float32))
+        self.listArrayContainer.append([4, 5, 6])
+
+        container = pickle.loads(pickle.dumps(self.listArrayContainer))
+
+        self.assertEqual(2, len(container))
+        self.assertEqual(np.float32, container.getData().dtype)
+        self.assertTrue(np.array_equal(np.array([[1, 2, 3], [4, 5, 6]]), container.getData()))
+
+    def testGivenAStateOfThePreviousFormat_shouldRestoreData(self):
+        container = ListArrayContainer.__new__(ListArrayContainer)
+        container.__setstate__({"_list": [[1, 2, 3]], "_array": np.array([[4, 5, 6]])})
+
+        self.assertTrue(np.array_equal(np.array([[1, 2, 3], [4, 5, 6]]), container.getData()))
+
+    def testWhenCreatedFromArray_shouldNotWriteToTheArray(self):
+        array = np.array([[1, 2, 3]])
+        array.setflags(write=False)
+
+        container = ListArrayContainer.fromArray(array)
+        container.append([4, 5, 6])
+        container.append(np.array([[7, 8, 9]]))
+
+        self.assertTrue(np.array_equal(np.array([[1, 2, 3], [4, 5, 6], [7, 8, 9]]), container.getData()))
+
+    def testWhenGetChunksFromStart_shouldYieldRowsFromStartInOrder(self):
+        self.listArrayContainer.append(np.full((100, 3), 1))
+        self.listArrayContainer.append(np.full((100, 3), 2))
+
+        chunks = list(self.listArrayContainer.getChunks(start=50))
+
+        self.assertTrue(np.array_equal(self.listArrayContainer.getData()[50:], np.concatenate(chunks)))
+
+    def testWhenGetChunksWithMaxRows_shouldYieldChunksOfAtMostMaxRows(self):
+        self.listArrayContainer.append(np.full((100, 3), 1))
+
+        chunks = list(self.listArrayContainer.getChunks(maxRows=30))
+
+        self.assertEqual([30, 30, 30, 10], [len(chunk) for chunk in chunks])
+
+    def testWhenSpill_shouldMemoryMapTheRowsFromTheStore(self):
+        self.listArrayContainer.append(np.array([[1, 2, 3], [4, 5, 6]]))
+        with tempfile.TemporaryDirectory() as tempDir:
+            self.listArrayContainer.spill(LoggerStore(tempDir), "a.bin", start=0)
+
+            self.assertEqual(0, self.listArrayContainer.nBytesInMemory)
+            self.assertIsInstance(self.listArrayContainer.getData(), np.memmap)
+            self.assertTrue(np.array_equal([[1, 2, 3], [4, 5, 6]], self.listArrayContainer.getData()))
+
+    def testGivenSpilledRows_whenAppendAndSpillAgain_shouldOnlyWriteTheNewRows(self):
+        self.listArrayContainer.append(np.array([[1, 2, 3]]))
+        with tempfile.TemporaryDirectory() as tempDir:
+            store = LoggerStore(tempDir)
+            self.listArrayContainer.spill(store, "a.bin", start=0)
+            self.listArrayContainer.append([4, 5, 6])
+            self.assertGreater(self.listArrayContainer.nBytesInMemory, 0)
+
+            self.listArrayContainer.spill(store, "a.bin", start=1)
+
+            self.assertEqual(2 * 3 * 4, os.path.getsize(os.path.join(tempDir, "a.bin")))
+            self.assertTrue(np.array_equal([[1, 2, 3], [4, 5, 6]], self.listArrayContainer.getData()))
+
+    def testWhenSpillInTheBackground_shouldKeepRowsAvailableAndInOrder(self):
+        expectedData = np.arange(3000).reshape((-1, 3))
+        with tempfile.TemporaryDirectory() as tempDir, ThreadPoolExecutor(max_workers=1) as executor:
+            store = LoggerStore(tempDir)
+            for i, rows in enumerate(np.split(expectedData, 10)):
+                self.listArrayContainer.append(rows)
+                self.listArrayContainer.spill(store, "a.bin", start=i * 100, executor=executor)
+
+            self.assertTrue(np.array_equal(expectedData, np.concatenate(list(self.listArrayContainer.getChunks()))))
+            self.assertEqual(0, self.listArrayContainer.nBytesInMemory)
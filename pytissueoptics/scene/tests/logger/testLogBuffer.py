@@ -0,0 +1,56 @@
+import unittest
+
+import numpy as np
+
+from pytissueoptics.scene.geometry import Vector
+from pytissueoptics.scene.logger import Logger, InteractionKey, LogBuffer
+
+
+class TestLogBuffer(unittest.TestCase):
+    KEY = InteractionKey("mySolid")
+    OTHER_KEY = InteractionKey("mySolid", "front")
+
+    def setUp(self):
+        self.logger = Logger()
+        self.logBuffer = LogBuffer(self.logger, size=4)
+
+    def testWhenLogDataPoint_shouldNotLogToLoggerBeforeFlush(self):
+        self.logBuffer.logDataPoint(0.5, Vector(1, 2, 3), self.KEY)
+
+        self.assertEqual(1, len(self.logBuffer))
+        self.assertIsNone(self.logger.getDataPoints())
+
+    def testWhenFlush_shouldLogDataPointsOfEachKeyInOrder(self):
+        self.logBuffer.logDataPoint(0.5, Vector(1, 2, 3), self.KEY)
+        self.logBuffer.logDataPoint(-0.2, Vector(4, 5, 6), self.OTHER_KEY)
+        self.logBuffer.logDataPoint(0.1, Vector(7, 8, 9), self.KEY)
+
+        self.logBuffer.flush()
+
+        self.assertEqual(0, len(self.logBuffer))
+        self.assertTrue(np.array_equal([[0.5, 1, 2, 3], [0.1, 7, 8, 9]], self.logger.getDataPoints(self.KEY)))
+        self.assertTrue(np.array_equal([[-0.2, 4, 5, 6]], self.logger.getDataPoints(self.OTHER_KEY)))
+
+    def testWhenBufferIsFull_shouldFlushToLogger(self):
+        for i in range(5):
+            self.logBuffer.logDataPoint(i, Vector(i, i, i), self.KEY)
+
+        self.assertEqual(1, len(self.logBuffer))
+        self.assertEqual(4, len(self.logger.getDataPoints(self.KEY)))
+
+        self.logBuffer.flush()
+        self.assertTrue(np.array_equal(np.arange(5), self.logger.getDataPoints(self.KEY)[:, 0]))
+
+    def testWhenPositionChangesAfterLogging_shouldLogThePositionAtTheTimeOfLogging(self):
+        position = Vector(1, 2, 3)
+        self.logBuffer.logDataPoint(0.5, position, self.KEY)
+
+        position.add(Vector(1, 1, 1))
+        self.logBuffer.flush()
+
+        self.assertTrue(np.array_equal([[0.5, 1, 2, 3]], self.logger.getDataPoints(self.KEY)))
+
+    def testGivenEmptyBuffer_whenFlush_shouldNotLogAnything(self):
+        self.logBuffer.flush()
+
+        self.assertIsNone(self.logger.getDataPoints())
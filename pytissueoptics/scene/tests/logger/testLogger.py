@@ -140,6 +140,15 @@ class TestLogger(unittest.TestCase):
         self.assertEqual(4, len(logger.getPoints()))
         self.assertEqual(4, len(logger.getPoints(InteractionKey(None, None))))
 
+    def testGivenAllDataWasRetrieved_whenLogNewData_shouldReturnAllDataWithTheNewData(self):
+        logger = Logger()
+        logger.logPoint(Vector(0, 0, 0), self.INTERACTION_KEY)
+        self.assertEqual(1, len(logger.getPoints()))
+
+        logger.logPoint(Vector(1, 0, 0), InteractionKey(self.SOLID_LABEL, "another surface"))
+
+        self.assertEqual(2, len(logger.getPoints()))
+
     def testWhenGetDataWithNonExistentKey_shouldWarnAndReturnNone(self):
         logger = Logger()
         with self.assertWarns(UserWarning):
@@ -267,3 +276,99 @@ class TestLogger(unittest.TestCase):
 
             self.assertTrue(np.array_equal(previousLogger.getPoints(), logger.getPoints()))
             self.assertEqual(previousLogger.info, logger.info)
+
+    def testGivenALoggerSavedToAStore_whenLoad_shouldLoadPreviousLoggerFromStore(self):
+        previousLogger = Logger()
+        previousLogger.logPoint(Vector(0, 0, 0), self.INTERACTION_KEY)
+        previousLogger.logDataPoint(0.5, Vector(1, 0, 0), InteractionKey(self.SOLID_LABEL))
+        previousLogger.logSegment(Vector(0, 0, 0), Vector(1, 1, 1))
+        previousLogger.info["some key"] = "some metadata"
+
+        with tempfile.TemporaryDirectory() as tempDir:
+            storePath = os.path.join(tempDir, "test.logdir")
+            previousLogger.save(storePath)
+
+            logger = Logger(storePath)
+
+            self.assertTrue(np.array_equal(previousLogger.getPoints(), logger.getPoints()))
+            self.assertTrue(np.array_equal(previousLogger.getDataPoints(), logger.getDataPoints()))
+            self.assertTrue(np.array_equal(previousLogger.getSegments(), logger.getSegments()))
+            self.assertEqual(previousLogger.info, logger.info)
+            self.assertEqual([self.SURFACE_LABEL], logger.getSeenSurfaceLabels(self.SOLID_LABEL))
+
+    def testGivenALoggerLoadedFromAStore_shouldMemoryMapTheStoredData(self):
+        previousLogger = Logger()
+        previousLogger.logPoint(Vector(0, 0, 0), self.INTERACTION_KEY)
+
+        with tempfile.TemporaryDirectory() as tempDir:
+            storePath = os.path.join(tempDir, "test.logdir")
+            previousLogger.save(storePath)
+
+            logger = Logger(storePath)
+
+            self.assertIsInstance(logger.getPoints(self.INTERACTION_KEY), np.memmap)
+
+    def testGivenALoggerLoadedFromAStore_whenSaveNewData_shouldAppendNewDataToTheStore(self):
+        previousLogger = Logger()
+        previousLogger.logPoint(Vector(0, 0, 0), self.INTERACTION_KEY)
+
+        with tempfile.TemporaryDirectory() as tempDir:
+            storePath = os.path.join(tempDir, "test.logdir")
+            previousLogger.save(storePath)
+            logger = Logger(storePath)
+            arrayFilePath = [os.path.join(storePath, f) for f in os.listdir(storePath) if f.endswith(".bin")][0]
+            inode = os.stat(arrayFilePath).st_ino
+
+            logger.logPoint(Vector(1, 0, 0), self.INTERACTION_KEY)
+            logger.save()
+
+            self.assertEqual(inode, os.stat(arrayFilePath).st_ino)
+            self.assertTrue(np.array_equal([[0, 0, 0], [1, 0, 0]], Logger(storePath).getPoints()))
+
+    def testWhenQuery_shouldReduceTheDatapointsInsideTheBoundingBox(self):
+        logger = Logger()
+        logger.logDataPointArray(np.array([[1, 0, 0, 0], [2, 0.5, 0.5, 0.5], [4, 1, 1, 1]]), self.INTERACTION_KEY)
+        logger.logDataPointArray(np.array([[8, 0.5, 0, 0]]), InteractionKey("otherSolid"))
+        bbox = ((0, 0.5), (0, 0.5), (0, 0.5))
+
+        self.assertEqual(3, logger.query(self.INTERACTION_KEY, bbox))
+        self.assertEqual(11, logger.query(bbox=bbox))
+        self.assertEqual(15, logger.query())
+        self.assertTrue(np.array_equal([[1, 0, 0, 0], [2, 0.5, 0.5, 0.5]],
+                                       logger.query(self.INTERACTION_KEY, bbox, reduce="points")))
+
+    def testGivenASpatialIndex_whenQuery_shouldAlsoIncludeTheDatapointsLoggedAfterTheIndexWasBuilt(self):
+        randomGenerator = np.random.default_rng(0)
+        dataPoints = np.hstack([randomGenerator.random((5000, 1)), randomGenerator.random((5000, 3))])
+        bbox = ((0.1, 0.4), (0.2, 0.9), (0, 0.5))
+        isInBBox = np.all((dataPoints[:, 1:] >= [0.1, 0.2, 0]) & (dataPoints[:, 1:] <= [0.4, 0.9, 0.5]), axis=1)
+        logger = Logger()
+        logger.logDataPointArray(dataPoints[:4000], self.INTERACTION_KEY)
+        logger.buildSpatialIndex(blockRows=64)
+        logger.logDataPointArray(dataPoints[4000:], self.INTERACTION_KEY)
+
+        self.assertAlmostEqual(np.sum(dataPoints[isInBBox, 0]), logger.query(self.INTERACTION_KEY, bbox))
+        self.assertEqual(np.count_nonzero(isInBBox), len(logger.query(self.INTERACTION_KEY, bbox, reduce="points")))
+
+    def testGivenALoggerLoadedFromAStore_whenBuildSpatialIndex_shouldMemoryMapTheIndexedDatapoints(self):
+        dataPoints = np.random.default_rng(0).random((5000, 4))
+        bbox = ((0.1, 0.4), (0.2, 0.9), (0, 0.5))
+        isInBBox = np.all((dataPoints[:, 1:] >= [0.1, 0.2, 0]) & (dataPoints[:, 1:] <= [0.4, 0.9, 0.5]), axis=1)
+        previousLogger = Logger()
+        previousLogger.logDataPointArray(dataPoints, self.INTERACTION_KEY)
+
+        with tempfile.TemporaryDirectory() as tempDir:
+            storePath = os.path.join(tempDir, "test.logdir")
+            previousLogger.save(storePath)
+            logger = Logger(storePath)
+
+            logger.buildSpatialIndex(blockRows=64)
+
+            index = logger._spatialIndexes[self.INTERACTION_KEY]
+            self.assertLess(index.nBytesInMemory, dataPoints.nbytes / 10)
+            self.assertAlmostEqual(np.sum(dataPoints[isInBBox, 0]), logger.query(self.INTERACTION_KEY, bbox), places=3)
+
+    def testWhenQueryWithAnInvalidReduce_shouldRaiseException(self):
+        logger = Logger()
+        with self.assertRaises(ValueError):
+            logger.query(reduce="mean")
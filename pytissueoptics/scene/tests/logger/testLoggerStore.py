@@ -0,0 +1,81 @@
+import json
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from pytissueoptics.scene.logger.loggerStore import LoggerStore, isStorePath, STORE_VERSION
+
+
+class TestLoggerStore(unittest.TestCase):
+    def setUp(self):
+        self.tempDir = tempfile.TemporaryDirectory()
+        self.store = LoggerStore(os.path.join(self.tempDir.name, "test.logdir"))
+
+    def tearDown(self):
+        self.tempDir.cleanup()
+
+    def testShouldBeAStorePathIfEndingWithStoreSuffixOrIfADirectory(self):
+        self.assertTrue(isStorePath("test.logdir"))
+        self.assertTrue(isStorePath(self.tempDir.name))
+        self.assertFalse(isStorePath("test.log"))
+
+    def testWhenWriteHeader_shouldReadHeaderWithFormatVersion(self):
+        self.store.writeHeader({"info": {"photonCount": np.int64(10)}})
+
+        header = self.store.readHeader()
+
+        self.assertTrue(self.store.exists())
+        self.assertEqual(STORE_VERSION, header["version"])
+        self.assertEqual({"photonCount": 10}, header["info"])
+
+    def testGivenAStoreOfANewerVersion_whenReadHeader_shouldRaiseError(self):
+        self.store.writeHeader({})
+        with open(os.path.join(self.store.path, LoggerStore.HEADER_FILENAME), "r+") as file:
+            header = json.load(file)
+            header["version"] = STORE_VERSION + 1
+            file.seek(0)
+            json.dump(header, file)
+
+        with self.assertRaises(ValueError):
+            self.store.readHeader()
+
+    def testWhenWriteArray_shouldOpenArrayAsFloat32MemoryMap(self):
+        self.store.writeArray("a.bin", [np.array([[1, 2, 3]]), np.array([[4, 5, 6]])])
+
+        array = self.store.openArray("a.bin", length=2, width=3)
+
+        self.assertIsInstance(array, np.memmap)
+        self.assertEqual(np.float32, array.dtype)
+        self.assertTrue(np.array_equal([[1, 2, 3], [4, 5, 6]], array))
+
+    def testWhenAppendArray_shouldKeepPreviousRowsAndPreviouslyOpenedArrays(self):
+        self.store.writeArray("a.bin", [np.array([[1, 2, 3]])])
+        previousArray = self.store.openArray("a.bin", length=1, width=3)
+
+        self.store.appendArray("a.bin", [np.array([[4, 5, 6]])], start=1, width=3)
+
+        self.assertTrue(np.array_equal([[1, 2, 3]], previousArray))
+        self.assertTrue(np.array_equal([[1, 2, 3], [4, 5, 6]], self.store.openArray("a.bin", length=2, width=3)))
+
+    def testWhenAppendArrayAfterStart_shouldOverwriteTheRowsAfterStart(self):
+        self.store.writeArray("a.bin", [np.array([[1, 2, 3], [4, 5, 6]])])
+
+        self.store.appendArray("a.bin", [np.array([[7, 8, 9]])], start=1, width=3)
+
+        self.assertEqual(2 * 3 * 4, os.path.getsize(os.path.join(self.store.path, "a.bin")))
+        self.assertTrue(np.array_equal([[1, 2, 3], [7, 8, 9]], self.store.openArray("a.bin", length=2, width=3)))
+
+    def testGivenATemporaryStore_whenDeleted_shouldRemoveItsDirectory(self):
+        store = LoggerStore.temporary()
+        store.writeHeader({})
+        path = store.path
+
+        del store
+
+        self.assertFalse(os.path.exists(path))
+
+    def testWhenWriteObject_shouldReadObject(self):
+        self.store.writeObject("views", ["view"])
+        self.assertEqual(["view"], self.store.readObject("views"))
@@ -0,0 +1,67 @@
+import unittest
+
+import numpy as np
+
+from pytissueoptics.scene.logger import SpatialIndex
+from pytissueoptics.scene.logger.loggerStore import LoggerStore
+
+
+class TestSpatialIndex(unittest.TestCase):
+    LIMITS = [(0, 1), (0, 1), (0, 1)]
+    BBOX = ((0.2, 0.6), (0.1, 0.5), (0.3, 0.9))
+
+    def setUp(self):
+        randomGenerator = np.random.default_rng(0)
+        self.dataPoints = np.hstack([randomGenerator.exponential(1, (10000, 1)), randomGenerator.random((10000, 3))])
+        self.isInBBox = np.all((self.dataPoints[:, 1:] >= [0.2, 0.1, 0.3]) &
+                               (self.dataPoints[:, 1:] <= [0.6, 0.5, 0.9]), axis=1)
+
+    def testWhenExtend_shouldSplitEachChunkInBlocksOfNeighboringDatapoints(self):
+        index = SpatialIndex(self.LIMITS, blockRows=100)
+
+        index.extend(np.array_split(self.dataPoints, 3))
+
+        self.assertEqual(10000, len(index))
+        self.assertEqual(102, index.nBlocks)
+        # Blocks of 100 unsorted datapoints would span about 90% of the volume.
+        blockVolumes = np.prod(index._blockMaxs - index._blockMins, axis=1)
+        self.assertLess(np.mean(blockVolumes), 0.2)
+
+    def testWhenGetSum_shouldReturnTheSumOfTheDatapointsInsideTheBoundingBox(self):
+        index = SpatialIndex(self.LIMITS, blockRows=100)
+        index.extend([self.dataPoints])
+
+        self.assertAlmostEqual(np.sum(self.dataPoints[self.isInBBox, 0]), index.getSum(self.BBOX))
+
+    def testWhenGetDataPoints_shouldReturnTheDatapointsInsideTheBoundingBox(self):
+        index = SpatialIndex(self.LIMITS, blockRows=100)
+        index.extend(np.array_split(self.dataPoints, 2))
+
+        dataPoints = index.getDataPoints(self.BBOX)
+
+        expectedDataPoints = self.dataPoints[self.isInBBox]
+        self.assertEqual(len(expectedDataPoints), len(dataPoints))
+        self.assertTrue(np.array_equal(np.sort(expectedDataPoints[:, 0]), np.sort(dataPoints[:, 0])))
+
+    def testGivenABoundingBoxContainingEveryBlock_shouldOnlySumTheBlocks(self):
+        index = SpatialIndex(self.LIMITS, blockRows=100)
+        index.extend([self.dataPoints])
+        index._chunks = None
+
+        self.assertAlmostEqual(np.sum(self.dataPoints[:, 0]), index.getSum(self.LIMITS))
+
+    def testGivenABoundingBoxOutsideTheDatapoints_shouldReturnNothing(self):
+        index = SpatialIndex(self.LIMITS)
+        index.extend([self.dataPoints])
+
+        self.assertEqual(0, index.getSum(((2, 3), (0, 1), (0, 1))))
+        self.assertEqual((0, 4), index.getDataPoints(((2, 3), (0, 1), (0, 1))).shape)
+
+    def testGivenAStore_shouldMemoryMapTheSortedDatapointsFromTheStore(self):
+        index = SpatialIndex(self.LIMITS, blockRows=100, store=LoggerStore.temporary(), filename="index.bin")
+        index.extend(np.array_split(self.dataPoints, 3))
+
+        self.assertTrue(all(isinstance(chunk, np.memmap) for chunk in index._chunks))
+        self.assertLess(index.nBytesInMemory, self.dataPoints.nbytes / 10)
+        self.assertAlmostEqual(np.sum(self.dataPoints[self.isInBBox, 0]), index.getSum(self.BBOX), places=3)
+        self.assertEqual(np.count_nonzero(self.isInBBox), len(index.getDataPoints(self.BBOX)))
@@ -0,0 +1,21 @@
+import unittest
+
+import numpy as np
+
+from pytissueoptics.scene.utils import mortonEncode, getMortonCells
+
+
+class TestMorton(unittest.TestCase):
+    def testShouldInterleaveTheBitsOfTheCellCoordinates(self):
+        cells = np.array([[1, 0, 0], [0, 1, 0], [0, 0, 1], [3, 0, 1]], dtype=np.uint64)
+        self.assertTrue(np.array_equal([1, 2, 4, 0b001101], mortonEncode(cells)))
+
+    def testShiftingACodeRightBy3Bits_shouldGiveTheCodeOfTheParentCell(self):
+        cells = np.array([[5, 2, 7], [2 ** 20 + 3, 6, 2 ** 21 - 1]], dtype=np.uint64)
+        parentCodes = mortonEncode(cells) >> np.uint64(3)
+        self.assertTrue(np.array_equal(mortonEncode(cells // 2), parentCodes))
+
+    def testShouldReturnTheCellOfEachPositionInTheLimits(self):
+        positions = np.array([[0.1, 0.6, 0.99], [-1, 2, 0.5]])
+        cells = getMortonCells(positions, [(0, 1), (0, 1), (0, 1)], level=2)
+        self.assertTrue(np.array_equal([[0, 2, 3], [0, 3, 2]], cells))
@@ -1 +1,2 @@
 from .progressBar import progressBar
+from .morton import mortonEncode, getMortonCells, MORTON_BITS
@@ -0,0 +1,35 @@
+import numpy as np
+
+MORTON_BITS = 21
+
+
+def _spreadBits(values: np.ndarray) -> np.ndarray:
+    """ Inserts two zero bits between each of the first 21 bits of the values. """
+    values = values.astype(np.uint64) & np.uint64(0x1FFFFF)
+    values = (values | values << np.uint64(32)) & np.uint64(0x1F00000000FFFF)
+    values = (values | values << np.uint64(16)) & np.uint64(0x1F0000FF0000FF)
+    values = (values | values << np.uint64(8)) & np.uint64(0x100F00F00F00F00F)
+    values = (values | values << np.uint64(4)) & np.uint64(0x10C30C30C30C30C3)
+    values = (values | values << np.uint64(2)) & np.uint64(0x1249249249249249)
+    return values
+
+
+def mortonEncode(cells: np.ndarray) -> np.ndarray:
+    """
+    Returns the Morton code (Z-order) of integer 3D cell coordinates of shape (n, 3), each in [0, 2**21). The bits of
+    the x, y and z coordinates are interleaved, so sorting the codes sorts the cells along a Z-order curve where each
+    octree cell is a contiguous range of codes, and shifting a code right by 3 bits gives the code of its parent cell.
+    """
+    return _spreadBits(cells[:, 0]) | _spreadBits(cells[:, 1]) << np.uint64(1) | \
+        _spreadBits(cells[:, 2]) << np.uint64(2)
+
+
+def getMortonCells(positions: np.ndarray, limits, level: int) -> np.ndarray:
+    """ Returns the integer cell coordinates (n, 3) of the positions in a grid of 2**level cells along each axis of
+    the limits. Positions outside the limits are clipped to the nearest cell. """
+    minima = np.array([l[0] for l in limits], dtype=np.float64)
+    sizes = np.array([l[1] - l[0] for l in limits], dtype=np.float64)
+    sizes[sizes == 0] = 1
+    nCells = 2 ** level
+    cells = np.floor((positions - minima) / sizes * nCells)
+    return np.clip(cells, 0, nCells - 1).astype(np.uint64)